@@ -0,0 +1,48 @@
+"""
+add tag_statistics aggregate table
+
+Revision ID: 009_tag_statistics
+Revises: 008_add_primary_skill_area
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+# revision identifiers, used by Alembic.
+revision = '009_tag_statistics'
+down_revision = '008_add_primary_skill_area'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'tag_statistics' not in inspector.get_table_names():
+        op.create_table(
+            'tag_statistics',
+            sa.Column('tag', sa.String(length=100), primary_key=True),
+            sa.Column('problem_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('quality_sum', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('quality_sq_sum', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('relevance_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('relevance_sum', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('relevance_sq_sum', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('high_relevance_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_tag_statistics_problem_count', 'tag_statistics', ['problem_count'])
+
+    # Backfill from existing problems
+    from src.models.database import rebuild_tag_statistics
+    session = Session(bind=bind)
+    try:
+        rebuild_tag_statistics(session)
+    finally:
+        session.close()
+
+
+def downgrade():
+    op.drop_index('ix_tag_statistics_problem_count', table_name='tag_statistics')
+    op.drop_table('tag_statistics')
@@ -0,0 +1,122 @@
+"""
+move problem embeddings into the binary embedding store
+
+problem_embeddings keeps only metadata and the row offset into the
+memory-mapped .npy matrices; the primary key becomes
+(problem_id, embedding_model) so model versions can coexist. Vectors still
+held in the old JSON columns are exported to the store before they are
+dropped; rows whose vectors do not match the model's dimension are skipped
+and logged.
+
+Revision ID: 010_embedding_store
+Revises: 009_tag_statistics
+Create Date: 2026-10-18
+"""
+import logging
+from collections import Counter, defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_embedding_store'
+down_revision = '009_tag_statistics'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+_METADATA_COLUMNS = (
+    'problem_id', 'embedding_model', 'row_offset', 'embedding_dimension',
+    'embedding_quality_score', 'created_at', 'updated_at',
+)
+
+
+def _create_table(name, default_model):
+    op.create_table(name,
+        sa.Column('problem_id', sa.String(length=50), nullable=False),
+        sa.Column('embedding_model', sa.String(length=50), nullable=False, server_default=default_model),
+        sa.Column('row_offset', sa.Integer(), nullable=False),
+        sa.Column('embedding_dimension', sa.Integer(), nullable=True),
+        sa.Column('embedding_quality_score', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+        sa.PrimaryKeyConstraint('problem_id', 'embedding_model')
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('problem_embeddings')}
+    if 'row_offset' in columns:
+        return
+
+    from src.ml.embedding_store import (
+        DEFAULT_EMBEDDING_MODEL, DEFAULT_STORE_DIR, LEGACY_EMBEDDING_MODEL, EmbeddingStoreWriter,
+    )
+
+    legacy = sa.table('problem_embeddings',
+        sa.column('problem_id', sa.String), sa.column('embedding_model', sa.String),
+        sa.column('title_embedding', sa.JSON), sa.column('description_embedding', sa.JSON),
+        sa.column('combined_embedding', sa.JSON), sa.column('embedding_dimension', sa.Integer),
+        sa.column('embedding_quality_score', sa.Float),
+        sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime),
+    )
+    by_model = defaultdict(list)
+    for row in bind.execute(sa.select(legacy).order_by(legacy.c.problem_id)).mappings():
+        by_model[row['embedding_model'] or LEGACY_EMBEDDING_MODEL].append(row)
+
+    migrated = []
+    for model, all_rows in by_model.items():
+        lengths = Counter(len(r['combined_embedding'] or []) for r in all_rows)
+        dimension = max(lengths, key=lambda length: (lengths[length], length)) or 128
+        rows = []
+        for r in all_rows:
+            if any(len(r[c] or []) not in (0, dimension) for c in ('combined_embedding', 'title_embedding', 'description_embedding')):
+                logger.warning("Skipping %s embedding of problem %s: vectors are not %d-dimensional",
+                               model, r['problem_id'], dimension)
+            else:
+                rows.append(r)
+        if not rows:
+            continue
+        with EmbeddingStoreWriter(DEFAULT_STORE_DIR, model, len(rows), dimension,
+                                  metadata={"source": "010_embedding_store"}) as writer:
+            for r in rows:
+                offset = writer.write(r['problem_id'], r['combined_embedding'],
+                                      r['title_embedding'], r['description_embedding'])
+                migrated.append({
+                    'problem_id': r['problem_id'], 'embedding_model': model, 'row_offset': offset,
+                    'embedding_dimension': r['embedding_dimension'],
+                    'embedding_quality_score': r['embedding_quality_score'],
+                    'created_at': r['created_at'], 'updated_at': r['updated_at'],
+                })
+
+    _create_table('problem_embeddings_new', DEFAULT_EMBEDDING_MODEL)
+    if migrated:
+        new_table = sa.table('problem_embeddings_new', *(sa.column(c) for c in _METADATA_COLUMNS))
+        op.bulk_insert(new_table, migrated)
+    op.drop_index('idx_embedding_quality', table_name='problem_embeddings')
+    op.drop_table('problem_embeddings')
+    op.rename_table('problem_embeddings_new', 'problem_embeddings')
+    op.create_index('idx_embedding_quality', 'problem_embeddings', ['embedding_quality_score'], unique=False)
+
+
+def downgrade():
+    # Vectors stay in the store files; the JSON columns come back empty
+    op.drop_index('idx_embedding_quality', table_name='problem_embeddings')
+    op.drop_table('problem_embeddings')
+    op.create_table('problem_embeddings',
+        sa.Column('problem_id', sa.String(length=50), nullable=False),
+        sa.Column('title_embedding', sa.JSON(), nullable=False),
+        sa.Column('description_embedding', sa.JSON(), nullable=False),
+        sa.Column('combined_embedding', sa.JSON(), nullable=False),
+        sa.Column('embedding_model', sa.String(length=50), nullable=True),
+        sa.Column('embedding_dimension', sa.Integer(), nullable=True),
+        sa.Column('embedding_quality_score', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+        sa.PrimaryKeyConstraint('problem_id')
+    )
+    op.create_index('idx_embedding_quality', 'problem_embeddings', ['embedding_quality_score'], unique=False)
@@ -0,0 +1,31 @@
+"""
+add watermark column to data_pipeline_status
+
+Incremental pipeline runs record per-source change-tracking state (file
+hash/mtime, last Codeforces contest id, row updated_at) here.
+
+Revision ID: 011_pipeline_watermarks
+Revises: 010_embedding_store
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_pipeline_watermarks'
+down_revision = '010_embedding_store'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c['name'] for c in inspector.get_columns('data_pipeline_status')}
+    if 'watermark' not in columns:
+        with op.batch_alter_table('data_pipeline_status') as batch_op:
+            batch_op.add_column(sa.Column('watermark', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('data_pipeline_status') as batch_op:
+        batch_op.drop_column('watermark')
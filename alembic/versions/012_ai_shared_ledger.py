@@ -0,0 +1,45 @@
+"""
+add shared AI cost ledger and session budget tables
+
+Lets several API workers enforce one monthly cost cap and one set of
+per-session budgets through atomic conditional updates.
+
+Revision ID: 012_ai_shared_ledger
+Revises: 011_pipeline_watermarks
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_ai_shared_ledger'
+down_revision = '011_pipeline_watermarks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'ai_cost_ledger' not in tables:
+        op.create_table(
+            'ai_cost_ledger',
+            sa.Column('month_key', sa.String(length=7), primary_key=True),
+            sa.Column('used_usd', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+    if 'ai_budget_usage' not in tables:
+        op.create_table(
+            'ai_budget_usage',
+            sa.Column('session_id', sa.String(length=100), primary_key=True),
+            sa.Column('action', sa.String(length=30), primary_key=True),
+            sa.Column('used', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('expires_at', sa.Float(), nullable=False),
+        )
+        op.create_index('ix_ai_budget_usage_expires_at', 'ai_budget_usage', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_ai_budget_usage_expires_at', table_name='ai_budget_usage')
+    op.drop_table('ai_budget_usage')
+    op.drop_table('ai_cost_ledger')
@@ -0,0 +1,40 @@
+"""
+add precomputed AI responses table
+
+Stores query-less hints and elaboration prompts generated offline per
+problem and provider/model, tagged with the problem content hash they were
+generated from.
+
+Revision ID: 013_ai_precomputed_responses
+Revises: 012_ai_shared_ledger
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_ai_precomputed_responses'
+down_revision = '012_ai_shared_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'ai_precomputed_responses' not in inspector.get_table_names():
+        op.create_table(
+            'ai_precomputed_responses',
+            sa.Column('problem_id', sa.String(length=50), primary_key=True),
+            sa.Column('action', sa.String(length=30), primary_key=True),
+            sa.Column('provider', sa.String(length=50), primary_key=True),
+            sa.Column('model', sa.String(length=100), primary_key=True, server_default=''),
+            sa.Column('content_hash', sa.String(length=32), nullable=False),
+            sa.Column('response', sa.JSON(), nullable=False),
+            sa.Column('generated_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_ai_precomputed_responses_content_hash', 'ai_precomputed_responses', ['content_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_ai_precomputed_responses_content_hash', table_name='ai_precomputed_responses')
+    op.drop_table('ai_precomputed_responses')
@@ -0,0 +1,96 @@
+"""
+Benchmark the IVF ANN index against exact (brute-force) cosine search.
+
+Reports build time, then recall@k and per-query latency for a sweep of nprobe
+values. Uses the embedding store when one exists (--store), otherwise a
+synthetic clustered catalogue of --count vectors.
+
+Usage examples (from repo root):
+  python scripts/benchmark_ann_index.py --count 100000 --queries 500
+  python scripts/benchmark_ann_index.py --store --nprobe 4 8 16 32
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+# Ensure repo root is on sys.path so `import src.*` works when running as a script
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.ml.ann_index import IVFIndex, recall_at_k  # noqa: E402
+from src.ml.embedding_store import DEFAULT_EMBEDDING_MODEL, EmbeddingStore  # noqa: E402
+
+
+def synthetic_vectors(count: int, dimension: int, topics: int, noise: float, seed: int) -> np.ndarray:
+    """Vectors scattered around random topic directions, like embeddings of related problems."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dimension)).astype(np.float32)
+    vectors = centres[rng.integers(0, topics, count)]
+    vectors += noise * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors
+
+
+def exact_search(vectors: np.ndarray, k: int):
+    """Brute-force cosine top-k over pre-normalised vectors (the baseline being replaced)."""
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def search(query: np.ndarray):
+        scores = normalized @ (query / max(np.linalg.norm(query), 1e-12))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [[(int(i), float(scores[i])) for i in top[np.argsort(-scores[top])]]]
+    return search
+
+
+def timed_per_query(fn, queries):
+    started = time.perf_counter()
+    results = [fn(query)[0] for query in queries]
+    return results, (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN recall and latency against exact search")
+    parser.add_argument("--store", action="store_true", help="Use the embedding store instead of synthetic data")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--count", type=int, default=100_000, help="Synthetic catalogue size")
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--topics", type=int, default=500, help="Synthetic topic clusters")
+    parser.add_argument("--noise", type=float, default=1.0, help="Spread of synthetic vectors around their topic")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None, help="Inverted lists (default ~4*sqrt(count))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.store:
+        store = EmbeddingStore.open(args.model, mmap=False)
+        if store is None:
+            print(f"❌ No embedding store for model {args.model}")
+            sys.exit(1)
+        vectors = np.asarray(store.matrix("combined"))
+    else:
+        vectors = synthetic_vectors(args.count, args.dimension, args.topics, args.noise, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    started = time.perf_counter()
+    index = IVFIndex.build(vectors, nlist=args.nlist)
+    build_seconds = time.perf_counter() - started
+    print(f"Catalogue: {len(vectors)} x {vectors.shape[1]}, nlist={index.nlist}, built in {build_seconds:.2f}s")
+
+    exact, exact_ms = timed_per_query(exact_search(vectors, args.k), queries)
+    print(f"{'search':>12} {'recall@' + str(args.k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>10.3f} {1.0:>8.1f}")
+    for nprobe in args.nprobe:
+        approx, ms = timed_per_query(lambda q: index.search(q, args.k, nprobe=nprobe), queries)
+        print(f"{'nprobe=' + str(nprobe):>12} {recall_at_k(approx, exact):>10.3f} {ms:>10.3f} {exact_ms / ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark AI hint latency with per-call settings file reads versus the shared snapshot.
+
+Runs AIService.generate_hint against a throwaway SQLite database and settings
+file (local provider, limits out of the way, a distinct query per call so the
+response cache never answers). "file" re-reads and parses the settings file
+on every access, as SettingsService.load did before snapshots; "snapshot"
+uses the cached, change-notified snapshot.
+
+Usage examples (from repo root):
+  python scripts/benchmark_settings_snapshot.py
+  python scripts/benchmark_settings_snapshot.py --calls 5000 --rounds 5
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+# Ensure repo root is on sys.path so `import src.*` works when running as a script
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.models.database import Base, DatabaseConfig, Problem  # noqa: E402
+from src.services.ai_service import AIService  # noqa: E402
+from src.services.settings_service import Settings, SettingsService, SettingsSnapshot  # noqa: E402
+
+
+class FileReadingSettingsService(SettingsService):
+    """Parses the settings file on every access (the behaviour being replaced)."""
+
+    def snapshot(self) -> SettingsSnapshot:
+        return SettingsSnapshot(settings=self._read(), version=0, file_stat=None)
+
+
+def hint_latencies_us(service: AIService, calls: int, offset: int):
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        service.generate_hint("bench_1", query=f"q{offset + i}")
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hint latency with and without the settings snapshot")
+    parser.add_argument("--calls", type=int, default=2000, help="Hints per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseConfig(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=db.engine)
+        session = db.get_session()
+        session.add(Problem(id="bench_1", platform="custom", platform_id="b1", title="Benchmark Problem",
+                            difficulty="Easy", algorithm_tags=["arrays"]))
+        session.commit()
+
+        settings_path = Path(tmp) / "user_settings.json"
+        SettingsService(settings_path).save(Settings(
+            enable_ai=True, ai_provider="local", rate_limit_per_minute=10 ** 9,
+            monthly_cost_cap_usd=10 ** 6, hint_budget_per_session=0,
+        ))
+        variants = {
+            "file": AIService(session, settings=FileReadingSettingsService(settings_path)),
+            "snapshot": AIService(session, settings=SettingsService(settings_path)),
+        }
+        results = {name: [] for name in variants}
+        offset = 0
+        for _ in range(args.rounds):
+            for name, service in variants.items():
+                results[name] += hint_latencies_us(service, args.calls, offset)
+                offset += args.calls
+        session.close()
+
+    print(f"{'settings':>10} {'p50 us':>10} {'p95 us':>10} {'mean us':>10}")
+    for name, latencies in results.items():
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(f"{name:>10} {statistics.median(latencies):>10.1f} {p95:>10.1f} {statistics.fmean(latencies):>10.1f}")
+    speedup = statistics.median(results["file"]) / statistics.median(results["snapshot"])
+    print(f"Median speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
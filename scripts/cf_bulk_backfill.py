@@ -6,12 +6,14 @@ Async bulk backfill for Codeforces problem statements.
 Features:
 - Finds Codeforces problems with empty/short descriptions
 - Async HTTP with concurrency limit and polite rate limiting
-- Batch DB commits
-- Resumable via progress file (JSON)
+- Batch DB commits, decoupled from fetch concurrency
+- Resumable via a crash-safe SQLite progress store (one status row per problem)
+- Live fetch rate, error rate and ETA reporting
 
 Usage examples (from repo root):
   python scripts/cf_bulk_backfill.py --max 500 --concurrency 5 --delay 0.5
   python scripts/cf_bulk_backfill.py --resume
+  python scripts/cf_bulk_backfill.py --resume --commit-batch 200 --max-attempts 5
     # Optionally supply cookies to bypass 403 (env or flag):
     CF_COOKIE="__cf_bm=...; JSESSIONID=..." python scripts/cf_bulk_backfill.py --max 500
 """
@@ -21,9 +23,12 @@ import asyncio
 import json
 import os
 import re
+import sqlite3
+import time
+from collections import deque
 from pathlib import Path
 import sys
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
 
 import httpx
 from bs4 import BeautifulSoup
@@ -37,8 +42,9 @@ from src.models.database import DatabaseConfig, Problem
 from sqlalchemy import func
 
 ROOT = Path(__file__).resolve().parents[1]
-PROGRESS_FILE = ROOT / "data" / "processed" / "cf_backfill_progress.json"
-PROGRESS_FILE.parent.mkdir(parents=True, exist_ok=True)
+PROGRESS_DB = ROOT / "data" / "processed" / "cf_backfill_progress.sqlite3"
+# Whole-file JSON progress of earlier versions; imported once into PROGRESS_DB
+LEGACY_PROGRESS_FILE = ROOT / "data" / "processed" / "cf_backfill_progress.json"
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -274,17 +280,132 @@ async def scrape_problem(client: httpx.AsyncClient, contest_id: str, index: str,
     raise last_exc
 
 
-def load_progress() -> Dict[str, Any]:
-    if PROGRESS_FILE.exists():
+class ProgressStore:
+    """Per-problem backfill status in a small SQLite database.
+
+    Every status change is its own row update in WAL mode, so a kill at any
+    point loses at most the item in flight, and the cost of a checkpoint does
+    not grow with the number of items already done. An item becomes ``done``
+    only after its data is committed to the main database.
+    """
+
+    def __init__(self, path: Path, legacy_file: Optional[Path] = None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            " problem_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        if legacy_file is not None and legacy_file.exists() and not self.counts():
+            self._import_legacy(legacy_file)
+
+    def _import_legacy(self, legacy_file: Path) -> None:
         try:
-            return json.loads(PROGRESS_FILE.read_text(encoding="utf-8"))
+            legacy = json.loads(legacy_file.read_text(encoding="utf-8"))
         except Exception:
-            pass
-    return {"completed": [], "failures": []}
-
+            return
+        attempts: Dict[str, Tuple[int, Optional[str]]] = {}
+        for failure in legacy.get("failures", []):
+            count, _ = attempts.get(failure.get("id"), (0, None))
+            attempts[failure.get("id")] = (count + 1, failure.get("error"))
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO progress VALUES (?, 'failed', ?, ?, ?)",
+                [(pid, count, error, now) for pid, (count, error) in attempts.items() if pid],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO progress VALUES (?, 'done', 0, NULL, ?)",
+                [(pid, now) for pid in legacy.get("completed", [])],
+            )
+        print(f"Imported legacy progress: {len(legacy.get('completed', []))} done, {len(attempts)} failed")
+
+    def finished(self, max_attempts: int) -> Set[str]:
+        """Ids not worth fetching again: done, or failed ``max_attempts`` times."""
+        rows = self.conn.execute(
+            "SELECT problem_id FROM progress WHERE status = 'done' OR (status = 'failed' AND attempts >= ?)",
+            (max_attempts,),
+        )
+        return {pid for (pid,) in rows}
+
+    def record_failure(self, problem_id: str, error: Optional[str]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO progress VALUES (?, 'failed', 1, ?, ?) "
+                "ON CONFLICT(problem_id) DO UPDATE SET status = 'failed', attempts = attempts + 1, "
+                "error = excluded.error, updated_at = excluded.updated_at",
+                (problem_id, error, time.time()),
+            )
+
+    def record_done(self, problem_ids: Iterable[str]) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO progress VALUES (?, 'done', 0, NULL, ?) "
+                "ON CONFLICT(problem_id) DO UPDATE SET status = 'done', error = NULL, updated_at = excluded.updated_at",
+                [(pid, now) for pid in problem_ids],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM progress GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class RateMeter:
+    """Fetch rate over a sliding window, error rate and ETA for the current run."""
+
+    def __init__(self, total: int, window_seconds: float = 60.0):
+        self.total = total
+        self.window_seconds = window_seconds
+        self.started = time.monotonic()
+        self.ok = 0
+        self.failed = 0
+        self._recent: Deque[float] = deque()
+
+    def tick(self, ok: bool) -> None:
+        now = time.monotonic()
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - self.window_seconds:
+            self._recent.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        done = self.ok + self.failed
+        span = min(self.window_seconds, now - self.started)
+        recent = sum(1 for t in self._recent if t >= now - self.window_seconds)
+        rate = recent / span if span > 0 else 0.0
+        remaining = self.total - done
+        return {
+            "done": done,
+            "total": self.total,
+            "ok": self.ok,
+            "failed": self.failed,
+            "rate_per_second": rate,
+            "error_rate": self.failed / done if done else 0.0,
+            "eta_seconds": remaining / rate if rate > 0 else None,
+        }
 
-def save_progress(data: Dict[str, Any]) -> None:
-    PROGRESS_FILE.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    def line(self) -> str:
+        snap = self.snapshot()
+        eta = snap["eta_seconds"]
+        eta_text = f"{int(eta // 60)}m{int(eta % 60):02d}s" if eta is not None else "?"
+        return (
+            f"{snap['done']}/{snap['total']} fetched | {snap['rate_per_second']:.2f}/s | "
+            f"errors {snap['error_rate']:.1%} | ETA {eta_text}"
+        )
 
 
 async def worker(sem: asyncio.Semaphore, client: httpx.AsyncClient, task: Tuple[str, str, str], delay: float, browser: Optional["BrowserPool"] = None, proxy_base: Optional[str] = None) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
@@ -311,10 +432,76 @@ async def worker(sem: asyncio.Semaphore, client: httpx.AsyncClient, task: Tuple[
             return (problem_id, None, str(e))
 
 
-async def run_backfill(max_items: int, concurrency: int, delay: float, resume: bool, use_browser: bool) -> None:
+def _apply_batch(session, batch: Dict[str, Dict[str, Any]]) -> int:
+    """Write fetched statements to their Problem rows and commit; returns rows updated."""
+    problems = session.query(Problem).filter(Problem.id.in_(list(batch))).all()
+    for p in problems:
+        data = batch[p.id]
+        p.description = data.get("description") or p.description
+        if data.get("constraints"):
+            p.constraints = data["constraints"]
+        if data.get("examples"):
+            p.examples = data["examples"]
+    session.commit()
+    return len(problems)
+
+
+async def _apply_results(queue: "asyncio.Queue", session, store: ProgressStore, meter: RateMeter,
+                         commit_batch: int, commit_interval: float) -> Dict[str, int]:
+    """Drain fetch results into the database in batches, whatever the fetch concurrency.
+
+    Failures are recorded right away. Successes are marked done only after the
+    batch holding them is committed, so a crash between the two costs a
+    re-fetch, never a problem marked done without its statement.
+    """
+    pending: Dict[str, Dict[str, Any]] = {}
+    totals = {"updated": 0, "commits": 0}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + commit_interval
+
+    async def flush() -> None:
+        if pending:
+            # The session commits in a worker thread so fetching goes on meanwhile
+            totals["updated"] += await asyncio.to_thread(_apply_batch, session, pending)
+            totals["commits"] += 1
+            store.record_done(pending)
+            pending.clear()
+
+    while True:
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            item = ()
+        if item is None:
+            break
+        if item:
+            problem_id, data, error = item
+            meter.tick(data is not None)
+            if data is not None:
+                pending[problem_id] = data
+            else:
+                store.record_failure(problem_id, error)
+        if len(pending) >= commit_batch or loop.time() >= deadline:
+            await flush()
+            deadline = loop.time() + commit_interval
+    await flush()
+    return totals
+
+
+async def _report(meter: RateMeter, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        print(f"⏱️  {meter.line()}")
+
+
+async def run_backfill(max_items: int, concurrency: int, delay: float, resume: bool, use_browser: bool,
+                       commit_batch: int = 100, commit_interval: float = 10.0, max_attempts: int = 3,
+                       report_interval: float = 15.0, progress_path: Path = PROGRESS_DB,
+                       legacy_progress: Optional[Path] = LEGACY_PROGRESS_FILE, preflight: bool = True) -> Dict[str, int]:
     # Load candidates from DB synchronously
     db = DatabaseConfig()
     session = db.get_session()
+    store = ProgressStore(progress_path, legacy_file=legacy_progress)
     try:
         q = (
             session.query(Problem)
@@ -324,12 +511,11 @@ async def run_backfill(max_items: int, concurrency: int, delay: float, resume: b
         total = q.count()
         candidates: List[Problem] = q.limit(max_items).all() if max_items > 0 else q.all()
 
-        progress = load_progress()
-        completed = set(progress.get("completed", [])) if resume else set()
+        finished = store.finished(max_attempts) if resume else set()
 
         tasks: List[Tuple[str, str, str]] = []
         for p in candidates:
-            if p.id in completed:
+            if p.id in finished:
                 continue
             pid = p.platform_id or p.id
             parsed = parse_cf_platform_id(pid)
@@ -354,79 +540,57 @@ async def run_backfill(max_items: int, concurrency: int, delay: float, resume: b
         if cookie_env:
             headers["Cookie"] = cookie_env
         timeout = httpx.Timeout(30.0)
-        results: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]] = []
+        meter = RateMeter(len(tasks))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(commit_batch, concurrency) * 2)
 
-        async with httpx.AsyncClient(headers=headers, timeout=timeout, follow_redirects=True) as client:
-            # Preflight request to establish cookies/session
-            try:
-                await client.get("https://codeforces.com/", headers={"Referer": "https://codeforces.com/problemset"})
-            except Exception:
-                pass
+        async def fetch_all(client: httpx.AsyncClient, browser: Optional["BrowserPool"]) -> None:
             proxy_base = os.getenv("CF_PROXY_BASE")
-            if use_browser:
-                async with BrowserPool(max_pages=max(1, min(3, concurrency))) as browser:
-                    coros = [worker(sem, client, t, delay, browser, proxy_base) for t in tasks]
-                    async for res in _as_completed_stream(coros):
-                        results.append(res)
-                        if len(results) % 50 == 0:
-                            _flush_progress(progress, results)
-            else:
-                coros = [worker(sem, client, t, delay, None, proxy_base) for t in tasks]
-                for fut in asyncio.as_completed(coros):
-                    res = await fut
-                    results.append(res)
-                    if len(results) % 50 == 0:
-                        _flush_progress(progress, results)
-
-        # Apply updates to DB in batches
-        by_id: Dict[str, Dict[str, Any]] = {pid: data for pid, data, err in results if data is not None}
-        failures = [(pid, err) for pid, data, err in results if err]
-        print(f"Fetched OK: {len(by_id)} | Failures: {len(failures)}")
-
-        updated = 0
-        batch = 0
-        for p in candidates:
-            data = by_id.get(p.id)
-            if not data:
-                continue
-            p.description = data.get("description") or p.description
-            if data.get("constraints"):
-                p.constraints = data["constraints"]
-            if data.get("examples"):
-                p.examples = data["examples"]
-            session.add(p)
-            updated += 1
-            batch += 1
-            if batch >= 100:
-                session.commit()
-                batch = 0
-        if batch:
-            session.commit()
-        print(f"DB updated rows: {updated}")
-
-        # Finalize progress
-        _finalize_progress(progress, by_id, failures)
+            coros = [worker(sem, client, t, delay, browser, proxy_base) for t in tasks]
+            async for res in _as_completed_stream(coros):
+                await queue.put(res)
+
+        async def fetch() -> None:
+            async with httpx.AsyncClient(headers=headers, timeout=timeout, follow_redirects=True) as client:
+                if preflight:
+                    # Preflight request to establish cookies/session
+                    try:
+                        await client.get("https://codeforces.com/", headers={"Referer": "https://codeforces.com/problemset"})
+                    except Exception:
+                        pass
+                if use_browser:
+                    async with BrowserPool(max_pages=max(1, min(3, concurrency))) as browser:
+                        await fetch_all(client, browser)
+                else:
+                    await fetch_all(client, None)
+
+        applier = asyncio.create_task(_apply_results(queue, session, store, meter, commit_batch, commit_interval))
+        reporter = asyncio.create_task(_report(meter, report_interval))
+        fetcher = asyncio.create_task(fetch())
+        try:
+            # The applier is the queue's only consumer: if it fails, producers
+            # would block on put() forever, so stop them and surface its error.
+            await asyncio.wait({fetcher, applier}, return_when=asyncio.FIRST_COMPLETED)
+            if fetcher.done():
+                fetcher.result()
+        finally:
+            reporter.cancel()
+            if not fetcher.done():
+                fetcher.cancel()
+                await asyncio.gather(fetcher, return_exceptions=True)
+            if not applier.done():
+                # Commit whatever was fetched, also when interrupted
+                await queue.put(None)
+            totals = await applier
+
+        snapshot = meter.snapshot()
+        print(f"Fetched OK: {snapshot['ok']} | Failures: {snapshot['failed']}")
+        print(f"DB updated rows: {totals['updated']} in {totals['commits']} commits")
+        print(f"Progress store: {store.counts()}")
+        return {**totals, "fetched": snapshot["ok"], "failed": snapshot["failed"]}
     finally:
+        store.close()
         session.close()
 
-def _flush_progress(progress: Dict[str, Any], results: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]) -> None:
-    done_ids = [pid for pid, data, err in results if data is not None]
-    progress["completed"] = list(set(progress.get("completed", []) + done_ids))
-    progress.setdefault("failures", [])
-    for pid, data, err in results:
-        if err:
-            progress["failures"].append({"id": pid, "error": err})
-    save_progress(progress)
-
-
-def _finalize_progress(progress: Dict[str, Any], by_id: Dict[str, Dict[str, Any]], failures: List[Tuple[str, Optional[str]]]) -> None:
-    done_ids = [pid for pid in by_id.keys()]
-    progress["completed"] = list(set(progress.get("completed", []) + done_ids))
-    progress.setdefault("failures", [])
-    for pid, err in failures:
-        progress["failures"].append({"id": pid, "error": err})
-    save_progress(progress)
-
 
 async def _as_completed_stream(coros):
     for fut in asyncio.as_completed(coros):
@@ -438,7 +602,11 @@ def main() -> None:
     parser.add_argument("--max", type=int, default=1000, help="Max number of items to process (0 = all)")
     parser.add_argument("--concurrency", type=int, default=5, help="Concurrent requests")
     parser.add_argument("--delay", type=float, default=0.5, help="Delay between requests per worker (seconds)")
-    parser.add_argument("--resume", action="store_true", help="Resume using progress file")
+    parser.add_argument("--resume", action="store_true", help="Skip problems already done (or failed --max-attempts times) in the progress store")
+    parser.add_argument("--commit-batch", type=int, default=100, help="Fetched problems per DB commit")
+    parser.add_argument("--commit-interval", type=float, default=10.0, help="Commit at least this often (seconds) while fetching")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Stop retrying a problem on resume after this many failures")
+    parser.add_argument("--report-every", type=float, default=15.0, help="Seconds between rate/ETA reports")
     parser.add_argument("--browser", action="store_true", help="Use headless browser fallback for 403s")
     parser.add_argument("--proxy", action="store_true", help="Enable proxy fallback via r.jina.ai (sets CF_PROXY_BASE)")
     parser.add_argument("--cookie", type=str, default=None, help="Explicit Cookie header value for codeforces.com requests")
@@ -453,7 +621,11 @@ def main() -> None:
         # Store into env so run_backfill can pick it up (keeps signature simple)
         os.environ["CF_COOKIE"] = cookie_header
 
-    asyncio.run(run_backfill(max_items=args.max, concurrency=args.concurrency, delay=args.delay, resume=args.resume, use_browser=args.browser))
+    asyncio.run(run_backfill(
+        max_items=args.max, concurrency=args.concurrency, delay=args.delay, resume=args.resume,
+        use_browser=args.browser, commit_batch=args.commit_batch, commit_interval=args.commit_interval,
+        max_attempts=args.max_attempts, report_interval=args.report_every,
+    ))
 
 
 if __name__ == "__main__":
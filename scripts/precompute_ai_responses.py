@@ -0,0 +1,73 @@
+"""
+Precompute query-less AI hints and elaboration prompts for the catalogue.
+
+Fills the ``ai_precomputed_responses`` warm cache that AIService serves
+without rate limiting, cost accounting or provider calls. Only rows that are
+missing, or whose problem content hash changed since they were generated,
+are regenerated; rows of deleted problems are dropped. Run it after catalogue
+ingestion (and after migration 013).
+
+Targets default to the provider/model in the current user settings.
+
+Usage examples (from repo root):
+  python scripts/precompute_ai_responses.py
+  python scripts/precompute_ai_responses.py --target local --target openai:gpt-4o-mini
+  python scripts/precompute_ai_responses.py --problem two_sum --force
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+# Ensure repo root is on sys.path so `import src.*` works when running as a script
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.models.database import DatabaseConfig  # noqa: E402
+from src.services.ai_warm_cache import WARM_ACTIONS, warm_responses  # noqa: E402
+from src.services.settings_service import SettingsService  # noqa: E402
+
+
+def _parse_target(value: str) -> Tuple[str, Optional[str]]:
+    provider, _, model = value.partition(":")
+    return provider.strip().lower(), (model.strip() or None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute query-less AI hints and elaborations")
+    parser.add_argument("--target", action="append", default=None,
+                        help="provider[:model] to precompute for (repeatable; default: current settings)")
+    parser.add_argument("--action", action="append", choices=WARM_ACTIONS, default=None, help="Actions (default: all)")
+    parser.add_argument("--problem", action="append", default=None, help="Only these problem ids (no stale-row cleanup)")
+    parser.add_argument("--force", action="store_true", help="Regenerate even when the content hash is unchanged")
+    parser.add_argument("--batch-size", type=int, default=200, help="Problems per DB commit")
+    args = parser.parse_args()
+
+    if args.target:
+        targets: List[Tuple[str, Optional[str]]] = [_parse_target(t) for t in args.target]
+    else:
+        settings = SettingsService().current()
+        targets = [((settings.ai_provider or "local").lower(), settings.model)]
+
+    db = DatabaseConfig().get_session()
+    try:
+        started = time.perf_counter()
+        stats = warm_responses(
+            db, targets, actions=tuple(args.action or WARM_ACTIONS), problem_ids=args.problem,
+            force=args.force, batch_size=args.batch_size,
+        )
+        labels = ", ".join(f"{provider}:{model or '-'}" for provider, model in targets)
+        print(
+            f"Warm cache updated for {labels} in "
+            f"{time.perf_counter() - started:.1f}s: {stats.generated} generated, {stats.unchanged} unchanged, "
+            f"{stats.removed} removed, {stats.failed} failed"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
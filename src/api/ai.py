@@ -58,7 +58,7 @@ async def get_hint(payload: HintRequest, db: Session = Depends(get_db), response
         if not db.query(Problem).filter(Problem.id == payload.problem_id).first():
             raise HTTPException(status_code=404, detail="Problem not found")
         svc = AIService(db)
-        data = svc.generate_hint(problem_id=payload.problem_id, query=payload.query, session_id=payload.session_id)
+        data = await svc.agenerate_hint(problem_id=payload.problem_id, query=payload.query, session_id=payload.session_id)
         if response is not None:
             response.headers.update(_rate_headers(svc, payload.session_id))
         return data
@@ -84,7 +84,7 @@ async def get_hint(payload: HintRequest, db: Session = Depends(get_db), response
 async def review_code(payload: ReviewRequest, db: Session = Depends(get_db), response: Response = None):
     try:
         svc = AIService(db)
-        data = svc.review_code(code=payload.code, rubric=payload.rubric, problem_id=payload.problem_id)
+        data = await svc.areview_code(code=payload.code, rubric=payload.rubric, problem_id=payload.problem_id)
         if response is not None:
             response.headers.update(_rate_headers(svc))
         return data
@@ -109,7 +109,7 @@ async def elaborate(payload: ElaborateRequest, db: Session = Depends(get_db), re
         if not db.query(Problem).filter(Problem.id == payload.problem_id).first():
             raise HTTPException(status_code=404, detail="Problem not found")
         svc = AIService(db)
-        data = svc.elaborate_prompts(problem_id=payload.problem_id)
+        data = await svc.aelaborate_prompts(problem_id=payload.problem_id)
         if response is not None:
             response.headers.update(_rate_headers(svc))
         return data
@@ -200,20 +200,25 @@ async def stream_hint(
         svc = AIService(db)
 
         async def event_gen():
+            # Events go out as the provider produces them: meta first, then
+            # each hint, then done (carrying the final meta)
             try:
-                data = svc.generate_hint(problem_id=problem_id, query=query, session_id=session_id)
-                # Yield meta once
-                meta = {
-                    "type": "meta",
-                    "provider": data.get("provider"),
-                    "model": data.get("model"),
-                    "problem_id": data.get("problem_id"),
-                    "session_id": session_id,
-                }
-                yield _sse_format(meta)
-                for h in (data.get("hints") or []):
-                    yield _sse_format({"type": "hint", "hint": h})
-                yield _sse_format({"type": "done"})
+                meta_sent, final_meta = False, None
+                async for chunk in svc.astream_hint(problem_id=problem_id, query=query, session_id=session_id):
+                    if not meta_sent and "provider" in chunk:
+                        meta_sent = True
+                        yield _sse_format({
+                            "type": "meta",
+                            "provider": chunk.get("provider"),
+                            "model": chunk.get("model"),
+                            "problem_id": chunk.get("problem_id"),
+                            "session_id": session_id,
+                        })
+                    for h in (chunk.get("hints") or []):
+                        yield _sse_format({"type": "hint", "hint": h})
+                    if "meta" in chunk:
+                        final_meta = chunk["meta"]
+                yield _sse_format({"type": "done", "meta": final_meta})
             except AIForbidden as fe:
                 yield _sse_format({"type": "error", "detail": str(fe), "code": 403})
             except AIRateLimited as rl:
@@ -241,13 +246,18 @@ async def stream_review(
 
         async def event_gen():
             try:
-                data = svc.review_code(code=payload.code, rubric=payload.rubric, problem_id=payload.problem_id)
-                yield _sse_format({"type": "meta", "provider": data.get("provider"), "model": data.get("model")})
-                for s in (data.get("strengths") or []):
-                    yield _sse_format({"type": "strength", "text": s})
-                for s in (data.get("suggestions") or []):
-                    yield _sse_format({"type": "suggestion", "text": s})
-                yield _sse_format({"type": "done"})
+                meta_sent, final_meta = False, None
+                async for chunk in svc.astream_review(code=payload.code, rubric=payload.rubric, problem_id=payload.problem_id):
+                    if not meta_sent and "provider" in chunk:
+                        meta_sent = True
+                        yield _sse_format({"type": "meta", "provider": chunk.get("provider"), "model": chunk.get("model")})
+                    for s in (chunk.get("strengths") or []):
+                        yield _sse_format({"type": "strength", "text": s})
+                    for s in (chunk.get("suggestions") or []):
+                        yield _sse_format({"type": "suggestion", "text": s})
+                    if "meta" in chunk:
+                        final_meta = chunk["meta"]
+                yield _sse_format({"type": "done", "meta": final_meta})
             except AIForbidden as fe:
                 yield _sse_format({"type": "error", "detail": str(fe), "code": 403})
             except AIRateLimited as rl:
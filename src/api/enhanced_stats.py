@@ -8,7 +8,7 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, case, desc, asc
 from typing import Optional, List, Dict, Any
-from src.models.database import DatabaseConfig, Problem
+from src.models.database import DatabaseConfig, Problem, TagStatistic, ensure_tag_statistics
 import json
 
 # Create router for enhanced statistics
@@ -135,39 +135,28 @@ async def get_algorithm_relevance_analysis(
 ):
     """Get algorithm tag relevance analysis"""
     try:
-        # Get all problems with tags
-        problems = db.query(Problem.algorithm_tags, Problem.google_interview_relevance).all()
-        
-        # Aggregate by algorithm tags
-        tag_stats = {}
-        for problem in problems:
-            if problem.algorithm_tags and problem.google_interview_relevance is not None:
-                for tag in problem.algorithm_tags:
-                    if tag not in tag_stats:
-                        tag_stats[tag] = {
-                            'relevance_scores': [],
-                            'count': 0
-                        }
-                    tag_stats[tag]['relevance_scores'].append(problem.google_interview_relevance)
-                    tag_stats[tag]['count'] += 1
+        # Per-tag aggregates are maintained on problem writes; only problems with a
+        # relevance score contribute to relevance_count
+        ensure_tag_statistics(db)
+        tag_stats = db.query(TagStatistic).filter(
+            TagStatistic.relevance_count >= max(min_problems, 1)
+        ).all()
         
         # Calculate statistics for each tag
         algorithm_analysis = []
-        for tag, data in tag_stats.items():
-            if data['count'] >= min_problems:
-                scores = data['relevance_scores']
-                avg_relevance = sum(scores) / len(scores)
-                high_relevance_count = sum(1 for score in scores if score >= 7.0)
-                high_relevance_percentage = (high_relevance_count / len(scores)) * 100
-                
-                algorithm_analysis.append({
-                    "algorithm_tag": tag,
-                    "problem_count": data['count'],
-                    "avg_relevance": round(avg_relevance, 2),
-                    "high_relevance_count": high_relevance_count,
-                    "high_relevance_percentage": round(high_relevance_percentage, 1),
-                    "interview_priority": "High" if avg_relevance >= 7.0 else "Medium" if avg_relevance >= 5.0 else "Low"
-                })
+        for stat in tag_stats:
+            avg_relevance = stat.avg_relevance
+            high_relevance_percentage = (stat.high_relevance_count / stat.relevance_count) * 100
+            
+            algorithm_analysis.append({
+                "algorithm_tag": stat.tag,
+                "problem_count": stat.relevance_count,
+                "avg_relevance": round(avg_relevance, 2),
+                "relevance_std_dev": round(stat.relevance_stddev, 2),
+                "high_relevance_count": stat.high_relevance_count,
+                "high_relevance_percentage": round(high_relevance_percentage, 1),
+                "interview_priority": "High" if avg_relevance >= 7.0 else "Medium" if avg_relevance >= 5.0 else "Low"
+            })
         
         # Sort by average relevance
         algorithm_analysis.sort(key=lambda x: x['avg_relevance'], reverse=True)
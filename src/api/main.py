@@ -4,6 +4,7 @@ RESTful API for DSA Training Platform
 """
 
 from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -14,13 +15,14 @@ import json
 from datetime import datetime
 import urllib.parse
 import httpx
+from contextlib import asynccontextmanager
 
 # Database imports
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.models.database import DatabaseConfig, Problem, Solution, get_database_stats, get_quality_metrics, UserSkillTreePreferences
+from src.models.database import DatabaseConfig, Problem, Solution, get_database_stats, get_quality_metrics, UserSkillTreePreferences, TagStatistic, ensure_tag_statistics
 from src.ml.recommendation_engine_simple import RecommendationEngine
 from src.models.user_tracking import UserBehaviorTracker
 from src.api.enhanced_stats import stats_router
@@ -36,9 +38,31 @@ from src.api.interview import router as interview_router
 from src.api.ai import router as ai_router
 from src.api.reading_materials_api import router as reading_materials_router
 from src.api.error_handlers import setup_error_handlers
+from src.api.observability import setup_observability
 from src.api.skill_tree_api import skill_tree_router
 from src.api.skill_tree_api_optimized import router as skill_tree_v2_router
 from src.performance.caching_strategy import cache_manager
+from src.services.autocomplete_index import get_autocomplete_index, refresh_autocomplete_index
+from src.services.search_index import get_search_index
+from src.services.providers.http_pool import aclose_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm in-memory indexes from the catalogue before serving requests."""
+    db = db_config.get_session()
+    try:
+        refresh_autocomplete_index(db)
+        get_search_index(db)
+    except Exception as e:
+        # Non-fatal: the indexes are built lazily on first lookup (e.g. before migrations run)
+        print(f"⚠️ Search index warmup skipped: {e}")
+    finally:
+        db.close()
+    yield
+    # Release pooled AI provider connections
+    await aclose_clients()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -48,7 +72,8 @@ app = FastAPI(
         "OpenAPI docs: visit /docs while the server is running.\n"
         "Curated endpoint list: see docs/API_REFERENCE.md in the repo."
     ),
-    version="4.0.0"
+    version="4.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for web frontend
@@ -73,6 +98,9 @@ app.add_middleware(
 # Set up consistent error handling
 setup_error_handlers(app)
 
+# Request/query metrics and GET /metrics (outermost middleware, so it sees every response)
+setup_observability(app)
+
 # Database configuration
 db_config = DatabaseConfig()
 
@@ -632,7 +660,9 @@ async def get_similar_problems(
 ):
     """Get problems similar to a specific problem using content-based filtering"""
     try:
-        similar_problems = recommendation_engine.get_content_based_recommendations(
+        # May (re)build the search index, so it stays off the event loop
+        similar_problems = await run_in_threadpool(
+            recommendation_engine.get_content_based_recommendations,
             problem_id=problem_id,
             num_recommendations=limit
         )
@@ -778,45 +808,30 @@ async def get_platform_trends(
 async def get_algorithm_tag_analytics(db: Session = Depends(get_db)):
     """Get analytics for algorithm tags"""
     try:
-        from collections import Counter
-        
-        # Get all algorithm tags
-        problems = db.query(Problem.algorithm_tags, Problem.quality_score, Problem.google_interview_relevance).all()
+        # Read the incrementally maintained per-tag aggregates (one row per tag)
+        ensure_tag_statistics(db)
+        tag_stats = db.query(TagStatistic).filter(
+            TagStatistic.problem_count > 0
+        ).order_by(TagStatistic.problem_count.desc(), TagStatistic.tag).all()
         
-        tag_stats = Counter()
-        tag_quality = {}
-        tag_relevance = {}
-        
-        for problem in problems:
-            if problem.algorithm_tags:
-                for tag in problem.algorithm_tags:
-                    tag_stats[tag] += 1
-                    
-                    # Track quality and relevance
-                    if tag not in tag_quality:
-                        tag_quality[tag] = []
-                        tag_relevance[tag] = []
-                    
-                    tag_quality[tag].append(problem.quality_score or 0)
-                    tag_relevance[tag].append(problem.google_interview_relevance or 0)
-        
-        # Calculate averages
         analytics = []
-        for tag, count in tag_stats.most_common():
-            avg_quality = sum(tag_quality[tag]) / len(tag_quality[tag]) if tag_quality[tag] else 0
-            avg_relevance = sum(tag_relevance[tag]) / len(tag_relevance[tag]) if tag_relevance[tag] else 0
+        for stat in tag_stats:
+            avg_quality = stat.avg_quality
+            # Problems without a relevance score count as 0 here
+            avg_relevance = stat.relevance_sum / stat.problem_count
             
             analytics.append({
-                'tag': tag,
-                'problem_count': count,
+                'tag': stat.tag,
+                'problem_count': stat.problem_count,
                 'average_quality': round(avg_quality, 2),
+                'quality_std_dev': round(stat.quality_stddev, 2),
                 'average_google_relevance': round(avg_relevance, 2),
                 'learning_priority': round((avg_quality + avg_relevance) / 2, 2)
             })
         
         return {
             "algorithm_tag_analytics": analytics,
-            "total_unique_tags": len(tag_stats),
+            "total_unique_tags": len(analytics),
             "generated_at": datetime.now().isoformat()
         }
         
@@ -902,51 +917,54 @@ async def enhanced_search_problems(
     try:
         from sqlalchemy import or_, and_, func
         
-        # Start with base query
-        base_query = db.query(Problem)
+        def apply_filters(q):
+            if algorithm_tags:
+                for tag in algorithm_tags:
+                    q = q.filter(Problem.algorithm_tags.contains([tag]))
+            if difficulty:
+                q = q.filter(Problem.difficulty == difficulty)
+            if company:
+                q = q.filter(Problem.companies.contains([company]))
+            if platform:
+                q = q.filter(Problem.platform == platform)
+            if min_quality is not None:
+                q = q.filter(Problem.quality_score >= min_quality)
+            if min_relevance is not None:
+                q = q.filter(Problem.google_interview_relevance >= min_relevance)
+            return q
+        
+        # Rank by TF-IDF cosine over title + description; over-fetch to survive filtering.
+        # A cold or stale index is rebuilt in the threadpool, not on the event loop.
+        text_scores: Dict[str, float] = {}
+        if query:
+            index = await run_in_threadpool(get_search_index, db)
+            text_scores = dict(index.search(query, k=max(limit * 5, 100)))
+        candidates = {}
+        if text_scores:
+            for problem in apply_filters(db.query(Problem).filter(Problem.id.in_(list(text_scores)))):
+                candidates[problem.id] = problem
         
-        # Text search across title, description, and tags
-        search_conditions = []
+        # Substring and tag matches still count (e.g. tag-only queries like "dp")
+        base_query = db.query(Problem)
         if query:
-            search_conditions.extend([
+            base_query = base_query.filter(or_(
                 Problem.title.contains(query),
                 Problem.description.contains(query),
                 Problem.algorithm_tags.contains([query.lower()])
-            ])
-        
-        if search_conditions:
-            base_query = base_query.filter(or_(*search_conditions))
-        
-        # Apply filters
-        if algorithm_tags:
-            for tag in algorithm_tags:
-                base_query = base_query.filter(Problem.algorithm_tags.contains([tag]))
-                
-        if difficulty:
-            base_query = base_query.filter(Problem.difficulty == difficulty)
-            
-        if company:
-            base_query = base_query.filter(Problem.companies.contains([company]))
-            
-        if platform:
-            base_query = base_query.filter(Problem.platform == platform)
-            
-        if min_quality is not None:
-            base_query = base_query.filter(Problem.quality_score >= min_quality)
-            
-        if min_relevance is not None:
-            base_query = base_query.filter(Problem.google_interview_relevance >= min_relevance)
-        
-        # Order by relevance (quality score + Google relevance)
-        problems = base_query.order_by(
+            ))
+        for problem in apply_filters(base_query).order_by(
             (Problem.quality_score + Problem.google_interview_relevance).desc()
-        ).limit(limit).all()
+        ).limit(limit):
+            candidates.setdefault(problem.id, problem)
         
         # Calculate search relevance scores
         results = []
-        for problem in problems:
+        for problem in candidates.values():
             relevance_score = 0.0
             
+            # Text similarity (cosine in [0, 1])
+            relevance_score += 100.0 * text_scores.get(problem.id, 0.0)
+            
             # Title match bonus
             if query and query.lower() in problem.title.lower():
                 relevance_score += 50.0
@@ -968,6 +986,7 @@ async def enhanced_search_problems(
         
         # Sort by search relevance
         results.sort(key=lambda x: x['search_relevance_score'], reverse=True)
+        results = results[:limit]
         
         return {
             "query": query,
@@ -993,21 +1012,19 @@ def _generate_search_suggestions(query: str, results: List[Dict], db: Session) -
     suggestions = []
     
     if len(results) < 5:  # If few results, suggest alternatives
-        # Get popular algorithm tags
-        popular_tags = db.query(Problem.algorithm_tags).limit(100).all()
-        all_tags = set()
-        for tag_list in popular_tags:
-            all_tags.update(tag_list[0] if tag_list[0] else [])
-        
-        # Find similar tags
+        # Find similar tags from the catalogue-wide autocomplete index
         if query:
-            similar_tags = [tag for tag in all_tags if query.lower() in tag.lower() and tag.lower() != query.lower()]
+            index = get_autocomplete_index(db)
+            similar_tags = [
+                c.text for c in index.complete(query, limit=4, kind="tag")
+                if c.text.lower() != query.lower()
+            ]
             suggestions.extend(similar_tags[:3])
         
         # Add popular search terms
         suggestions.extend(["dynamic_programming", "binary_search", "two_pointers", "graph", "tree"])
     
-    return list(set(suggestions))[:5]  # Remove duplicates and limit
+    return list(dict.fromkeys(suggestions))[:5]  # Remove duplicates and limit
 
 
 @app.get("/search/suggestions")
@@ -1017,26 +1034,14 @@ async def get_search_suggestions(
 ):
     """Get search suggestions as user types"""
     try:
-        suggestions = []
-        
-        # Get algorithm tags that match
-        problems = db.query(Problem.algorithm_tags).limit(200).all()
-        all_tags = set()
-        for tag_list in problems:
-            all_tags.update(tag_list[0] if tag_list[0] else [])
-        
-        matching_tags = [tag for tag in all_tags if partial.lower() in tag.lower()]
-        suggestions.extend(matching_tags[:5])
-        
-        # Get problem titles that match
-        matching_problems = db.query(Problem.title).filter(
-            Problem.title.contains(partial)
-        ).limit(5).all()
+        index = get_autocomplete_index(db)
         
-        suggestions.extend([p.title for p in matching_problems])
+        # Best-weighted matching tags first, then problem titles
+        suggestions = [c.text for c in index.complete(partial, limit=5, kind="tag")]
+        suggestions.extend(c.text for c in index.complete(partial, limit=10, kind="title"))
         
         return {
-            "suggestions": list(set(suggestions))[:10],
+            "suggestions": list(dict.fromkeys(suggestions))[:10],
             "query": partial
         }
         
@@ -0,0 +1,224 @@
+"""
+Request observability
+HTTP and database metrics for the API, exported at ``GET /metrics``.
+
+``MetricsMiddleware`` is a plain ASGI middleware (streaming responses pass
+through untouched) that records request latency per route template and
+responses per status. ``instrument_queries`` hooks SQLAlchemy's cursor events
+on every engine, so queries issued by any router are timed, whichever
+``DatabaseConfig`` they came from. The middleware also opens a query profiler
+scope per request (see ``query_profiler``): queries per request and DB time
+per request are exported per route, every response carries them in a
+``Server-Timing: db`` header, and ``GET /debug/queries`` lists the
+statements that dominate each route.
+
+With ``DSATRAIN_PROFILING`` set, ``ProfilingMiddleware`` also samples the
+stacks of a fraction of requests (see ``request_profiler``), served as
+collapsed stacks from ``GET /debug/profiles``. Without it the middleware is
+not installed at all.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.services import metrics, query_profiler, request_profiler
+
+HTTP_REQUESTS = metrics.counter("dsatrain_http_requests_total", "HTTP responses by route and status", ["method", "route", "status"])
+HTTP_SECONDS = metrics.histogram(
+    "dsatrain_http_request_duration_seconds", "HTTP request latency until the response body completes", ["method", "route"]
+)
+HTTP_IN_PROGRESS = metrics.gauge("dsatrain_http_requests_in_progress", "HTTP requests being served")
+DB_QUERY_SECONDS = metrics.histogram(
+    "dsatrain_db_query_duration_seconds", "SQL statement execution time", ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES_PER_REQUEST = metrics.histogram(
+    "dsatrain_db_queries_per_request", "SQL statements executed per HTTP request", ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000),
+)
+DB_SECONDS_PER_REQUEST = metrics.histogram(
+    "dsatrain_db_seconds_per_request", "Total SQL execution time per HTTP request", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# Requests that matched no route share one label, so scanners cannot blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+_OPERATIONS = ("select", "insert", "update", "delete")
+
+router = APIRouter(tags=["observability"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    """Prometheus text exposition of every registered metric."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def debug_endpoints_enabled() -> bool:
+    return os.getenv("DSATRAIN_DEBUG_ENDPOINTS", "0") in ("1", "true", "True")
+
+
+@router.get("/debug/queries", include_in_schema=False)
+def get_query_report(limit: int = Query(10, ge=1, le=50, description="Top statements per route")) -> Dict[str, Any]:
+    """Per-route query counts and DB time since startup (this worker), with the top statements."""
+    if not debug_endpoints_enabled():
+        raise HTTPException(status_code=403, detail="Debug endpoints are disabled")
+    threshold = query_profiler.slow_query_seconds
+    return {
+        "slow_query_ms": threshold * 1000 if threshold is not None else None,
+        "routes": query_profiler.route_report(limit=limit),
+    }
+
+
+@router.get("/debug/profiles", include_in_schema=False)
+def list_profiles(route: Optional[str] = Query(None, description='Route as "METHOD /template"')) -> Dict[str, Any]:
+    """Stored request profiles (this worker), newest first."""
+    if not debug_endpoints_enabled():
+        raise HTTPException(status_code=403, detail="Debug endpoints are disabled")
+    if not request_profiler.profiling_enabled():
+        return {"enabled": False, "profiles": []}
+    profiler = request_profiler.get_profiler()
+    return {
+        "enabled": True,
+        "sample_rate": profiler.sample_rate,
+        "profiles": [p.summary() for p in profiler.store.profiles(route)],
+    }
+
+
+@router.get("/debug/profiles/collapsed", include_in_schema=False)
+def get_collapsed_stacks(
+    route: Optional[str] = Query(None, description='Merge every stored profile of this route ("METHOD /template")'),
+    profile_id: Optional[int] = Query(None, description="A single profile"),
+) -> PlainTextResponse:
+    """Collapsed stacks (flamegraph.pl / speedscope input) of one profile, one route, or everything stored."""
+    if not debug_endpoints_enabled():
+        raise HTTPException(status_code=403, detail="Debug endpoints are disabled")
+    store = request_profiler.get_profiler().store
+    if profile_id is not None:
+        profile = store.get(profile_id)
+        profiles = [profile] if profile is not None else []
+    else:
+        profiles = store.profiles(route)
+    if not profiles:
+        raise HTTPException(status_code=404, detail="No matching profiles")
+    return PlainTextResponse(request_profiler.collapse(profiles))
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """The matched route's path template (``/problems/{problem_id}``), set by the router."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if isinstance(path, str) else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500  # If the app raises before responding
+        queries = query_profiler.QueryStats(f"{scope['method']} {scope['path']}")
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Queries so far (all of them, unless the body is streamed)
+                timing = f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries"'
+                message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", timing.encode("latin-1"))]}
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_PROGRESS.inc()
+        with query_profiler.track_queries(stats=queries):
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                HTTP_IN_PROGRESS.dec()
+                method, route = scope["method"], route_template(scope)
+                HTTP_SECONDS.labels(method, route).observe(time.perf_counter() - started)
+                HTTP_REQUESTS.labels(method, route, str(status)).inc()
+                DB_QUERIES_PER_REQUEST.labels(route).observe(queries.count)
+                DB_SECONDS_PER_REQUEST.labels(route).observe(queries.seconds)
+                query_profiler.record_route(f"{method} {route}", queries)
+
+
+class ProfilingMiddleware:
+    """Profiles sampled and ``X-Profile: 1`` requests; the response names the profile in ``X-Profile-Id``."""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiler = request_profiler.get_profiler()
+        trigger = profiler.trigger(scope.get("headers") or ())
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        profile = request_profiler.RequestProfile(scope["method"], scope["path"], trigger)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-id", str(profile.id).encode())]}
+            await send(message)
+
+        started = time.perf_counter()
+        # This coroutine's frame is where the request's stacks start on the event loop thread
+        token = profiler.begin(profile, sys._getframe())
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.end(profile, token, f"{scope['method']} {route_template(scope)}", time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    DB_QUERY_SECONDS.labels(keyword if keyword in _OPERATIONS else "other").observe(elapsed)
+    query_profiler.record(cursor, statement, parameters, executemany, conn.dialect.name, elapsed)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument_queries() -> None:
+    """Time and profile every SQL statement on every engine (idempotent)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def setup_observability(app) -> None:
+    """Install the HTTP metrics middleware (and the profiler, if enabled), the query hooks and the endpoints."""
+    if request_profiler.profiling_enabled():
+        app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+    instrument_queries()
@@ -4,9 +4,10 @@ Scalable, database-integrated data collection system
 """
 
 import asyncio
-import aiohttp
+import gzip
 import json
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Set
 from pathlib import Path
@@ -17,19 +18,21 @@ from concurrent.futures import ThreadPoolExecutor
 import traceback
 
 # Database imports
+from sqlalchemy import func, select
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import IntegrityError
 import sys
-import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.models.database import DatabaseConfig, Problem, Solution, SystemMetrics
+from src.collectors.http_client import CollectorHTTPClient
+from src.models.database import DatabaseConfig, Problem, Solution, SystemMetrics, rebuild_tag_statistics
+from src.services.bulk_upsert import BulkUpsertEngine
 from src.models.schemas import Difficulty, SolutionAnalytics
 
 # Analysis imports
 from src.analysis.code_quality import PythonCodeAnalyzer
 
 # Setup logging
+Path("logs").mkdir(exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -59,9 +62,9 @@ class CollectionConfig:
 class PlatformCollector:
     """Base class for platform-specific collectors"""
     
-    def __init__(self, platform_name: str, session: aiohttp.ClientSession, db_session):
+    def __init__(self, platform_name: str, http: CollectorHTTPClient, db_session):
         self.platform_name = platform_name
-        self.session = session
+        self.http = http
         self.db_session = db_session
         self.code_analyzer = PythonCodeAnalyzer()
         
@@ -113,8 +116,8 @@ class PlatformCollector:
 class LeetCodeCollector(PlatformCollector):
     """Enhanced LeetCode collector for Phase 4"""
     
-    def __init__(self, session: aiohttp.ClientSession, db_session):
-        super().__init__("leetcode", session, db_session)
+    def __init__(self, http: CollectorHTTPClient, db_session):
+        super().__init__("leetcode", http, db_session)
         self.base_url = "https://leetcode.com/api"
         
     async def collect_problems(self, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -275,7 +278,7 @@ class LeetCodeCollector(PlatformCollector):
                 solution_id = f"{problem_id}_solution_{i+1}"
                 
                 # Analyze code quality
-                quality_metrics = self.code_analyzer.analyze_solution_code(solution_data['code'])
+                quality_metrics = self.code_analyzer.analyze_code(solution_data['code'])
                 
                 solution = {
                     'id': solution_id,
@@ -307,8 +310,8 @@ class LeetCodeCollector(PlatformCollector):
 class CodeforceCollector(PlatformCollector):
     """Enhanced Codeforces collector for Phase 4"""
     
-    def __init__(self, session: aiohttp.ClientSession, db_session):
-        super().__init__("codeforces", session, db_session)
+    def __init__(self, http: CollectorHTTPClient, db_session):
+        super().__init__("codeforces", http, db_session)
         self.base_url = "https://codeforces.com/api"
         
     async def collect_problems(self, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -397,28 +400,44 @@ class AutomatedCollectionPipeline:
         Path(config.backup_directory).mkdir(parents=True, exist_ok=True)
         Path("logs").mkdir(exist_ok=True)
         
+    def _http_client(self) -> CollectorHTTPClient:
+        """Pooled client shared by all collectors of a cycle"""
+        return CollectorHTTPClient(
+            default_rate=(1 / self.config.request_delay_seconds, self.config.concurrent_requests),
+            max_retries=self.config.retry_attempts,
+            max_connections=self.config.concurrent_requests,
+        )
+        
     async def run_collection_cycle(self):
         """Run a complete collection cycle"""
         logger.info("🚀 Starting automated collection cycle")
         start_time = time.time()
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._http_client() as http:
                 db_session = self.session_factory()
                 
                 try:
                     # Initialize collectors
                     collectors = {}
                     if "leetcode" in self.config.platforms:
-                        collectors["leetcode"] = LeetCodeCollector(session, db_session)
+                        collectors["leetcode"] = LeetCodeCollector(http, db_session)
                     if "codeforces" in self.config.platforms:
-                        collectors["codeforces"] = CodeforceCollector(session, db_session)
+                        collectors["codeforces"] = CodeforceCollector(http, db_session)
+                    
+                    # Collect problems from all platforms at once: the cycle takes as
+                    # long as the slowest platform, not the sum of all of them
+                    semaphore = asyncio.Semaphore(self.config.concurrent_requests)
+                    platform_results = await asyncio.gather(*(
+                        self._bounded(semaphore, collector.collect_problems(self.config.max_problems_per_platform))
+                        for collector in collectors.values()
+                    ), return_exceptions=True)
                     
-                    # Collect problems from all platforms
                     all_problems = []
-                    for platform, collector in collectors.items():
-                        logger.info(f"📊 Collecting problems from {platform}")
-                        problems = await collector.collect_problems(self.config.max_problems_per_platform)
+                    for platform, problems in zip(collectors, platform_results):
+                        if isinstance(problems, BaseException):
+                            logger.error(f"❌ Collecting problems from {platform} failed: {problems}")
+                            continue
                         all_problems.extend(problems)
                         logger.info(f"✅ Collected {len(problems)} problems from {platform}")
                     
@@ -426,21 +445,30 @@ class AutomatedCollectionPipeline:
                     stored_problems = await self._store_problems(db_session, all_problems)
                     logger.info(f"💾 Stored {stored_problems} problems in database")
                     
-                    # Collect solutions for high-quality problems
-                    total_solutions = 0
-                    high_quality_problems = db_session.query(Problem).filter(
+                    # Collect solutions for high-quality problems, concurrently
+                    high_quality_problems = db_session.query(Problem.id, Problem.platform).filter(
                         Problem.quality_score >= self.config.quality_threshold
                     ).limit(50).all()  # Limit for demo
                     
-                    for problem in high_quality_problems:
-                        platform_collector = collectors.get(problem.platform)
-                        if platform_collector:
-                            solutions = await platform_collector.collect_solutions(
-                                problem.id, self.config.max_solutions_per_problem
-                            )
-                            stored_solutions = await self._store_solutions(db_session, solutions)
-                            total_solutions += stored_solutions
+                    targets = [
+                        (problem_id, collectors[platform]) for problem_id, platform in high_quality_problems
+                        if platform in collectors
+                    ]
+                    solution_results = await asyncio.gather(*(
+                        self._bounded(semaphore, collector.collect_solutions(problem_id, self.config.max_solutions_per_problem))
+                        for problem_id, collector in targets
+                    ), return_exceptions=True)
                     
+                    all_solutions = []
+                    for (problem_id, _), solutions in zip(targets, solution_results):
+                        if isinstance(solutions, NotImplementedError):
+                            continue  # platform has no solution source
+                        if isinstance(solutions, BaseException):
+                            logger.error(f"Error collecting solutions for {problem_id}: {solutions}")
+                            continue
+                        all_solutions.extend(solutions)
+                    
+                    total_solutions = await self._store_solutions(db_session, all_solutions)
                     logger.info(f"💾 Stored {total_solutions} solutions in database")
                     
                     # Record system metrics
@@ -464,108 +492,122 @@ class AutomatedCollectionPipeline:
             logger.error(f"❌ Collection cycle failed: {e}")
             logger.error(traceback.format_exc())
     
-    async def _store_problems(self, db_session, problems: List[Dict[str, Any]]) -> int:
-        """Store problems in database"""
-        stored_count = 0
-        
-        for problem_data in problems:
-            try:
-                # Check if problem already exists
-                existing = db_session.query(Problem).filter_by(id=problem_data['id']).first()
-                if existing:
-                    continue
-                
-                # Create problem instance
-                problem = Problem(
-                    id=problem_data['id'],
-                    platform=problem_data['platform'],
-                    platform_id=problem_data['platform_id'],
-                    title=problem_data['title'],
-                    difficulty=problem_data['difficulty'],
-                    category=problem_data.get('category'),
-                    description=problem_data.get('description'),
-                    constraints=problem_data.get('constraints'),
-                    algorithm_tags=problem_data['algorithm_tags'],
-                    data_structures=problem_data.get('data_structures'),
-                    google_interview_relevance=problem_data['google_interview_relevance'],
-                    quality_score=problem_data['quality_score'],
-                    acceptance_rate=problem_data.get('acceptance_rate'),
-                    frequency_score=problem_data.get('frequency_score'),
-                    companies=problem_data.get('companies'),
-                    collected_at=problem_data['collected_at']
-                )
-                
-                db_session.add(problem)
-                stored_count += 1
-                
-            except IntegrityError:
-                db_session.rollback()
-                continue
-            except Exception as e:
-                logger.error(f"Error storing problem {problem_data.get('id')}: {e}")
-                db_session.rollback()
-                continue
+    @staticmethod
+    async def _bounded(semaphore: asyncio.Semaphore, coroutine):
+        """Await ``coroutine`` while holding a slot of ``semaphore``"""
+        async with semaphore:
+            return await coroutine
+    
+    # collected_at is deliberately absent: it records when a problem was first collected
+    PROBLEM_UPDATE_COLUMNS = (
+        "title", "difficulty", "category", "description", "constraints", "algorithm_tags",
+        "data_structures", "google_interview_relevance", "quality_score", "acceptance_rate",
+        "frequency_score", "companies",
+    )
+    SOLUTION_UPDATE_COLUMNS = (
+        "code", "approach_type", "algorithm_tags", "time_complexity", "space_complexity",
+        "overall_quality_score", "readability_score", "documentation_score", "efficiency_score",
+        "maintainability_score", "style_score", "explanation", "google_interview_relevance",
+        "educational_value", "implementation_difficulty", "conceptual_difficulty",
+    )
+    
+    def _bulk_upsert(self, db_session, model, rows: List[Dict[str, Any]], update_columns) -> int:
+        """Upsert ``rows`` in one transaction; returns how many of them were new
         
+        Rows identical to the stored ones are left alone, so re-collecting
+        unchanged data does not touch ``updated_at`` (which drives backups).
+        """
+        if not rows:
+            return 0
+        # Later duplicates win, as they would have with row-by-row writes
+        rows = list({row["id"]: row for row in rows}.values())
+        engine = BulkUpsertEngine(db_session)
+        columns = [model.id] + [getattr(model, name) for name in update_columns]
         try:
+            stored: Dict[str, tuple] = {}
+            for start in range(0, len(rows), engine.chunk_size):
+                ids = [row["id"] for row in rows[start:start + engine.chunk_size]]
+                stored.update((values[0], tuple(values[1:])) for values in db_session.execute(
+                    select(*columns).where(model.id.in_(ids))
+                ))
+            # None never overwrites a stored value, so it does not count as a change
+            changed = [
+                row for row in rows
+                if row["id"] not in stored or any(
+                    row.get(name) is not None and row.get(name) != value
+                    for name, value in zip(update_columns, stored[row["id"]])
+                )
+            ]
+            for start in range(0, len(changed), engine.chunk_size):
+                engine.upsert(model, changed[start:start + engine.chunk_size], update_columns)
             db_session.commit()
         except Exception as e:
-            logger.error(f"Error committing problems: {e}")
+            logger.error(f"Error storing {model.__tablename__}: {e}")
             db_session.rollback()
-        
-        return stored_count
-    
-    async def _store_solutions(self, db_session, solutions: List[Dict[str, Any]]) -> int:
-        """Store solutions in database"""
-        stored_count = 0
-        
-        for solution_data in solutions:
+            return 0
+        if model is Problem and changed:
+            # Core upserts bypass the ORM flush hook; recompute the tag aggregates in one pass
             try:
-                # Check if solution already exists
-                existing = db_session.query(Solution).filter_by(id=solution_data['id']).first()
-                if existing:
-                    continue
-                
-                # Create solution instance
-                solution = Solution(
-                    id=solution_data['id'],
-                    problem_id=solution_data['problem_id'],
-                    code=solution_data['code'],
-                    language=solution_data['language'],
-                    approach_type=solution_data['approach_type'],
-                    algorithm_tags=solution_data['algorithm_tags'],
-                    time_complexity=solution_data['time_complexity'],
-                    space_complexity=solution_data['space_complexity'],
-                    overall_quality_score=solution_data['overall_quality_score'],
-                    readability_score=solution_data['readability_score'],
-                    documentation_score=solution_data['documentation_score'],
-                    efficiency_score=solution_data['efficiency_score'],
-                    maintainability_score=solution_data['maintainability_score'],
-                    style_score=solution_data['style_score'],
-                    explanation=solution_data.get('explanation'),
-                    google_interview_relevance=solution_data['google_interview_relevance'],
-                    educational_value=solution_data['educational_value'],
-                    implementation_difficulty=solution_data['implementation_difficulty'],
-                    conceptual_difficulty=solution_data['conceptual_difficulty']
-                )
-                
-                db_session.add(solution)
-                stored_count += 1
-                
-            except IntegrityError:
-                db_session.rollback()
-                continue
+                rebuild_tag_statistics(db_session)
             except Exception as e:
-                logger.error(f"Error storing solution {solution_data.get('id')}: {e}")
+                logger.error(f"Error rebuilding tag statistics: {e}")
                 db_session.rollback()
-                continue
-        
-        try:
-            db_session.commit()
-        except Exception as e:
-            logger.error(f"Error committing solutions: {e}")
-            db_session.rollback()
-        
-        return stored_count
+        new = len(rows) - len(stored)
+        logger.info(f"{model.__tablename__}: {new} new, {len(changed) - new} updated, {len(rows) - len(changed)} unchanged")
+        return new
+    
+    async def _store_problems(self, db_session, problems: List[Dict[str, Any]]) -> int:
+        """Store problems in database (bulk upsert); returns the number of new problems"""
+        rows = [
+            {
+                'id': problem_data['id'],
+                'platform': problem_data['platform'],
+                'platform_id': problem_data['platform_id'],
+                'title': problem_data['title'],
+                'difficulty': problem_data['difficulty'],
+                'category': problem_data.get('category'),
+                'description': problem_data.get('description'),
+                'constraints': problem_data.get('constraints'),
+                'algorithm_tags': problem_data['algorithm_tags'],
+                'data_structures': problem_data.get('data_structures'),
+                'google_interview_relevance': problem_data['google_interview_relevance'],
+                'quality_score': problem_data['quality_score'],
+                'acceptance_rate': problem_data.get('acceptance_rate'),
+                'frequency_score': problem_data.get('frequency_score'),
+                'companies': problem_data.get('companies'),
+                'collected_at': problem_data['collected_at']
+            }
+            for problem_data in problems
+        ]
+        return self._bulk_upsert(db_session, Problem, rows, self.PROBLEM_UPDATE_COLUMNS)
+    
+    async def _store_solutions(self, db_session, solutions: List[Dict[str, Any]]) -> int:
+        """Store solutions in database (bulk upsert); returns the number of new solutions"""
+        rows = [
+            {
+                'id': solution_data['id'],
+                'problem_id': solution_data['problem_id'],
+                'code': solution_data['code'],
+                'language': solution_data['language'],
+                'approach_type': solution_data['approach_type'],
+                'algorithm_tags': solution_data['algorithm_tags'],
+                'time_complexity': solution_data['time_complexity'],
+                'space_complexity': solution_data['space_complexity'],
+                'overall_quality_score': solution_data['overall_quality_score'],
+                'readability_score': solution_data['readability_score'],
+                'documentation_score': solution_data['documentation_score'],
+                'efficiency_score': solution_data['efficiency_score'],
+                'maintainability_score': solution_data['maintainability_score'],
+                'style_score': solution_data['style_score'],
+                'explanation': solution_data.get('explanation'),
+                'google_interview_relevance': solution_data['google_interview_relevance'],
+                'educational_value': solution_data['educational_value'],
+                'implementation_difficulty': solution_data['implementation_difficulty'],
+                'conceptual_difficulty': solution_data['conceptual_difficulty']
+            }
+            for solution_data in solutions
+        ]
+        return self._bulk_upsert(db_session, Solution, rows, self.SOLUTION_UPDATE_COLUMNS)
     
     async def _record_system_metrics(self, db_session, metrics: Dict[str, float]):
         """Record system performance metrics"""
@@ -587,33 +629,63 @@ class AutomatedCollectionPipeline:
             logger.error(f"Error committing metrics: {e}")
             db_session.rollback()
     
-    async def _create_backup(self, db_session):
-        """Create database backup"""
+    BACKUP_STATE_FILE = "backup_state.json"
+    BACKUP_BATCH_SIZE = 1000
+    
+    async def _create_backup(self, db_session) -> Optional[Path]:
+        """Create an incremental database backup
+        
+        Streams the problem and solution rows changed since the previous
+        backup into a gzip JSONL file: a header line, then one
+        ``{"table": ..., "row": ...}`` line per row. The first backup holds
+        every row; replaying the files in order restores the tables.
+        """
         try:
+            backup_dir = Path(self.config.backup_directory)
+            state_file = backup_dir / self.BACKUP_STATE_FILE
+            state = json.loads(state_file.read_text()) if state_file.exists() else {}
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = Path(self.config.backup_directory) / f"database_backup_{timestamp}.json"
+            backup_file = backup_dir / f"database_backup_{timestamp}.jsonl.gz"
+            temporary = backup_file.with_name(backup_file.name + ".tmp")
             
-            # Export key data for backup
-            problems = db_session.query(Problem).all()
-            solutions = db_session.query(Solution).all()
+            counts: Dict[str, int] = {}
+            changed = 0
+            watermarks: Dict[str, Optional[str]] = {}
+            with gzip.open(temporary, "wt", encoding="utf-8") as f:
+                f.write(json.dumps({"type": "backup", "timestamp": timestamp, "since": state}) + "\n")
+                for model in (Problem, Solution):
+                    table = model.__table__
+                    since = state.get(table.name)
+                    # Watermark first: rows changing while we stream land in the next backup
+                    watermarks[table.name] = db_session.execute(select(func.max(table.c.updated_at))).scalar()
+                    query = select(table)
+                    since_at = datetime.fromisoformat(since) if since else None
+                    if since_at is not None:
+                        # Inclusive, so rows sharing the watermark's timestamp are never missed
+                        query = query.where(table.c.updated_at >= since_at)
+                    rows = db_session.execute(query.execution_options(yield_per=self.BACKUP_BATCH_SIZE))
+                    counts[table.name] = 0
+                    for row in rows.mappings():
+                        f.write(json.dumps({"table": table.name, "row": dict(row)}, default=str) + "\n")
+                        counts[table.name] += 1
+                        if since_at is None or row["updated_at"] is None or row["updated_at"] > since_at:
+                            changed += 1
             
-            backup_data = {
-                'timestamp': timestamp,
-                'problems': [p.to_dict() for p in problems],
-                'solutions': [s.to_dict() for s in solutions],
-                'stats': {
-                    'total_problems': len(problems),
-                    'total_solutions': len(solutions)
-                }
-            }
+            # Rows at the watermark itself were backed up last time already
+            if not changed:
+                temporary.unlink()
+                logger.info("📦 No changes since the last backup")
+                return None
+            os.replace(temporary, backup_file)
+            state.update({name: value.isoformat() for name, value in watermarks.items() if value is not None})
+            state_file.write_text(json.dumps(state, indent=2))
             
-            with open(backup_file, 'w') as f:
-                json.dump(backup_data, f, indent=2, default=str)
-                
-            logger.info(f"📦 Database backup created: {backup_file}")
+            logger.info(f"📦 Database backup created: {backup_file} ({counts})")
+            return backup_file
             
         except Exception as e:
             logger.error(f"Error creating backup: {e}")
+            return None
 
 
 async def main():
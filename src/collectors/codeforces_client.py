@@ -15,6 +15,7 @@ from typing import List, Dict, Any, Optional
 import httpx
 from tqdm import tqdm
 
+from .http_client import CollectorHTTPClient
 from ..models.schemas import (
     Problem, Solution, Difficulty, DifficultyLevel, SourcePlatform,
     ProblemMetadata, AcquisitionMethod, TestCase, Constraints
@@ -29,7 +30,7 @@ class CodeforcesAPIClient:
     BASE_URL = "https://codeforces.com/api"
     RATE_LIMIT_DELAY = 2.1  # Slightly more than 2 seconds to be safe
     
-    def __init__(self, data_dir: Path):
+    def __init__(self, data_dir: Path, http: Optional[CollectorHTTPClient] = None):
         self.data_dir = data_dir
         self.problems_dir = data_dir / "raw" / "codeforces" / "problems"
         self.submissions_dir = data_dir / "raw" / "codeforces" / "submissions"
@@ -40,37 +41,36 @@ class CodeforcesAPIClient:
         self.submissions_dir.mkdir(parents=True, exist_ok=True)
         self.contests_dir.mkdir(parents=True, exist_ok=True)
         
-        self.last_request_time = 0
+        # One pooled client for all calls; it also paces requests to codeforces.com
+        self.http = http or CollectorHTTPClient(
+            cache_dir=data_dir / "cache" / "http",
+            rate_limits={"codeforces.com": (1 / self.RATE_LIMIT_DELAY, 1)},
+        )
         
     async def _make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Make a rate-limited request to Codeforces API
         """
-        # Enforce rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.RATE_LIMIT_DELAY:
-            await asyncio.sleep(self.RATE_LIMIT_DELAY - time_since_last)
-        
         url = f"{self.BASE_URL}/{endpoint}"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(url, params=params or {})
-                response.raise_for_status()
-                
-                self.last_request_time = time.time()
-                
-                data = response.json()
-                if data.get("status") != "OK":
-                    raise Exception(f"API Error: {data.get('comment', 'Unknown error')}")
-                
-                return data.get("result", {})
-                
-            except httpx.TimeoutException:
-                raise Exception(f"Timeout while accessing {url}")
-            except httpx.HTTPStatusError as e:
-                raise Exception(f"HTTP {e.response.status_code} error: {e.response.text}")
+        try:
+            response = await self.http.get(url, params=params or None)
+            response.raise_for_status()
+            
+            data = response.json()
+            if data.get("status") != "OK":
+                raise Exception(f"API Error: {data.get('comment', 'Unknown error')}")
+            
+            return data.get("result", {})
+            
+        except httpx.TimeoutException:
+            raise Exception(f"Timeout while accessing {url}")
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"HTTP {e.response.status_code} error: {e.response.text}")
+    
+    async def aclose(self):
+        """Close the pooled HTTP connections"""
+        await self.http.aclose()
     
     async def get_problemset_problems(self) -> Dict[str, Any]:
         """
@@ -290,6 +290,9 @@ async def main():
     except Exception as e:
         print(f"Error during collection: {e}")
         raise
+    
+    finally:
+        await client.aclose()
 
 
 if __name__ == "__main__":
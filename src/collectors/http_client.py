@@ -0,0 +1,269 @@
+"""
+Collector HTTP Client
+Shared HTTP layer for collectors: pooled keep-alive connections, per-host
+rate limiting, retries with backoff and conditional requests.
+
+``CollectorHTTPClient`` (async) and ``SyncCollectorHTTPClient`` (blocking)
+wrap one long-lived httpx client each, so repeated calls reuse TCP/TLS
+connections instead of paying a handshake per request. Every host gets a
+token bucket; reservations are taken under a lock, so concurrent callers
+are spaced out instead of racing on a shared timestamp. Connection errors,
+timeouts, 429 and 5xx responses are retried with exponential backoff and
+jitter, honouring ``Retry-After``. GET responses carrying an ``ETag`` or
+``Last-Modified`` header are kept in an on-disk cache and revalidated with
+``If-None-Match`` / ``If-Modified-Since``; a ``304`` is answered from the
+cache (``response.extensions["from_cache"]`` is then true).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+USER_AGENT = "DSATrain-Collector/0.2 (Educational Research)"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Requests per second and burst size for hosts without an explicit limit
+DEFAULT_RATE = (5.0, 5)
+# Published limits of the APIs the collectors talk to
+HOST_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "codeforces.com": (1 / 2.1, 1),
+}
+
+
+class TokenBucket:
+    """Token bucket that hands out waiting times instead of sleeping itself.
+
+    Usable from threads and event loops alike: ``reserve`` only holds the lock
+    for the arithmetic, and the caller sleeps for the returned delay. Tokens
+    may go negative, which queues later callers behind earlier ones.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class ResponseCache:
+    """On-disk store of validated GET responses, one body and one metadata file per URL"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        try:
+            with (self.directory / f"{key}.json").open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+            return meta, (self.directory / f"{key}.body").read_bytes()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def store(self, key: str, url: str, response: httpx.Response) -> None:
+        headers = {
+            name: response.headers[name]
+            for name in ("etag", "last-modified", "content-type")
+            if name in response.headers
+        }
+        # Body first: metadata without its body is never visible
+        self._replace(self.directory / f"{key}.body", response.content)
+        meta = {"url": url, "headers": headers, "stored_at": time.time()}
+        self._replace(self.directory / f"{key}.json", json.dumps(meta).encode("utf-8"))
+
+    @staticmethod
+    def _replace(path: Path, data: bytes) -> None:
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+
+class _CollectorHTTPBase:
+    """Rate limiting, retry and cache policy shared by the async and blocking clients"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, rate_limits: Optional[Mapping[str, Tuple[float, int]]] = None,
+                 default_rate: Tuple[float, int] = DEFAULT_RATE, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, timeout: float = 30.0,
+                 max_connections: int = 10, headers: Optional[Mapping[str, str]] = None):
+        self.rate_limits = {**HOST_RATE_LIMITS, **(rate_limits or {})}
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        self.cache = ResponseCache(cache_dir) if cache_dir is not None else None
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).hostname or ""
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                # Subdomains share their parent's limit (api.example.com -> example.com)
+                limit = next(
+                    (rate for name, rate in self.rate_limits.items() if host == name or host.endswith(f".{name}")),
+                    self.default_rate,
+                )
+                bucket = self._buckets[host] = TokenBucket(*limit)
+            return bucket
+
+    def _conditional(self, method: str, url: str) -> Tuple[Optional[str], Dict[str, str], Optional[Tuple]]:
+        """Cache key, validator headers and cached entry for a request"""
+        if self.cache is None or method != "GET":
+            return None, {}, None
+        key = ResponseCache.key(url)
+        cached = self.cache.load(key)
+        headers: Dict[str, str] = {}
+        if cached is not None:
+            meta = cached[0]["headers"]
+            if "etag" in meta:
+                headers["If-None-Match"] = meta["etag"]
+            if "last-modified" in meta:
+                headers["If-Modified-Since"] = meta["last-modified"]
+        return key, headers, cached
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # Full jitter keeps retrying collectors from hitting the host in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _finish(self, url: str, key: Optional[str], cached: Optional[Tuple], response: httpx.Response) -> httpx.Response:
+        if key is None:
+            return response
+        if response.status_code == 304 and cached is not None:
+            self.stats["cache_hits"] += 1
+            meta, body = cached
+            return httpx.Response(
+                200, headers=meta["headers"], content=body, request=response.request,
+                extensions={"from_cache": True},
+            )
+        if response.status_code == 200 and ("etag" in response.headers or "last-modified" in response.headers):
+            self.cache.store(key, url, response)
+        return response
+
+
+class CollectorHTTPClient(_CollectorHTTPBase):
+    """Async client; use as ``async with CollectorHTTPClient(...) as http``"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _pool(self) -> httpx.AsyncClient:
+        # An AsyncClient is tied to the event loop it first ran on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, headers=self.headers)
+            self._loop = loop
+        return self._client
+
+    async def request(self, method: str, url: str, *, params: Optional[Mapping[str, Any]] = None,
+                      headers: Optional[Mapping[str, str]] = None, **kwargs) -> httpx.Response:
+        full_url = str(httpx.URL(url, params=params)) if params else url
+        key, conditional, cached = self._conditional(method, full_url)
+        bucket = self._bucket(full_url)
+        for attempt in range(self.max_retries + 1):
+            delay = bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            self.stats["requests"] += 1
+            try:
+                response = await self._pool().request(method, full_url, headers={**conditional, **(headers or {})}, **kwargs)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return self._finish(full_url, key, cached, response)
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+        raise AssertionError("unreachable")
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "CollectorHTTPClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+class SyncCollectorHTTPClient(_CollectorHTTPBase):
+    """Blocking client for collectors that do not run an event loop"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = httpx.Client(timeout=self.timeout, limits=self.limits, headers=self.headers)
+
+    def request(self, method: str, url: str, *, params: Optional[Mapping[str, Any]] = None,
+                headers: Optional[Mapping[str, str]] = None, **kwargs) -> httpx.Response:
+        full_url = str(httpx.URL(url, params=params)) if params else url
+        key, conditional, cached = self._conditional(method, full_url)
+        bucket = self._bucket(full_url)
+        for attempt in range(self.max_retries + 1):
+            delay = bucket.reserve()
+            if delay:
+                time.sleep(delay)
+            self.stats["requests"] += 1
+            try:
+                response = self._client.request(method, full_url, headers={**conditional, **(headers or {})}, **kwargs)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return self._finish(full_url, key, cached, response)
+            self.stats["retries"] += 1
+            time.sleep(self._retry_delay(attempt, response))
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self) -> "SyncCollectorHTTPClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -6,14 +6,48 @@ Creates AI-ready features from unified problem data for machine learning trainin
 from __future__ import annotations
 
 import json
+import logging
 import re
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Set
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Set
 from collections import defaultdict, Counter
 import hashlib
 import math
+import os
+import time
+
+import numpy as np
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.ml.concept_graph import CONCEPT_PREREQUISITES, ConceptGraph
+from src.ml.hashed_embeddings import DEFAULT_SEED, ENCODER_NAME, HashedEmbeddingEncoder
+from src.ml.embedding_store import (
+    ANN_MIN_ROWS,
+    DEFAULT_EMBEDDING_MODEL,
+    EMBEDDING_KINDS,
+    INDEX_FILE,
+    EmbeddingStore,
+    EmbeddingStoreWriter,
+    build_ann_index,
+)
+from src.processors.jsonl_artifacts import iter_artifact_records, resolve_artifact, write_jsonl_artifact
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_WORKERS_ENV = "DSATRAIN_EMBEDDING_WORKERS"
+
+
+def _embedding_workers_from_env() -> int:
+    raw = os.getenv(EMBEDDING_WORKERS_ENV)
+    try:
+        return max(1, int(raw)) if raw not in (None, "") else 1
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", EMBEDDING_WORKERS_ENV, raw)
+        return 1
 
 
 @dataclass
@@ -23,8 +57,14 @@ class AIFeatureEngineer:
     data_dir: Path
     output_dir: Optional[Path] = None
     
+    # Parallel embedding workers (1 = encode in-process); None reads EMBEDDING_WORKERS_ENV
+    embedding_workers: Optional[int] = None
+    
     # Feature engineering parameters
     EMBEDDING_DIM = 128
+    EMBEDDING_MODEL = DEFAULT_EMBEDDING_MODEL
+    EMBEDDING_SEED = DEFAULT_SEED
+    EMBEDDING_UPDATE_BLOCK = 4096
     MAX_VOCAB_SIZE = 10000
     
     def __post_init__(self):
@@ -33,6 +73,9 @@ class AIFeatureEngineer:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
         self.processed_dir = self.data_dir / "processed"
+        if self.embedding_workers is None:
+            self.embedding_workers = _embedding_workers_from_env()
+        self.concept_graph = ConceptGraph(CONCEPT_PREREQUISITES)
 
     def _tokenize_text(self, text: str) -> List[str]:
         """Simple tokenization for text processing"""
@@ -68,40 +111,13 @@ class AIFeatureEngineer:
         print(f"✅ Built vocabulary with {len(vocab)} words")
         return vocab
 
-    def _text_to_vector(self, text: str, vocab: Dict[str, int]) -> List[float]:
-        """Convert text to TF-IDF-like vector"""
-        if not text:
-            return [0.0] * self.EMBEDDING_DIM
-        
-        tokens = self._tokenize_text(text)
-        if not tokens:
-            return [0.0] * self.EMBEDDING_DIM
-        
-        # Create simple embedding by averaging word indices (normalized)
-        word_indices = []
-        for token in tokens:
-            idx = vocab.get(token, vocab["<UNK>"])
-            word_indices.append(idx)
-        
-        if not word_indices:
-            return [0.0] * self.EMBEDDING_DIM
-        
-        # Create embedding vector
-        embedding = [0.0] * self.EMBEDDING_DIM
-        
-        # Simple approach: use hash-based embeddings
-        for idx in word_indices:
-            # Use hash to distribute word indices across embedding dimensions
-            for i in range(self.EMBEDDING_DIM):
-                hash_val = hash(f"{idx}_{i}") % 1000000
-                embedding[i] += (hash_val / 1000000.0) / len(word_indices)
-        
-        # Normalize
-        norm = math.sqrt(sum(x*x for x in embedding))
-        if norm > 0:
-            embedding = [x/norm for x in embedding]
-        
-        return embedding
+    @staticmethod
+    def _embedding_texts(problems: List[Dict[str, Any]]) -> Tuple[List[str], List[str], List[str]]:
+        """Texts behind the combined, title and description embeddings"""
+        titles = [problem.get("title", "") for problem in problems]
+        descriptions = [problem.get("description", "") for problem in problems]
+        combined = [f"{title} {desc}" for title, desc in zip(titles, descriptions)]
+        return combined, titles, descriptions
 
     def generate_semantic_embeddings(self, problems: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate semantic embeddings for all problems"""
@@ -109,46 +125,109 @@ class AIFeatureEngineer:
         
         # Build vocabulary
         vocab = self._build_vocabulary(problems)
+        encoder = HashedEmbeddingEncoder(vocab, self.EMBEDDING_DIM, self.EMBEDDING_SEED)
+        
+        # Encode the whole corpus at once, one matrix per text field
+        ids = [problem.get("id", f"unknown_{i}") for i, problem in enumerate(problems)]
+        started = time.perf_counter()
+        matrices = [
+            encoder.encode_parallel(texts, workers=self.embedding_workers)
+            for texts in self._embedding_texts(problems)
+        ]
+        elapsed = time.perf_counter() - started
+        
+        store_dir = self.output_dir / "embeddings"
+        metadata = {
+            "encoder": ENCODER_NAME,
+            "seed": self.EMBEDDING_SEED,
+            "vocab_size": len(vocab),
+            "timestamp": datetime.now().isoformat(),
+            "vocabulary": vocab
+        }
+        with EmbeddingStoreWriter(store_dir, self.EMBEDDING_MODEL, len(problems),
+                                  self.EMBEDDING_DIM, metadata) as writer:
+            writer.write_batch(ids, *matrices)
+        
+        print(f"✅ Generated embeddings for {len(problems)} problems in {elapsed:.2f}s")
+        result = {
+            "embeddings_file": str(writer.path / INDEX_FILE),
+            "embedding_model": self.EMBEDDING_MODEL,
+            "total_embeddings": len(writer.ids),
+            "embedding_dim": self.EMBEDDING_DIM,
+            "encode_seconds": round(elapsed, 3)
+        }
         
-        # Generate embeddings for each problem
-        embeddings = {}
-        
-        for i, problem in enumerate(problems):
-            if i % 50 == 0:
-                print(f"Generating embeddings {i}/{len(problems)}")
-            
-            problem_id = problem.get("id", f"unknown_{i}")
-            
-            # Combine title and description for embedding
-            text = f"{problem.get('title', '')} {problem.get('description', '')}"
-            embedding = self._text_to_vector(text, vocab)
-            
-            embeddings[problem_id] = {
-                "embedding": embedding,
-                "title_embedding": self._text_to_vector(problem.get("title", ""), vocab),
-                "desc_embedding": self._text_to_vector(problem.get("description", ""), vocab)
-            }
-        
-        # Save embeddings
-        embeddings_file = self.output_dir / "semantic_embeddings.json"
-        with embeddings_file.open("w", encoding="utf-8") as f:
-            json.dump({
-                "metadata": {
-                    "embedding_dim": self.EMBEDDING_DIM,
-                    "vocab_size": len(vocab),
-                    "total_problems": len(problems),
-                    "timestamp": datetime.now().isoformat()
-                },
-                "vocabulary": vocab,
-                "embeddings": embeddings
-            }, f, indent=2)
-        
-        print(f"✅ Generated embeddings for {len(problems)} problems")
-        return {
-            "embeddings_file": str(embeddings_file),
-            "total_embeddings": len(embeddings),
-            "embedding_dim": self.EMBEDDING_DIM
+        # Approximate nearest-neighbour index for large catalogues
+        if len(writer.ids) >= ANN_MIN_ROWS:
+            started = time.perf_counter()
+            ann = build_ann_index(EmbeddingStore(writer.path, mmap=False))
+            result["ann_index"] = {"nlist": ann.nlist, "build_seconds": round(time.perf_counter() - started, 3)}
+            print(f"✅ Built ANN index with {ann.nlist} lists")
+        return result
+
+    def update_semantic_embeddings(self, problems: List[Dict[str, Any]],
+                                   removed_ids: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """Re-encode only ``problems`` into a new version of the existing store
+        
+        The vocabulary is kept from the current store (new words count as
+        unknown until the next full run), so rows of unchanged problems are
+        copied rather than re-encoded. Problems keep their row offsets unless
+        ``removed_ids`` drops rows. Returns ``None`` when there is no store to
+        update, or it was built with another encoder, in which case a full
+        ``generate_semantic_embeddings`` is needed.
+        """
+        store_dir = self.output_dir / "embeddings"
+        store = EmbeddingStore.open(self.EMBEDDING_MODEL, store_dir)
+        if store is None or "vocabulary" not in store.metadata or store.metadata.get("encoder") != ENCODER_NAME:
+            return None
+        print(f"=== Updating Semantic Embeddings ({len(problems)} changed) ===")
+        
+        started = time.perf_counter()
+        vocab = store.metadata["vocabulary"]
+        encoder = HashedEmbeddingEncoder(vocab, store.dimension, store.metadata.get("seed", self.EMBEDDING_SEED))
+        changed = {problem["id"]: problem for problem in problems}
+        removed = set(removed_ids) & set(store.ids)
+        order = [pid for pid in store.ids if pid not in removed]
+        order += [pid for pid in changed if pid not in store]
+        
+        metadata = {
+            key: value for key, value in store.metadata.items()
+            if key not in ("embedding_model", "dimension", "count", "created_at")
+        }
+        metadata["timestamp"] = datetime.now().isoformat()
+        with EmbeddingStoreWriter(store_dir, self.EMBEDDING_MODEL, len(order), store.dimension, metadata) as writer:
+            for start in range(0, len(order), self.EMBEDDING_UPDATE_BLOCK):
+                ids = order[start:start + self.EMBEDDING_UPDATE_BLOCK]
+                kept = [i for i, pid in enumerate(ids) if pid not in changed]
+                kept_rows = [store.row_offset(ids[i]) for i in kept]
+                fresh = [i for i, pid in enumerate(ids) if pid in changed]
+                texts = self._embedding_texts([changed[ids[i]] for i in fresh])
+                blocks = []
+                for kind, kind_texts in zip(EMBEDDING_KINDS, texts):
+                    block = np.zeros((len(ids), store.dimension), dtype=np.float32)
+                    if kept:
+                        block[kept] = store.matrix(kind)[kept_rows]
+                    if fresh:
+                        block[fresh] = encoder.encode(kind_texts)
+                    blocks.append(block)
+                writer.write_batch(ids, *blocks)
+        elapsed = time.perf_counter() - started
+        
+        result = {
+            "embeddings_file": str(writer.path / INDEX_FILE),
+            "embedding_model": self.EMBEDDING_MODEL,
+            "total_embeddings": len(writer.ids),
+            "reencoded": len(changed),
+            "removed": len(removed),
+            # Removing rows shifts the offsets of every row behind them
+            "offsets_changed": bool(removed),
+            "encode_seconds": round(elapsed, 3)
         }
+        if len(writer.ids) >= ANN_MIN_ROWS:
+            ann = build_ann_index(EmbeddingStore(writer.path, mmap=False))
+            result["ann_index"] = {"nlist": ann.nlist}
+        print(f"✅ Re-encoded {len(changed)} embeddings in {elapsed:.2f}s ({len(writer.ids)} in store)")
+        return result
 
     def build_difficulty_vectors(self, problems: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Build multi-dimensional difficulty vectors"""
@@ -205,16 +284,15 @@ class AIFeatureEngineer:
             }
         
         # Save difficulty vectors
-        vectors_file = self.output_dir / "difficulty_vectors.json"
-        with vectors_file.open("w", encoding="utf-8") as f:
-            json.dump({
-                "metadata": {
-                    "dimensions": dimensions,
-                    "total_problems": len(problems),
-                    "timestamp": datetime.now().isoformat()
-                },
-                "vectors": difficulty_vectors
-            }, f, indent=2)
+        vectors_file = write_jsonl_artifact(
+            self.output_dir / "difficulty_vectors.json",
+            ({"id": pid, **vector} for pid, vector in difficulty_vectors.items()),
+            metadata={
+                "dimensions": dimensions,
+                "total_problems": len(problems),
+                "timestamp": datetime.now().isoformat()
+            }
+        )
         
         print(f"✅ Built difficulty vectors for {len(problems)} problems")
         return {
@@ -227,20 +305,6 @@ class AIFeatureEngineer:
         """Construct concept prerequisite graph"""
         print("=== Constructing Concept Graph ===")
         
-        # Define concept prerequisites
-        concept_prerequisites = {
-            "dynamic_programming": ["arrays", "recursion"],
-            "graphs": ["arrays", "data_structures"],
-            "trees": ["recursion", "data_structures"],
-            "binary_search": ["arrays", "sorting"],
-            "greedy": ["sorting", "mathematics"],
-            "shortest_paths": ["graphs", "greedy"],
-            "minimum_spanning_tree": ["graphs", "greedy"],
-            "topological_sort": ["graphs", "depth_first_search"],
-            "segment_trees": ["trees", "data_structures"],
-            "fenwick_trees": ["trees", "data_structures"]
-        }
-        
         # Build concept graph
         concept_graph = {
             "nodes": {},
@@ -257,12 +321,12 @@ class AIFeatureEngineer:
         for concept in all_concepts:
             concept_graph["nodes"][concept] = {
                 "name": concept,
-                "prerequisites": concept_prerequisites.get(concept, []),
+                "prerequisites": self.concept_graph.prerequisites(concept),
                 "problem_count": 0,
                 "difficulty_level": 1
             }
         
-        # Count problems per concept and assign difficulty levels
+        # Count problems per concept
         for problem in problems:
             problem_id = problem.get("id", "")
             tags = problem.get("unified_tags", [])
@@ -273,41 +337,17 @@ class AIFeatureEngineer:
                 if tag in concept_graph["nodes"]:
                     concept_graph["nodes"][tag]["problem_count"] += 1
         
-        # Assign difficulty levels based on prerequisites
-        def calculate_difficulty_level(concept, visited=None):
-            if visited is None:
-                visited = set()
-            
-            if concept in visited:
-                return 1  # Circular dependency, assign basic level
-            
-            visited.add(concept)
-            prereqs = concept_prerequisites.get(concept, [])
-            
-            if not prereqs:
-                return 1  # No prerequisites = basic level
-            
-            max_prereq_level = max(
-                calculate_difficulty_level(prereq, visited.copy()) 
-                for prereq in prereqs
-                if prereq in concept_graph["nodes"]
-            ) if prereqs else 0
-            
-            return max_prereq_level + 1
-        
-        for concept in concept_graph["nodes"]:
-            concept_graph["nodes"][concept]["difficulty_level"] = calculate_difficulty_level(concept)
+        # Difficulty levels and edges over the concepts actually present
+        present = self.concept_graph.subgraph(concept_graph["nodes"])
+        for concept, level in present.levels().items():
+            concept_graph["nodes"][concept]["difficulty_level"] = level
+        if present.has_cycle:
+            print(f"⚠️ Prerequisite cycle among concepts: {sorted(present.cycle_nodes)}")
         
-        # Create edges based on prerequisites
-        for concept, prereqs in concept_prerequisites.items():
-            if concept in concept_graph["nodes"]:
-                for prereq in prereqs:
-                    if prereq in concept_graph["nodes"]:
-                        concept_graph["edges"].append({
-                            "from": prereq,
-                            "to": concept,
-                            "type": "prerequisite"
-                        })
+        concept_graph["edges"] = [
+            {"from": prereq, "to": concept, "type": "prerequisite"}
+            for prereq, concept in present.edges()
+        ]
         
         # Save concept graph
         graph_file = self.output_dir / "concept_graph.json"
@@ -320,7 +360,7 @@ class AIFeatureEngineer:
                     "timestamp": datetime.now().isoformat()
                 },
                 "graph": concept_graph
-            }, f, indent=2)
+            }, f, separators=(",", ":"))
         
         print(f"✅ Built concept graph with {len(concept_graph['nodes'])} concepts")
         return {
@@ -403,22 +443,21 @@ class AIFeatureEngineer:
             interview_features[problem_id] = features
         
         # Save interview features
-        features_file = self.output_dir / "interview_features.json"
-        with features_file.open("w", encoding="utf-8") as f:
-            json.dump({
-                "metadata": {
-                    "total_problems": len(problems),
-                    "feature_weights": {
-                        "base_google_relevance": 0.3,
-                        "frequency_score": 0.25,
-                        "difficulty_appropriateness": 0.25,
-                        "concept_coverage": 0.1,
-                        "implementation_complexity": 0.1
-                    },
-                    "timestamp": datetime.now().isoformat()
+        features_file = write_jsonl_artifact(
+            self.output_dir / "interview_features.json",
+            ({"id": pid, **features} for pid, features in interview_features.items()),
+            metadata={
+                "total_problems": len(problems),
+                "feature_weights": {
+                    "base_google_relevance": 0.3,
+                    "frequency_score": 0.25,
+                    "difficulty_appropriateness": 0.25,
+                    "concept_coverage": 0.1,
+                    "implementation_complexity": 0.1
                 },
-                "features": interview_features
-            }, f, indent=2)
+                "timestamp": datetime.now().isoformat()
+            }
+        )
         
         print(f"✅ Calculated interview features for {len(problems)} problems")
         return {
@@ -439,14 +478,12 @@ class AIFeatureEngineer:
         try:
             # Load unified problems
             problems_file = self.processed_dir / "problems_unified_complete.json"
-            if not problems_file.exists():
+            if resolve_artifact(problems_file) is None:
                 raise FileNotFoundError(f"Unified problems file not found: {problems_file}")
             
             print("Loading unified problems...")
-            with problems_file.open("r", encoding="utf-8") as f:
-                problems_data = json.load(f)
-            
-            problems = problems_data.get("problems", [])
+            # Several passes follow (vocabulary, vectors, graph), so materialize once
+            problems = list(iter_artifact_records(problems_file, "problems"))
             print(f"Loaded {len(problems)} unified problems")
             
             # 1. Generate semantic embeddings
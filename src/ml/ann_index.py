@@ -0,0 +1,223 @@
+"""
+Approximate Nearest-Neighbour Index
+Inverted-file (IVF) index for cosine similarity over embedding matrices.
+
+A spherical k-means coarse quantizer splits the (L2-normalised) vectors into
+``nlist`` inverted lists. A query scores the centroids, then exhaustively
+scores only the vectors of its ``nprobe`` closest lists, so search work is
+roughly ``nprobe / nlist`` of a brute-force scan.
+
+Everything is stored as flat arrays, ordered list by list, so that a probed
+list is one contiguous slice of a memory-mapped file:
+
+    <path>/
+        centroids.npy   float32 (nlist, dimension), unit length
+        offsets.npy     int64   (nlist + 1,), list i is [offsets[i], offsets[i+1])
+        rows.npy        int32   (count,), source row of every position
+        vectors.npy     float32 (count, dimension), normalised, in list order
+        ivf.json        build parameters and caller metadata, written last
+
+Knobs: ``nlist`` (build time; more lists = smaller lists, faster queries and
+lower recall at a fixed nprobe) and ``nprobe`` (query time; more lists probed =
+higher recall, higher latency). ``nprobe == nlist`` is an exact search.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+META_FILE = "ivf.json"
+DEFAULT_NPROBE = 16
+DEFAULT_ITERATIONS = 12
+DEFAULT_SEED = 20250814
+# Training points per list; k-means on a sample is as good as on everything
+_TRAINING_POINTS_PER_LIST = 64
+_ASSIGN_CHUNK = 8192
+_ARRAYS = ("centroids", "offsets", "rows", "vectors")
+
+
+def default_nlist(count: int) -> int:
+    """Rule-of-thumb list count: about 4 * sqrt(count)."""
+    return max(1, min(count, int(round(4 * math.sqrt(count)))))
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.array(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Closest centroid (by inner product) and its score for every vector, in chunks."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    best = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        scores = vectors[start:start + _ASSIGN_CHUNK] @ centroids.T
+        labels[start:start + len(scores)] = scores.argmax(axis=1)
+        best[start:start + len(scores)] = scores.max(axis=1)
+    return labels, best
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = DEFAULT_ITERATIONS,
+                     seed: int = DEFAULT_SEED) -> np.ndarray:
+    """Unit-length centroids maximising total cosine similarity to ``vectors``.
+
+    ``vectors`` must already be normalised. Empty clusters are re-seeded with
+    the points that are currently worst served, so all ``k`` lists get used.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels, best = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        sizes = np.bincount(labels, minlength=k)
+        empty = np.flatnonzero(sizes == 0)
+        if len(empty):
+            worst = np.argsort(best, kind="stable")[: len(empty)]
+            sums[empty] = vectors[worst]
+        new = _normalized(sums)
+        if np.array_equal(new, centroids):
+            break
+        centroids = new
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index; search returns source row numbers, not ids."""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray,
+                 vectors: np.ndarray, metadata: Optional[Dict[str, Any]] = None):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.vectors = vectors
+        self.metadata = metadata or {}
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: Optional[int] = None,
+              iterations: int = DEFAULT_ITERATIONS, seed: int = DEFAULT_SEED,
+              metadata: Optional[Dict[str, Any]] = None) -> "IVFIndex":
+        """Train the coarse quantizer on a sample and file every vector into its list."""
+        normalized = _normalized(vectors)
+        count = len(normalized)
+        if not count:
+            raise ValueError("Cannot build an ANN index over zero vectors")
+        nlist = min(nlist or default_nlist(count), count)
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, nlist * _TRAINING_POINTS_PER_LIST)
+        sample = normalized if sample_size == count else normalized[
+            np.sort(rng.choice(count, size=sample_size, replace=False))
+        ]
+        centroids = spherical_kmeans(sample, nlist, iterations, seed)
+
+        labels, _ = _assign(normalized, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        return cls(
+            centroids,
+            offsets,
+            order.astype(np.int32),
+            normalized[order],
+            {
+                "nlist": nlist,
+                "dimension": int(normalized.shape[1]),
+                "count": count,
+                "iterations": iterations,
+                "seed": seed,
+                "created_at": datetime.now().isoformat(),
+                **(metadata or {}),
+            },
+        )
+
+    def save(self, path: Path) -> Path:
+        """Write the arrays, then the metadata file that makes them visible."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            tmp = path / f"{name}.npy.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, getattr(self, name))
+            os.replace(tmp, path / f"{name}.npy")
+        tmp_meta = path / (META_FILE + ".tmp")
+        tmp_meta.write_text(json.dumps(self.metadata, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_meta, path / META_FILE)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Optional["IVFIndex"]:
+        path = Path(path)
+        meta_file = path / META_FILE
+        if not meta_file.exists():
+            return None
+        metadata = json.loads(meta_file.read_text(encoding="utf-8"))
+        mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+        return cls(metadata=metadata, **arrays)
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None,
+               exclude_rows: Iterable[int] = ()) -> List[List[Tuple[int, float]]]:
+        """Approximate top ``k`` source rows by cosine similarity for each query.
+
+        ``queries`` is a single vector or a (Q, dimension) batch. Each result is
+        a best-first ``[(row, score), ...]`` list; rows in ``exclude_rows`` are
+        never returned.
+        """
+        queries = _normalized(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        nprobe = max(1, min(nprobe or DEFAULT_NPROBE, self.nlist))
+        excluded = np.fromiter(exclude_rows, dtype=np.int64)
+        if k <= 0 or not len(self.rows):
+            return [[] for _ in range(len(queries))]
+
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), (len(queries), self.nlist))
+
+        results = []
+        for query, lists in zip(queries, probes):
+            spans = [(self.offsets[i], self.offsets[i + 1]) for i in lists if self.offsets[i + 1] > self.offsets[i]]
+            if not spans:
+                results.append([])
+                continue
+            # Each probed list is a contiguous slice of the (memory-mapped) vectors
+            scores = np.concatenate([self.vectors[a:b] @ query for a, b in spans])
+            rows = np.concatenate([self.rows[a:b] for a, b in spans])
+            if len(excluded):
+                scores[np.isin(rows, excluded)] = -np.inf
+            top = min(k, int(np.isfinite(scores).sum()))
+            if top <= 0:
+                results.append([])
+                continue
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.lexsort((rows[best], -scores[best]))]
+            results.append([(int(rows[i]), float(scores[i])) for i in best])
+        return results
+
+
+def recall_at_k(approximate: List[List[Tuple[Any, float]]], exact: List[List[Tuple[Any, float]]]) -> float:
+    """Fraction of the exact top-k neighbours that the approximate search found."""
+    found = total = 0
+    for approx_hits, exact_hits in zip(approximate, exact):
+        truth = {key for key, _ in exact_hits}
+        found += len(truth & {key for key, _ in approx_hits})
+        total += len(truth)
+    return found / total if total else 1.0
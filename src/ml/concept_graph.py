@@ -0,0 +1,230 @@
+"""
+Concept Graph
+Shared prerequisite graph for concepts (unified tags) and skill areas.
+
+Built once from a prerequisite map (``{concept: [prerequisite, ...]}``).
+Construction runs a single Kahn topological sort that yields difficulty
+levels (1 for concepts without prerequisites, else one more than the hardest
+prerequisite) and detects cycles. Ancestor and descendant closures are kept
+as integer bitsets, so "does A (transitively) require B?" and "are all of
+A's prerequisites covered by this set?" are constant-time bit operations.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Sequence, Set, Tuple
+
+# Prerequisites between unified problem tags, used by feature engineering
+CONCEPT_PREREQUISITES: Dict[str, List[str]] = {
+    "dynamic_programming": ["arrays", "recursion"],
+    "graphs": ["arrays", "data_structures"],
+    "trees": ["recursion", "data_structures"],
+    "binary_search": ["arrays", "sorting"],
+    "greedy": ["sorting", "mathematics"],
+    "shortest_paths": ["graphs", "greedy"],
+    "minimum_spanning_tree": ["graphs", "greedy"],
+    "topological_sort": ["graphs", "depth_first_search"],
+    "segment_trees": ["trees", "data_structures"],
+    "fenwick_trees": ["trees", "data_structures"],
+}
+
+# The smaller map quality scoring places problems with (learning_position).
+# Kept apart from CONCEPT_PREREQUISITES so that scores do not shift until the
+# two maps are deliberately merged.
+LEARNING_POSITION_PREREQUISITES: Dict[str, List[str]] = {
+    "dynamic_programming": ["arrays", "recursion"],
+    "graphs": ["arrays", "data_structures"],
+    "trees": ["recursion", "data_structures"],
+    "binary_search": ["arrays", "sorting"],
+    "advanced_dp": ["dynamic_programming"],
+    "graph_algorithms": ["graphs", "dynamic_programming"],
+}
+
+# Prerequisites between learning-path skill areas (see learning_path_engine.SkillArea)
+SKILL_AREA_PREREQUISITES: Dict[str, List[str]] = {
+    "arrays": [],
+    "strings": ["arrays"],
+    "hash_tables": ["arrays"],
+    "two_pointers": ["arrays"],
+    "sliding_window": ["two_pointers"],
+    "trees": ["arrays"],
+    "graphs": ["trees"],
+    "dynamic_programming": ["arrays", "strings"],
+    "greedy": ["arrays"],
+    "binary_search": ["arrays"],
+    "sorting": ["arrays"],
+    "backtracking": ["arrays", "trees"],
+    "mathematics": [],
+    "bit_manipulation": ["mathematics"],
+    "system_design": ["arrays", "hash_tables"],
+}
+
+
+class ConceptGraph:
+    """Immutable prerequisite DAG with precomputed levels and closure bitsets."""
+
+    def __init__(self, prerequisites: Mapping[str, Iterable[str]], nodes: Iterable[str] = ()):
+        # Node order follows first appearance, so derived lists keep the map's order
+        names: Dict[str, None] = {}
+        for concept, prereqs in prerequisites.items():
+            names.setdefault(concept)
+            for prereq in prereqs:
+                names.setdefault(prereq)
+        for node in nodes:
+            names.setdefault(node)
+        self._names: List[str] = list(names)
+        self._index: Dict[str, int] = {name: i for i, name in enumerate(self._names)}
+
+        count = len(self._names)
+        self._prereqs: List[Tuple[int, ...]] = [()] * count
+        for concept, prereqs in prerequisites.items():
+            merged = dict.fromkeys(self._prereqs[self._index[concept]])
+            merged.update(dict.fromkeys(self._index[p] for p in prereqs if p != concept))
+            self._prereqs[self._index[concept]] = tuple(merged)
+        self._dependents: List[List[int]] = [[] for _ in range(count)]
+        for node, prereqs in enumerate(self._prereqs):
+            for prereq in prereqs:
+                self._dependents[prereq].append(node)
+        self._prereq_masks: List[int] = [_mask(prereqs) for prereqs in self._prereqs]
+
+        self.order, self.cycle_nodes = self._toposort()
+        self._levels = self._compute_levels()
+        self._ancestors = self._closure(self._prereqs, self.order)
+        self._descendants = self._closure(self._dependents, list(reversed(self.order)))
+
+    # --- construction -------------------------------------------------
+
+    def _toposort(self) -> Tuple[List[int], Set[str]]:
+        """Kahn's algorithm; nodes left with unresolved prerequisites lie on or behind a cycle."""
+        indegree = [len(prereqs) for prereqs in self._prereqs]
+        ready = deque(i for i, d in enumerate(indegree) if d == 0)
+        order: List[int] = []
+        while ready:
+            node = ready.popleft()
+            order.append(node)
+            for dependent in self._dependents[node]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        blocked = [i for i, d in enumerate(indegree) if d > 0]
+        return order + blocked, {self._names[i] for i in blocked}
+
+    def _compute_levels(self) -> List[int]:
+        levels = [1] * len(self._names)
+        resolved = [False] * len(self._names)
+        for node in self.order:
+            # Prerequisites on a cycle are not resolved yet and are ignored
+            known = [levels[p] for p in self._prereqs[node] if resolved[p]]
+            levels[node] = max(known) + 1 if known else 1
+            resolved[node] = True
+        return levels
+
+    def _closure(self, parents: Sequence[Sequence[int]], order: List[int]) -> List[int]:
+        closure = [0] * len(self._names)
+        for node in order:
+            bits = 0
+            for parent in parents[node]:
+                bits |= (1 << parent) | closure[parent]
+            closure[node] = bits
+        if self.cycle_nodes:
+            # One pass is not enough inside a cycle; iterate to a fixed point
+            changed = True
+            while changed:
+                changed = False
+                for node in order:
+                    bits = closure[node]
+                    for parent in parents[node]:
+                        bits |= (1 << parent) | closure[parent]
+                    if bits != closure[node]:
+                        closure[node], changed = bits, True
+        return closure
+
+    # --- queries ------------------------------------------------------
+
+    def __contains__(self, concept: str) -> bool:
+        return concept in self._index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._names)
+
+    @property
+    def has_cycle(self) -> bool:
+        return bool(self.cycle_nodes)
+
+    def topological_order(self) -> List[str]:
+        return [self._names[i] for i in self.order]
+
+    def level(self, concept: str) -> int:
+        index = self._index.get(concept)
+        return 1 if index is None else self._levels[index]
+
+    def levels(self) -> Dict[str, int]:
+        return {name: self._levels[i] for i, name in enumerate(self._names)}
+
+    def prerequisites(self, concept: str) -> List[str]:
+        index = self._index.get(concept)
+        return [] if index is None else [self._names[p] for p in self._prereqs[index]]
+
+    def dependents(self, concept: str) -> List[str]:
+        index = self._index.get(concept)
+        return [] if index is None else [self._names[d] for d in self._dependents[index]]
+
+    def edges(self) -> List[Tuple[str, str]]:
+        """``(prerequisite, concept)`` pairs in node order."""
+        return [(self._names[p], self._names[c]) for c, prereqs in enumerate(self._prereqs) for p in prereqs]
+
+    def mask(self, concepts: Iterable[str]) -> int:
+        """Bitset of the known concepts in ``concepts``; unknown names are ignored."""
+        return _mask(self._index[c] for c in concepts if c in self._index)
+
+    def names(self, bits: int) -> List[str]:
+        return [name for i, name in enumerate(self._names) if bits >> i & 1]
+
+    def ancestors(self, concept: str) -> Set[str]:
+        """Everything ``concept`` transitively requires."""
+        index = self._index.get(concept)
+        return set() if index is None else set(self.names(self._ancestors[index]))
+
+    def descendants(self, concept: str) -> Set[str]:
+        """Everything that transitively requires ``concept``."""
+        index = self._index.get(concept)
+        return set() if index is None else set(self.names(self._descendants[index]))
+
+    def requires(self, concept: str, prerequisite: str) -> bool:
+        """Whether ``concept`` depends on ``prerequisite``, directly or transitively."""
+        index = self._index.get(concept)
+        other = self._index.get(prerequisite)
+        return index is not None and other is not None and bool(self._ancestors[index] >> other & 1)
+
+    def prerequisite_mask(self, concept: str, transitive: bool = False) -> int:
+        index = self._index.get(concept)
+        if index is None:
+            return 0
+        return self._ancestors[index] if transitive else self._prereq_masks[index]
+
+    def unlocked_by(self, known: int) -> List[str]:
+        """Concepts outside ``known`` whose direct prerequisites are all in ``known`` (a bitset)."""
+        return [
+            self._names[i] for i, prereqs in enumerate(self._prereq_masks)
+            if prereqs and not prereqs & ~known and not known >> i & 1
+        ]
+
+    def subgraph(self, concepts: Iterable[str]) -> "ConceptGraph":
+        """Graph induced by ``concepts``: only edges between two of them are kept."""
+        keep = set(concepts)
+        return ConceptGraph(
+            {c: [p for p in self.prerequisites(c) if p in keep] for c in self._names if c in keep},
+            sorted(keep - set(self._index)),
+        )
+
+
+def _mask(indices: Iterable[int]) -> int:
+    bits = 0
+    for index in indices:
+        bits |= 1 << index
+    return bits
@@ -0,0 +1,332 @@
+"""
+Embedding Store
+Binary, memory-mapped storage for problem embeddings.
+
+Each embedding model version gets its own directory, and every build of it
+is published as a new subdirectory that ``CURRENT`` points at:
+
+    <store_dir>/<embedding_model>/
+        CURRENT           name of the published build
+        <build>/
+            combined.npy      float32 matrix, one row per problem
+            title.npy         float32 matrix, same row order
+            description.npy   float32 matrix, same row order
+            index.json        model metadata plus the problem id of every row
+            ivf/              optional ANN index over ``combined`` (src/ml/ann_index.py)
+
+API workers open the matrices with ``mmap_mode="r"``, so the operating system
+shares the pages between processes and nothing is parsed per request. The
+database keeps only metadata and the row offset (``ProblemEmbedding``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.ml.ann_index import META_FILE as ANN_META_FILE, IVFIndex
+
+DEFAULT_EMBEDDING_MODEL = "dsatrain_v2"
+# Salted-hash embeddings from before the deterministic encoder (JSON artifacts, JSON columns)
+LEGACY_EMBEDDING_MODEL = "dsatrain_v1"
+EMBEDDING_KINDS = ("combined", "title", "description")
+INDEX_FILE = "index.json"
+CURRENT_FILE = "CURRENT"
+ANN_DIR = "ivf"
+# Published builds kept per model; older ones are removed once nothing maps them
+KEEP_BUILDS = 2
+# Below this many rows a brute-force scan is fast enough to not need an ANN index
+ANN_MIN_ROWS = int(os.getenv("DSATRAIN_ANN_MIN_ROWS", "5000"))
+ANN_NPROBE = int(os.getenv("DSATRAIN_ANN_NPROBE", "16"))
+DEFAULT_STORE_DIR = Path(os.getenv(
+    "DSATRAIN_EMBEDDING_STORE",
+    str(Path(__file__).parent.parent.parent / "data" / "processed" / "ai_features" / "embeddings"),
+))
+
+
+def model_dir(store_dir: Path, model: str) -> Path:
+    return Path(store_dir) / model
+
+
+def current_build(store_dir: Path, model: str) -> Optional[Path]:
+    """Directory of the published build of ``model``, or ``None`` if there is none."""
+    root = model_dir(store_dir, model)
+    try:
+        path = root / (root / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        # Stores written before builds were versioned keep their files in the model directory
+        path = root
+    return path if (path / INDEX_FILE).exists() else None
+
+
+def _prune_builds(root: Path, published: Path, keep: int = KEEP_BUILDS) -> None:
+    """Remove all but the newest ``keep`` builds, skipping any that cannot be removed yet.
+
+    A build another process still has memory-mapped cannot be deleted on
+    Windows; it stays until a later publish retries.
+    """
+    builds = sorted(p for p in root.iterdir() if p.is_dir() and p != published)
+    for old in builds[:max(len(builds) - (keep - 1), 0)]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class EmbeddingStoreWriter:
+    """Fill a store row by row through on-disk memmaps, then publish it.
+
+    Every build is written to a directory of its own and published on close
+    by switching ``CURRENT`` to it, so readers see either the previous build
+    or the complete new one, never a mix of both.
+
+    Usage:
+        with EmbeddingStoreWriter(store_dir, model, count, dimension) as writer:
+            for problem_id, combined, title, description in rows:
+                writer.write(problem_id, combined, title, description)
+    """
+
+    def __init__(self, store_dir: Path, model: str, count: int, dimension: int,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.root = model_dir(store_dir, model)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self.path.mkdir()
+        self.model = model
+        self.dimension = dimension
+        self.metadata = metadata or {}
+        self.ids: List[str] = []
+        self._capacity = count
+        self._files = {kind: self.path / f"{kind}.npy" for kind in EMBEDDING_KINDS}
+        self._matrices = {
+            kind: open_memmap(file, mode="w+", dtype=np.float32, shape=(max(count, 1), dimension))
+            for kind, file in self._files.items()
+        }
+
+    def write(self, problem_id: str, combined: Sequence[float],
+              title: Optional[Sequence[float]] = None, description: Optional[Sequence[float]] = None) -> int:
+        """Append one problem and return its row offset."""
+        row = len(self.ids)
+        if row >= self._capacity:
+            raise IndexError(f"Embedding store sized for {self._capacity} rows")
+        for kind, vector in zip(EMBEDDING_KINDS, (combined, title, description)):
+            if vector is not None and len(vector):
+                self._matrices[kind][row] = np.asarray(vector, dtype=np.float32)
+        self.ids.append(str(problem_id))
+        return row
+
+    def write_batch(self, problem_ids: Sequence[str], combined: np.ndarray,
+                    title: Optional[np.ndarray] = None, description: Optional[np.ndarray] = None) -> None:
+        """Append a block of rows, e.g. matrices encoded for a whole corpus at once."""
+        start = len(self.ids)
+        end = start + len(problem_ids)
+        if end > self._capacity:
+            raise IndexError(f"Embedding store sized for {self._capacity} rows")
+        for kind, block in zip(EMBEDDING_KINDS, (combined, title, description)):
+            if block is not None:
+                self._matrices[kind][start:end] = block
+        self.ids.extend(str(pid) for pid in problem_ids)
+
+    def close(self) -> None:
+        if self._matrices is None:
+            return
+        count = len(self.ids)
+        matrices, self._matrices = self._matrices, None
+        for kind, file in self._files.items():
+            matrix = matrices.pop(kind)
+            matrix.flush()
+            if matrix.shape[0] != count:
+                # Fewer rows than announced: rewrite with the exact shape
+                trimmed = np.array(matrix[:count])
+                del matrix
+                trim_path = file.with_name(file.name + ".trim")
+                with trim_path.open("wb") as f:
+                    np.save(f, trimmed)
+                os.replace(trim_path, file)
+        index = {
+            "embedding_model": self.model,
+            "dimension": self.dimension,
+            "count": count,
+            "created_at": datetime.now().isoformat(),
+            **self.metadata,
+            "ids": self.ids,
+        }
+        (self.path / INDEX_FILE).write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+        pointer = self.root / (CURRENT_FILE + ".tmp")
+        pointer.write_text(self.path.name, encoding="utf-8")
+        os.replace(pointer, self.root / CURRENT_FILE)
+        _prune_builds(self.root, self.path)
+
+    def abort(self) -> None:
+        self._matrices = None
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "EmbeddingStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class EmbeddingStore:
+    """Read-only view over one model version of the store."""
+
+    def __init__(self, path: Path, mmap: bool = True):
+        self.path = Path(path)
+        index_file = self.path / INDEX_FILE
+        index = json.loads(index_file.read_text(encoding="utf-8"))
+        self.version = index_file.stat().st_mtime_ns
+        self.model: str = index["embedding_model"]
+        self.dimension: int = int(index["dimension"])
+        self.ids: List[str] = index["ids"]
+        self.metadata = {k: v for k, v in index.items() if k != "ids"}
+        self._rows = {pid: row for row, pid in enumerate(self.ids)}
+        mode = "r" if mmap else None
+        self._matrices = {
+            kind: np.load(self.path / f"{kind}.npy", mmap_mode=mode) for kind in EMBEDDING_KINDS
+        }
+        self._norms: Dict[str, np.ndarray] = {}
+        self._ann: Optional[IVFIndex] = None
+        self._ann_loaded = False
+
+    @classmethod
+    def open(cls, model: str = DEFAULT_EMBEDDING_MODEL, store_dir: Optional[Path] = None,
+             mmap: bool = True) -> Optional["EmbeddingStore"]:
+        """Open the published build of a model version, or return ``None`` if it has not been built."""
+        path = current_build(store_dir or DEFAULT_STORE_DIR, model)
+        return None if path is None else cls(path, mmap=mmap)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, problem_id: str) -> bool:
+        return problem_id in self._rows
+
+    def row_offset(self, problem_id: str) -> Optional[int]:
+        return self._rows.get(problem_id)
+
+    def matrix(self, kind: str = "combined") -> np.ndarray:
+        return self._matrices[kind][: len(self.ids)]
+
+    def vector(self, problem_id: str, kind: str = "combined") -> Optional[np.ndarray]:
+        row = self._rows.get(problem_id)
+        return None if row is None else self._matrices[kind][row]
+
+    def norms(self, kind: str = "combined") -> np.ndarray:
+        norms = self._norms.get(kind)
+        if norms is None:
+            norms = np.linalg.norm(self.matrix(kind), axis=1)
+            self._norms[kind] = norms
+        return norms
+
+    def cosine_top_k(self, queries: np.ndarray, k: int = 10, kind: str = "combined",
+                     exclude: Iterable[str] = ()) -> List[List[Tuple[str, float]]]:
+        """Top ``k`` rows by cosine similarity for each query vector.
+
+        ``queries`` is a single vector or a (Q, dimension) batch; the result has
+        one best-first ``[(problem_id, score), ...]`` list per query. Rows with a
+        zero norm score 0 and problem ids in ``exclude`` are never returned.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self.ids) or k <= 0:
+            return [[] for _ in range(len(queries))]
+        matrix = self.matrix(kind)
+        denom = np.outer(np.linalg.norm(queries, axis=1), self.norms(kind))
+        scores = queries @ matrix.T
+        np.divide(scores, denom, out=scores, where=denom > 0)
+        scores[denom == 0] = 0.0
+        excluded = [self._rows[pid] for pid in exclude if pid in self._rows]
+        if excluded:
+            scores[:, excluded] = -np.inf
+
+        k = min(k, len(self.ids) - len(excluded))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for q, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[q, candidates], kind="stable")]
+            results.append([(self.ids[i], float(scores[q, i])) for i in ordered])
+        return results
+
+    @property
+    def ann(self) -> Optional[IVFIndex]:
+        """The ANN index built for this exact store contents, if there is one."""
+        if not self._ann_loaded:
+            ann = IVFIndex.load(self.path / ANN_DIR)
+            if ann is not None and ann.metadata.get("store_created_at") != self.metadata.get("created_at"):
+                ann = None  # built for an earlier version of the matrices
+            self._ann, self._ann_loaded = ann, True
+        return self._ann
+
+    def nearest(self, queries: np.ndarray, k: int = 10, kind: str = "combined",
+                exclude: Iterable[str] = (), nprobe: Optional[int] = None,
+                exact: bool = False) -> List[List[Tuple[str, float]]]:
+        """Top ``k`` by cosine similarity, through the ANN index when one exists.
+
+        Same contract as ``cosine_top_k``. ``nprobe`` trades latency for
+        recall; ``exact=True`` forces the brute-force scan.
+        """
+        ann = None if exact or kind != "combined" else self.ann
+        if ann is None:
+            return self.cosine_top_k(queries, k, kind, exclude)
+        excluded = [self._rows[pid] for pid in exclude if pid in self._rows]
+        return [
+            [(self.ids[row], score) for row, score in hits]
+            for hits in ann.search(queries, k, nprobe or ANN_NPROBE, exclude_rows=excluded)
+        ]
+
+    def similar_to(self, problem_id: str, k: int = 10, kind: str = "combined",
+                   nprobe: Optional[int] = None, exact: bool = False) -> List[Tuple[str, float]]:
+        """Nearest problems to a stored problem, excluding itself."""
+        vector = self.vector(problem_id, kind)
+        if vector is None:
+            return []
+        return self.nearest(vector, k, kind, exclude=(problem_id,), nprobe=nprobe, exact=exact)[0]
+
+
+def build_ann_index(store: EmbeddingStore, nlist: Optional[int] = None, **kwargs: Any) -> IVFIndex:
+    """Build and save the IVF index over a store's ``combined`` matrix."""
+    ann = IVFIndex.build(
+        store.matrix("combined"), nlist=nlist,
+        metadata={"embedding_model": store.model, "store_created_at": store.metadata.get("created_at")},
+        **kwargs,
+    )
+    ann.save(store.path / ANN_DIR)
+    return ann
+
+
+_stores: Dict[Tuple[str, str], Tuple[EmbeddingStore, Tuple[str, int, int]]] = {}
+_lock = threading.Lock()
+
+
+def get_embedding_store(model: str = DEFAULT_EMBEDDING_MODEL,
+                        store_dir: Optional[Path] = None) -> Optional[EmbeddingStore]:
+    """Process-wide memory-mapped store, reopened when a new build is published or gets an ANN index."""
+    root = store_dir or DEFAULT_STORE_DIR
+    path = current_build(root, model)
+    if path is None:
+        return None
+    try:
+        ann_version = (path / ANN_DIR / ANN_META_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        ann_version = 0
+    key = (str(model_dir(root, model)), model)
+    version = (str(path), (path / INDEX_FILE).stat().st_mtime_ns, ann_version)
+    entry = _stores.get(key)
+    if entry is not None and entry[1] == version:
+        return entry[0]
+    with _lock:
+        entry = _stores.get(key)
+        if entry is None or entry[1] != version:
+            entry = (EmbeddingStore(path), version)
+            _stores[key] = entry
+    return entry[0]
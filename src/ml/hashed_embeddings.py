@@ -0,0 +1,119 @@
+"""
+Hashed Embedding Encoder
+Deterministic bag-of-words embeddings computed as a matrix product.
+
+Every vocabulary id owns one row of a zero-mean random projection matrix
+drawn from a seeded generator, so a token always maps to the same vector in every process
+and every run (unlike Python's salted ``hash()``). A text's embedding is the
+L2-normalized mean of its tokens' rows, i.e. the row of
+
+    normalize(bag_of_words @ projection)
+
+computed for a whole corpus at once: token ids are concatenated into one flat
+array (CSR layout) and summed per document with ``np.add.reduceat``.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_SEED = 20250814
+# Recorded in store metadata; stores built with another projection are re-encoded
+ENCODER_NAME = "hashed_gaussian_projection"
+DEFAULT_CHUNK_SIZE = 2048
+UNKNOWN_TOKEN = "<UNK>"
+_TOKEN_RE = re.compile(r"\b\w+\b")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; the same rule the vocabulary is built with."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def projection_matrix(rows: int, dim: int, seed: int = DEFAULT_SEED) -> np.ndarray:
+    """Seeded Gaussian projection scaled by 1/sqrt(dim); row ``i`` is identical for any ``rows > i``.
+
+    Zero-mean rows keep texts without shared tokens near-orthogonal; an
+    all-positive projection would put every embedding in one orthant.
+    """
+    matrix = np.random.default_rng(seed).standard_normal((rows, dim), dtype=np.float32)
+    matrix *= np.float32(1.0 / np.sqrt(dim))
+    return matrix
+
+
+class HashedEmbeddingEncoder:
+    """Encode texts into ``dim``-dimensional vectors over a fixed vocabulary."""
+
+    def __init__(self, vocab: Dict[str, int], dim: int = 128, seed: int = DEFAULT_SEED):
+        self.vocab = vocab
+        self.dim = dim
+        self.seed = seed
+        self.unknown_id = vocab.get(UNKNOWN_TOKEN, 0)
+        self._projection: Optional[np.ndarray] = None
+
+    @property
+    def projection(self) -> np.ndarray:
+        if self._projection is None:
+            rows = max(self.vocab.values(), default=0) + 1
+            self._projection = projection_matrix(rows, self.dim, self.seed)
+        return self._projection
+
+    def bag_of_words(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """CSR-style (token_ids, offsets) for ``texts``; offsets has ``len(texts) + 1`` entries."""
+        lookup = self.vocab.get
+        unknown = self.unknown_id
+        ids: List[int] = []
+        offsets = [0]
+        for text in texts:
+            ids.extend(lookup(token, unknown) for token in tokenize(text))
+            offsets.append(len(ids))
+        return np.asarray(ids, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` into a (len(texts), dim) float32 matrix in one pass."""
+        token_ids, offsets = self.bag_of_words(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        lengths = np.diff(offsets)
+        nonempty = np.flatnonzero(lengths)
+        if nonempty.size:
+            sums = np.add.reduceat(self.projection[token_ids], offsets[nonempty], axis=0)
+            out[nonempty] = sums / lengths[nonempty, None].astype(np.float32)
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def encode_parallel(self, texts: Sequence[str], workers: Optional[int] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+        """Encode in chunks across worker processes; output is identical to ``encode``.
+
+        Tokenization dominates the cost and holds the GIL, hence processes. Each
+        worker receives the vocabulary once and regenerates the projection from
+        the seed instead of receiving it.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(texts) <= chunk_size:
+            return self.encode(texts)
+        chunks = [list(texts[i:i + chunk_size]) for i in range(0, len(texts), chunk_size)]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.vocab, self.dim, self.seed)) as pool:
+            for i, block in enumerate(pool.map(_encode_chunk, chunks)):
+                out[i * chunk_size:i * chunk_size + len(block)] = block
+        return out
+
+
+_worker_encoder: Optional[HashedEmbeddingEncoder] = None
+
+
+def _init_worker(vocab: Dict[str, int], dim: int, seed: int) -> None:
+    global _worker_encoder
+    _worker_encoder = HashedEmbeddingEncoder(vocab, dim, seed)
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    return _worker_encoder.encode(texts)
@@ -18,9 +18,14 @@ from ..models.database import (
     Problem, Solution, UserInteraction, LearningPathTemplate,
     UserLearningPath, LearningMilestone, UserSkillAssessment
 )
+from .concept_graph import SKILL_AREA_PREREQUISITES, ConceptGraph
 
 logger = logging.getLogger(__name__)
 
+# Skill areas are a fixed namespace of their own: tag-level concept edges
+# imported into the database must not leak into learning paths
+SKILL_AREA_GRAPH = ConceptGraph(SKILL_AREA_PREREQUISITES)
+
 
 class SkillArea(Enum):
     """Core skill areas for assessment and learning paths"""
@@ -467,23 +472,9 @@ class LearningPathEngine:
     # Private helper methods
     
     def _build_skill_dependency_graph(self) -> Dict[str, List[str]]:
-        """Build a graph of skill prerequisites"""
+        """Direct prerequisites of every skill area"""
         return {
-            SkillArea.ARRAYS.value: [],
-            SkillArea.STRINGS.value: [SkillArea.ARRAYS.value],
-            SkillArea.HASH_TABLES.value: [SkillArea.ARRAYS.value],
-            SkillArea.TWO_POINTERS.value: [SkillArea.ARRAYS.value],
-            SkillArea.SLIDING_WINDOW.value: [SkillArea.TWO_POINTERS.value],
-            SkillArea.TREES.value: [SkillArea.ARRAYS.value],
-            SkillArea.GRAPHS.value: [SkillArea.TREES.value],
-            SkillArea.DYNAMIC_PROGRAMMING.value: [SkillArea.ARRAYS.value, SkillArea.STRINGS.value],
-            SkillArea.GREEDY.value: [SkillArea.ARRAYS.value],
-            SkillArea.BINARY_SEARCH.value: [SkillArea.ARRAYS.value],
-            SkillArea.SORTING.value: [SkillArea.ARRAYS.value],
-            SkillArea.BACKTRACKING.value: [SkillArea.ARRAYS.value, SkillArea.TREES.value],
-            SkillArea.MATHEMATICS.value: [],
-            SkillArea.BIT_MANIPULATION.value: [SkillArea.MATHEMATICS.value],
-            SkillArea.SYSTEM_DESIGN.value: [SkillArea.ARRAYS.value, SkillArea.HASH_TABLES.value]
+            area.value: SKILL_AREA_GRAPH.prerequisites(area.value) for area in SkillArea
         }
     
     def _load_path_templates(self) -> List[LearningPathTemplate]:
@@ -111,6 +111,22 @@ class RecommendationEngine:
             if not ref_problem:
                 raise ValueError(f"Problem {problem_id} not found")
             
+            # Prefer TF-IDF text neighbours (hashed bag-of-words embeddings carry
+            # no more signal than TF-IDF), then the embedding store (ANN-backed
+            # when an index is built), then tag overlap
+            neighbours = (
+                self._text_neighbours(problem_id, num_recommendations)
+                or self._embedding_neighbours(problem_id, num_recommendations)
+            )
+            if neighbours:
+                recommendations = []
+                for problem, score in neighbours:
+                    rec = problem.to_dict()
+                    rec['similarity_score'] = round(score, 4)
+                    rec['recommendation_reason'] = f"Similar to {ref_problem.title}"
+                    recommendations.append(rec)
+                return recommendations
+            
             # Get all problems for comparison
             all_problems = self.db.query(Problem).all()
             
@@ -142,6 +158,44 @@ class RecommendationEngine:
             logger.error(f"Error generating content-based recommendations: {str(e)}")
             return []
     
+    def _text_neighbours(self, problem_id: str, limit: int) -> List[Tuple[Problem, float]]:
+        """Nearest problems by TF-IDF cosine over title and description"""
+        try:
+            from ..services.search_index import get_search_index
+        except ImportError:  # numpy is optional for the simplified engine
+            return []
+        
+        try:
+            ranked = get_search_index(self.db).similar(problem_id, k=limit)
+        except Exception as e:
+            logger.warning(f"Text similarity unavailable, falling back: {e}")
+            return []
+        problems = {
+            p.id: p for p in self.db.query(Problem).filter(Problem.id.in_([pid for pid, _ in ranked]))
+        }
+        return [(problems[pid], score) for pid, score in ranked if pid in problems]
+    
+    def _embedding_neighbours(self, problem_id: str, limit: int) -> List[Tuple[Problem, float]]:
+        """Nearest problems by embedding cosine similarity; empty when no store is available"""
+        try:
+            from .embedding_store import get_embedding_store
+        except ImportError:  # numpy is optional for the simplified engine
+            return []
+        
+        try:
+            store = get_embedding_store()
+            if store is None or problem_id not in store:
+                return []
+            # Over-fetch: the store may hold problems that are not in this database
+            ranked = store.similar_to(problem_id, k=limit * 3)
+        except Exception as e:
+            logger.warning(f"Embedding similarity unavailable, falling back: {e}")
+            return []
+        problems = {
+            p.id: p for p in self.db.query(Problem).filter(Problem.id.in_([pid for pid, _ in ranked]))
+        }
+        return [(problems[pid], score) for pid, score in ranked if pid in problems][:limit]
+    
     def generate_learning_path(
         self,
         user_id: str,
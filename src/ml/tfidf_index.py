@@ -0,0 +1,302 @@
+"""
+TF-IDF Index
+Sparse TF-IDF vectors over problem text with cosine top-K queries, in pure NumPy.
+
+Documents are stored twice, both in CSR layout:
+
+    rows      (indptr, indices, counts, weights)   document -> terms
+    postings  (post_ptr, post_docs, post_weights)  term -> documents
+
+Weights are ``(1 + log tf) * idf`` with smoothed ``idf = log((1 + N) / (1 + df)) + 1``
+and every document row is L2-normalized, so a query's dot product with the
+postings of its terms is its cosine similarity to each document.
+
+An index can be saved to a directory of ``.npy`` files and loaded memory-mapped.
+``updated()`` re-tokenizes only changed documents (detected by content hash);
+document frequencies, weights and postings are then recomputed vectorized from
+the stored raw counts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.ml.hashed_embeddings import tokenize
+
+META_FILE = "meta.json"
+_ARRAYS = ("indptr", "indices", "counts", "weights", "post_ptr", "post_docs", "post_weights")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _row_ids(indptr: np.ndarray) -> np.ndarray:
+    """Row number of every stored entry of a CSR matrix."""
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+class TfidfIndex:
+    """Immutable TF-IDF index; ``updated()`` returns a new instance."""
+
+    def __init__(self, ids: List[str], terms: List[str], hashes: List[str],
+                 indptr: np.ndarray, indices: np.ndarray, counts: np.ndarray,
+                 metadata: Optional[Dict[str, Any]] = None, arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.ids = ids
+        self.terms = terms
+        self.hashes = hashes
+        self.metadata = metadata or {}
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self._rows = {pid: row for row, pid in enumerate(ids)}
+        self._vocab = {term: col for col, term in enumerate(terms)}
+        if arrays is None:
+            arrays = self._derive(len(terms), indptr, indices, counts)
+        self.idf: np.ndarray = arrays["idf"]
+        self.weights: np.ndarray = arrays["weights"]
+        self.post_ptr: np.ndarray = arrays["post_ptr"]
+        self.post_docs: np.ndarray = arrays["post_docs"]
+        self.post_weights: np.ndarray = arrays["post_weights"]
+
+    # ------------------------------------------------------------------ build
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str]], metadata: Optional[Dict[str, Any]] = None) -> "TfidfIndex":
+        """Index ``(doc_id, text)`` pairs from scratch."""
+        ids: List[str] = []
+        hashes: List[str] = []
+        vocab: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        for doc_id, text in documents:
+            cls._append_document(vocab, indptr, indices, counts, text)
+            ids.append(str(doc_id))
+            hashes.append(content_hash(text))
+        terms = sorted(vocab, key=vocab.get)
+        return cls(ids, terms, hashes, *cls._csr(indptr, indices, counts), metadata=metadata)
+
+    def updated(self, documents: Iterable[Tuple[str, str]], metadata: Optional[Dict[str, Any]] = None) -> "TfidfIndex":
+        """Index reflecting the full current document set, re-tokenizing only what changed.
+
+        ``documents`` lists every ``(doc_id, text)`` that should be in the index;
+        ids missing from it are dropped. Unchanged documents keep their stored
+        term counts; changed and new ones are tokenized and appended.
+        """
+        keep: Set[int] = set()
+        changed: List[Tuple[str, str, str]] = []
+        for doc_id, text in documents:
+            doc_id = str(doc_id)
+            digest = content_hash(text)
+            row = self._rows.get(doc_id)
+            if row is not None and self.hashes[row] == digest:
+                keep.add(row)
+            else:
+                changed.append((doc_id, text, digest))
+        if not changed and len(keep) == len(self.ids):
+            return self
+
+        kept_rows = np.array(sorted(keep), dtype=np.int64)
+        entry_mask = np.isin(_row_ids(self.indptr), kept_rows)
+        lengths = np.diff(self.indptr)[kept_rows]
+        indptr = [0] + np.cumsum(lengths).tolist()
+        indices = np.asarray(self.indices)[entry_mask].tolist()
+        counts = np.asarray(self.counts)[entry_mask].tolist()
+        ids = [self.ids[row] for row in kept_rows]
+        hashes = [self.hashes[row] for row in kept_rows]
+
+        vocab = dict(self._vocab)
+        for doc_id, text, digest in changed:
+            self._append_document(vocab, indptr, indices, counts, text)
+            ids.append(doc_id)
+            hashes.append(digest)
+        terms = sorted(vocab, key=vocab.get)
+        return TfidfIndex(ids, terms, hashes, *self._csr(indptr, indices, counts),
+                          metadata={**self.metadata, **(metadata or {}), "reindexed": len(changed)})
+
+    @staticmethod
+    def _append_document(vocab: Dict[str, int], indptr: List[int], indices: List[int],
+                         counts: List[int], text: str) -> None:
+        tf = Counter(tokenize(text))
+        for term in tf:
+            if term not in vocab:
+                vocab[term] = len(vocab)
+        for col, term in sorted((vocab[term], term) for term in tf):
+            indices.append(col)
+            counts.append(tf[term])
+        indptr.append(len(indices))
+
+    @staticmethod
+    def _csr(indptr, indices, counts) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32),
+                np.asarray(counts, dtype=np.int32))
+
+    @staticmethod
+    def _derive(n_terms: int, indptr: np.ndarray, indices: np.ndarray, counts: np.ndarray) -> Dict[str, np.ndarray]:
+        """idf, normalized row weights and the term -> documents postings."""
+        n_docs = len(indptr) - 1
+        df = np.bincount(indices, minlength=n_terms)
+        idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+        weights = (1.0 + np.log(counts, dtype=np.float32)) * idf[indices]
+
+        rows = _row_ids(indptr)
+        norms = np.sqrt(np.bincount(rows, weights=weights.astype(np.float64) ** 2, minlength=n_docs))
+        nonzero = norms[rows] > 0
+        weights[nonzero] /= norms[rows][nonzero].astype(np.float32)
+
+        order = np.argsort(indices, kind="stable")
+        post_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=post_ptr[1:])
+        return {
+            "idf": idf,
+            "weights": weights.astype(np.float32),
+            "post_ptr": post_ptr,
+            "post_docs": rows[order].astype(np.int32),
+            "post_weights": weights[order].astype(np.float32),
+        }
+
+    # ---------------------------------------------------------- persistence
+
+    def save(self, path: Path) -> Path:
+        """Write the index into ``path`` (arrays first, metadata last)."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "indptr": self.indptr, "indices": self.indices, "counts": self.counts, "weights": self.weights,
+            "post_ptr": self.post_ptr, "post_docs": self.post_docs, "post_weights": self.post_weights,
+        }
+        for name, array in arrays.items():
+            tmp = path / f"{name}.npy.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, np.asarray(array))
+            os.replace(tmp, path / f"{name}.npy")
+        meta = {
+            "created_at": datetime.now().isoformat(),
+            **self.metadata,
+            "ids": self.ids, "terms": self.terms, "hashes": self.hashes,
+            "idf": self.idf.tolist(),
+        }
+        tmp = path / (META_FILE + ".tmp")
+        tmp.write_text(json.dumps(meta, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path / META_FILE)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Optional["TfidfIndex"]:
+        """Load a saved index memory-mapped, or ``None`` if there is none at ``path``."""
+        path = Path(path)
+        if not (path / META_FILE).exists():
+            return None
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+        arrays["idf"] = np.asarray(meta.pop("idf"), dtype=np.float32)
+        ids, terms, hashes = meta.pop("ids"), meta.pop("terms"), meta.pop("hashes")
+        return cls(ids, terms, hashes, arrays["indptr"], arrays["indices"], arrays["counts"],
+                   metadata=meta, arrays=arrays)
+
+    # -------------------------------------------------------------- queries
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    def query_vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(term columns, normalized weights) of a free-text query; unknown terms are dropped."""
+        tf = Counter(t for t in tokenize(text) if t in self._vocab)
+        if not tf:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        cols = np.fromiter((self._vocab[t] for t in tf), dtype=np.int64, count=len(tf))
+        weights = (1.0 + np.log(np.fromiter(tf.values(), dtype=np.float32, count=len(tf)))) * self.idf[cols]
+        norm = np.linalg.norm(weights)
+        return cols, (weights / norm if norm > 0 else weights).astype(np.float32)
+
+    def document_vector(self, doc_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        row = self._rows.get(doc_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return np.asarray(self.indices[start:end], dtype=np.int64), np.asarray(self.weights[start:end])
+
+    def top_k_vectors(self, queries: Sequence[Tuple[np.ndarray, np.ndarray]], k: int = 10,
+                      exclude: Sequence[Iterable[str]] = ()) -> List[List[Tuple[str, float]]]:
+        """Cosine top ``k`` documents for a batch of sparse query vectors.
+
+        Scores are accumulated for the whole batch into one dense (Q, N) array
+        by walking the postings of every query term; only documents sharing at
+        least one term with a query (score > 0) are returned.
+        """
+        scores = np.zeros((len(queries), len(self.ids)), dtype=np.float32)
+        for q, (cols, weights) in enumerate(queries):
+            if not len(cols):
+                continue
+            starts, ends = self.post_ptr[cols], self.post_ptr[cols + 1]
+            lengths = ends - starts
+            # Flat positions of every posting of every query term
+            positions = np.repeat(ends - np.cumsum(lengths), lengths) + np.arange(lengths.sum())
+            np.add.at(scores[q], np.asarray(self.post_docs[positions]),
+                      np.asarray(self.post_weights[positions]) * np.repeat(weights, lengths))
+        for q, excluded in enumerate(exclude):
+            rows = [self._rows[d] for d in excluded if d in self._rows]
+            scores[q, rows] = 0.0
+
+        results = []
+        for row_scores in scores:
+            hits = np.flatnonzero(row_scores > 0)
+            if len(hits) > k:
+                hits = hits[np.argpartition(-row_scores[hits], k - 1)[:k]]
+            hits = hits[np.lexsort((hits, -row_scores[hits]))]
+            results.append([(self.ids[i], float(row_scores[i])) for i in hits])
+        return results
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[str, float]]:
+        return self.search_many([text], k)[0]
+
+    def search_many(self, texts: Sequence[str], k: int = 10) -> List[List[Tuple[str, float]]]:
+        return self.top_k_vectors([self.query_vector(t) for t in texts], k)
+
+    def similar(self, doc_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Documents most similar to an indexed document, excluding itself."""
+        return self.top_k_vectors([self.document_vector(doc_id)], k, exclude=[(doc_id,)])[0]
+
+
+CURRENT_FILE = "CURRENT"
+
+
+def publish_index(index: TfidfIndex, root: Path, keep: int = 2) -> Path:
+    """Save ``index`` as a new version under ``root`` and point ``CURRENT`` at it.
+
+    Readers that already memory-mapped an older version keep working; only the
+    newest ``keep`` versions are retained. A version that cannot be deleted
+    yet (mapped by another process on Windows) is left for the next publish.
+    """
+    root = Path(root)
+    version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    path = index.save(root / version)
+    tmp = root / (CURRENT_FILE + ".tmp")
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, root / CURRENT_FILE)
+    versions = sorted(p for p in root.iterdir() if p.is_dir())
+    for old in versions[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def load_published_index(root: Path, mmap: bool = True) -> Optional[TfidfIndex]:
+    """The version ``CURRENT`` points at, memory-mapped; ``None`` if nothing was published."""
+    pointer = Path(root) / CURRENT_FILE
+    if not pointer.exists():
+        return None
+    return TfidfIndex.load(Path(root) / pointer.read_text(encoding="utf-8").strip(), mmap=mmap)
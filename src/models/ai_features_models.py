@@ -6,22 +6,20 @@ New tables to store AI-generated features from the data framework
 from sqlalchemy import Column, String, Integer, Float, Text, JSON, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from src.ml.embedding_store import DEFAULT_EMBEDDING_MODEL
 from src.models.database import Base
 
 
 class ProblemEmbedding(Base):
-    """Store semantic embeddings for problems"""
+    """Metadata for a problem's row in the binary embedding store (src/ml/embedding_store.py)"""
     __tablename__ = 'problem_embeddings'
     
     problem_id = Column(String(50), ForeignKey('problems.id'), primary_key=True)
+    # Each model version has its own matrix files, so rows are versioned by model
+    embedding_model = Column(String(50), primary_key=True, default=DEFAULT_EMBEDDING_MODEL)
     
-    # Embedding vectors (128-dimensional)
-    title_embedding = Column(JSON, nullable=False)  # Title embedding vector
-    description_embedding = Column(JSON, nullable=False)  # Description embedding vector
-    combined_embedding = Column(JSON, nullable=False)  # Full problem embedding
-    
-    # Metadata
-    embedding_model = Column(String(50), default='dsatrain_v1')
+    # Row of the problem in the published build of <store>/<embedding_model>/ (see embedding_store)
+    row_offset = Column(Integer, nullable=False)
     embedding_dimension = Column(Integer, default=128)
     
     # Quality metrics
@@ -343,6 +341,9 @@ class DataPipelineStatus(Base):
     pipeline_version = Column(String(20))
     execution_time_seconds = Column(Float)
     
+    # Change-tracking state for incremental updates (file hash/mtime, last contest id, ...)
+    watermark = Column(JSON)
+    
     # Timestamps
     last_updated = Column(DateTime, default=func.now())
     
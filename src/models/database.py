@@ -4,12 +4,14 @@ Enhanced database schema for scalable problem and solution storage
 """
 
 from sqlalchemy import create_engine, Column, String, Integer, Float, Text, JSON, DateTime, ForeignKey, Boolean, Index, PrimaryKeyConstraint
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import event, inspect as sa_inspect, select, update
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session, attributes
 from sqlalchemy.sql import func
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 import json
 import os
+import weakref
 
 Base = declarative_base()
 # Cache the last-resolved database URL to keep consistency across instances in-process
@@ -820,6 +822,96 @@ class PracticeGateSession(Base):
     # Relationships
     problem = relationship('Problem')
 
+class TagStatistic(Base):
+    """Running per-tag aggregates over problems (count, sums, sums of squares).
+
+    Maintained incrementally by the ``before_flush`` hook below so tag analytics
+    endpoints read one row per tag instead of scanning every problem.
+    """
+    __tablename__ = 'tag_statistics'
+
+    tag = Column(String(100), primary_key=True)
+    problem_count = Column(Integer, nullable=False, default=0, index=True)
+    quality_sum = Column(Float, nullable=False, default=0.0)
+    quality_sq_sum = Column(Float, nullable=False, default=0.0)
+    # Relevance is tracked separately because some problems have no relevance score
+    relevance_count = Column(Integer, nullable=False, default=0)
+    relevance_sum = Column(Float, nullable=False, default=0.0)
+    relevance_sq_sum = Column(Float, nullable=False, default=0.0)
+    high_relevance_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    @staticmethod
+    def _mean(total: float, count: int) -> float:
+        return (total or 0.0) / count if count else 0.0
+
+    @staticmethod
+    def _stddev(total: float, sq_total: float, count: int) -> float:
+        if not count:
+            return 0.0
+        mean = (total or 0.0) / count
+        # Clamp tiny negatives caused by float drift of incremental updates
+        return max((sq_total or 0.0) / count - mean * mean, 0.0) ** 0.5
+
+    @property
+    def avg_quality(self) -> float:
+        return self._mean(self.quality_sum, self.problem_count)
+
+    @property
+    def quality_stddev(self) -> float:
+        return self._stddev(self.quality_sum, self.quality_sq_sum, self.problem_count)
+
+    @property
+    def avg_relevance(self) -> float:
+        return self._mean(self.relevance_sum, self.relevance_count)
+
+    @property
+    def relevance_stddev(self) -> float:
+        return self._stddev(self.relevance_sum, self.relevance_sq_sum, self.relevance_count)
+
+
+class AICostLedger(Base):
+    """AI spend per UTC month, shared by every worker process.
+
+    ``month_key`` comes from the database clock, so a new month starts a new
+    row without any process having to notice the rollover.
+    """
+    __tablename__ = 'ai_cost_ledger'
+
+    month_key = Column(String(7), primary_key=True)  # YYYY-MM
+    used_usd = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class AIBudgetUsage(Base):
+    """Per-session AI action usage counted against the session budgets."""
+    __tablename__ = 'ai_budget_usage'
+
+    session_id = Column(String(100), primary_key=True)
+    action = Column(String(30), primary_key=True)
+    used = Column(Integer, nullable=False, default=0)
+    # Database-clock epoch seconds after which the row no longer counts
+    expires_at = Column(Float, nullable=False, index=True)
+
+
+
+class AIPrecomputedResponse(Base):
+    """Query-less AI response (hint, elaboration) generated offline for one problem.
+
+    Keyed by problem, action and the provider implementation/model that produced
+    it; ``content_hash`` is the problem content it was generated from, so the
+    warm-cache job only regenerates rows whose problem changed.
+    """
+    __tablename__ = 'ai_precomputed_responses'
+
+    problem_id = Column(String(50), primary_key=True)
+    action = Column(String(30), primary_key=True)
+    provider = Column(String(50), primary_key=True)
+    model = Column(String(100), primary_key=True, default='')  # '' when no model is configured
+    content_hash = Column(String(32), nullable=False, index=True)
+    response = Column(JSON, nullable=False)
+    generated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 # Database configuration
 class DatabaseConfig:
     """Database configuration and connection management"""
@@ -924,6 +1016,175 @@ def get_quality_metrics(db_session) -> Dict[str, float]:
     }
 
 
+# Tag statistics maintenance
+HIGH_RELEVANCE_THRESHOLD = 7.0
+_TAG_STAT_FIELDS = (
+    'problem_count', 'quality_sum', 'quality_sq_sum',
+    'relevance_count', 'relevance_sum', 'relevance_sq_sum', 'high_relevance_count',
+)
+_TAG_STAT_TRACKED = ('algorithm_tags', 'quality_score', 'google_interview_relevance')
+# Zero-count row written by every rebuild, so a build over untagged problems is not redone
+TAG_STATISTICS_MARKER = ''
+# Engines on which the tag_statistics table is known to exist (pre-migration DBs are skipped)
+_tag_statistics_engines = weakref.WeakKeyDictionary()
+
+
+def _accumulate_tag_deltas(deltas: Dict[str, List[float]], tags: Any, quality: Optional[float],
+                           relevance: Optional[float], sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one problem's contribution to per-tag deltas."""
+    if not isinstance(tags, (list, tuple)) or not tags:
+        return
+    q = float(quality or 0.0)
+    r = float(relevance) if relevance is not None else None
+    for tag in tags:
+        d = deltas.setdefault(str(tag), [0, 0.0, 0.0, 0, 0.0, 0.0, 0])
+        d[0] += sign
+        d[1] += sign * q
+        d[2] += sign * q * q
+        if r is not None:
+            d[3] += sign
+            d[4] += sign * r
+            d[5] += sign * r * r
+            if r >= HIGH_RELEVANCE_THRESHOLD:
+                d[6] += sign
+
+
+def apply_tag_statistic_deltas(connection, deltas: Dict[str, List[float]]) -> None:
+    """Atomically add per-tag deltas to tag_statistics (SQL-side increments)."""
+    table = TagStatistic.__table__
+    rows = [
+        {'tag': tag, **dict(zip(_TAG_STAT_FIELDS, values))}
+        for tag, values in deltas.items() if any(values)
+    ]
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        set_ = {f: table.c[f] + stmt.excluded[f] for f in _TAG_STAT_FIELDS}
+        set_['updated_at'] = func.now()
+        connection.execute(stmt.on_conflict_do_update(index_elements=[table.c.tag], set_=set_), rows)
+        return
+    # Portable fallback: increment in place, insert when the tag is new
+    for row in rows:
+        result = connection.execute(
+            update(table).where(table.c.tag == row['tag']).values(
+                {f: table.c[f] + row[f] for f in _TAG_STAT_FIELDS}
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def _tag_statistics_available(connection) -> bool:
+    engine = connection.engine
+    if _tag_statistics_engines.get(engine):
+        return True
+    available = sa_inspect(connection).has_table(TagStatistic.__tablename__)
+    if available:
+        _tag_statistics_engines[engine] = True
+    return available
+
+
+def _stored_tag_inputs(connection, problem_ids: List[str]) -> Dict[str, Tuple[Any, Any, Any]]:
+    """Load the pre-flush (tags, quality, relevance) of persisted problems in chunks."""
+    table = Problem.__table__
+    stored = {}
+    for start in range(0, len(problem_ids), 500):
+        chunk = problem_ids[start:start + 500]
+        rows = connection.execute(
+            select(table.c.id, table.c.algorithm_tags, table.c.quality_score,
+                   table.c.google_interview_relevance).where(table.c.id.in_(chunk))
+        )
+        for row in rows:
+            stored[row[0]] = (row[1], row[2], row[3])
+    return stored
+
+
+def _pending_value(obj, key: str) -> Any:
+    """Attribute value as it will be inserted, applying scalar column defaults."""
+    value = getattr(obj, key)
+    if value is None:
+        default = Problem.__table__.c[key].default
+        if default is not None and default.is_scalar:
+            return default.arg
+    return value
+
+
+@event.listens_for(Session, 'before_flush')
+def _maintain_tag_statistics(session, flush_context, instances):
+    """Keep tag_statistics in step with ORM inserts, updates and deletes of problems.
+
+    Core-level bulk writes bypass this hook and must call apply_tag_statistic_deltas
+    (or rebuild_tag_statistics) themselves.
+    """
+    new = [o for o in session.new if isinstance(o, Problem)]
+    changed = [
+        o for o in session.dirty
+        if isinstance(o, Problem)
+        and any(attributes.get_history(o, key).has_changes() for key in _TAG_STAT_TRACKED)
+    ]
+    deleted = [o for o in session.deleted if isinstance(o, Problem)]
+    if not (new or changed or deleted):
+        return
+
+    connection = session.connection()
+    if not _tag_statistics_available(connection):
+        return
+
+    deltas: Dict[str, List[float]] = {}
+    for obj in new:
+        _accumulate_tag_deltas(deltas, *(_pending_value(obj, key) for key in _TAG_STAT_TRACKED), 1)
+
+    persisted = changed + deleted
+    if persisted:
+        ids = [sa_inspect(o).identity[0] for o in persisted]
+        stored = _stored_tag_inputs(connection, ids)
+        for obj, pid in zip(persisted, ids):
+            if pid in stored:
+                _accumulate_tag_deltas(deltas, *stored[pid], -1)
+        for obj in changed:
+            _accumulate_tag_deltas(deltas, obj.algorithm_tags, obj.quality_score, obj.google_interview_relevance, 1)
+
+    apply_tag_statistic_deltas(connection, deltas)
+
+
+def rebuild_tag_statistics(db_session) -> int:
+    """Recompute tag_statistics from scratch in one streamed pass. Returns the tag count."""
+    deltas: Dict[str, List[float]] = {}
+    rows = db_session.query(
+        Problem.algorithm_tags, Problem.quality_score, Problem.google_interview_relevance
+    ).yield_per(1000)
+    for tags, quality, relevance in rows:
+        _accumulate_tag_deltas(deltas, tags, quality, relevance, 1)
+
+    db_session.query(TagStatistic).delete(synchronize_session=False)
+    connection = db_session.connection()
+    apply_tag_statistic_deltas(connection, deltas)
+    if TAG_STATISTICS_MARKER not in deltas:
+        connection.execute(TagStatistic.__table__.insert().values(tag=TAG_STATISTICS_MARKER))
+    db_session.commit()
+    return len(deltas)
+
+
+def ensure_tag_statistics(db_session) -> None:
+    """Create and backfill tag_statistics for databases populated before it existed.
+
+    Any row, including the marker left by rebuild_tag_statistics, means a build has run.
+    """
+    connection = db_session.connection()
+    if not _tag_statistics_available(connection):
+        TagStatistic.__table__.create(bind=connection, checkfirst=True)
+        db_session.commit()
+    elif db_session.query(TagStatistic.tag).first() is not None:
+        return
+    if db_session.query(Problem.id).first() is not None:
+        rebuild_tag_statistics(db_session)
+
 if __name__ == "__main__":
     # Initialize database for development
     db_config = DatabaseConfig()
@@ -1,21 +1,31 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import re
-import time
-import urllib.request
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from src.collectors.acquisition_logger import AcquisitionLogger
+from src.collectors.http_client import SyncCollectorHTTPClient
 
 
 @dataclass
 class InterviewTrendMonitor:
     data_dir: Path
     rate_limit_sleep: float = 3.0
+    http: Optional[SyncCollectorHTTPClient] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.http is None:
+            # Paces each host separately, so different sites are not slowed by one another
+            self.http = SyncCollectorHTTPClient(
+                cache_dir=self.monitoring_dir / "http_cache",
+                default_rate=(1 / self.rate_limit_sleep, 1),
+                headers={"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"},
+            )
 
     @property
     def monitoring_dir(self) -> Path:
@@ -64,7 +74,7 @@ class InterviewTrendMonitor:
                     "url": source["url"],
                     "type": source["type"],
                     "checked_at": datetime.now().isoformat(),
-                    "content_hash": hash(content),
+                    "content_hash": self._content_hash(content),
                     "content_length": len(content),
                     "changes_detected": changes["has_changes"],
                     "change_summary": changes["summary"],
@@ -73,7 +83,6 @@ class InterviewTrendMonitor:
                 }
                 
                 monitoring_results.append(result)
-                time.sleep(self.rate_limit_sleep)
                 
             except Exception as e:
                 print(f"❌ Failed to monitor {source['name']}: {e}")
@@ -138,8 +147,6 @@ class InterviewTrendMonitor:
                     "trends": trends
                 })
                 
-                time.sleep(self.rate_limit_sleep)
-                
             except Exception as e:
                 print(f"❌ Failed to monitor {source['name']}: {e}")
                 discussion_results.append({
@@ -201,16 +208,15 @@ class InterviewTrendMonitor:
         }
 
     def _fetch_page(self, url: str) -> str:
-        """Fetch web page content"""
-        req = urllib.request.Request(
-            url,
-            headers={
-                "User-Agent": "DSATrain-TrendMonitor/0.1 (Educational Research)",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-            }
-        )
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return response.read().decode("utf-8", errors="ignore")
+        """Fetch web page content (revalidated against the local cache)"""
+        response = self.http.get(url, headers={"User-Agent": "DSATrain-TrendMonitor/0.1 (Educational Research)"})
+        response.raise_for_status()
+        return response.content.decode("utf-8", errors="ignore")
+
+    @staticmethod
+    def _content_hash(content: str) -> str:
+        # Persisted in the history files, so it must not vary between processes like hash()
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
     def _detect_content_changes(self, source: Dict[str, Any], current_content: str) -> Dict[str, Any]:
         """Detect changes from previous monitoring runs"""
@@ -223,7 +229,7 @@ class InterviewTrendMonitor:
                 history = json.load(f)
                 
             previous_hash = history.get("last_content_hash")
-            current_hash = hash(current_content)
+            current_hash = self._content_hash(current_content)
             
             has_changes = previous_hash != current_hash
             
@@ -238,7 +244,7 @@ class InterviewTrendMonitor:
             history = {
                 "source": source["name"],
                 "first_monitored": datetime.now().isoformat(),
-                "last_content_hash": hash(current_content),
+                "last_content_hash": self._content_hash(current_content),
                 "last_checked": datetime.now().isoformat(),
                 "change_count": 0
             }
@@ -0,0 +1,155 @@
+"""
+JSON Lines Pipeline Artifacts
+Streamable storage for per-problem pipeline outputs (unified problems,
+difficulty vectors, interview features, quality scores).
+
+Layout of a ``.jsonl`` artifact:
+    line 1:  {"_metadata": {...}}            optional header
+    line 2+: {"id": "<problem id>", ...}     one record per line
+
+Callers keep referring to the historical ``<name>.json`` paths; the readers
+use whichever of ``<name>.jsonl`` and the legacy single-document JSON file
+(which has to be loaded whole) was written last, so a tool that still
+writes the legacy form is not shadowed by an older ``.jsonl``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+METADATA_KEY = "_metadata"
+
+
+def jsonl_path(path: Path) -> Path:
+    """The JSON Lines sibling of a legacy ``.json`` artifact path."""
+    path = Path(path)
+    return path if path.suffix == ".jsonl" else path.with_suffix(".jsonl")
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def resolve_artifact(path: Path) -> Optional[Path]:
+    """Existing file backing an artifact: the newer of the ``.jsonl`` form and legacy JSON.
+
+    The ``.jsonl`` form wins ties.
+    """
+    path = Path(path)
+    streamed = jsonl_path(path)
+    streamed_mtime = _mtime(streamed)
+    legacy_mtime = _mtime(path) if path != streamed else None
+    if streamed_mtime is None and legacy_mtime is None:
+        return None
+    if legacy_mtime is None or (streamed_mtime is not None and streamed_mtime >= legacy_mtime):
+        return streamed
+    return path
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class JsonlArtifactWriter:
+    """Write records one line at a time; the file is swapped in atomically on close.
+
+    Usage:
+        with JsonlArtifactWriter(path, metadata={...}) as writer:
+            for record in records:
+                writer.write(record)
+    """
+
+    def __init__(self, path: Path, metadata: Optional[Dict[str, Any]] = None):
+        self.path = jsonl_path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_suffix(".jsonl.tmp")
+        self._fh = self._tmp.open("w", encoding="utf-8")
+        self.count = 0
+        if metadata is not None:
+            self._fh.write(_dumps({METADATA_KEY: metadata}) + "\n")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._fh.write(_dumps(record) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._fh.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "JsonlArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_jsonl_artifact(path: Path, records: Iterable[Dict[str, Any]],
+                         metadata: Optional[Dict[str, Any]] = None) -> Path:
+    """Write ``records`` as a JSON Lines artifact and return its path."""
+    with JsonlArtifactWriter(path, metadata) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.path
+
+
+def read_artifact_metadata(path: Path) -> Dict[str, Any]:
+    """Header metadata of an artifact (legacy files: their top-level ``metadata``)."""
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        return {}
+    if resolved.suffix == ".jsonl":
+        with resolved.open("r", encoding="utf-8") as f:
+            first = f.readline()
+        if first.strip():
+            head = json.loads(first)
+            if isinstance(head, dict) and METADATA_KEY in head:
+                return head[METADATA_KEY]
+        return {}
+    with resolved.open("r", encoding="utf-8") as f:
+        return json.load(f).get("metadata", {})
+
+
+def iter_artifact_records(path: Path, collection: str, key_field: str = "id") -> Iterator[Dict[str, Any]]:
+    """Yield the records of an artifact one at a time.
+
+    For JSON Lines files memory stays flat regardless of size. Legacy JSON
+    documents are loaded whole and their ``collection`` is adapted: lists are
+    yielded as-is, ``{id: record}`` mappings as ``{**record, key_field: id}``.
+    """
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        raise FileNotFoundError(f"Artifact not found: {path}")
+
+    if resolved.suffix == ".jsonl":
+        with resolved.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if METADATA_KEY in record:
+                    continue
+                yield record
+        return
+
+    with resolved.open("r", encoding="utf-8") as f:
+        items = json.load(f).get(collection, [])
+    if isinstance(items, dict):
+        for key, value in items.items():
+            yield {**value, key_field: key}
+    else:
+        yield from items
@@ -0,0 +1,314 @@
+"""
+Pipeline DAG
+Declarative stage graph for the data pipeline, scheduled like a build system.
+
+Each ``Stage`` names a target (``"module:function"`` called with the data
+directory, or ``"module:Class.method"`` where ``Class(data_dir)`` is built
+first) and the paths it reads and writes, relative to the data directory.
+Edges follow from those paths: a stage depends on every stage that writes
+one of its inputs, or a directory containing one.
+
+``PipelineScheduler`` starts each stage as soon as its dependencies have
+finished, so independent stages overlap. I/O-bound stages run on the event
+loop (coroutines) or in a thread; CPU-bound stages run in a process pool.
+A stage is skipped when the content hash of its inputs matches its last
+successful run and its outputs still exist. Durations of the last runs are
+kept per stage so slow-downs show up as regressions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple
+
+from src.ml.concept_graph import ConceptGraph
+from src.processors.change_tracking import file_watermark
+from src.processors.jsonl_artifacts import resolve_artifact
+
+IO = "io"
+CPU = "cpu"
+DURATION_HISTORY = 20
+# A run slower than this multiple of the median of earlier runs is flagged
+REGRESSION_FACTOR = 1.5
+# Ignore regressions of stages that finish faster than this, they are noise
+REGRESSION_MIN_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of the pipeline graph"""
+
+    name: str
+    target: str
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    kind: str = CPU
+    after: Tuple[str, ...] = ()
+    # Collectors read the outside world, which has no content hash to compare
+    always_run: bool = False
+    # Bump to invalidate previous runs when the stage's code changes meaning
+    version: str = "1"
+
+
+# The data pipeline, from collection to model inputs. Every path a stage reads
+# must be listed, or the stage neither waits for nor reruns after its producer.
+DEFAULT_STAGES: Tuple[Stage, ...] = (
+    Stage(
+        "codeforces_collection", "src.collectors.codeforces_fetcher:CodeforcesFetcher.save_problemset",
+        outputs=("raw/codeforces",), kind=IO, always_run=True,
+    ),
+    Stage(
+        "academic_datasets", "src.processors.academic_dataset_processor:AcademicDatasetProcessor.run_complete_processing",
+        inputs=("raw/academic_datasets",), outputs=("processed/academic_datasets",),
+    ),
+    Stage(
+        "behavioral_processing",
+        "src.processors.behavioral_document_processor:BehavioralDocumentProcessor.run_behavioral_processing_pipeline",
+        inputs=("raw/behavioral_resources", "raw/google_official"), outputs=("processed/behavioral",),
+    ),
+    Stage(
+        "unified_data_processor", "src.processors.unified_data_processor:UnifiedDataProcessor.run_unification_pipeline",
+        inputs=(
+            "raw/codeforces/problems/problems_simple.json",
+            "raw/hackerrank/interview_kit/interview_kit_problems.json",
+            "raw/atcoder/atcoder_problems.json",
+            "raw/codechef/codechef_problems.json",
+        ),
+        outputs=("processed/problems_unified_complete.json", "processed/unification_summary.json"),
+    ),
+    Stage(
+        "quality_scoring_engine", "src.processors.quality_scoring_engine:QualityScoringEngine.run_quality_scoring_pipeline",
+        inputs=(
+            "processed/problems_unified_complete.json",
+            "processed/academic_datasets/ml4code_quality_rules.json",
+            "processed/academic_datasets/code_quality_engine.json",
+        ),
+        outputs=("processed/quality_scoring",),
+    ),
+    Stage(
+        "ai_feature_engineer", "src.ml.ai_feature_engineer:AIFeatureEngineer.run_feature_engineering_pipeline",
+        inputs=(
+            "processed/problems_unified_complete.json",
+            "processed/academic_datasets/code_quality_engine.json",
+        ),
+        outputs=("processed/ai_features",),
+    ),
+)
+
+
+def _covers(outer: str, inner: str) -> bool:
+    """Whether path ``inner`` is ``outer`` or lies below it."""
+    outer_path, inner_path = PurePosixPath(outer), PurePosixPath(inner)
+    return outer_path == inner_path or outer_path in inner_path.parents
+
+
+class PipelineDAG:
+    """Validated stage graph with dependencies derived from inputs and outputs"""
+
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate pipeline stage: {stage.name}")
+            if stage.kind not in (IO, CPU):
+                raise ValueError(f"Stage {stage.name} has unknown kind {stage.kind!r}")
+            self.stages[stage.name] = stage
+
+        self.dependencies: Dict[str, List[str]] = {}
+        for stage in self.stages.values():
+            unknown = [name for name in stage.after if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} runs after unknown stages {unknown}")
+            dependencies = dict.fromkeys(stage.after)
+            for other in self.stages.values():
+                if other is not stage and any(
+                    _covers(output, path) or _covers(path, output)
+                    for output in other.outputs for path in stage.inputs
+                ):
+                    dependencies[other.name] = None
+            self.dependencies[stage.name] = list(dependencies)
+
+        self.graph = ConceptGraph(self.dependencies, self.stages)
+        if self.graph.has_cycle:
+            raise ValueError(f"Pipeline stages form a cycle: {sorted(self.graph.cycle_nodes)}")
+
+    def order(self) -> List[str]:
+        """All stages, every one after its dependencies"""
+        return self.graph.topological_order()
+
+    def select(self, targets: Iterable[str]) -> List[str]:
+        """``targets`` and everything they depend on, in dependency order"""
+        wanted = set()
+        for target in targets:
+            if target not in self.stages:
+                raise KeyError(f"Unknown pipeline stage: {target}")
+            wanted |= {target} | self.graph.ancestors(target)
+        return [name for name in self.order() if name in wanted]
+
+
+def _resolve_target(target: str, data_dir: Path):
+    module_name, _, attribute = target.partition(":")
+    obj = importlib.import_module(module_name)
+    owner, _, method = attribute.partition(".")
+    obj = getattr(obj, owner)
+    return getattr(obj(data_dir), method) if method else functools.partial(obj, data_dir)
+
+
+def run_target(target: str, data_dir: str) -> Any:
+    """Run a stage target to completion (process pool and thread entry point)"""
+    result = _resolve_target(target, Path(data_dir))()
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def _reported_failure(result: Any) -> Optional[str]:
+    """Processors report failure in their result instead of raising."""
+    if not isinstance(result, dict):
+        return None
+    for key in ("pipeline_status", "status", "import_status"):
+        if result.get(key) == "failed":
+            return str(result.get("error") or f"{key} is failed")
+    return None
+
+
+def _input_files(path: Path) -> List[Path]:
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file())
+    resolved = resolve_artifact(path)
+    return [resolved] if resolved is not None else []
+
+
+@dataclass
+class PipelineScheduler:
+    """Runs a ``PipelineDAG`` concurrently, skipping up-to-date stages"""
+
+    dag: PipelineDAG
+    data_dir: Path
+    state_file: Path
+    max_workers: Optional[int] = None
+
+    def run(self, targets: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        return asyncio.run(self.run_async(targets, force))
+
+    async def run_async(self, targets: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        names = self.dag.select(targets) if targets is not None else self.dag.order()
+        state = self._load_state()
+        results: Dict[str, Dict[str, Any]] = {}
+        started = time.perf_counter()
+
+        needs_pool = any(self.dag.stages[name].kind == CPU for name in names)
+        pool = ProcessPoolExecutor(self.max_workers or os.cpu_count() or 1) if needs_pool else None
+        try:
+            tasks: Dict[str, asyncio.Future] = {}
+            for name in names:
+                dependencies = [tasks[d] for d in self.dag.dependencies[name]]
+                tasks[name] = asyncio.ensure_future(
+                    self._run_stage(name, dependencies, state, pool, force, results)
+                )
+            await asyncio.gather(*tasks.values())
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self._save_state(state)
+
+        counts: Dict[str, int] = {}
+        for result in results.values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "counts": counts,
+            "regressions": [name for name, result in results.items() if result.get("regressed")],
+            "stages": {name: results[name] for name in names},
+        }
+
+    async def _run_stage(self, name: str, dependencies: List[Awaitable], state: Dict[str, Any],
+                         pool: Optional[ProcessPoolExecutor], force: bool,
+                         results: Dict[str, Dict[str, Any]]) -> None:
+        await asyncio.gather(*dependencies)
+        stage = self.dag.stages[name]
+        blocked_by = [d for d in self.dag.dependencies[name] if results[d]["status"] in ("failed", "blocked")]
+        if blocked_by:
+            results[name] = {"status": "blocked", "blocked_by": blocked_by}
+            return
+
+        previous = state.get(name, {})
+        files, fingerprint = self._fingerprint(stage, previous.get("files", {}))
+        outputs_exist = all(resolve_artifact(self.data_dir / output) is not None for output in stage.outputs)
+        if (not force and not stage.always_run and outputs_exist
+                and previous.get("status") == "success" and previous.get("fingerprint") == fingerprint):
+            results[name] = {"status": "skipped", "reason": "inputs unchanged"}
+            return
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            if stage.kind == CPU:
+                outcome = await loop.run_in_executor(pool, run_target, stage.target, str(self.data_dir))
+            else:
+                call = _resolve_target(stage.target, self.data_dir)
+                outcome = await call() if inspect.iscoroutinefunction(call) else await asyncio.to_thread(call)
+            error = _reported_failure(outcome)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        seconds = round(time.perf_counter() - started, 3)
+
+        history = previous.get("durations", [])
+        result: Dict[str, Any] = {"status": "failed" if error else "success", "seconds": seconds}
+        if error:
+            result["error"] = error
+        elif len(history) >= 3:
+            baseline = statistics.median(history)
+            result["baseline_seconds"] = baseline
+            result["regressed"] = seconds >= REGRESSION_MIN_SECONDS and seconds > REGRESSION_FACTOR * baseline
+        results[name] = result
+
+        state[name] = {
+            "status": result["status"],
+            # A failed run must not make the next one look up to date
+            "fingerprint": None if error else fingerprint,
+            "files": files,
+            "durations": history if error else (history + [seconds])[-DURATION_HISTORY:],
+            "last_run": datetime.now().isoformat(),
+        }
+
+    def _fingerprint(self, stage: Stage,
+                     previous_files: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Watermarks of every input file and a digest over their contents."""
+        files: Dict[str, Any] = {}
+        for path in stage.inputs:
+            for file in _input_files(self.data_dir / path):
+                key = file.relative_to(self.data_dir).as_posix()
+                files[key] = file_watermark(file, previous_files.get(key))
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps([stage.target, stage.version, list(stage.inputs)]).encode("utf-8"))
+        for key in sorted(files):
+            digest.update(f"\n{key}\0{files[key]['sha256']}".encode("utf-8"))
+        return files, digest.hexdigest()
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with self.state_file.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.state_file.with_name(self.state_file.name + ".tmp")
+        with temporary.open("w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temporary, self.state_file)
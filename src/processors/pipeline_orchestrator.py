@@ -1,6 +1,11 @@
 """
 Data Pipeline Orchestrator
 Automates the complete data processing pipeline with monitoring and quality checks
+
+Full refreshes run the stage DAG of ``pipeline_dag``. Incremental updates
+are driven by per-source watermarks (see ``change_tracking``): only sources
+whose raw files changed are re-unified, and only records whose content
+changed are rescored, re-embedded and re-imported.
 """
 
 from __future__ import annotations
@@ -15,11 +20,22 @@ except ImportError:
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Callable
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Callable
 import subprocess
 import sys
 import logging
 
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.processors.jsonl_artifacts import iter_artifact_records, resolve_artifact
+from src.processors.pipeline_dag import DEFAULT_STAGES, PipelineDAG, PipelineScheduler, Stage
+from src.processors.change_tracking import file_watermark, load_watermarks, record_fingerprint, save_watermark
+
+if TYPE_CHECKING:
+    from src.models.database import DatabaseConfig
+
+DAG_STATE_FILE = "dag_state.json"
+
 
 @dataclass
 class DataPipelineOrchestrator:
@@ -27,6 +43,11 @@ class DataPipelineOrchestrator:
     
     data_dir: Path
     output_dir: Optional[Path] = None
+    db_config: Optional[DatabaseConfig] = None
+    pipeline_stages: Optional[List[Stage]] = None
+    max_workers: Optional[int] = None
+    # Processes encoding embeddings on incremental runs (None: DSATRAIN_EMBEDDING_WORKERS, default 1)
+    embedding_workers: Optional[int] = None
     
     def __post_init__(self):
         if self.output_dir is None:
@@ -59,16 +80,20 @@ class DataPipelineOrchestrator:
         
         # Check unified problems file
         problems_file = self.data_dir / "processed" / "problems_unified_complete.json"
-        if problems_file.exists():
+        if resolve_artifact(problems_file) is not None:
             try:
-                with problems_file.open("r") as f:
-                    data = json.load(f)
+                # Stream the records; only the counts are needed
+                total_problems = 0
+                missing_fields_count = 0
+                for problem in iter_artifact_records(problems_file, "problems"):
+                    total_problems += 1
+                    if not problem.get("title") or not problem.get("id"):
+                        missing_fields_count += 1
                 
-                problems = data.get("problems", [])
                 quality_metrics["total_files_checked"] += 1
                 
                 # Check for empty problems
-                if not problems:
+                if not total_problems:
                     quality_issues.append({
                         "type": "critical",
                         "file": "problems_unified_complete.json",
@@ -77,12 +102,7 @@ class DataPipelineOrchestrator:
                     quality_metrics["critical_issues"] += 1
                 
                 # Check for problems missing essential fields
-                missing_fields_count = 0
-                for problem in problems:
-                    if not problem.get("title") or not problem.get("id"):
-                        missing_fields_count += 1
-                
-                if missing_fields_count > len(problems) * 0.1:  # More than 10% missing fields
+                if missing_fields_count > total_problems * 0.1:  # More than 10% missing fields
                     quality_issues.append({
                         "type": "warning",
                         "file": "problems_unified_complete.json",
@@ -108,7 +128,7 @@ class DataPipelineOrchestrator:
         # Check AI features
         ai_features_dir = self.data_dir / "processed" / "ai_features"
         expected_ai_files = [
-            "semantic_embeddings.json",
+            "embeddings/dsatrain_v2/index.json",
             "difficulty_vectors.json", 
             "concept_graph.json",
             "interview_features.json"
@@ -118,7 +138,7 @@ class DataPipelineOrchestrator:
             file_path = ai_features_dir / filename
             quality_metrics["total_files_checked"] += 1
             
-            if not file_path.exists():
+            if resolve_artifact(file_path) is None:
                 quality_issues.append({
                     "type": "warning",
                     "file": filename,
@@ -144,6 +164,12 @@ class DataPipelineOrchestrator:
         self.logger.info(f"Quality check complete. Status: {quality_report['status']}")
         return quality_report
 
+    def _database(self) -> DatabaseConfig:
+        if self.db_config is None:
+            from src.models.database import DatabaseConfig
+            self.db_config = DatabaseConfig()
+        return self.db_config
+
     def run_incremental_update(self) -> Dict[str, Any]:
         """Run incremental data updates"""
         self.logger.info("Running incremental data update...")
@@ -151,26 +177,20 @@ class DataPipelineOrchestrator:
         update_results = {
             "timestamp": datetime.now().isoformat(),
             "components_updated": [],
+            "stage_seconds": {},
             "errors": [],
             "status": "success"
         }
         
         try:
-            # Update Codeforces data (simulated - would call actual fetcher)
-            self.logger.info("Checking for new Codeforces problems...")
-            
-            # In a real implementation, this would:
-            # 1. Call the Codeforces API to get recent problems
-            # 2. Compare with existing data
-            # 3. Add new problems to the dataset
-            # 4. Re-run unification for new data
-            
-            update_results["components_updated"].append({
-                "component": "codeforces_problems",
-                "action": "checked_for_updates",
-                "new_items": 0,
-                "status": "no_new_data"
-            })
+            session = self._database().get_session()
+            try:
+                self._apply_incremental_changes(session, update_results)
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
             
             # Check trend monitoring
             self.logger.info("Running trend monitoring...")
@@ -194,6 +214,150 @@ class DataPipelineOrchestrator:
         
         return update_results
 
+    def _apply_incremental_changes(self, session, update_results: Dict[str, Any]) -> None:
+        """Reprocess what changed since the stored watermarks; watermarks advance only on success"""
+        from src.ml.ai_feature_engineer import AIFeatureEngineer
+        from src.models.database import Problem
+        from src.processors.quality_scoring_engine import QualityScoringEngine
+        from src.processors.unified_data_processor import UnifiedDataProcessor
+        from src.services.data_import_service import DataImportService
+        from src.services.search_index import publish_search_index
+        from sqlalchemy import func
+        
+        stage_seconds = update_results["stage_seconds"]
+        started = time.perf_counter()
+        processor = UnifiedDataProcessor(self.data_dir)
+        problems_file = processor.output_dir / "problems_unified_complete.json"
+        have_artifact = resolve_artifact(problems_file) is not None
+        
+        # 1. Which raw sources changed since their watermark
+        self.logger.info("Checking sources against their watermarks...")
+        previous = load_watermarks(session)
+        watermarks: Dict[str, Dict[str, Any]] = {}
+        changed_sources: List[str] = []
+        for source, path in processor.source_files().items():
+            watermark = file_watermark(path, previous.get(source))
+            if watermark is None:
+                if source not in previous:
+                    continue  # never seen, nothing to do
+                watermark = {"path": str(path), "sha256": None}  # source file went away
+            watermarks[source] = watermark
+            if not have_artifact or watermark["sha256"] != previous.get(source, {}).get("sha256"):
+                changed_sources.append(source)
+        stage_seconds["detect"] = round(time.perf_counter() - started, 3)
+        
+        if not changed_sources:
+            update_results["components_updated"].append({
+                "component": "unified_problems",
+                "action": "checked_for_updates",
+                "new_items": 0,
+                "status": "no_new_data"
+            })
+            return
+        
+        # 2. Re-unify the changed sources and diff them against the current artifact
+        stage = time.perf_counter()
+        fresh: Dict[str, Dict[str, Any]] = {}
+        source_totals: Dict[str, int] = {}
+        for source in changed_sources:
+            records = processor.process_source(source)
+            source_totals[source] = len(records)
+            fresh.update((record["id"], record) for record in records)
+        
+        reprocessed: Dict[str, int] = dict.fromkeys(changed_sources, 0)
+        removed_counts: Dict[str, int] = dict.fromkeys(changed_sources, 0)
+        merged: List[Dict[str, Any]] = []
+        changed: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        seen = set()
+        if have_artifact:
+            for record in iter_artifact_records(problems_file, "problems"):
+                problem_id = record.get("id")
+                seen.add(problem_id)
+                if record.get("source") not in changed_sources:
+                    merged.append(record)
+                elif problem_id not in fresh:
+                    removed.append(problem_id)
+                    removed_counts[record["source"]] += 1
+                elif record_fingerprint(record) == record_fingerprint(fresh[problem_id]):
+                    merged.append(record)  # unchanged, keeps its original created_date
+                else:
+                    merged.append(fresh[problem_id])
+                    changed.append(fresh[problem_id])
+        for problem_id, record in fresh.items():
+            if problem_id not in seen:
+                merged.append(record)
+                changed.append(record)
+        stage_seconds["unify"] = round(time.perf_counter() - stage, 3)
+        
+        for record in changed:
+            reprocessed[record["source"]] += 1
+        
+        if changed or removed:
+            changed_ids = {record["id"] for record in changed}
+            self.logger.info(f"{len(changed_ids)} changed and {len(removed)} removed problems in {changed_sources}")
+            
+            stage = time.perf_counter()
+            processor.write_unified_artifact(merged, processor.calculate_cross_platform_statistics(merged))
+            stage_seconds["write_unified"] = round(time.perf_counter() - stage, 3)
+            
+            # 3. Rescore and re-embed only what changed
+            stage = time.perf_counter()
+            QualityScoringEngine(self.data_dir).update_scores(changed, removed)
+            stage_seconds["quality_scoring"] = round(time.perf_counter() - stage, 3)
+            
+            stage = time.perf_counter()
+            engineer = AIFeatureEngineer(self.data_dir, embedding_workers=self.embedding_workers)
+            embeddings = engineer.update_semantic_embeddings(changed, removed)
+            if embeddings is None:
+                engineer.generate_semantic_embeddings(merged)
+            stage_seconds["embeddings"] = round(time.perf_counter() - stage, 3)
+            
+            # 4. Import the changed rows; every embedding row moves if offsets shifted
+            stage = time.perf_counter()
+            importer = DataImportService(self.data_dir, self._database())
+            for component, result in (
+                ("unified_problems", importer.import_unified_problems(session, changed_ids)),
+                ("embeddings", importer.import_problem_embeddings(
+                    session, ids=None if embeddings is None or embeddings["offsets_changed"] else changed_ids)),
+                ("quality_scores", importer.import_quality_scores(session, changed_ids)),
+            ):
+                if result.get("status") != "success":
+                    raise RuntimeError(f"import of {component} failed: {result.get('error')}")
+            publish_search_index(session, importer.processed_dir / "search" / "tfidf")
+            stage_seconds["import"] = round(time.perf_counter() - stage, 3)
+        
+        # 5. Advance the watermarks now that everything downstream is up to date
+        for source, watermark in watermarks.items():
+            if source in changed_sources:
+                if source == "codeforces":
+                    contest_ids = [
+                        int(record["id"].split("_")[1]) for record in merged
+                        if record.get("source") == "codeforces" and record["id"].split("_")[1].isdigit()
+                    ]
+                    watermark["last_contest_id"] = max(contest_ids, default=None)
+                save_watermark(session, source, watermark, source_totals[source], reprocessed[source],
+                               stage_seconds.get("unify"))
+        last_updated = session.query(func.max(Problem.updated_at)).scalar()
+        save_watermark(session, "import", {
+            "problems_updated_at": last_updated.isoformat() if last_updated else None,
+            "imported": len(changed),
+            "removed": len(removed),
+        }, len(merged), len(changed))
+        session.commit()
+        stage_seconds["total"] = round(time.perf_counter() - started, 3)
+        
+        for source in changed_sources:
+            update_results["components_updated"].append({
+                "component": f"{source}_problems",
+                "action": "reprocessed_changes",
+                "new_items": reprocessed[source],
+                "removed_items": removed_counts[source],
+                "status": "updated" if reprocessed[source] or removed_counts[source] else "no_new_data"
+            })
+        update_results["reprocessed_ids"] = sorted(record["id"] for record in changed)
+        update_results["removed_ids"] = sorted(removed)
+
     def generate_pipeline_status_report(self) -> Dict[str, Any]:
         """Generate comprehensive pipeline status report"""
         self.logger.info("Generating pipeline status report...")
@@ -219,7 +383,8 @@ class DataPipelineOrchestrator:
             total_components = len(components)
             
             for component_name, file_path in components.items():
-                if file_path.exists():
+                file_path = resolve_artifact(file_path)
+                if file_path is not None:
                     # Check file age
                     file_age = datetime.now() - datetime.fromtimestamp(file_path.stat().st_mtime)
                     
@@ -274,49 +439,49 @@ class DataPipelineOrchestrator:
         
         return status_report
 
-    def run_full_pipeline_refresh(self) -> Dict[str, Any]:
-        """Run complete pipeline refresh"""
+    def run_full_pipeline_refresh(self, targets: Optional[List[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """Run complete pipeline refresh
+        
+        Stages run through the DAG scheduler: independent stages overlap and
+        stages whose inputs are unchanged since their last success are skipped
+        (``force`` reruns them). ``targets`` limits the run to those stages
+        and their dependencies.
+        """
         self.logger.info("Starting full pipeline refresh...")
         
         refresh_results = {
             "timestamp": datetime.now().isoformat(),
             "steps_completed": [],
+            "steps_skipped": [],
             "steps_failed": [],
+            "stage_seconds": {},
             "overall_status": "running"
         }
         
-        pipeline_steps = [
-            ("unified_data_processor", "Cross-platform data unification"),
-            ("ai_feature_engineer", "AI feature engineering"),
-            ("quality_scoring_engine", "Quality scoring"),
-            ("behavioral_document_processor", "Behavioral data processing")
-        ]
-        
-        for step_module, step_description in pipeline_steps:
-            try:
-                self.logger.info(f"Running: {step_description}")
-                
-                # In a real implementation, this would dynamically import and run each processor
-                # For now, we'll simulate the execution
-                
-                refresh_results["steps_completed"].append({
-                    "step": step_module,
-                    "description": step_description,
-                    "completion_time": datetime.now().isoformat(),
-                    "status": "success"
-                })
-                
-                # Simulate processing time
-                time.sleep(1)
-                
-            except Exception as e:
-                self.logger.error(f"Failed step {step_module}: {e}")
-                refresh_results["steps_failed"].append({
-                    "step": step_module,
-                    "description": step_description,
-                    "error": str(e),
-                    "failure_time": datetime.now().isoformat()
-                })
+        dag = PipelineDAG(self.pipeline_stages or DEFAULT_STAGES)
+        scheduler = PipelineScheduler(dag, self.data_dir, self.output_dir / DAG_STATE_FILE, self.max_workers)
+        try:
+            run = scheduler.run(targets, force=force)
+        except Exception as e:
+            self.logger.error(f"Pipeline refresh could not run: {e}")
+            run = {"stages": {}, "regressions": [], "error": str(e)}
+            refresh_results["steps_failed"].append({"step": "scheduler", "error": str(e),
+                                                    "failure_time": datetime.now().isoformat()})
+        
+        for step, outcome in run["stages"].items():
+            if outcome["status"] == "success":
+                refresh_results["steps_completed"].append({"step": step, "seconds": outcome["seconds"], "status": "success"})
+                refresh_results["stage_seconds"][step] = outcome["seconds"]
+            elif outcome["status"] == "skipped":
+                refresh_results["steps_skipped"].append({"step": step, "reason": outcome["reason"]})
+            else:
+                self.logger.error(f"Failed step {step}: {outcome.get('error') or outcome.get('blocked_by')}")
+                refresh_results["steps_failed"].append({"step": step, **outcome, "failure_time": datetime.now().isoformat()})
+        refresh_results["regressions"] = run["regressions"]
+        refresh_results["wall_seconds"] = run.get("wall_seconds")
+        for step in run["regressions"]:
+            outcome = run["stages"][step]
+            self.logger.warning(f"Stage {step} took {outcome['seconds']}s, median was {outcome['baseline_seconds']}s")
         
         # Determine overall status
         if not refresh_results["steps_failed"]:
@@ -391,7 +556,9 @@ class DataPipelineOrchestrator:
         while datetime.now() - start_time < max_runtime:
             try:
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                # Sleep until the next job is due instead of polling
+                idle = schedule.idle_seconds()
+                time.sleep(min(max(idle if idle is not None else 60, 1), 3600))
             except KeyboardInterrupt:
                 self.logger.info("Pipeline daemon stopped by user")
                 break
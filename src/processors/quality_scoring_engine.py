@@ -5,14 +5,43 @@ Implements cross-platform quality scoring with Google interview relevance metric
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from collections import Counter
 import math
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.ml.concept_graph import LEARNING_POSITION_PREREQUISITES, ConceptGraph
+from src.processors.jsonl_artifacts import iter_artifact_records, resolve_artifact, write_jsonl_artifact
+
+# Lookup tables shared by every scoring call (built once per process)
+SPECIFIC_TAGS = frozenset(["dynamic_programming", "binary_search", "graphs", "trees"])
+GENERAL_TAGS = frozenset(["implementation", "math", "greedy"])
+EDUCATIONAL_TAGS = frozenset([
+    "arrays", "strings", "dynamic_programming", "graphs", "trees",
+    "binary_search", "sorting", "hash_tables", "two_pointers"
+])
+GOOGLE_TOPICS = {
+    "high_priority": frozenset(["dynamic_programming", "graphs", "trees", "arrays", "strings"]),
+    "medium_priority": frozenset(["binary_search", "sorting", "hash_tables", "two_pointers"]),
+    "system_topics": frozenset(["system_design", "scalability", "distributed_systems"])
+}
+COMMON_PATTERNS = (
+    "two sum", "merge", "binary search", "dfs", "bfs",
+    "dynamic", "substring", "palindrome", "tree traversal"
+)
+GOOGLE_INDICATORS = ("optimization", "efficiency", "scale", "distributed", "large")
+SCORING_STAGES = ("content_quality", "google_relevance", "learning_position", "combine")
+CHECKPOINT_FILE = "quality_scores.checkpoint.jsonl"
 
 
 @dataclass
@@ -22,12 +51,17 @@ class QualityScoringEngine:
     data_dir: Path
     output_dir: Optional[Path] = None
     
+    # Parallel scoring: worker processes (1 = score in-process) and problems per chunk
+    scoring_workers: int = 1
+    chunk_size: int = 500
+    
     def __post_init__(self):
         if self.output_dir is None:
             self.output_dir = self.data_dir / "processed" / "quality_scoring"
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
         self.processed_dir = self.data_dir / "processed"
+        self.concept_graph = ConceptGraph(LEARNING_POSITION_PREREQUISITES)
 
     def load_quality_criteria(self) -> Dict[str, Any]:
         """Load academic quality criteria and rules"""
@@ -95,21 +129,13 @@ class QualityScoringEngine:
         # Specificity score based on tag quality and detail
         if tags:
             # More specific tags = better
-            specific_tags = ["dynamic_programming", "binary_search", "graphs", "trees"]
-            general_tags = ["implementation", "math", "greedy"]
-            
-            specific_count = sum(1 for tag in tags if tag in specific_tags)
-            general_count = sum(1 for tag in tags if tag in general_tags)
+            specific_count = sum(1 for tag in tags if tag in SPECIFIC_TAGS)
+            general_count = sum(1 for tag in tags if tag in GENERAL_TAGS)
             
             scores["specificity"] = min(1.0, (specific_count * 0.8 + general_count * 0.3) / 3)
         
         # Educational value (based on common interview topics)
-        educational_tags = [
-            "arrays", "strings", "dynamic_programming", "graphs", "trees",
-            "binary_search", "sorting", "hash_tables", "two_pointers"
-        ]
-        
-        educational_score = sum(1 for tag in tags if tag in educational_tags)
+        educational_score = sum(1 for tag in tags if tag in EDUCATIONAL_TAGS)
         scores["educational_value"] = min(1.0, educational_score / 5.0)
         
         # Overall score (weighted average)
@@ -139,15 +165,9 @@ class QualityScoringEngine:
         difficulty = problem.get("difficulty", {})
         
         # Topic relevance (based on known Google interview topics)
-        google_topics = {
-            "high_priority": ["dynamic_programming", "graphs", "trees", "arrays", "strings"],
-            "medium_priority": ["binary_search", "sorting", "hash_tables", "two_pointers"],
-            "system_topics": ["system_design", "scalability", "distributed_systems"]
-        }
-        
-        high_count = sum(1 for tag in tags if tag in google_topics["high_priority"])
-        medium_count = sum(1 for tag in tags if tag in google_topics["medium_priority"])
-        system_count = sum(1 for tag in tags if tag in google_topics["system_topics"])
+        high_count = sum(1 for tag in tags if tag in GOOGLE_TOPICS["high_priority"])
+        medium_count = sum(1 for tag in tags if tag in GOOGLE_TOPICS["medium_priority"])
+        system_count = sum(1 for tag in tags if tag in GOOGLE_TOPICS["system_topics"])
         
         scores["topic_relevance"] = min(1.0, (high_count * 0.8 + medium_count * 0.5 + system_count * 0.9) / 3)
         
@@ -161,17 +181,11 @@ class QualityScoringEngine:
             scores["difficulty_appropriateness"] = 0.4
         
         # Frequency score (common interview patterns)
-        common_patterns = [
-            "two sum", "merge", "binary search", "dfs", "bfs", 
-            "dynamic", "substring", "palindrome", "tree traversal"
-        ]
-        
-        pattern_matches = sum(1 for pattern in common_patterns if pattern in title)
+        pattern_matches = sum(1 for pattern in COMMON_PATTERNS if pattern in title)
         scores["frequency_score"] = min(1.0, pattern_matches / 2.0)
         
         # Company alignment (Google-specific indicators)
-        google_indicators = ["optimization", "efficiency", "scale", "distributed", "large"]
-        company_matches = sum(1 for indicator in google_indicators if indicator in title)
+        company_matches = sum(1 for indicator in GOOGLE_INDICATORS if indicator in title)
         scores["company_alignment"] = min(1.0, company_matches / 2.0)
         
         # Overall relevance
@@ -186,22 +200,13 @@ class QualityScoringEngine:
         
         return scores
 
-    def calculate_learning_path_position(self, problem: Dict[str, Any], all_problems: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Calculate where this problem fits in learning progression"""
+    def calculate_learning_path_position(self, problem: Dict[str, Any],
+                                         all_problems: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Calculate where this problem fits in learning progression (``all_problems`` is unused)"""
         
         tags = problem.get("unified_tags", [])
         difficulty = problem.get("difficulty", {})
         
-        # Define prerequisite relationships
-        prerequisite_map = {
-            "dynamic_programming": ["arrays", "recursion"],
-            "graphs": ["arrays", "data_structures"],
-            "trees": ["recursion", "data_structures"], 
-            "binary_search": ["arrays", "sorting"],
-            "advanced_dp": ["dynamic_programming"],
-            "graph_algorithms": ["graphs", "dynamic_programming"]
-        }
-        
         position_info = {
             "prerequisites": [],
             "difficulty_tier": 1,
@@ -211,11 +216,11 @@ class QualityScoringEngine:
         }
         
         # Identify prerequisites
+        graph = self.concept_graph
+        prerequisite_bits = 0
         for tag in tags:
-            if tag in prerequisite_map:
-                position_info["prerequisites"].extend(prerequisite_map[tag])
-        
-        position_info["prerequisites"] = list(set(position_info["prerequisites"]))
+            prerequisite_bits |= graph.prerequisite_mask(tag)
+        position_info["prerequisites"] = graph.names(prerequisite_bits)
         
         # Assign difficulty tier
         diff_level = difficulty.get("level", "medium")
@@ -234,16 +239,60 @@ class QualityScoringEngine:
         # Calculate learning order (problems with fewer prerequisites come first)
         position_info["learning_order"] = len(position_info["prerequisites"])
         
-        # Identify next topics
-        for topic, prereqs in prerequisite_map.items():
-            if all(prereq in tags for prereq in prereqs) and topic not in tags:
-                position_info["next_topics"].append(topic)
+        # Identify next topics: every direct prerequisite already covered by the tags
+        position_info["next_topics"] = graph.unlocked_by(graph.mask(tags))
         
         return position_info
 
-    def score_all_problems(self, problems: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Score all problems with comprehensive quality metrics"""
+    def score_problem(self, problem: Dict[str, Any], timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Score one problem; stage durations are added to ``timings`` when given"""
+        clock = time.perf_counter
+        started = clock()
+        content_scores = self.calculate_content_quality_score(problem)
+        t_content = clock()
+        relevance_scores = self.calculate_google_interview_relevance(problem)
+        t_relevance = clock()
+        position_info = self.calculate_learning_path_position(problem)
+        t_position = clock()
+        
+        # Combine into final score
+        final_score = {
+            "content_quality": content_scores,
+            "google_relevance": relevance_scores,
+            "learning_position": position_info,
+            "overall_score": (content_scores["overall"] * 0.6 + relevance_scores["overall_relevance"] * 0.4),
+            "recommendation": self._generate_recommendation(content_scores, relevance_scores)
+        }
+        
+        if timings is not None:
+            for stage, seconds in zip(SCORING_STAGES, (
+                t_content - started, t_relevance - t_content, t_position - t_relevance, clock() - t_position
+            )):
+                timings[stage] = timings.get(stage, 0.0) + seconds
+        return final_score
+
+    def score_chunk(self, problems: List[Dict[str, Any]], offset: int = 0) -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, float]]:
+        """Score a slice of the catalogue; ``offset`` is its position, for ids of problems without one"""
+        timings: Dict[str, float] = {}
+        scores = [
+            (problem.get("id", f"unknown_{offset + i}"), self.score_problem(problem, timings))
+            for i, problem in enumerate(problems)
+        ]
+        return scores, timings
+
+    def score_all_problems(self, problems: List[Dict[str, Any]],
+                           checkpoint_path: Optional[Path] = None) -> Dict[str, Any]:
+        """Score all problems with comprehensive quality metrics
+        
+        Problems are scored in chunks of ``chunk_size``, over ``scoring_workers``
+        processes when more than one. Chunks are merged back in input order,
+        so the result does not depend on which worker finished first. With a
+        ``checkpoint_path`` every finished chunk is appended to it, keyed by a
+        hash of its contents, and a rerun after a crash only scores the chunks
+        that are missing.
+        """
         print("=== Scoring All Problems ===")
+        started = time.perf_counter()
         
         scoring_results = {
             "metadata": {
@@ -262,48 +311,74 @@ class QualityScoringEngine:
             }
         }
         
-        for i, problem in enumerate(problems):
-            if i % 50 == 0:
-                print(f"Scoring problem {i}/{len(problems)}")
-            
-            problem_id = problem.get("id", f"unknown_{i}")
-            
-            # Calculate all scores
-            content_scores = self.calculate_content_quality_score(problem)
-            relevance_scores = self.calculate_google_interview_relevance(problem)
-            position_info = self.calculate_learning_path_position(problem, problems)
-            
-            # Combine into final score
-            final_score = {
-                "content_quality": content_scores,
-                "google_relevance": relevance_scores,
-                "learning_position": position_info,
-                "overall_score": (content_scores["overall"] * 0.6 + relevance_scores["overall_relevance"] * 0.4),
-                "recommendation": self._generate_recommendation(content_scores, relevance_scores)
-            }
-            
-            scoring_results["scores"][problem_id] = final_score
-            
-            # Update statistics
-            overall = final_score["overall_score"]
-            if overall >= 0.8:
-                scoring_results["statistics"]["high_quality_count"] += 1
-            elif overall >= 0.5:
-                scoring_results["statistics"]["medium_quality_count"] += 1
-            else:
-                scoring_results["statistics"]["low_quality_count"] += 1
-            
-            relevance = relevance_scores["overall_relevance"]
-            if relevance >= 0.7:
-                scoring_results["statistics"]["high_relevance_count"] += 1
-            elif relevance >= 0.4:
-                scoring_results["statistics"]["medium_relevance_count"] += 1
-            else:
-                scoring_results["statistics"]["low_relevance_count"] += 1
-        
+        chunk_size = max(1, self.chunk_size)
+        chunks = [problems[i:i + chunk_size] for i in range(0, len(problems), chunk_size)]
+        keys = [_chunk_key(chunk) for chunk in chunks]
+        done = _read_checkpoint(checkpoint_path, set(keys)) if checkpoint_path else {}
+        if done:
+            print(f"Resuming from checkpoint: {len(done)}/{len(chunks)} chunks already scored")
+        
+        pending = [i for i, key in enumerate(keys) if key not in done]
+        with _CheckpointWriter(checkpoint_path) as checkpoint:
+            for index, (scores, timings) in self._run_chunks(chunks, pending):
+                done[keys[index]] = (scores, timings)
+                checkpoint.append(keys[index], scores, timings)
+                print(f"Scored chunk {len(done)}/{len(chunks)}")
+        
+        stage_seconds = dict.fromkeys(SCORING_STAGES, 0.0)
+        for key in keys:
+            scores, timings = done[key]
+            for problem_id, final_score in scores:
+                scoring_results["scores"][problem_id] = final_score
+                self._tally(scoring_results["statistics"], final_score)
+            for stage, seconds in timings.items():
+                stage_seconds[stage] += seconds
+        
+        scoring_results["metadata"]["timings"] = {
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "workers": self.scoring_workers,
+            "chunks": len(chunks),
+            "resumed_chunks": len(chunks) - len(pending),
+            # CPU seconds summed over workers and chunks
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()}
+        }
         print(f"✅ Scored {len(problems)} problems")
         return scoring_results
 
+    def _run_chunks(self, chunks: List[List[Dict[str, Any]]], pending: List[int]):
+        """Yield ``(chunk_index, (scores, timings))`` as chunks finish, in any order"""
+        chunk_size = max(1, self.chunk_size)
+        if self.scoring_workers <= 1 or len(pending) <= 1:
+            for index in pending:
+                yield index, self.score_chunk(chunks[index], index * chunk_size)
+            return
+        with ProcessPoolExecutor(max_workers=self.scoring_workers, initializer=_init_worker,
+                                 initargs=(self,)) as pool:
+            futures = {
+                pool.submit(_score_chunk, chunks[index], index * chunk_size): index for index in pending
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    @staticmethod
+    def _tally(statistics: Dict[str, int], final_score: Dict[str, Any]) -> None:
+        """Update statistics"""
+        overall = final_score["overall_score"]
+        if overall >= 0.8:
+            statistics["high_quality_count"] += 1
+        elif overall >= 0.5:
+            statistics["medium_quality_count"] += 1
+        else:
+            statistics["low_quality_count"] += 1
+        
+        relevance = final_score["google_relevance"]["overall_relevance"]
+        if relevance >= 0.7:
+            statistics["high_relevance_count"] += 1
+        elif relevance >= 0.4:
+            statistics["medium_relevance_count"] += 1
+        else:
+            statistics["low_relevance_count"] += 1
+
     def _generate_recommendation(self, content_scores: Dict[str, float], relevance_scores: Dict[str, float]) -> str:
         """Generate recommendation based on scores"""
         content_overall = content_scores["overall"]
@@ -404,6 +479,70 @@ class QualityScoringEngine:
         
         return recommendations
 
+    def write_results(self, scoring_results: Dict[str, Any]) -> Tuple[Path, Path, Dict[str, Any]]:
+        """Write the scores artifact and the quality report; returns both paths and the report"""
+        # Generate quality report
+        quality_report = self.generate_quality_report(scoring_results)
+        
+        # Save results: one score record per line, statistics in the header
+        scores_file = write_jsonl_artifact(
+            self.output_dir / "quality_scores.json",
+            ({"id": pid, **score} for pid, score in scoring_results["scores"].items()),
+            metadata={**scoring_results["metadata"], "statistics": scoring_results["statistics"]}
+        )
+        
+        report_file = self.output_dir / "quality_report.json"
+        with report_file.open("w", encoding="utf-8") as f:
+            json.dump(quality_report, f, indent=2)
+        return scores_file, report_file, quality_report
+
+    def update_scores(self, problems: List[Dict[str, Any]], removed_ids: Iterable[str] = ()) -> Dict[str, Any]:
+        """Rescore only ``problems`` and merge them into the existing scores artifact
+        
+        Scores of other problems are carried over unchanged, problems in
+        ``removed_ids`` are dropped, and statistics and the report are
+        recomputed over the merged set.
+        """
+        print(f"=== Rescoring {len(problems)} Changed Problems ===")
+        started = time.perf_counter()
+        removed = set(removed_ids)
+        rescored, timings = self.score_chunk(problems)
+        
+        scores: Dict[str, Any] = {}
+        scores_file = self.output_dir / "quality_scores.json"
+        if resolve_artifact(scores_file) is not None:
+            for record in iter_artifact_records(scores_file, "scores"):
+                problem_id = record.pop("id")
+                if problem_id not in removed:
+                    scores[problem_id] = record
+        scores.update(rescored)
+        
+        statistics = dict.fromkeys((
+            "high_quality_count", "medium_quality_count", "low_quality_count",
+            "high_relevance_count", "medium_relevance_count", "low_relevance_count"
+        ), 0)
+        for final_score in scores.values():
+            self._tally(statistics, final_score)
+        
+        scoring_results = {
+            "metadata": {
+                "total_problems": len(scores),
+                "scoring_date": datetime.now().isoformat(),
+                "version": "1.0",
+                "timings": {
+                    "wall_seconds": round(time.perf_counter() - started, 3),
+                    "rescored": len(rescored),
+                    "removed": len(removed),
+                    "stage_seconds": {stage: round(seconds, 3) for stage, seconds in timings.items()}
+                }
+            },
+            "scores": scores,
+            "statistics": statistics
+        }
+        self.write_results(scoring_results)
+        print(f"✅ Rescored {len(rescored)} problems, {len(scores)} scores in total")
+        return scoring_results
+
     def run_quality_scoring_pipeline(self) -> Dict[str, Any]:
         """Run complete quality scoring pipeline"""
         print("=== Quality Scoring Pipeline ===")
@@ -416,39 +555,30 @@ class QualityScoringEngine:
         try:
             # Load unified problems
             problems_file = self.processed_dir / "problems_unified_complete.json"
-            if not problems_file.exists():
+            if resolve_artifact(problems_file) is None:
                 raise FileNotFoundError(f"Unified problems file not found: {problems_file}")
             
             print("Loading unified problems...")
-            with problems_file.open("r", encoding="utf-8") as f:
-                problems_data = json.load(f)
-            
-            problems = problems_data.get("problems", [])
+            # Learning path positions compare each problem against the whole set
+            problems = list(iter_artifact_records(problems_file, "problems"))
             print(f"Loaded {len(problems)} unified problems")
             
             # Load quality criteria
             criteria = self.load_quality_criteria()
             
-            # Score all problems
-            scoring_results = self.score_all_problems(problems)
+            # Score all problems, resuming an interrupted run from its checkpoint
+            checkpoint_path = self.output_dir / CHECKPOINT_FILE
+            scoring_results = self.score_all_problems(problems, checkpoint_path)
             
-            # Generate quality report
-            quality_report = self.generate_quality_report(scoring_results)
-            
-            # Save results
-            scores_file = self.output_dir / "quality_scores.json"
-            with scores_file.open("w", encoding="utf-8") as f:
-                json.dump(scoring_results, f, indent=2)
-            
-            report_file = self.output_dir / "quality_report.json"
-            with report_file.open("w", encoding="utf-8") as f:
-                json.dump(quality_report, f, indent=2)
+            scores_file, report_file, quality_report = self.write_results(scoring_results)
+            checkpoint_path.unlink(missing_ok=True)
             
             results["pipeline_status"] = "success"
             results["problems_scored"] = len(problems)
             results["scores_file"] = str(scores_file)
             results["report_file"] = str(report_file)
             results["executive_summary"] = quality_report["executive_summary"]
+            results["timings"] = scoring_results["metadata"]["timings"]
             
             print(f"\n✅ Quality scoring complete!")
             print(f"Problems scored: {len(problems)}")
@@ -464,6 +594,71 @@ class QualityScoringEngine:
             return results
 
 
+def _chunk_key(problems: List[Dict[str, Any]]) -> str:
+    payload = json.dumps(problems, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _read_checkpoint(path: Path, wanted: Set[str]) -> Dict[str, Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, float]]]:
+    """Finished chunks recorded in a checkpoint file, restricted to the ones still wanted"""
+    done = {}
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line from a crash mid-write
+            if entry.get("key") in wanted:
+                done[entry["key"]] = ([tuple(pair) for pair in entry["scores"]], entry.get("timings", {}))
+    return done
+
+
+class _CheckpointWriter:
+    """Append-only JSON Lines log of finished chunks; a no-op without a path"""
+    
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self) -> "_CheckpointWriter":
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists():
+                # Drop a torn final record so new lines are not appended onto it
+                data = self.path.read_bytes()
+                if data and not data.endswith(b"\n"):
+                    with self.path.open("r+b") as f:
+                        f.truncate(data.rfind(b"\n") + 1)
+            self._file = self.path.open("a", encoding="utf-8")
+        return self
+    
+    def append(self, key: str, scores: List[Tuple[str, Dict[str, Any]]], timings: Dict[str, float]) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps({"key": key, "scores": scores, "timings": timings}, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+_worker_engine: Optional[QualityScoringEngine] = None
+
+
+def _init_worker(engine: QualityScoringEngine) -> None:
+    # The engine arrives pickled once per worker, concept graph included
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _score_chunk(problems: List[Dict[str, Any]], offset: int):
+    return _worker_engine.score_chunk(problems, offset)
+
+
 def main():
     """Main function for running quality scoring"""
     from pathlib import Path
@@ -472,8 +667,8 @@ def main():
     project_root = Path(__file__).parent.parent.parent
     data_dir = project_root / "data"
     
-    # Create scoring engine
-    engine = QualityScoringEngine(data_dir)
+    # Create scoring engine, one scoring worker per core
+    engine = QualityScoringEngine(data_dir, scoring_workers=os.cpu_count() or 1)
     
     # Run scoring pipeline
     results = engine.run_quality_scoring_pipeline()
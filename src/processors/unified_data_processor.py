@@ -13,6 +13,11 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Tuple
 import hashlib
 
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.processors.jsonl_artifacts import write_jsonl_artifact
+
 
 @dataclass
 class UnifiedDataProcessor:
@@ -200,16 +205,21 @@ class UnifiedDataProcessor:
             return f"cf_{contest_id}_{index}"
         elif source == "hackerrank":
             hr_id = problem.get("id", "")
-            return f"hr_{hr_id}" if hr_id else f"hr_{hash(str(problem))}"
+            return f"hr_{hr_id}" if hr_id else f"hr_{self._content_hash(problem)}"
         elif source == "leetcode":
             lc_id = problem.get("id", "")
-            return f"lc_{lc_id}" if lc_id else f"lc_{hash(str(problem))}"
+            return f"lc_{lc_id}" if lc_id else f"lc_{self._content_hash(problem)}"
         else:
             # Generate hash-based ID for other sources
             content = str(problem.get("title", "")) + str(problem.get("tags", []))
             hash_id = hashlib.md5(content.encode()).hexdigest()[:8]
             return f"{source}_{hash_id}"
 
+    @staticmethod
+    def _content_hash(problem: Dict[str, Any]) -> str:
+        # Stable across processes, unlike hash(), so ids survive incremental reruns
+        return hashlib.md5(str(problem).encode()).hexdigest()[:8]
+
     def _calculate_quality_scores(self, unified_problem: Dict[str, Any]) -> Dict[str, float]:
         """Calculate quality scores for the problem"""
         scores = {
@@ -249,7 +259,7 @@ class UnifiedDataProcessor:
         """Process Codeforces problems"""
         print("Processing Codeforces problems...")
         
-        cf_file = self.raw_dir / "codeforces" / "problems" / "problems_simple.json"
+        cf_file = self.source_files()["codeforces"]
         if not cf_file.exists():
             print(f"⚠️  Codeforces file not found: {cf_file}")
             return []
@@ -278,7 +288,7 @@ class UnifiedDataProcessor:
         """Process HackerRank problems"""
         print("Processing HackerRank problems...")
         
-        hr_file = self.raw_dir / "hackerrank" / "interview_kit" / "interview_kit_problems.json"
+        hr_file = self.source_files()["hackerrank"]
         if not hr_file.exists():
             print(f"⚠️  HackerRank file not found: {hr_file}")
             return []
@@ -299,41 +309,54 @@ class UnifiedDataProcessor:
         print(f"✅ Processed {len(unified_problems)} HackerRank problems")
         return unified_problems
 
+    def source_files(self) -> Dict[str, Path]:
+        """Raw input file of every source, keyed by source name"""
+        return {
+            "codeforces": self.raw_dir / "codeforces" / "problems" / "problems_simple.json",
+            "hackerrank": self.raw_dir / "hackerrank" / "interview_kit" / "interview_kit_problems.json",
+            "atcoder": self.raw_dir / "atcoder" / "atcoder_problems.json",
+            "codechef": self.raw_dir / "codechef" / "codechef_problems.json",
+        }
+
+    def process_source(self, source: str) -> List[Dict[str, Any]]:
+        """Unified problems of a single source"""
+        if source == "codeforces":
+            return self.process_codeforces_problems()
+        if source == "hackerrank":
+            return self.process_hackerrank_problems()
+        return self._process_listed_source(source)
+
+    def _process_listed_source(self, source: str) -> List[Dict[str, Any]]:
+        """Process a ``{"problems": [...]}`` file of one of the additional sources
+        
+        A file that cannot be read or parsed raises: an empty result would
+        read as "every problem of this source was removed".
+        """
+        source_file = self.source_files()[source]
+        if not source_file.exists():
+            return []
+        
+        with source_file.open("r", encoding="utf-8") as f:
+            source_data = json.load(f)
+        
+        unified_problems = []
+        for problem in source_data.get("problems", []):
+            unified = self._create_unified_problem(problem, source)
+            unified_problems.append(unified)
+        
+        print(f"✅ Processed {source} problems")
+        return unified_problems
+
     def process_additional_sources(self) -> List[Dict[str, Any]]:
         """Process other sources (AtCoder, CodeChef, etc.)"""
         print("Processing additional sources...")
         
         unified_problems = []
-        
-        # Process AtCoder
-        atcoder_file = self.raw_dir / "atcoder" / "atcoder_problems.json"
-        if atcoder_file.exists():
-            try:
-                with atcoder_file.open("r", encoding="utf-8") as f:
-                    atcoder_data = json.load(f)
-                    
-                for problem in atcoder_data.get("problems", []):
-                    unified = self._create_unified_problem(problem, "atcoder")
-                    unified_problems.append(unified)
-                    
-                print(f"✅ Processed AtCoder problems")
-            except Exception as e:
-                print(f"❌ Error processing AtCoder: {e}")
-        
-        # Process CodeChef
-        codechef_file = self.raw_dir / "codechef" / "codechef_problems.json"
-        if codechef_file.exists():
+        for source in ("atcoder", "codechef"):
             try:
-                with codechef_file.open("r", encoding="utf-8") as f:
-                    codechef_data = json.load(f)
-                    
-                for problem in codechef_data.get("problems", []):
-                    unified = self._create_unified_problem(problem, "codechef")
-                    unified_problems.append(unified)
-                    
-                print(f"✅ Processed CodeChef problems")
+                unified_problems.extend(self._process_listed_source(source))
             except Exception as e:
-                print(f"❌ Error processing CodeChef: {e}")
+                print(f"❌ Error processing {source}: {e}")
         
         print(f"✅ Processed {len(unified_problems)} additional problems")
         return unified_problems
@@ -398,6 +421,39 @@ class UnifiedDataProcessor:
         
         return stats
 
+    def write_unified_artifact(self, all_problems: List[Dict[str, Any]], stats: Dict[str, Any]) -> Path:
+        """Write the unified problems artifact and its summary"""
+        # Save unified problems, one per line
+        output_file = write_jsonl_artifact(
+            self.output_dir / "problems_unified_complete.json",
+            all_problems,
+            metadata={
+                "creation_date": datetime.now().isoformat(),
+                "total_problems": len(all_problems),
+                "sources": list(stats["by_source"].keys()),
+                "pipeline_version": "1.1",
+                "statistics": stats
+            }
+        )
+        
+        # Create summary file
+        summary_file = self.output_dir / "unification_summary.json"
+        summary = {
+            "timestamp": datetime.now().isoformat(),
+            "total_problems_unified": len(all_problems),
+            "sources_processed": stats["by_source"],
+            "quality_distribution": stats["quality_metrics"],
+            "google_relevance_distribution": stats["google_relevance"],
+            "output_files": {
+                "unified_problems": str(output_file),
+                "summary": str(summary_file)
+            }
+        }
+        
+        with summary_file.open("w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return output_file
+
     def run_unification_pipeline(self) -> Dict[str, Any]:
         """Run complete cross-platform unification pipeline"""
         print("=== Cross-Platform Data Unification Pipeline ===")
@@ -428,38 +484,7 @@ class UnifiedDataProcessor:
             print("\nCalculating cross-platform statistics...")
             stats = self.calculate_cross_platform_statistics(all_problems)
             
-            # Save unified problems
-            output_file = self.output_dir / "problems_unified_complete.json"
-            unified_data = {
-                "metadata": {
-                    "creation_date": datetime.now().isoformat(),
-                    "total_problems": len(all_problems),
-                    "sources": list(stats["by_source"].keys()),
-                    "pipeline_version": "1.0"
-                },
-                "statistics": stats,
-                "problems": all_problems
-            }
-            
-            with output_file.open("w", encoding="utf-8") as f:
-                json.dump(unified_data, f, indent=2, ensure_ascii=False)
-            
-            # Create summary file
-            summary_file = self.output_dir / "unification_summary.json"
-            summary = {
-                "timestamp": datetime.now().isoformat(),
-                "total_problems_unified": len(all_problems),
-                "sources_processed": stats["by_source"],
-                "quality_distribution": stats["quality_metrics"],
-                "google_relevance_distribution": stats["google_relevance"],
-                "output_files": {
-                    "unified_problems": str(output_file),
-                    "summary": str(summary_file)
-                }
-            }
-            
-            with summary_file.open("w", encoding="utf-8") as f:
-                json.dump(summary, f, indent=2)
+            output_file = self.write_unified_artifact(all_problems, stats)
             
             results["pipeline_status"] = "success"
             results["total_unified"] = len(all_problems)
@@ -4,7 +4,8 @@ No external network calls; respects SettingsService gating.
 """
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from contextlib import aclosing
 import os
 import time
 from collections import deque, defaultdict
@@ -13,7 +14,7 @@ from sqlalchemy.orm import Session
 
 from src.models.database import Problem
 from src.services.settings_service import SettingsService
-from src.services.providers.base import ProviderBase, AIContext as ProviderAIContext
+from src.services.providers.base import ProviderBase, AIContext as ProviderAIContext, merge_chunk, split_response
 from src.services.providers.local import LocalProvider
 from src.services.providers.mock_openai import MockOpenAIProvider
 from src.services.providers.mock_anthropic import MockAnthropicProvider
@@ -31,16 +32,76 @@ try:
 except Exception:
     OpenRouterRealProvider = None  # type: ignore
 from src.services.rate_limit.in_memory import InMemoryRateLimiter
+from src.services.rate_limit.budget_stores import HINT_BUDGET_ACTION, RedisBudgetStore, SQLBudgetStore
+from src.services.rate_limit.common import BudgetExceeded
+from src.services.costs.common import CostCapExceeded
 from src.services.costs.in_memory import InMemoryCostLedger
+from src.services.costs.redis_backed import RedisCostLedger
+from src.services.costs.sql_backed import SQLCostLedger
 try:
     from src.services.rate_limit.redis_backed import RedisRateLimiter  # type: ignore
 except Exception:
     RedisRateLimiter = None  # type: ignore
-from src.services.metrics import Metrics
+from src.services import metrics
+from src.services.response_cache import ResponseCache
+from src.services.ai_warm_cache import lookup as warm_cache_lookup, problem_content_hash
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Where the monthly cost ledger and per-session budgets live: "memory" (per
+# process, the default), "sql" (the app database) or "redis" (DSATRAIN_REDIS_URL).
+# The shared backends let several API workers enforce one cap and one budget.
+LEDGER_BACKEND_ENV = "DSATRAIN_AI_LEDGER_BACKEND"
+
+AI_REQUESTS = metrics.counter("dsatrain_ai_requests_total", "AI requests that reached provider dispatch", ["action"])
+AI_REFUSED = metrics.counter("dsatrain_ai_refused_total", "AI requests refused by a limit", ["reason"])
+AI_RESETS = metrics.counter("dsatrain_ai_resets_total", "AI limit resets", ["scope"])
+AI_PRECOMPUTED_HITS = metrics.counter("dsatrain_ai_precomputed_hits_total", "AI requests served from the warm cache", ["action"])
+AI_STREAMS_INTERRUPTED = metrics.counter("dsatrain_ai_streams_interrupted_total", "AI streams cut off after their first chunk")
+AI_PROVIDER_SECONDS = metrics.histogram(
+    "dsatrain_ai_provider_seconds", "AI provider call latency (non-streaming)", ["provider"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+def resolve_provider(prov: str) -> ProviderBase:
+    """Provider implementation for a settings provider name (mocks unless real ones are enabled by env)."""
+    # Provider selection: default to LocalProvider for 'local' or unknown
+    if prov == "openai":
+        # Use real provider only if explicitly allowed by env flag
+        allow_real = os.getenv("DSATRAIN_ENABLE_REAL_OPENAI", "0") in ("1", "true", "True")
+        if allow_real and OpenAIRealProvider is not None:
+            try:
+                provider = OpenAIRealProvider()
+            except Exception:
+                provider = MockOpenAIProvider()
+        else:
+            provider = MockOpenAIProvider()
+    elif prov == "anthropic":
+        allow_real = os.getenv("DSATRAIN_ENABLE_REAL_ANTHROPIC", "0") in ("1", "true", "True")
+        if allow_real and AnthropicRealProvider is not None:
+            try:
+                provider = AnthropicRealProvider()
+            except Exception:
+                provider = MockAnthropicProvider()
+        else:
+            provider = MockAnthropicProvider()
+    elif prov == "openrouter":
+        allow_real = os.getenv("DSATRAIN_ENABLE_REAL_OPENROUTER", "0") in ("1", "true", "True")
+        if allow_real and OpenRouterRealProvider is not None:
+            try:
+                provider = OpenRouterRealProvider()
+            except Exception:
+                provider = MockOpenRouterProvider()
+        else:
+            provider = MockOpenRouterProvider()
+    elif prov == "local":
+        provider = LocalProvider()
+    else:
+        provider = LocalProvider()
+    return provider
+
 
 class AIForbidden(Exception):
     """Raised when AI features are disabled by settings or access is not allowed."""
@@ -67,9 +128,10 @@ class AIContext:
 
 
 class AIService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, settings: Optional[SettingsService] = None):
         self.db = db
-        self.settings = SettingsService()
+        # Reads go through the shared settings snapshot, not the file
+        self.settings = settings or SettingsService()
         # In-memory global rate limiter and per-session hint budgets
         # Deques store timestamps (seconds) of recent requests
         if not hasattr(AIService, "_global_requests"):
@@ -83,14 +145,14 @@ class AIService:
             AIService._rate_limiter = None  # type: ignore[attr-defined]
         if not hasattr(AIService, "_cost_ledger"):
             AIService._cost_ledger = None  # type: ignore[attr-defined]
-        # Lightweight in-memory cache for idempotent responses (hints/elaboration)
-        if not hasattr(AIService, "_cache_store"):
-            AIService._cache_store = {}  # type: ignore[attr-defined]
-        if not hasattr(AIService, "_cache_meta"):
-            AIService._cache_meta = {"ttl_seconds": 60}  # type: ignore[attr-defined]
+        if not hasattr(AIService, "_budget_store"):
+            AIService._budget_store = None  # type: ignore[attr-defined]
+        # Bounded cache for idempotent responses (hints/elaboration), built on first use
+        if not hasattr(AIService, "_response_cache"):
+            AIService._response_cache = None  # type: ignore[attr-defined]
 
     def _enforce_global_rate_limit(self):
-        s = self.settings.load()
+        s = self.settings.current()
         window_secs = int(getattr(s, "rate_limit_window_seconds", 60) or 60)
         limit = int(s.rate_limit_per_minute or 0)
         use_redis = os.getenv("DSATRAIN_USE_REDIS_RATE_LIMIT", "0") in ("1", "true", "True")
@@ -113,28 +175,92 @@ class AIService:
         except Exception as e:
             # Map to AIRateLimited if RateLimitExceeded
             retry_after = getattr(e, "retry_after_seconds", None)
-            Metrics.incr("ai.rate_limit_hits")
+            AI_REFUSED.labels("rate_limit").inc()
             raise AIRateLimited(str(e), retry_after_seconds=retry_after)
 
-    def _enforce_cost_cap(self, estimated_cost_usd: float) -> None:
-        s = self.settings.load()
-        # Initialize ledger when settings change (cap included in key)
+    def _ledger_backend(self) -> str:
+        return os.getenv(LEDGER_BACKEND_ENV, "memory").strip().lower()
+
+    def _ledger_location(self, backend: str) -> Optional[str]:
+        if backend == "sql":
+            return str(self.db.get_bind().url)
+        if backend == "redis":
+            return os.getenv("DSATRAIN_REDIS_URL")
+        return None
+
+    def _ledger(self):
+        s = self.settings.current()
+        # Initialize ledger when settings change (cap and backend included in key)
         cap = float(getattr(s, "monthly_cost_cap_usd", 0.0) or 0.0)
-        key = (cap,)
+        backend = self._ledger_backend()
+        key = (cap, backend, self._ledger_location(backend))
         current_key = getattr(AIService, "_cost_key", None)  # type: ignore[attr-defined]
         if current_key != key or getattr(AIService, "_cost_ledger", None) is None:  # type: ignore[attr-defined]
-            AIService._cost_ledger = InMemoryCostLedger(cap)  # type: ignore[attr-defined]
+            try:
+                if backend == "sql":
+                    ledger = SQLCostLedger(cap, self.db.get_bind())
+                elif backend == "redis":
+                    ledger = RedisCostLedger(cap, os.getenv("DSATRAIN_REDIS_URL"))
+                else:
+                    ledger = InMemoryCostLedger(cap)
+            except Exception as e:
+                logger.warning("Shared cost ledger unavailable, falling back to in-memory: %s", e)
+                ledger = InMemoryCostLedger(cap)
+            AIService._cost_ledger = ledger  # type: ignore[attr-defined]
             AIService._cost_key = key  # type: ignore[attr-defined]
-        ledger = AIService._cost_ledger  # type: ignore[attr-defined]
+        return AIService._cost_ledger  # type: ignore[attr-defined]
+
+    def _budgets(self):
+        """Per-session budget store: the shared one when configured, else the rate limiter."""
+        backend = self._ledger_backend()
+        if backend in ("sql", "redis"):
+            key = (backend, self._ledger_location(backend))
+            if getattr(AIService, "_budget_key", None) != key:  # type: ignore[attr-defined]
+                try:
+                    if backend == "sql":
+                        AIService._budget_store = SQLBudgetStore(self.db.get_bind())  # type: ignore[attr-defined]
+                    else:
+                        AIService._budget_store = RedisBudgetStore(os.getenv("DSATRAIN_REDIS_URL"))  # type: ignore[attr-defined]
+                except Exception as e:
+                    logger.warning("Shared budget store unavailable, falling back to the rate limiter: %s", e)
+                    AIService._budget_store = None  # type: ignore[attr-defined]
+                AIService._budget_key = key  # type: ignore[attr-defined]
+            if AIService._budget_store is not None:  # type: ignore[attr-defined]
+                return AIService._budget_store  # type: ignore[attr-defined]
+        limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
+        if limiter is None:
+            s = self.settings.current()
+            limiter = InMemoryRateLimiter(s.rate_limit_per_minute, getattr(s, "rate_limit_window_seconds", 60), s.ai_provider, s.model)
+        return limiter
+
+    def _enforce_cost_cap(self, estimated_cost_usd: float) -> None:
+        """Fail fast when the estimate would not fit; nothing is reserved yet."""
         try:
-            ledger.precheck(estimated_cost_usd)
+            self._ledger().precheck(estimated_cost_usd)
         except Exception as e:
-            Metrics.incr("ai.cost_cap_blocked")
+            AI_REFUSED.labels("cost_cap").inc()
             raise AICostExceeded(str(e))
 
+    def _reserve_cost(self, estimated_cost_usd: float) -> float:
+        """Atomically take the estimate out of the monthly cap right before calling a provider.
+
+        Returns the amount reserved, which ``_commit_cost`` settles against the
+        actual cost (or refunds when the provider call fails).
+        """
+        try:
+            self._ledger().reserve(estimated_cost_usd)
+        except CostCapExceeded as e:
+            AI_REFUSED.labels("cost_cap").inc()
+            raise AICostExceeded(str(e))
+        except Exception as e:
+            # Do not fail user flows when the shared ledger is unreachable
+            logger.warning("Cost reservation failed: %s", e)
+            return 0.0
+        return estimated_cost_usd
+
     def get_status(self, session_id: Optional[str] = None) -> Dict[str, Any]:
         """Return current AI usage status: global rate limit window and per-session hint usage."""
-        s = self.settings.load()
+        s = self.settings.current()
         limit = int(s.rate_limit_per_minute or 0)
         window_secs = int(getattr(s, "rate_limit_window_seconds", 60) or 60)
         limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
@@ -149,27 +275,28 @@ class AIService:
         review_used = None
         elaborate_used = None
         if session_id:
+            budgets = self._budgets()
             # Prefer limiter-provided usage if available
             try:
-                if hasattr(limiter, "get_hint_usage"):
-                    sess_used = int(limiter.get_hint_usage(session_id))  # type: ignore[attr-defined]
+                if hasattr(budgets, "get_hint_usage"):
+                    sess_used = int(budgets.get_hint_usage(session_id))  # type: ignore[attr-defined]
                 else:
                     sess_used = int(AIService._hints_by_session.get(session_id, 0))  # type: ignore[attr-defined]
             except Exception:
                 sess_used = int(AIService._hints_by_session.get(session_id, 0))  # type: ignore[attr-defined]
             # Generic action usage
             try:
-                if hasattr(limiter, "get_action_usage"):
-                    hint_used = int(limiter.get_action_usage(session_id, "hint"))  # type: ignore[attr-defined]
-                    review_used = int(limiter.get_action_usage(session_id, "review"))  # type: ignore[attr-defined]
-                    elaborate_used = int(limiter.get_action_usage(session_id, "elaborate"))  # type: ignore[attr-defined]
+                if hasattr(budgets, "get_action_usage"):
+                    hint_used = int(budgets.get_action_usage(session_id, "hint"))  # type: ignore[attr-defined]
+                    review_used = int(budgets.get_action_usage(session_id, "review"))  # type: ignore[attr-defined]
+                    elaborate_used = int(budgets.get_action_usage(session_id, "elaborate"))  # type: ignore[attr-defined]
             except Exception:
                 pass
         # Cost status
-        ledger = getattr(AIService, "_cost_ledger", None)  # type: ignore[attr-defined]
-        if ledger is None:
-            ledger = InMemoryCostLedger(float(getattr(s, "monthly_cost_cap_usd", 0.0) or 0.0))
-        cost_status = ledger.status()
+        try:
+            cost_status = self._ledger().status()
+        except Exception:
+            cost_status = InMemoryCostLedger(float(getattr(s, "monthly_cost_cap_usd", 0.0) or 0.0)).status()
         return {
             "enabled": s.enable_ai and s.ai_provider not in {None, "", "none"},
             "provider": s.ai_provider,
@@ -199,96 +326,78 @@ class AIService:
                 limiter.reset(session_id=session_id, reset_global=reset_global)
             except Exception:
                 pass
+        store = getattr(AIService, "_budget_store", None)  # type: ignore[attr-defined]
+        if store is not None and session_id and self._ledger_backend() in ("sql", "redis"):
+            try:
+                store.reset(session_id=session_id)
+            except Exception:
+                pass
         # Observability: count resets
-        Metrics.incr("ai.resets")
-        if session_id:
-            Metrics.incr("ai.resets.session")
+        AI_RESETS.labels("session" if session_id else "global").inc()
         return self.get_status(session_id=session_id)
 
-    def _precheck_hint_budget(self, session_id: Optional[str]):
-        """Check but do not decrement the session budget."""
-        if not session_id:
-            return
-        s = self.settings.load()
-        budget = int(s.hint_budget_per_session or 0)
-        if budget <= 0:
-            return
-        limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
-        if limiter is None:
-            limiter = InMemoryRateLimiter(s.rate_limit_per_minute, getattr(s, "rate_limit_window_seconds", 60), s.ai_provider, s.model)
-        try:
-            if hasattr(limiter, "check_hint_budget"):
-                limiter.check_hint_budget(session_id, budget)  # type: ignore[attr-defined]
-            else:
-                # Backward-compat fallback uses enforce-and-count, but we don't want to decrement; emulate check
-                if hasattr(limiter, "_hints_by_session"):
-                    used = limiter._hints_by_session.get(session_id, 0)  # type: ignore[attr-defined]
-                    if used >= budget:
-                        raise Exception("Hint budget exceeded for this session.")
-        except Exception as e:
-            Metrics.incr("ai.hint_budget_exceeded")
-            raise AIRateLimited(str(e))
+    def _session_budget(self, action: str) -> int:
+        s = self.settings.current()
+        budget_map = {
+            "hint": int(s.hint_budget_per_session or 0),
+            "review": int(getattr(s, "review_budget_per_session", 0) or 0),
+            "elaborate": int(getattr(s, "elaborate_budget_per_session", 0) or 0),
+        }
+        return budget_map.get(action, 0)
 
-    def _commit_hint_budget(self, session_id: Optional[str]):
-        if not session_id:
-            return
-        s = self.settings.load()
-        budget = int(s.hint_budget_per_session or 0)
-        if budget <= 0:
+    def _reserve_session(self, session_id: Optional[str], action: str) -> Tuple[str, ...]:
+        """Atomically count one ``action`` against the session's budgets before calling a provider.
+
+        Like ``_reserve_cost``: each counter is a conditional increment, so
+        concurrent requests cannot all pass a check and overshoot the budget.
+        Returns the counters taken, which ``_release_session`` refunds when the
+        request delivers nothing.
+        """
+        budget = self._session_budget(action)
+        if not session_id or budget <= 0:
+            return ()
+        limiter = self._budgets()
+        steps: List[Tuple[str, Callable[[], Any]]] = []
+        if action == "hint" and hasattr(limiter, "commit_hint_usage"):
+            steps.append((HINT_BUDGET_ACTION, lambda: limiter.commit_hint_usage(session_id, budget)))  # type: ignore[attr-defined]
+        if hasattr(limiter, "commit_action_usage"):
+            steps.append((action, lambda: limiter.commit_action_usage(session_id, action, budget)))  # type: ignore[attr-defined]
+        reserved: List[str] = []
+        for counter, commit in steps:
+            try:
+                commit()
+            except BudgetExceeded as e:
+                self._release_session(session_id, tuple(reserved))
+                AI_REFUSED.labels(f"{action}_budget").inc()
+                raise AIRateLimited(str(e))
+            except Exception as e:
+                # Do not fail user flows when the budget store is unreachable
+                logger.warning("Session budget reservation failed: %s", e)
+                continue
+            reserved.append(counter)
+        return tuple(reserved)
+
+    def _release_session(self, session_id: Optional[str], reserved: Tuple[str, ...]) -> None:
+        if not session_id or not reserved:
             return
-        limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
-        if limiter is None:
-            limiter = InMemoryRateLimiter(s.rate_limit_per_minute, getattr(s, "rate_limit_window_seconds", 60), s.ai_provider, s.model)
-        try:
-            if hasattr(limiter, "commit_hint_usage"):
-                limiter.commit_hint_usage(session_id)  # type: ignore[attr-defined]
-            else:
-                # Fallback to old behavior
-                limiter.enforce_and_count_hint(session_id, budget)
-        except Exception:
-            # Do not surface commit errors; budgets are best-effort
-            pass
+        limiter = self._budgets()
+        for counter in reserved:
+            try:
+                if counter == HINT_BUDGET_ACTION:
+                    limiter.release_hint_usage(session_id)  # type: ignore[attr-defined]
+                else:
+                    limiter.release_action_usage(session_id, counter)  # type: ignore[attr-defined]
+            except Exception as e:
+                logger.warning("Session budget refund failed: %s", e)
 
     def _get_context(self) -> AIContext:
-        s = self.settings.load()
+        s = self.settings.current()
         return AIContext(enable_ai=s.enable_ai, provider=s.ai_provider, model=s.model)
 
     def _provider_and_ctx(self) -> Tuple[ProviderBase, ProviderAIContext]:
-        s = self.settings.load()
+        s = self.settings.current()
         prov = (s.ai_provider or "none").lower()
-        # Provider selection: default to LocalProvider for 'local' or unknown
-        if prov == "openai":
-            # Use real provider only if explicitly allowed by env flag
-            allow_real = os.getenv("DSATRAIN_ENABLE_REAL_OPENAI", "0") in ("1", "true", "True")
-            if allow_real and OpenAIRealProvider is not None:
-                try:
-                    provider = OpenAIRealProvider()
-                except Exception:
-                    provider = MockOpenAIProvider()
-            else:
-                provider = MockOpenAIProvider()
-        elif prov == "anthropic":
-            allow_real = os.getenv("DSATRAIN_ENABLE_REAL_ANTHROPIC", "0") in ("1", "true", "True")
-            if allow_real and AnthropicRealProvider is not None:
-                try:
-                    provider = AnthropicRealProvider()
-                except Exception:
-                    provider = MockAnthropicProvider()
-            else:
-                provider = MockAnthropicProvider()
-        elif prov == "openrouter":
-            allow_real = os.getenv("DSATRAIN_ENABLE_REAL_OPENROUTER", "0") in ("1", "true", "True")
-            if allow_real and OpenRouterRealProvider is not None:
-                try:
-                    provider = OpenRouterRealProvider()
-                except Exception:
-                    provider = MockOpenRouterProvider()
-            else:
-                provider = MockOpenRouterProvider()
-        elif prov == "local":
-            provider = LocalProvider()
-        else:
-            provider = LocalProvider()
+        provider = resolve_provider(prov)
         ctx = ProviderAIContext(enable_ai=s.enable_ai, provider=prov, model=s.model)
         return provider, ctx
 
@@ -299,87 +408,297 @@ class AIService:
         return ctx
 
     def generate_hint(self, problem_id: str, query: Optional[str] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        precomputed, loaded = self._precomputed("hint", problem_id, query)
+        if precomputed is not None:
+            return self._serve_precomputed_hint(precomputed, session_id)
+        ctx, estimated_cost = self._begin("hint")
+        problem = self._problem(problem_id, loaded=loaded)
+        # Budgets belong to this caller, so they are reserved here: a refusal inside
+        # the shared computation would be handed to every coalesced caller.
+        reserved = self._reserve_session(session_id, "hint")
+
+        def produce() -> Dict[str, Any]:
+            AI_REQUESTS.labels("hint").inc()
+            return self._call_provider(
+                lambda provider, pctx: provider.generate_hint(problem=problem, query=query, ctx=pctx), estimated_cost
+            )
+
+        # Identical concurrent requests share one provider call. Cache hits and
+        # coalesced callers are not charged again for it.
+        try:
+            result, computed = self._responses().get_or_compute("hint", self._hint_key(ctx, problem_id, query), produce)
+        except BaseException:
+            self._release_session(session_id, reserved)
+            raise
+        return self._finish_hint(result, computed, session_id)
+
+    async def agenerate_hint(self, problem_id: str, query: Optional[str] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async ``generate_hint``: the provider call is awaited instead of blocking the event loop."""
+        precomputed, loaded = self._precomputed("hint", problem_id, query)
+        if precomputed is not None:
+            return self._serve_precomputed_hint(precomputed, session_id)
+        ctx, estimated_cost = self._begin("hint")
+        problem = self._problem(problem_id, loaded=loaded)
+        reserved = self._reserve_session(session_id, "hint")
+
+        async def produce() -> Dict[str, Any]:
+            AI_REQUESTS.labels("hint").inc()
+            return await self._acall_provider(
+                lambda provider, pctx: provider.agenerate_hint(problem=problem, query=query, ctx=pctx), estimated_cost
+            )
+
+        try:
+            result, computed = await self._responses().aget_or_compute("hint", self._hint_key(ctx, problem_id, query), produce)
+        except BaseException:
+            self._release_session(session_id, reserved)
+            raise
+        return self._finish_hint(result, computed, session_id)
+
+    def review_code(self, code: str, rubric: Optional[Dict[str, Any]] = None, problem_id: Optional[str] = None) -> Dict[str, Any]:
+        ctx, estimated_cost = self._begin("review")
+        session_id, reserved = self._before_review(rubric)
+        problem = self._problem(problem_id, required=False)
+        try:
+            result = self._call_provider(
+                lambda provider, pctx: provider.review_code(code=code, rubric=rubric, ctx=pctx, problem=problem), estimated_cost
+            )
+        except BaseException:
+            self._release_session(session_id, reserved)
+            raise
+        return result
+
+    async def areview_code(self, code: str, rubric: Optional[Dict[str, Any]] = None, problem_id: Optional[str] = None) -> Dict[str, Any]:
+        ctx, estimated_cost = self._begin("review")
+        session_id, reserved = self._before_review(rubric)
+        problem = self._problem(problem_id, required=False)
+        try:
+            result = await self._acall_provider(
+                lambda provider, pctx: provider.areview_code(code=code, rubric=rubric, ctx=pctx, problem=problem), estimated_cost
+            )
+        except BaseException:
+            self._release_session(session_id, reserved)
+            raise
+        return result
+
+    def elaborate_prompts(self, problem_id: str) -> Dict[str, Any]:
+        precomputed, loaded = self._precomputed("elaborate", problem_id)
+        if precomputed is not None:
+            return precomputed
+        ctx, estimated_cost = self._begin("elaborate")
+        problem = self._problem(problem_id, loaded=loaded)
+
+        def produce() -> Dict[str, Any]:
+            AI_REQUESTS.labels("elaborate").inc()
+            result = self._call_provider(
+                lambda provider, pctx: provider.elaborate_prompts(problem=problem, ctx=pctx), estimated_cost
+            )
+            return self._after_elaborate(result)
+
+        result, computed = self._responses().get_or_compute("elaborate", (ctx.provider, ctx.model, problem_id), produce)
+        return self._mark_cached(result, computed)
+
+    async def aelaborate_prompts(self, problem_id: str) -> Dict[str, Any]:
+        precomputed, loaded = self._precomputed("elaborate", problem_id)
+        if precomputed is not None:
+            return precomputed
+        ctx, estimated_cost = self._begin("elaborate")
+        problem = self._problem(problem_id, loaded=loaded)
+
+        async def produce() -> Dict[str, Any]:
+            AI_REQUESTS.labels("elaborate").inc()
+            result = await self._acall_provider(
+                lambda provider, pctx: provider.aelaborate_prompts(problem=problem, ctx=pctx), estimated_cost
+            )
+            return self._after_elaborate(result)
+
+        result, computed = await self._responses().aget_or_compute("elaborate", (ctx.provider, ctx.model, problem_id), produce)
+        return self._mark_cached(result, computed)
+
+    async def astream_hint(self, problem_id: str, query: Optional[str] = None, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a hint as response chunks (see ``providers.base.merge_chunk``).
+
+        Gate checks and the session budget reservation run before the first
+        chunk, in the same order as ``generate_hint``. Cost is settled when the
+        stream completes, or when it stops part-way (client disconnect); a
+        stream that fails before producing anything refunds both.
+        The last chunk carries the final meta. Cached responses are replayed
+        without cost, and completed streams populate the cache.
+        """
+        precomputed, loaded = self._precomputed("hint", problem_id, query)
+        if precomputed is not None:
+            result = self._serve_precomputed_hint(precomputed, session_id)
+            for chunk in split_response(result, ("hints",)):
+                yield chunk
+            return
+        ctx, estimated_cost = self._begin("hint")
+        problem = self._problem(problem_id, loaded=loaded)
+        key = self._hint_key(ctx, problem_id, query)
+        reserved = self._reserve_session(session_id, "hint")
+        cached = self._responses().get("hint", key)
+        if cached is not None:
+            for chunk in split_response(self._finish_hint(cached, False, session_id), ("hints",)):
+                yield chunk
+            return
+        AI_REQUESTS.labels("hint").inc()
+        provider, pctx = self._provider_and_ctx()
+        response: Dict[str, Any] = {}
+        chunks = provider.astream_hint(problem=problem, query=query, ctx=pctx)
+        # aclosing: a disconnect settles the accounting now, not whenever the generator is collected
+        async with aclosing(self._astream_provider(chunks, estimated_cost, response, lambda: self._release_session(session_id, reserved))) as stream:
+            async for chunk in stream:
+                yield chunk
+        self._responses().set("hint", key, response)
+        meta = dict(response.get("meta") or {})
+        meta.update(self._hint_session_meta(session_id))
+        yield {"meta": meta}
+
+    async def astream_review(self, code: str, rubric: Optional[Dict[str, Any]] = None, problem_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a code review as response chunks; accounting as in ``astream_hint``."""
+        ctx, estimated_cost = self._begin("review")
+        session_id, reserved = self._before_review(rubric)
+        problem = self._problem(problem_id, required=False)
+        provider, pctx = self._provider_and_ctx()
+        response: Dict[str, Any] = {}
+        chunks = provider.astream_review(code=code, rubric=rubric, ctx=pctx, problem=problem)
+        async with aclosing(self._astream_provider(chunks, estimated_cost, response, lambda: self._release_session(session_id, reserved))) as stream:
+            async for chunk in stream:
+                yield chunk
+        yield {"meta": dict(response.get("meta") or {})}
+
+    async def _astream_provider(self, chunks: AsyncIterator[Dict[str, Any]], estimated_cost: float,
+                                response: Dict[str, Any], refund_session: Callable[[], Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Forward provider chunks, assembling them into ``response`` and settling the cost at the end."""
+        reserved = self._reserve_cost(estimated_cost)
+        started = False
+        try:
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    merge_chunk(response, chunk)
+                    started = True
+                    yield chunk
+        except BaseException:
+            if started:
+                # Output was already delivered, so a cancelled or broken stream is still charged
+                AI_STREAMS_INTERRUPTED.inc()
+                self._settle_cost(response, estimated_cost, reserved)
+            else:
+                self._commit_cost(0.0, reserved)
+                refund_session()
+            raise
+        self._settle_cost(response, estimated_cost, reserved)
+
+    def _precomputed(self, action: str, problem_id: str,
+                     query: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Problem]]:
+        """Warm-cache response for a query-less request, if the current provider/model has one.
+
+        Served without rate limiting, cost or provider calls; see ``ai_warm_cache``.
+        Also returns the problem row if it was loaded, so a miss does not load it again.
+        """
+        self._ensure_enabled()
+        if (query or "").strip():
+            return None, None
+        problem = self._problem(problem_id, required=False)
+        if problem is None:
+            return None, None
+        provider, pctx = self._provider_and_ctx()
+        try:
+            result = warm_cache_lookup(self.db, problem_id, action, provider.name, pctx.model, problem_content_hash(problem))
+        except Exception as e:
+            logger.warning("AI warm cache lookup failed: %s", e)
+            return None, problem
+        if not isinstance(result, dict):
+            return None, problem
+        AI_PRECOMPUTED_HITS.labels(action).inc()
+        result.setdefault("meta", {})["precomputed"] = True
+        return result, problem
+
+    def _serve_precomputed_hint(self, result: Dict[str, Any], session_id: Optional[str]) -> Dict[str, Any]:
+        # Precomputed hints count against the session's hint budget like any other
+        self._reserve_session(session_id, "hint")
+        return self._finish_hint(result, True, session_id)
+
+    def _begin(self, action: str) -> Tuple[AIContext, float]:
+        """Gate checks shared by every action; returns the context and the estimated cost."""
         ctx = self._ensure_enabled()
         self._enforce_global_rate_limit()
-        # Rough estimated cost in USD per hint request (0 for local/mock by default)
-        estimated_cost = self._estimate_cost(action="hint", provider=ctx.provider, model=ctx.model)
+        # Rough estimated cost in USD per request (0 for local/mock by default)
+        estimated_cost = self._estimate_cost(action=action, provider=ctx.provider, model=ctx.model)
         self._enforce_cost_cap(estimated_cost)
-        problem = self.db.query(Problem).filter(Problem.id == problem_id).first()
-        if not problem:
+        return ctx, estimated_cost
+
+    def _problem(self, problem_id: Optional[str], required: bool = True,
+                 loaded: Optional[Problem] = None) -> Optional[Problem]:
+        problem = loaded
+        if problem is None and problem_id:
+            problem = self.db.query(Problem).filter(Problem.id == problem_id).first()
+        if required and not problem:
             raise ValueError("Problem not found")
-        # Cache lookup
-        cache_key = ("hint", ctx.provider, ctx.model, problem_id, (query or "").strip().lower())
-        now = time.monotonic()
-        ttl = int(getattr(AIService, "_cache_meta", {}).get("ttl_seconds", 60))  # type: ignore[attr-defined]
-        entry = getattr(AIService, "_cache_store", {}).get(cache_key)  # type: ignore[attr-defined]
-        if entry and (now - entry[0]) <= ttl:
-            result = entry[1]
-            try:
-                if isinstance(result, dict):
-                    result.setdefault("meta", {})
-                    result["meta"]["cached"] = True
-            except Exception:
-                pass
-            Metrics.incr("ai.cache.hit")
-            # Do not re-commit budgets/costs on cache hit; return as-is (with meta preserved)
-            return result
-        Metrics.incr("ai.cache.miss")
-        # Pre-check budget; only commit after successful generation
-        self._precheck_hint_budget(session_id)
-        # Also enforce generic per-action budgets if configured
-        self._precheck_action_budget(session_id, "hint")
-        Metrics.incr("ai.requests.hint")
+        return problem
+
+    def _call_provider(self, call: Callable[[ProviderBase, ProviderAIContext], Dict[str, Any]], estimated_cost: float) -> Dict[str, Any]:
         provider, pctx = self._provider_and_ctx()
-        result = provider.generate_hint(problem=problem, query=query, ctx=pctx)
-        # Commit cost (prefer provider-reported cost if present)
+        reserved = self._reserve_cost(estimated_cost)
+        started = time.perf_counter()
         try:
-            meta = result.get("meta") if isinstance(result, dict) else None
-            actual_cost = float(meta.get("estimated_cost_usd")) if isinstance(meta, dict) and meta.get("estimated_cost_usd") is not None else estimated_cost
+            result = call(provider, pctx)
         except Exception:
-            actual_cost = estimated_cost
-        self._commit_cost(actual_cost)
-        # Observability: include optional session envelope for correlation
-        if isinstance(result, dict) and session_id:
-            result.setdefault("meta", {})
-            try:
-                # Reflect current usage after commit
-                self._commit_hint_budget(session_id)
-                self._commit_action_usage(session_id, "hint")
-                hints_used = None
-                limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
-                if limiter and hasattr(limiter, "get_hint_usage"):
-                    hints_used = limiter.get_hint_usage(session_id)  # type: ignore[attr-defined]
-                else:
-                    hints_used = getattr(AIService, "_hints_by_session", {}).get(session_id, None)  # type: ignore[attr-defined]
-                result["meta"].update({
-                    "session_id": session_id,
-                    "hints_used": int(hints_used) if hints_used is not None else None,
-                })
-            except Exception:
-                # Even if budget commit fails, return the hint; rate limiter will still apply globally
-                pass
-        else:
-            # No session id; nothing to commit
-            pass
-        # Write-through cache
+            self._commit_cost(0.0, reserved)
+            raise
+        finally:
+            AI_PROVIDER_SECONDS.labels(provider.name).observe(time.perf_counter() - started)
+        return self._settle_cost(result, estimated_cost, reserved)
+
+    async def _acall_provider(self, call: Callable[[ProviderBase, ProviderAIContext], Awaitable[Dict[str, Any]]], estimated_cost: float) -> Dict[str, Any]:
+        provider, pctx = self._provider_and_ctx()
+        reserved = self._reserve_cost(estimated_cost)
+        started = time.perf_counter()
         try:
-            getattr(AIService, "_cache_store", {})[cache_key] = (now, result)  # type: ignore[attr-defined]
-        except Exception:
-            pass
-        # Ensure meta reflects cost
+            result = await call(provider, pctx)
+        except BaseException:
+            # Cancelled requests (client went away) release their reservation too
+            self._commit_cost(0.0, reserved)
+            raise
+        finally:
+            AI_PROVIDER_SECONDS.labels(provider.name).observe(time.perf_counter() - started)
+        return self._settle_cost(result, estimated_cost, reserved)
+
+    @staticmethod
+    def _hint_key(ctx: AIContext, problem_id: str, query: Optional[str]) -> Tuple:
+        return (ctx.provider, ctx.model, problem_id, (query or "").strip().lower())
+
+    @staticmethod
+    def _mark_cached(result: Dict[str, Any], computed: bool) -> Dict[str, Any]:
+        if not computed and isinstance(result, dict):
+            result.setdefault("meta", {})["cached"] = True
+        return result
+
+    def _finish_hint(self, result: Dict[str, Any], computed: bool, session_id: Optional[str]) -> Dict[str, Any]:
+        # Cached and coalesced hints cost nothing but still used one of the session's hints
+        self._mark_cached(result, computed)
+        # Observability: include optional session envelope for correlation (not cached)
+        if isinstance(result, dict) and session_id:
+            result.setdefault("meta", {}).update(self._hint_session_meta(session_id))
+        return result
+
+    def _hint_session_meta(self, session_id: Optional[str]) -> Dict[str, Any]:
+        """The session envelope of a delivered hint: its id and the hints used so far."""
+        if not session_id:
+            return {}
         try:
-            if isinstance(result, dict):
-                result.setdefault("meta", {})
-                result["meta"]["estimated_cost_usd"] = actual_cost
+            limiter = self._budgets()
+            if limiter and hasattr(limiter, "get_hint_usage"):
+                hints_used = limiter.get_hint_usage(session_id)  # type: ignore[attr-defined]
+            else:
+                hints_used = getattr(AIService, "_hints_by_session", {}).get(session_id, None)  # type: ignore[attr-defined]
+            return {
+                "session_id": session_id,
+                "hints_used": int(hints_used) if hints_used is not None else None,
+            }
         except Exception:
-            pass
-        return result
+            # Even if the usage lookup fails, return the hint
+            return {}
 
-    def review_code(self, code: str, rubric: Optional[Dict[str, Any]] = None, problem_id: Optional[str] = None) -> Dict[str, Any]:
-        ctx = self._ensure_enabled()
-        self._enforce_global_rate_limit()
-        estimated_cost = self._estimate_cost(action="review", provider=ctx.provider, model=ctx.model)
-        self._enforce_cost_cap(estimated_cost)
+    def _before_review(self, rubric: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Tuple[str, ...]]:
         # Enforce per-session budget if a session is provided in rubric meta (optional)
         session_id = None
         try:
@@ -387,59 +706,11 @@ class AIService:
                 session_id = rubric.get("session_id")  # type: ignore[assignment]
         except Exception:
             session_id = None
-        if session_id:
-            self._precheck_action_budget(session_id, "review")
-        Metrics.incr("ai.requests.review")
-        provider, pctx = self._provider_and_ctx()
-        # Optional: pass problem if supplied
-        problem = None
-        if problem_id:
-            problem = self.db.query(Problem).filter(Problem.id == problem_id).first()
-        result = provider.review_code(code=code, rubric=rubric, ctx=pctx, problem=problem)
-        if session_id:
-            self._commit_action_usage(session_id, "review")
-        try:
-            meta = result.get("meta") if isinstance(result, dict) else None
-            actual_cost = float(meta.get("estimated_cost_usd")) if isinstance(meta, dict) and meta.get("estimated_cost_usd") is not None else estimated_cost
-        except Exception:
-            actual_cost = estimated_cost
-        self._commit_cost(actual_cost)
-        try:
-            if isinstance(result, dict):
-                result.setdefault("meta", {})
-                result["meta"]["estimated_cost_usd"] = actual_cost
-        except Exception:
-            pass
-        return result
+        reserved = self._reserve_session(session_id, "review")
+        AI_REQUESTS.labels("review").inc()
+        return session_id, reserved
 
-    def elaborate_prompts(self, problem_id: str) -> Dict[str, Any]:
-        ctx = self._ensure_enabled()
-        self._enforce_global_rate_limit()
-        estimated_cost = self._estimate_cost(action="elaborate", provider=ctx.provider, model=ctx.model)
-        self._enforce_cost_cap(estimated_cost)
-        problem = self.db.query(Problem).filter(Problem.id == problem_id).first()
-        if not problem:
-            raise ValueError("Problem not found")
-        Metrics.incr("ai.requests.elaborate")
-        provider, pctx = self._provider_and_ctx()
-        # Cache lookup
-        cache_key = ("elaborate", ctx.provider, ctx.model, problem_id)
-        now = time.monotonic()
-        ttl = int(getattr(AIService, "_cache_meta", {}).get("ttl_seconds", 60))  # type: ignore[attr-defined]
-        entry = getattr(AIService, "_cache_store", {}).get(cache_key)  # type: ignore[attr-defined]
-        if entry and (now - entry[0]) <= ttl:
-            Metrics.incr("ai.cache.hit")
-            result_cached = entry[1]
-            try:
-                if isinstance(result_cached, dict):
-                    result_cached.setdefault("meta", {})
-                    result_cached["meta"]["cached"] = True
-            except Exception:
-                pass
-            return result_cached
-        Metrics.incr("ai.cache.miss")
-        # For elaborate, optionally read session_id from environment context later; for now budget only if provided via model
-        result = provider.elaborate_prompts(problem=problem, ctx=pctx)
+    def _after_elaborate(self, result: Dict[str, Any]) -> Dict[str, Any]:
         # If response includes meta.session_id, commit usage. (Backward compatible: no-op if absent)
         try:
             session_id = None
@@ -448,67 +719,32 @@ class AIService:
                 if isinstance(meta, dict):
                     session_id = meta.get("session_id")
             if session_id:
-                self._precheck_action_budget(session_id, "elaborate")
-                self._commit_action_usage(session_id, "elaborate")
+                self._reserve_session(session_id, "elaborate")
         except Exception:
             pass
+        return result
+
+    def _settle_cost(self, result: Dict[str, Any], estimated_cost: float, reserved: float) -> Dict[str, Any]:
+        """Commit the provider-reported cost (or the estimate) and record it in the result meta."""
         try:
             meta = result.get("meta") if isinstance(result, dict) else None
             actual_cost = float(meta.get("estimated_cost_usd")) if isinstance(meta, dict) and meta.get("estimated_cost_usd") is not None else estimated_cost
         except Exception:
             actual_cost = estimated_cost
-        self._commit_cost(actual_cost)
+        self._commit_cost(actual_cost, reserved)
         try:
             if isinstance(result, dict):
                 result.setdefault("meta", {})
                 result["meta"]["estimated_cost_usd"] = actual_cost
         except Exception:
             pass
-        # Write-through cache
-        try:
-            getattr(AIService, "_cache_store", {})[cache_key] = (now, result)  # type: ignore[attr-defined]
-        except Exception:
-            pass
         return result
 
-    def _precheck_action_budget(self, session_id: Optional[str], action: str) -> None:
-        if not session_id:
-            return
-        s = self.settings.load()
-        budget_map = {
-            "hint": int(s.hint_budget_per_session or 0),
-            "review": int(getattr(s, "review_budget_per_session", 0) or 0),
-            "elaborate": int(getattr(s, "elaborate_budget_per_session", 0) or 0),
-        }
-        budget = budget_map.get(action, 0)
-        if budget <= 0:
-            return
-        limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
-        if limiter is None:
-            limiter = InMemoryRateLimiter(s.rate_limit_per_minute, getattr(s, "rate_limit_window_seconds", 60), s.ai_provider, s.model)
-        if hasattr(limiter, "check_action_budget"):
-            limiter.check_action_budget(session_id, budget, action)  # type: ignore[attr-defined]
-
-    def _commit_action_usage(self, session_id: Optional[str], action: str) -> None:
-        if not session_id:
-            return
-        s = self.settings.load()
-        budget_map = {
-            "hint": int(s.hint_budget_per_session or 0),
-            "review": int(getattr(s, "review_budget_per_session", 0) or 0),
-            "elaborate": int(getattr(s, "elaborate_budget_per_session", 0) or 0),
-        }
-        budget = budget_map.get(action, 0)
-        if budget <= 0:
-            return
-        limiter = getattr(AIService, "_rate_limiter", None)  # type: ignore[attr-defined]
-        if limiter is None:
-            limiter = InMemoryRateLimiter(s.rate_limit_per_minute, getattr(s, "rate_limit_window_seconds", 60), s.ai_provider, s.model)
-        if hasattr(limiter, "commit_action_usage"):
-            try:
-                limiter.commit_action_usage(session_id, action)  # type: ignore[attr-defined]
-            except Exception:
-                pass
+    def _responses(self) -> ResponseCache:
+        cache = getattr(AIService, "_response_cache", None)  # type: ignore[attr-defined]
+        if cache is None:
+            cache = AIService._response_cache = ResponseCache.from_env()  # type: ignore[attr-defined]
+        return cache
 
     def _estimate_cost(self, action: str, provider: Optional[str], model: Optional[str]) -> float:
         # Heuristic estimates; prefer provider-reported costs when available.
@@ -525,14 +761,10 @@ class AIService:
             base = 0.0015 if action == "review" else 0.0008
         return base
 
-    def _commit_cost(self, actual_cost_usd: float) -> None:
-        ledger = getattr(AIService, "_cost_ledger", None)  # type: ignore[attr-defined]
-        if ledger is None:
-            s = self.settings.load()
-            AIService._cost_ledger = InMemoryCostLedger(float(getattr(s, "monthly_cost_cap_usd", 0.0) or 0.0))  # type: ignore[attr-defined]
-            ledger = AIService._cost_ledger  # type: ignore[attr-defined]
+    def _commit_cost(self, actual_cost_usd: float, reserved_usd: float = 0.0) -> None:
+        """Settle a reservation: book the difference between actual and reserved cost."""
         try:
-            ledger.commit(actual_cost_usd)
+            self._ledger().commit(float(actual_cost_usd or 0.0) - float(reserved_usd or 0.0))
         except Exception:
             # Do not fail user flows on cost commit errors
             pass
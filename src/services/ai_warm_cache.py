@@ -0,0 +1,148 @@
+"""
+AI Warm Cache
+Precomputed query-less hints and elaboration prompts for the catalogue.
+
+Without a query, a hint or an elaboration depends only on the problem's
+content and the provider/model, so ``warm_responses`` generates them offline
+and stores them in ``ai_precomputed_responses``. AIService serves a matching
+row directly instead of going through the rate limiter, cost cap and provider
+dispatch. Each row records the content hash it was generated from, and is
+only served while the live problem still has that hash. A run regenerates
+only missing rows and rows whose problem changed, and drops rows of problems
+that no longer exist.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, inspect as sa_inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.models.database import AIPrecomputedResponse, Problem
+from src.services.providers.base import AIContext
+
+logger = logging.getLogger(__name__)
+
+WARM_ACTIONS = ("hint", "elaborate")
+# Problem fields a provider may read when there is no query
+CONTENT_FIELDS = (
+    "title", "difficulty", "category", "description", "constraints", "examples", "hints",
+    "algorithm_tags", "data_structures", "complexity_class", "pattern_tags", "skill_areas",
+)
+
+# Whether each engine has the table, checked once per engine. An engine without
+# it skips lookups until the process restarts after the migration.
+_READY: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+
+@dataclass
+class WarmStats:
+    generated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    failed: int = 0
+
+
+def problem_content_hash(problem: Problem) -> str:
+    payload = {field: getattr(problem, field, None) for field in CONTENT_FIELDS}
+    payload["id"] = problem.id
+    text = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def lookup(
+    session: Session, problem_id: str, action: str, provider: str, model: Optional[str], content_hash: str
+) -> Optional[Dict[str, Any]]:
+    """The precomputed response for this problem/action/provider/model, or None.
+
+    A row generated from other content than ``content_hash`` (the live
+    problem's ``problem_content_hash``) is stale and never served.
+    """
+    engine = session.get_bind()
+    ready = _READY.get(engine)
+    if ready is None:
+        ready = _READY[engine] = sa_inspect(engine).has_table(AIPrecomputedResponse.__tablename__)
+    if not ready:
+        return None  # Migration not applied
+    return session.execute(
+        select(AIPrecomputedResponse.response).where(
+            AIPrecomputedResponse.problem_id == problem_id,
+            AIPrecomputedResponse.action == action,
+            AIPrecomputedResponse.provider == provider,
+            AIPrecomputedResponse.model == (model or ""),
+            AIPrecomputedResponse.content_hash == content_hash,
+        )
+    ).scalar_one_or_none()
+
+
+def warm_responses(
+    session: Session,
+    targets: Iterable[Tuple[str, Optional[str]]],
+    actions: Sequence[str] = WARM_ACTIONS,
+    problem_ids: Optional[List[str]] = None,
+    force: bool = False,
+    batch_size: int = 200,
+) -> WarmStats:
+    """Generate missing or stale responses for each (provider name, model) in ``targets``.
+
+    Rows are committed every ``batch_size`` problems. Stale rows are only
+    removed on full-catalogue runs (``problem_ids`` is None).
+    """
+    # Imported here: AIService itself reads from the warm cache
+    from src.services.ai_service import resolve_provider
+
+    stats = WarmStats()
+    ids = problem_ids if problem_ids is not None else list(session.execute(select(Problem.id).order_by(Problem.id)).scalars())
+    for provider_name, model in targets:
+        provider = resolve_provider(provider_name)
+        ctx = AIContext(enable_ai=True, provider=provider_name, model=model)
+        scope = (AIPrecomputedResponse.provider == provider.name, AIPrecomputedResponse.model == (model or ""))
+        existing = {
+            (row.problem_id, row.action): row.content_hash
+            for row in session.execute(
+                select(AIPrecomputedResponse.problem_id, AIPrecomputedResponse.action, AIPrecomputedResponse.content_hash).where(*scope)
+            )
+        }
+        for start in range(0, len(ids), batch_size):
+            problems = session.execute(select(Problem).where(Problem.id.in_(ids[start:start + batch_size]))).scalars().all()
+            for problem in problems:
+                digest = problem_content_hash(problem)
+                for action in actions:
+                    if not force and existing.get((problem.id, action)) == digest:
+                        stats.unchanged += 1
+                        continue
+                    try:
+                        if action == "hint":
+                            response = provider.generate_hint(problem=problem, query=None, ctx=ctx)
+                        else:
+                            response = provider.elaborate_prompts(problem=problem, ctx=ctx)
+                    except Exception as e:
+                        logger.warning("Warm cache: %s/%s failed for %s: %s", provider.name, action, problem.id, e)
+                        stats.failed += 1
+                        continue
+                    session.merge(AIPrecomputedResponse(
+                        problem_id=problem.id, action=action, provider=provider.name, model=model or "",
+                        content_hash=digest, response=response,
+                    ))
+                    stats.generated += 1
+            session.commit()
+        if problem_ids is None:
+            live = set(ids)
+            gone = sorted({problem_id for problem_id, action in existing if problem_id not in live and action in actions})
+            for start in range(0, len(gone), batch_size):
+                stats.removed += session.execute(
+                    delete(AIPrecomputedResponse).where(
+                        *scope,
+                        AIPrecomputedResponse.action.in_(list(actions)),
+                        AIPrecomputedResponse.problem_id.in_(gone[start:start + batch_size]),
+                    )
+                ).rowcount
+            session.commit()
+    return stats
@@ -0,0 +1,194 @@
+"""
+Autocomplete index for search suggestions.
+
+An in-memory prefix index over every algorithm tag and problem title in the
+catalogue. Keys are kept in a sorted array and looked up with ``bisect``; each
+match carries a weight derived from problem quality, Google relevance and
+popularity so the top-N completions come back best-first.
+
+The index is built lazily per database URL (or eagerly at API startup via
+``refresh_autocomplete_index``) and rebuilt on the next lookup when it goes
+stale: immediately after an in-process commit touching Problem rows, and
+within ``_REVALIDATE_SECONDS`` of imports done by other processes, detected by
+a cheap (row count, max updated_at) fingerprint of the catalogue.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from src.models.database import Problem
+
+# Prefixes this short match a large slice of the index; their top-N lists are precomputed
+_PRECOMPUTED_PREFIX_LEN = 2
+_PRECOMPUTED_TOP_N = 20
+_REVALIDATE_SECONDS = 30.0
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower().replace("_", " ")))
+
+
+@dataclass(frozen=True)
+class Completion:
+    text: str
+    kind: str  # "tag" | "title"
+    weight: float
+
+
+def _problem_weight(quality: Optional[float], relevance: Optional[float], popularity: Optional[float]) -> float:
+    return float(quality or 0.0) + float(relevance or 0.0) + float(popularity or 0.0)
+
+
+class AutocompleteIndex:
+    """Immutable prefix index; build a new instance to reflect catalogue changes."""
+
+    def __init__(self, entries: List[Completion], fingerprint: Optional[Tuple] = None):
+        self.entries = entries
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+        keys: List[Tuple[str, int]] = []
+        for idx, entry in enumerate(entries):
+            words = _normalize(entry.text).split(" ")
+            # Index every word start so "sum" completes "Two Sum"
+            for start in range(len(words)):
+                key = " ".join(words[start:])
+                if key:
+                    keys.append((key, idx))
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._ids = [i for _, i in keys]
+        self._short: Dict[Tuple[str, str], List[int]] = self._precompute_short_prefixes()
+
+    @classmethod
+    def from_session(cls, session: Session) -> "AutocompleteIndex":
+        """Build from the full catalogue in one streamed pass over a few columns."""
+        fingerprint = _catalogue_fingerprint(session)
+        tag_weights: Dict[str, float] = {}
+        title_weights: Dict[str, float] = {}
+        rows = session.query(
+            Problem.title, Problem.algorithm_tags, Problem.quality_score,
+            Problem.google_interview_relevance, Problem.popularity_score,
+        ).yield_per(1000)
+        for title, tags, quality, relevance, popularity in rows:
+            weight = _problem_weight(quality, relevance, popularity)
+            if title:
+                title_weights[title] = max(title_weights.get(title, 0.0), weight)
+            for tag in tags or []:
+                # Tags accumulate weight so frequently used, high-quality tags rank first
+                tag_weights[str(tag)] = tag_weights.get(str(tag), 0.0) + weight + 1.0
+        entries = [Completion(t, "tag", w) for t, w in tag_weights.items()]
+        entries.extend(Completion(t, "title", w) for t, w in title_weights.items())
+        return cls(entries, fingerprint)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _precompute_short_prefixes(self) -> Dict[Tuple[str, str], List[int]]:
+        buckets: Dict[Tuple[str, str], List[int]] = {}
+        for key, idx in zip(self._keys, self._ids):
+            kind = self.entries[idx].kind
+            for n in range(1, min(_PRECOMPUTED_PREFIX_LEN, len(key)) + 1):
+                buckets.setdefault((key[:n], kind), []).append(idx)
+        weight = lambda i: self.entries[i].weight
+        return {
+            k: heapq.nlargest(_PRECOMPUTED_TOP_N, set(ids), key=weight)
+            for k, ids in buckets.items()
+        }
+
+    def complete(self, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Completion]:
+        """Top ``limit`` completions for ``prefix`` by weight, optionally of one kind."""
+        norm = _normalize(prefix)
+        if not norm or limit <= 0:
+            return []
+        if len(norm) <= _PRECOMPUTED_PREFIX_LEN and limit <= _PRECOMPUTED_TOP_N:
+            kinds = [kind] if kind else ["tag", "title"]
+            ids = [i for k in kinds for i in self._short.get((norm, k), [])]
+        else:
+            lo = bisect_left(self._keys, norm)
+            hi = bisect_left(self._keys, norm + "\uffff", lo)
+            ids = {
+                self._ids[j] for j in range(lo, hi)
+                if kind is None or self.entries[self._ids[j]].kind == kind
+            }
+        return heapq.nlargest(limit, (self.entries[i] for i in ids), key=lambda e: e.weight)
+
+
+def _catalogue_fingerprint(session: Session) -> Tuple:
+    count, last_update = session.query(func.count(Problem.id), func.max(Problem.updated_at)).one()
+    return (count, str(last_update))
+
+
+def _is_current(session: Session, index: AutocompleteIndex) -> bool:
+    now = time.monotonic()
+    if now - index.checked_at < _REVALIDATE_SECONDS:
+        return True
+    index.checked_at = now
+    return _catalogue_fingerprint(session) == index.fingerprint
+
+
+_indexes: Dict[str, AutocompleteIndex] = {}
+_stale: set = set()
+_lock = threading.Lock()
+
+
+def _index_key(session: Session) -> str:
+    return str(session.get_bind().url)
+
+
+def get_autocomplete_index(session: Session) -> AutocompleteIndex:
+    """Return the index for the session's database, (re)building it if missing or stale."""
+    key = _index_key(session)
+    index = _indexes.get(key)
+    if index is not None and key not in _stale:
+        if _is_current(session, index):
+            return index
+        _stale.add(key)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None or key in _stale:
+            _stale.discard(key)
+            index = AutocompleteIndex.from_session(session)
+            _indexes[key] = index
+    return index
+
+
+def refresh_autocomplete_index(session: Session) -> AutocompleteIndex:
+    """Eagerly rebuild the index, e.g. at startup or right after an import."""
+    key = _index_key(session)
+    index = AutocompleteIndex.from_session(session)
+    with _lock:
+        _indexes[key] = index
+        _stale.discard(key)
+    return index
+
+
+@event.listens_for(Session, "before_flush")
+def _note_problem_changes(session, flush_context, instances):
+    if any(isinstance(o, Problem) for o in (*session.new, *session.dirty, *session.deleted)):
+        session.info["autocomplete_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_index_stale(session):
+    if session.info.pop("autocomplete_dirty", False):
+        try:
+            key = _index_key(session)
+        except Exception:
+            return
+        if key in _indexes:
+            _stale.add(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop("autocomplete_dirty", None)
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+class CostCapExceeded(Exception):
+    pass
+
+
+@dataclass
+class CostStatus:
+    month_key: str
+    used_usd: float
+    cap_usd: float
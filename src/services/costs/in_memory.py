@@ -1,16 +1,10 @@
 from __future__ import annotations
 
 import threading
-from dataclasses import dataclass
 from datetime import datetime, UTC
 from typing import Optional, Dict
 
-
-@dataclass
-class CostStatus:
-    month_key: str
-    used_usd: float
-    cap_usd: float
+from .common import CostCapExceeded, CostStatus
 
 
 class InMemoryCostLedger:
@@ -49,15 +43,27 @@ class InMemoryCostLedger:
         if self.monthly_cap_usd <= 0:
             return
         if not self.can_spend(estimated_cost_usd):
-            raise Exception("Monthly AI cost cap exceeded.")
+            raise CostCapExceeded("Monthly AI cost cap exceeded.")
+
+    def reserve(self, estimated_cost_usd: float) -> None:
+        """Add the estimate to this month's spend if it stays within the cap, else raise."""
+        amount = float(estimated_cost_usd or 0.0)
+        with InMemoryCostLedger._lock:
+            key = self._month_key()
+            current = float(InMemoryCostLedger._usage_by_month.get(key, 0.0))
+            if self.monthly_cap_usd > 0 and current + amount > self.monthly_cap_usd:
+                raise CostCapExceeded("Monthly AI cost cap exceeded.")
+            InMemoryCostLedger._usage_by_month[key] = round(current + amount, 6)
 
     def commit(self, actual_cost_usd: float) -> None:
-        if float(actual_cost_usd or 0.0) <= 0:
+        """Add to this month's spend unconditionally; negative amounts refund a reservation."""
+        amount = float(actual_cost_usd or 0.0)
+        if amount == 0:
             return
         with InMemoryCostLedger._lock:
             key = self._month_key()
             current = float(InMemoryCostLedger._usage_by_month.get(key, 0.0))
-            InMemoryCostLedger._usage_by_month[key] = round(current + float(actual_cost_usd), 6)
+            InMemoryCostLedger._usage_by_month[key] = max(0.0, round(current + amount, 6))
 
     def reset_month(self, month_key: Optional[str] = None) -> None:
         with InMemoryCostLedger._lock:
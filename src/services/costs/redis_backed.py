@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+try:
+    import redis  # type: ignore
+except Exception:  # pragma: no cover - if redis not installed, module still importable
+    redis = None  # type: ignore
+
+from .common import CostCapExceeded, CostStatus
+
+# Keep a month's total around until well into the next one, then let Redis drop it
+MONTH_TTL_SECONDS = 62 * 24 * 3600
+
+# Current UTC month from the Redis server clock (days-to-civil conversion, as
+# Lua in Redis has no os.date). KEYS[1] is the key prefix; the month is appended.
+_MONTH_KEY_LUA = """
+local function month_key()
+  local z = math.floor(tonumber(redis.call('TIME')[1]) / 86400) + 719468
+  local era = math.floor(z / 146097)
+  local doe = z - era * 146097
+  local yoe = math.floor((doe - math.floor(doe / 1460) + math.floor(doe / 36524) - math.floor(doe / 146096)) / 365)
+  local doy = doe - (365 * yoe + math.floor(yoe / 4) - math.floor(yoe / 100))
+  local mp = math.floor((5 * doy + 2) / 153)
+  local month = mp < 10 and mp + 3 or mp - 9
+  local year = yoe + era * 400
+  if month <= 2 then year = year + 1 end
+  return string.format('%04d-%02d', year, month)
+end
+local month = month_key()
+local key = KEYS[1] .. month
+"""
+
+# ARGV = amount, cap, ttl. Returns {allowed (0/1), used, month}
+RESERVE_LUA = _MONTH_KEY_LUA + """
+local used = tonumber(redis.call('GET', key) or '0')
+local cap = tonumber(ARGV[2])
+if cap > 0 and used + tonumber(ARGV[1]) > cap then
+  return {0, tostring(used), month}
+end
+local total = redis.call('INCRBYFLOAT', key, ARGV[1])
+redis.call('EXPIRE', key, ARGV[3])
+return {1, total, month}
+"""
+
+# ARGV = amount (may be negative), ttl. Returns {used, month}
+COMMIT_LUA = _MONTH_KEY_LUA + """
+local total = redis.call('INCRBYFLOAT', key, ARGV[1])
+if tonumber(total) < 0 then
+  redis.call('SET', key, '0')
+  total = '0'
+end
+redis.call('EXPIRE', key, ARGV[2])
+return {total, month}
+"""
+
+STATUS_LUA = _MONTH_KEY_LUA + """
+return {redis.call('GET', key) or '0', month}
+"""
+
+
+class RedisCostLedger:
+    """Monthly cost tracker in Redis, shared by every process using the same server.
+
+    ``reserve`` checks the cap and INCRBYFLOATs in one Lua script. The month key
+    is derived from the Redis server clock, and each month's key expires on
+    its own, so rollover needs no coordination between workers.
+    """
+
+    def __init__(self, monthly_cap_usd: float, redis_url: Optional[str] = None, client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("redis-py is not installed; cannot enable the Redis cost ledger")
+            url = redis_url or os.getenv("DSATRAIN_REDIS_URL", "redis://localhost:6379/0")
+            client = redis.StrictRedis.from_url(url)  # type: ignore[attr-defined]
+        self.r = client
+        self.monthly_cap_usd = float(monthly_cap_usd or 0.0)
+        self.prefix = "dsatrain:cost:"
+        self._reserve = self.r.register_script(RESERVE_LUA)
+        self._commit = self.r.register_script(COMMIT_LUA)
+        self._status = self.r.register_script(STATUS_LUA)
+
+    def status(self) -> CostStatus:
+        used, month = self._status(keys=[self.prefix])
+        return CostStatus(month_key=_text(month), used_usd=float(used), cap_usd=self.monthly_cap_usd)
+
+    def can_spend(self, estimated_cost_usd: float) -> bool:
+        if self.monthly_cap_usd <= 0:
+            return True
+        return self.status().used_usd + float(estimated_cost_usd or 0.0) <= self.monthly_cap_usd
+
+    def precheck(self, estimated_cost_usd: float) -> None:
+        if self.monthly_cap_usd <= 0:
+            return
+        if not self.can_spend(estimated_cost_usd):
+            raise CostCapExceeded("Monthly AI cost cap exceeded.")
+
+    def reserve(self, estimated_cost_usd: float) -> None:
+        """Atomically add the estimate to this month's spend if it stays within the cap, else raise."""
+        allowed, _used, _month = self._reserve(
+            keys=[self.prefix], args=[repr(float(estimated_cost_usd or 0.0)), self.monthly_cap_usd, MONTH_TTL_SECONDS]
+        )
+        if not int(allowed):
+            raise CostCapExceeded("Monthly AI cost cap exceeded.")
+
+    def commit(self, actual_cost_usd: float) -> None:
+        """Add to this month's spend unconditionally; negative amounts refund a reservation."""
+        amount = float(actual_cost_usd or 0.0)
+        if amount == 0:
+            return
+        self._commit(keys=[self.prefix], args=[repr(amount), MONTH_TTL_SECONDS])
+
+    def reset_month(self, month_key: Optional[str] = None) -> None:
+        self.r.delete(f"{self.prefix}{month_key or self.status().month_key}")
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .common import CostCapExceeded, CostStatus
+
+
+def server_month_sql(dialect_name: str) -> str:
+    """SQL for the database's current UTC month as ``YYYY-MM``."""
+    if dialect_name == "postgresql":
+        return "to_char(timezone('UTC', now()), 'YYYY-MM')"
+    return "strftime('%Y-%m', 'now')"
+
+
+class SQLCostLedger:
+    """Monthly cost tracker in the ``ai_cost_ledger`` table (SQLite or Postgres).
+
+    Notes:
+    - Shared by every process using the same database.
+    - ``reserve`` is one conditional UPDATE (``used + x <= cap``), so concurrent
+      workers can never push the month past the cap between check and write.
+    - The month comes from the database clock; a new month simply starts a new row.
+    """
+
+    def __init__(self, monthly_cap_usd: float, engine: Engine):
+        self.monthly_cap_usd = float(monthly_cap_usd or 0.0)
+        self.engine = engine
+        self._month_sql = server_month_sql(engine.dialect.name)
+
+    def _month_key(self, conn: Connection) -> str:
+        month = conn.execute(text(f"SELECT {self._month_sql}")).scalar_one()
+        conn.execute(
+            text("INSERT INTO ai_cost_ledger (month_key, used_usd, updated_at) "
+                 "VALUES (:month, 0, CURRENT_TIMESTAMP) ON CONFLICT (month_key) DO NOTHING"),
+            {"month": month},
+        )
+        return month
+
+    def status(self) -> CostStatus:
+        with self.engine.begin() as conn:
+            month = conn.execute(text(f"SELECT {self._month_sql}")).scalar_one()
+            used = conn.execute(
+                text("SELECT used_usd FROM ai_cost_ledger WHERE month_key = :month"), {"month": month}
+            ).scalar()
+        return CostStatus(month_key=month, used_usd=float(used or 0.0), cap_usd=self.monthly_cap_usd)
+
+    def can_spend(self, estimated_cost_usd: float) -> bool:
+        if self.monthly_cap_usd <= 0:
+            return True
+        return self.status().used_usd + float(estimated_cost_usd or 0.0) <= self.monthly_cap_usd
+
+    def precheck(self, estimated_cost_usd: float) -> None:
+        if self.monthly_cap_usd <= 0:
+            return
+        if not self.can_spend(estimated_cost_usd):
+            raise CostCapExceeded("Monthly AI cost cap exceeded.")
+
+    def reserve(self, estimated_cost_usd: float) -> None:
+        """Atomically add the estimate to this month's spend if it stays within the cap, else raise."""
+        amount = float(estimated_cost_usd or 0.0)
+        with self.engine.begin() as conn:
+            month = self._month_key(conn)
+            if self.monthly_cap_usd <= 0:
+                conn.execute(
+                    text("UPDATE ai_cost_ledger SET used_usd = used_usd + :amount, updated_at = CURRENT_TIMESTAMP "
+                         "WHERE month_key = :month"),
+                    {"amount": amount, "month": month},
+                )
+                return
+            updated = conn.execute(
+                text("UPDATE ai_cost_ledger SET used_usd = used_usd + :amount, updated_at = CURRENT_TIMESTAMP "
+                     "WHERE month_key = :month AND used_usd + :amount <= :cap"),
+                {"amount": amount, "month": month, "cap": self.monthly_cap_usd},
+            ).rowcount
+        if not updated:
+            raise CostCapExceeded("Monthly AI cost cap exceeded.")
+
+    def commit(self, actual_cost_usd: float) -> None:
+        """Add to this month's spend unconditionally; negative amounts refund a reservation."""
+        amount = float(actual_cost_usd or 0.0)
+        if amount == 0:
+            return
+        with self.engine.begin() as conn:
+            month = self._month_key(conn)
+            conn.execute(
+                text("UPDATE ai_cost_ledger SET used_usd = CASE WHEN used_usd + :amount < 0 THEN 0 "
+                     "ELSE used_usd + :amount END, updated_at = CURRENT_TIMESTAMP WHERE month_key = :month"),
+                {"amount": amount, "month": month},
+            )
+
+    def reset_month(self, month_key: str | None = None) -> None:
+        with self.engine.begin() as conn:
+            month = month_key or conn.execute(text(f"SELECT {self._month_sql}")).scalar_one()
+            conn.execute(text("DELETE FROM ai_cost_ledger WHERE month_key = :month"), {"month": month})
@@ -5,80 +5,158 @@ Imports processed data from the data framework into the database
 
 from __future__ import annotations
 
+import hashlib
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from models.database import (
-    DatabaseConfig, Problem, Solution, get_database_stats
+from src.models.database import (
+    DatabaseConfig, Problem, Solution, get_database_stats, rebuild_tag_statistics
 )
-from models.ai_features_models import (
+from src.models.ai_features_models import (
     ProblemEmbedding, ProblemDifficultyVector, ConceptNode, 
     ConceptPrerequisite, ProblemConceptMapping, GoogleInterviewFeatures,
     ProblemQualityScore, BehavioralCompetency, BehavioralQuestion,
     ConversationTemplate, DataPipelineStatus
 )
+from src.services.bulk_upsert import (
+    BulkUpsertEngine, StageReport, DEFAULT_CHUNK_SIZE, PREFETCH_CHUNK_SIZE, source_signature
+)
+from src.ml.embedding_store import (
+    DEFAULT_EMBEDDING_MODEL, INDEX_FILE, LEGACY_EMBEDDING_MODEL, EmbeddingStore, EmbeddingStoreWriter
+)
+from src.processors.jsonl_artifacts import iter_artifact_records, resolve_artifact
+from src.services.search_index import publish_search_index
+
+
+def _record_id(record: Dict[str, Any]) -> Any:
+    return record.get("id")
+
+
+def _scoped_source(path: Path, ids: Optional[Set[str]]) -> str:
+    """Checkpoint identity of an import, covering the id filter when there is one."""
+    signature = source_signature(path)
+    if ids is None:
+        return signature
+    digest = hashlib.blake2b("\n".join(sorted(ids)).encode("utf-8"), digest_size=8).hexdigest()
+    return f"{signature}:{digest}"
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _only(records: Iterable[Dict[str, Any]], ids: Optional[Set[str]]) -> Iterable[Dict[str, Any]]:
+    return records if ids is None else (r for r in records if r.get("id") in ids)
 
 
 class DataImportService:
     """Service for importing processed data into database"""
     
-    def __init__(self, data_dir: Path, db_config: DatabaseConfig):
+    PROBLEM_UPDATE_COLUMNS = (
+        "title", "description", "difficulty", "difficulty_rating", "algorithm_tags",
+        "company_tags", "google_interview_relevance", "quality_score",
+    )
+    EMBEDDING_UPDATE_COLUMNS = ("row_offset", "embedding_dimension", "embedding_quality_score")
+    VECTOR_UPDATE_COLUMNS = (
+        "algorithmic_complexity", "implementation_difficulty", "mathematical_content",
+        "data_structure_usage", "optimization_required", "overall_difficulty",
+    )
+    QUALITY_UPDATE_COLUMNS = (
+        "completeness_score", "clarity_score", "specificity_score", "educational_value_score",
+        "content_quality_overall", "topic_relevance", "difficulty_appropriateness",
+        "frequency_score", "company_alignment", "google_relevance_overall",
+        "overall_quality_score", "recommendation",
+    )
+    # Values for fields a record lacks, used only when its row is inserted;
+    # re-imports keep what is stored
+    PROBLEM_DEFAULTS = {
+        "title": "", "description": "", "difficulty": "medium", "difficulty_rating": 1500.0,
+        "algorithm_tags": [], "company_tags": [], "google_interview_relevance": 0.0, "quality_score": 0.0,
+    }
+    QUALITY_DEFAULTS = {
+        **{column: 0.0 for column in QUALITY_UPDATE_COLUMNS if column != "recommendation"},
+        "recommendation": "not_recommended",
+    }
+    
+    def __init__(self, data_dir: Path, db_config: DatabaseConfig, chunk_size: int = DEFAULT_CHUNK_SIZE):
         self.data_dir = data_dir
         self.db_config = db_config
         self.processed_dir = data_dir / "processed"
+        self.chunk_size = chunk_size
+        self.checkpoint_path = self.processed_dir / "import_checkpoint.json"
+    
+    def _engine(self, session: Session) -> BulkUpsertEngine:
+        return BulkUpsertEngine(session, chunk_size=self.chunk_size, checkpoint_path=self.checkpoint_path)
+    
+    @staticmethod
+    def _print_stage(report: StageReport):
+        resumed = f", resumed after {report.resumed_from}" if report.resumed_from else ""
+        print(
+            f"   {report.stage}: {report.rows} rows in {report.seconds:.2f}s "
+            f"({report.rows_per_second:.0f} rows/s, {report.batches} batches{resumed}); "
+            f"RSS {report.rss_start_mb:.0f} -> peak {report.rss_peak_mb:.0f} MB"
+        )
+        
+    @staticmethod
+    def _counted(records: Iterable[Dict[str, Any]], counts: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        """Pass records through, tallying them into ``counts["total"]``."""
+        for record in records:
+            counts["total"] += 1
+            yield record
+    
+    def _known_problem_records(self, engine: BulkUpsertEngine, path: Path, collection: str,
+                               counts: Dict[str, int],
+                               ids: Optional[Set[str]] = None) -> Iterator[Tuple[Dict[str, Any], bool]]:
+        """Stream per-problem artifact records paired with whether their problem is in the database."""
+        records = self._counted(_only(iter_artifact_records(path, collection), ids), counts)
+        return engine.tag_existing(Problem.id, records, _record_id)
         
-    def import_unified_problems(self, session: Session) -> Dict[str, Any]:
-        """Import unified problems into database"""
+    def import_unified_problems(self, session: Session, ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Import unified problems into database (only ``ids`` when given)"""
         print("=== Importing Unified Problems ===")
         
-        problems_file = self.processed_dir / "problems_unified_complete.json"
-        if not problems_file.exists():
+        problems_file = resolve_artifact(self.processed_dir / "problems_unified_complete.json")
+        if problems_file is None:
             return {"status": "failed", "error": "Unified problems file not found"}
         
         try:
-            with problems_file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            problems = data.get("problems", [])
-            imported_count = 0
-            updated_count = 0
-            
-            for problem_data in problems:
-                problem_id = problem_data.get("id")
-                if not problem_id:
-                    continue
-                
-                # Check if problem exists
-                existing = session.query(Problem).filter(Problem.id == problem_id).first()
-                
-                if existing:
-                    # Update existing problem
-                    self._update_problem_from_unified_data(existing, problem_data)
-                    updated_count += 1
-                else:
-                    # Create new problem
-                    problem = self._create_problem_from_unified_data(problem_data)
-                    session.add(problem)
-                    imported_count += 1
-            
-            session.commit()
+            engine = self._engine(session)
+            counts = {"total": 0, "new": 0, "existing": 0}
+            
+            def rows():
+                # Records are streamed; existing ids are prefetched per chunk, not per problem
+                problems = _only(iter_artifact_records(problems_file, "problems"), ids)
+                for problem, exists in engine.tag_existing(Problem.id, self._counted(problems, counts), _record_id):
+                    if not problem.get("id"):
+                        continue
+                    counts["existing" if exists else "new"] += 1
+                    yield self._problem_row_from_unified_data(problem)
+            
+            report = engine.run_stage(
+                "unified_problems", Problem, rows(), self.PROBLEM_UPDATE_COLUMNS,
+                source=_scoped_source(problems_file, ids), defaults=self.PROBLEM_DEFAULTS,
+            )
+            # Core upserts bypass ORM flush hooks; recompute the tag aggregates in one pass
+            rebuild_tag_statistics(session)
             
             result = {
                 "status": "success",
-                "imported": imported_count,
-                "updated": updated_count,
-                "total_processed": len(problems)
+                "imported": counts["new"],
+                "updated": counts["existing"],
+                "total_processed": counts["total"],
+                "stage_report": report.to_dict()
             }
             
-            print(f"✅ Imported {imported_count} new problems, updated {updated_count}")
+            print(f"✅ Imported {counts['new']} new problems, updated {counts['existing']}")
+            self._print_stage(report)
             return result
             
         except Exception as e:
@@ -86,93 +164,91 @@ class DataImportService:
             print(f"❌ Failed to import problems: {e}")
             return {"status": "failed", "error": str(e)}
     
-    def _create_problem_from_unified_data(self, data: Dict[str, Any]) -> Problem:
-        """Create Problem instance from unified data"""
-        return Problem(
-            id=data.get("id"),
-            platform=data.get("source", "unknown"),
-            platform_id=data.get("original_id", ""),
-            title=data.get("title", ""),
-            description=data.get("description", ""),
-            difficulty=data.get("difficulty", {}).get("level", "medium"),
-            difficulty_rating=float(data.get("difficulty", {}).get("rating", 1500)),
-            algorithm_tags=data.get("unified_tags", []),
-            company_tags=data.get("company_tags", []),
-            google_interview_relevance=float(data.get("google_relevance", 0.0)),
-            quality_score=float(data.get("quality_scores", {}).get("overall", 0.0)),
-            constraints=data.get("constraints", {}),
-            created_at=datetime.now(),
-            collected_at=datetime.now()
-        )
-    
-    def _update_problem_from_unified_data(self, problem: Problem, data: Dict[str, Any]):
-        """Update existing problem with unified data"""
-        problem.title = data.get("title", problem.title)
-        problem.description = data.get("description", problem.description)
-        problem.difficulty = data.get("difficulty", {}).get("level", problem.difficulty)
-        problem.difficulty_rating = float(data.get("difficulty", {}).get("rating", problem.difficulty_rating))
-        problem.algorithm_tags = data.get("unified_tags", problem.algorithm_tags)
-        problem.company_tags = data.get("company_tags", problem.company_tags)
-        problem.google_interview_relevance = float(data.get("google_relevance", problem.google_interview_relevance))
-        problem.quality_score = float(data.get("quality_scores", {}).get("overall", problem.quality_score))
-        problem.updated_at = datetime.now()
+    def _problem_row_from_unified_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a problems row from unified data; fields the record lacks are ``None``"""
+        now = datetime.now()
+        difficulty = data.get("difficulty") or {}
+        return {
+            "id": data.get("id"),
+            "platform": data.get("source", "unknown"),
+            "platform_id": data.get("original_id", ""),
+            "title": data.get("title"),
+            "description": data.get("description"),
+            "difficulty": difficulty.get("level"),
+            "difficulty_rating": _optional_float(difficulty.get("rating")),
+            "algorithm_tags": data.get("unified_tags"),
+            "company_tags": data.get("company_tags"),
+            "google_interview_relevance": _optional_float(data.get("google_relevance")),
+            "quality_score": _optional_float((data.get("quality_scores") or {}).get("overall")),
+            "constraints": data.get("constraints", {}),
+            "created_at": now,
+            "updated_at": now,
+            "collected_at": now
+        }
     
-    def import_problem_embeddings(self, session: Session) -> Dict[str, Any]:
-        """Import semantic embeddings into database"""
+    def import_problem_embeddings(self, session: Session, model: str = DEFAULT_EMBEDDING_MODEL,
+                                  ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Register the rows of the binary embedding store in the database
+        
+        With ``ids`` only those problems' rows are (re)registered; that is only
+        correct while the other rows kept their offsets.
+        """
         print("=== Importing Problem Embeddings ===")
         
-        embeddings_file = self.processed_dir / "ai_features" / "semantic_embeddings.json"
-        if not embeddings_file.exists():
-            return {"status": "failed", "error": "Embeddings file not found"}
+        store_dir = self.processed_dir / "ai_features" / "embeddings"
+        store = EmbeddingStore.open(model, store_dir)
+        if store is None:
+            legacy_file = resolve_artifact(self.processed_dir / "ai_features" / "semantic_embeddings.json")
+            if legacy_file is None:
+                return {"status": "failed", "error": "Embeddings file not found"}
+            # Old artifacts hold salted-hash vectors; keep them under their own version
+            model = LEGACY_EMBEDDING_MODEL
+            store = EmbeddingStore.open(model, store_dir) or \
+                self._store_from_legacy_embeddings(legacy_file, store_dir, model)
         
         try:
-            with embeddings_file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            embeddings = data.get("embeddings", {})
-            imported_count = 0
-            
-            for problem_id, embedding_data in embeddings.items():
-                # Check if problem exists
-                problem = session.query(Problem).filter(Problem.id == problem_id).first()
-                if not problem:
-                    continue
-                
-                # Check if embedding already exists
-                existing = session.query(ProblemEmbedding).filter(
-                    ProblemEmbedding.problem_id == problem_id
-                ).first()
-                
-                if existing:
-                    # Update existing embedding
-                    existing.title_embedding = embedding_data.get("title_embedding", [])
-                    existing.description_embedding = embedding_data.get("desc_embedding", [])
-                    existing.combined_embedding = embedding_data.get("embedding", [])
-                    existing.updated_at = datetime.now()
-                else:
-                    # Create new embedding
-                    embedding = ProblemEmbedding(
-                        problem_id=problem_id,
-                        title_embedding=embedding_data.get("title_embedding", []),
-                        description_embedding=embedding_data.get("desc_embedding", []),
-                        combined_embedding=embedding_data.get("embedding", []),
-                        embedding_model="dsatrain_v1",
-                        embedding_dimension=len(embedding_data.get("embedding", [])),
-                        embedding_quality_score=0.8
-                    )
-                    session.add(embedding)
-                
-                imported_count += 1
+            engine = self._engine(session)
+            entries = _only(({"id": problem_id, "row": row} for row, problem_id in enumerate(store.ids)), ids)
+            rows = (
+                {
+                    "problem_id": entry["id"],
+                    "embedding_model": model,
+                    "row_offset": entry["row"],
+                    "embedding_dimension": store.dimension,
+                    "embedding_quality_score": 0.8
+                }
+                for entry, known in engine.tag_existing(Problem.id, entries, _record_id)
+                if known
+            )
+            report = engine.run_stage(
+                "embeddings", ProblemEmbedding, rows, self.EMBEDDING_UPDATE_COLUMNS,
+                source=_scoped_source(store.path / INDEX_FILE, ids),
+            )
             
+            # Offsets are only valid for the current store; forget problems it no longer holds
+            stale = [
+                problem_id for (problem_id,) in session.query(ProblemEmbedding.problem_id)
+                .filter(ProblemEmbedding.embedding_model == model)
+                if problem_id not in store
+            ]
+            for start in range(0, len(stale), PREFETCH_CHUNK_SIZE):
+                session.query(ProblemEmbedding).filter(
+                    ProblemEmbedding.embedding_model == model,
+                    ProblemEmbedding.problem_id.in_(stale[start:start + PREFETCH_CHUNK_SIZE])
+                ).delete(synchronize_session=False)
             session.commit()
             
             result = {
                 "status": "success",
-                "imported": imported_count,
-                "total_embeddings": len(embeddings)
+                "embedding_model": model,
+                "imported": report.rows + report.skipped,
+                "removed": len(stale),
+                "total_embeddings": len(store),
+                "stage_report": report.to_dict()
             }
             
-            print(f"✅ Imported {imported_count} problem embeddings")
+            print(f"✅ Imported {result['imported']} problem embeddings ({model})")
+            self._print_stage(report)
             return result
             
         except Exception as e:
@@ -180,70 +256,68 @@ class DataImportService:
             print(f"❌ Failed to import embeddings: {e}")
             return {"status": "failed", "error": str(e)}
     
+    def _store_from_legacy_embeddings(self, path: Path, store_dir: Path, model: str) -> EmbeddingStore:
+        """Convert a semantic_embeddings JSON/JSONL artifact into the binary store"""
+        count = 0
+        dimension = 0
+        for record in iter_artifact_records(path, "embeddings"):
+            count += 1
+            dimension = dimension or len(record.get("embedding", []))
+        
+        with EmbeddingStoreWriter(store_dir, model, count, dimension or 128,
+                                  metadata={"source": path.name}) as writer:
+            for record in iter_artifact_records(path, "embeddings"):
+                writer.write(
+                    record["id"],
+                    record.get("embedding"),
+                    record.get("title_embedding"),
+                    record.get("desc_embedding")
+                )
+        print(f"   Converted {writer.path.name} embeddings from {path.name} to {writer.path}")
+        return EmbeddingStore(writer.path)
+    
     def import_difficulty_vectors(self, session: Session) -> Dict[str, Any]:
         """Import difficulty vectors into database"""
         print("=== Importing Difficulty Vectors ===")
         
-        vectors_file = self.processed_dir / "ai_features" / "difficulty_vectors.json"
-        if not vectors_file.exists():
+        vectors_file = resolve_artifact(self.processed_dir / "ai_features" / "difficulty_vectors.json")
+        if vectors_file is None:
             return {"status": "failed", "error": "Difficulty vectors file not found"}
         
         try:
-            with vectors_file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            vectors = data.get("vectors", {})
-            imported_count = 0
-            
-            for problem_id, vector_data in vectors.items():
-                # Check if problem exists
-                problem = session.query(Problem).filter(Problem.id == problem_id).first()
-                if not problem:
-                    continue
-                
-                vector = vector_data.get("vector", [])
-                if len(vector) < 5:
-                    continue
-                
-                # Check if vector already exists
-                existing = session.query(ProblemDifficultyVector).filter(
-                    ProblemDifficultyVector.problem_id == problem_id
-                ).first()
-                
-                if existing:
-                    # Update existing vector
-                    existing.algorithmic_complexity = vector[0]
-                    existing.implementation_difficulty = vector[1]
-                    existing.mathematical_content = vector[2]
-                    existing.data_structure_usage = vector[3]
-                    existing.optimization_required = vector[4]
-                    existing.overall_difficulty = vector_data.get("overall_difficulty", sum(vector) / len(vector))
-                    existing.updated_at = datetime.now()
-                else:
-                    # Create new vector
-                    difficulty_vector = ProblemDifficultyVector(
-                        problem_id=problem_id,
-                        algorithmic_complexity=vector[0],
-                        implementation_difficulty=vector[1],
-                        mathematical_content=vector[2],
-                        data_structure_usage=vector[3],
-                        optimization_required=vector[4],
-                        overall_difficulty=vector_data.get("overall_difficulty", sum(vector) / len(vector)),
-                        difficulty_confidence=0.8
-                    )
-                    session.add(difficulty_vector)
-                
-                imported_count += 1
-            
-            session.commit()
+            engine = self._engine(session)
+            counts = {"total": 0}
+            
+            def rows():
+                for vector_data, known in self._known_problem_records(engine, vectors_file, "vectors", counts):
+                    vector = vector_data.get("vector", [])
+                    if not known or len(vector) < 5:
+                        continue
+                    yield {
+                        "problem_id": vector_data["id"],
+                        "algorithmic_complexity": vector[0],
+                        "implementation_difficulty": vector[1],
+                        "mathematical_content": vector[2],
+                        "data_structure_usage": vector[3],
+                        "optimization_required": vector[4],
+                        "overall_difficulty": vector_data.get("overall_difficulty", sum(vector) / len(vector)),
+                        "difficulty_confidence": 0.8
+                    }
+            
+            report = engine.run_stage(
+                "difficulty_vectors", ProblemDifficultyVector, rows(), self.VECTOR_UPDATE_COLUMNS,
+                source=source_signature(vectors_file),
+            )
             
             result = {
                 "status": "success",
-                "imported": imported_count,
-                "total_vectors": len(vectors)
+                "imported": report.rows + report.skipped,
+                "total_vectors": counts["total"],
+                "stage_report": report.to_dict()
             }
             
-            print(f"✅ Imported {imported_count} difficulty vectors")
+            print(f"✅ Imported {result['imported']} difficulty vectors")
+            self._print_stage(report)
             return result
             
         except Exception as e:
@@ -333,68 +407,37 @@ class DataImportService:
             print(f"❌ Failed to import concept graph: {e}")
             return {"status": "failed", "error": str(e)}
     
-    def import_quality_scores(self, session: Session) -> Dict[str, Any]:
-        """Import quality scores into database"""
+    def import_quality_scores(self, session: Session, ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Import quality scores into database (only ``ids`` when given)"""
         print("=== Importing Quality Scores ===")
         
-        scores_file = self.processed_dir / "quality_scoring" / "quality_scores.json"
-        if not scores_file.exists():
+        scores_file = resolve_artifact(self.processed_dir / "quality_scoring" / "quality_scores.json")
+        if scores_file is None:
             return {"status": "failed", "error": "Quality scores file not found"}
         
         try:
-            with scores_file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            scores = data.get("scores", {})
-            imported_count = 0
-            
-            for problem_id, score_data in scores.items():
-                # Check if problem exists
-                problem = session.query(Problem).filter(Problem.id == problem_id).first()
-                if not problem:
-                    continue
-                
-                content_quality = score_data.get("content_quality", {})
-                google_relevance = score_data.get("google_relevance", {})
-                
-                # Check if scores already exist
-                existing = session.query(ProblemQualityScore).filter(
-                    ProblemQualityScore.problem_id == problem_id
-                ).first()
-                
-                if existing:
-                    # Update existing scores
-                    self._update_quality_scores(existing, content_quality, google_relevance, score_data)
-                else:
-                    # Create new scores
-                    quality_score = ProblemQualityScore(
-                        problem_id=problem_id,
-                        completeness_score=content_quality.get("completeness", 0.0),
-                        clarity_score=content_quality.get("clarity", 0.0),
-                        specificity_score=content_quality.get("specificity", 0.0),
-                        educational_value_score=content_quality.get("educational_value", 0.0),
-                        content_quality_overall=content_quality.get("overall", 0.0),
-                        topic_relevance=google_relevance.get("topic_relevance", 0.0),
-                        difficulty_appropriateness=google_relevance.get("difficulty_appropriateness", 0.0),
-                        frequency_score=google_relevance.get("frequency_score", 0.0),
-                        company_alignment=google_relevance.get("company_alignment", 0.0),
-                        google_relevance_overall=google_relevance.get("overall_relevance", 0.0),
-                        overall_quality_score=score_data.get("overall_score", 0.0),
-                        recommendation=score_data.get("recommendation", "not_recommended")
-                    )
-                    session.add(quality_score)
-                
-                imported_count += 1
+            engine = self._engine(session)
+            counts = {"total": 0}
             
-            session.commit()
+            rows = (
+                self._quality_row(score_data["id"], score_data)
+                for score_data, known in self._known_problem_records(engine, scores_file, "scores", counts, ids)
+                if known
+            )
+            report = engine.run_stage(
+                "quality_scores", ProblemQualityScore, rows, self.QUALITY_UPDATE_COLUMNS,
+                source=_scoped_source(scores_file, ids), defaults=self.QUALITY_DEFAULTS,
+            )
             
             result = {
                 "status": "success",
-                "imported": imported_count,
-                "total_scores": len(scores)
+                "imported": report.rows + report.skipped,
+                "total_scores": counts["total"],
+                "stage_report": report.to_dict()
             }
             
-            print(f"✅ Imported {imported_count} quality scores")
+            print(f"✅ Imported {result['imported']} quality scores")
+            self._print_stage(report)
             return result
             
         except Exception as e:
@@ -402,21 +445,25 @@ class DataImportService:
             print(f"❌ Failed to import quality scores: {e}")
             return {"status": "failed", "error": str(e)}
     
-    def _update_quality_scores(self, existing, content_quality, google_relevance, score_data):
-        """Update existing quality scores"""
-        existing.completeness_score = content_quality.get("completeness", existing.completeness_score)
-        existing.clarity_score = content_quality.get("clarity", existing.clarity_score)
-        existing.specificity_score = content_quality.get("specificity", existing.specificity_score)
-        existing.educational_value_score = content_quality.get("educational_value", existing.educational_value_score)
-        existing.content_quality_overall = content_quality.get("overall", existing.content_quality_overall)
-        existing.topic_relevance = google_relevance.get("topic_relevance", existing.topic_relevance)
-        existing.difficulty_appropriateness = google_relevance.get("difficulty_appropriateness", existing.difficulty_appropriateness)
-        existing.frequency_score = google_relevance.get("frequency_score", existing.frequency_score)
-        existing.company_alignment = google_relevance.get("company_alignment", existing.company_alignment)
-        existing.google_relevance_overall = google_relevance.get("overall_relevance", existing.google_relevance_overall)
-        existing.overall_quality_score = score_data.get("overall_score", existing.overall_quality_score)
-        existing.recommendation = score_data.get("recommendation", existing.recommendation)
-        existing.updated_at = datetime.now()
+    def _quality_row(self, problem_id: str, score_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a problem_quality_scores row from quality engine output; absent scores are ``None``"""
+        content_quality = score_data.get("content_quality", {})
+        google_relevance = score_data.get("google_relevance", {})
+        return {
+            "problem_id": problem_id,
+            "completeness_score": content_quality.get("completeness"),
+            "clarity_score": content_quality.get("clarity"),
+            "specificity_score": content_quality.get("specificity"),
+            "educational_value_score": content_quality.get("educational_value"),
+            "content_quality_overall": content_quality.get("overall"),
+            "topic_relevance": google_relevance.get("topic_relevance"),
+            "difficulty_appropriateness": google_relevance.get("difficulty_appropriateness"),
+            "frequency_score": google_relevance.get("frequency_score"),
+            "company_alignment": google_relevance.get("company_alignment"),
+            "google_relevance_overall": google_relevance.get("overall_relevance"),
+            "overall_quality_score": score_data.get("overall_score"),
+            "recommendation": score_data.get("recommendation")
+        }
     
     def run_complete_import(self) -> Dict[str, Any]:
         """Run complete data import pipeline"""
@@ -451,6 +498,15 @@ class DataImportService:
             scores_result = self.import_quality_scores(session)
             results["components"]["quality_scores"] = scores_result
             
+            # 6. Publish the full-text search index for API workers to memory-map
+            try:
+                index_path = publish_search_index(session, self.processed_dir / "search" / "tfidf")
+                results["components"]["search_index"] = {"status": "success", "path": str(index_path)}
+                print(f"✅ Published search index to {index_path}")
+            except Exception as e:
+                results["components"]["search_index"] = {"status": "failed", "error": str(e)}
+                print(f"❌ Failed to publish search index: {e}")
+            
             # Update pipeline status
             self._update_pipeline_status(session, results)
             
@@ -521,7 +577,7 @@ def main():
     
     # Create AI features tables
     try:
-        from ..models.ai_features_models import Base
+        from src.models.ai_features_models import Base
         Base.metadata.create_all(bind=db_config.engine)
         print("✅ Created AI features tables")
     except Exception as e:
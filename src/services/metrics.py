@@ -1,32 +1,564 @@
+"""
+Metrics registry
+Prometheus-style counters, gauges and fixed-bucket histograms with labels.
+
+Metrics are declared once at module level (``counter``/``gauge``/``histogram``)
+and rendered in the Prometheus text exposition format by ``render`` (served
+at ``GET /metrics``).
+
+Updates take no lock: every thread accumulates into its own cell of a series
+and a scrape sums the cells. With ``DSATRAIN_METRICS_DIR`` set to a directory
+shared by all worker processes (emptied before the server starts), each
+process instead writes its series to an mmap'd file there, and a scrape from
+any worker aggregates every file: counters and histograms are summed,
+including processes that have exited, while gauges are summed (or maxed) over
+live processes only.
+"""
+
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Dict
-import threading
+import itertools
+import json
 import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import weakref
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
+MULTIPROC_DIR_ENV = "DSATRAIN_METRICS_DIR"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
-class Metrics:
-    """Minimal in-process counter store with logging hooks."""
+LabelValues = Tuple[str, ...]
+# (sample suffix, label pairs) -> value
+Samples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
 
-    _lock = threading.Lock()
-    _counters: Dict[str, int] = defaultdict(int)
 
-    @classmethod
-    def incr(cls, name: str, amount: int = 1) -> None:
-        with cls._lock:
-            cls._counters[name] = cls._counters.get(name, 0) + amount
-        # Lightweight log for visibility during development/tests
-        logger.debug("metric %s += %d -> %d", name, amount, cls._counters[name])
+class _CellOwner:
+    """Thread-local token whose collection (at thread exit) retires the thread's cell."""
 
-    @classmethod
-    def get(cls, name: str) -> int:
-        with cls._lock:
-            return int(cls._counters.get(name, 0))
+    __slots__ = ("__weakref__",)
+
+
+class _ThreadCells:
+    """Per-thread accumulators for one series; a cell is only written by its own thread.
+
+    When a thread exits, its cell is folded into ``_base`` so short-lived
+    threads do not leave their cells behind.
+    """
+
+    __slots__ = ("_cells", "_base", "_width", "_lock", "_local", "_ids")
+
+    def __init__(self, width: int):
+        self._cells: Dict[int, List[float]] = {}
+        self._base = [0.0] * width
+        self._width = width
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count()
+
+    def cell(self) -> List[float]:
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0.0] * self._width
+            owner = _CellOwner()
+            cell_id = next(self._ids)
+            with self._lock:  # Guards against a concurrent scrape or retirement
+                self._cells[cell_id] = cell
+            weakref.finalize(owner, self._retire, cell_id)
+            self._local.owner, self._local.cell = owner, cell
+        return cell
+
+    def _retire(self, cell_id: int) -> None:
+        with self._lock:
+            cell = self._cells.pop(cell_id)
+            for i, value in enumerate(cell):
+                self._base[i] += value
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = [list(self._base)] + list(self._cells.values())
+        return [sum(c[i] for c in cells) for i in range(self._width)]
+
+
+class _MmapFile:
+    """Append-only file of (key, float) slots owned by one process.
+
+    Layout: an 8-byte header holding the number of bytes used, then entries of
+    ``u32 key length | key (utf-8, padded to 8 bytes) | f64 value``. Values are
+    updated in place; a new entry is fully written before ``used`` covers it,
+    so readers in other processes never see a partial entry.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, int] = {}
+        with open(path, "a+b") as f:
+            if f.seek(0, os.SEEK_END) < self.INITIAL_SIZE:
+                f.truncate(self.INITIAL_SIZE)
+            self._capacity = f.seek(0, os.SEEK_END)
+        self._fd = os.open(path, os.O_RDWR)
+        self._map = mmap.mmap(self._fd, self._capacity)
+        self._used = struct.unpack_from("<I", self._map, 0)[0] or 8
+        for key, _, offset in _read_entries(self._map, self._used):
+            self._offsets[key] = offset
+
+    def add(self, key: str, amount: float) -> None:
+        with self._lock:
+            offset = self._offset(key)
+            struct.pack_into("<d", self._map, offset, struct.unpack_from("<d", self._map, offset)[0] + amount)
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            struct.pack_into("<d", self._map, self._offset(key), value)
+
+    def get(self, key: str) -> float:
+        with self._lock:
+            offset = self._offsets.get(key)
+            return struct.unpack_from("<d", self._map, offset)[0] if offset is not None else 0.0
+
+    def _offset(self, key: str) -> int:
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+        encoded = key.encode("utf-8")
+        padded = len(encoded) + (-(4 + len(encoded)) % 8)
+        size = 4 + padded + 8
+        while self._used + size > self._capacity:
+            self._grow()
+        struct.pack_into(f"<I{padded}sd", self._map, self._used, len(encoded), encoded, 0.0)
+        offset = self._used + 4 + padded
+        self._used += size
+        struct.pack_into("<I", self._map, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def _grow(self) -> None:
+        self._map.close()
+        self._capacity *= 2
+        os.ftruncate(self._fd, self._capacity)
+        self._map = mmap.mmap(self._fd, self._capacity)
+
+
+def _read_entries(buf, used: int) -> Iterable[Tuple[str, float, int]]:
+    pos = 8
+    while pos < used:
+        length = struct.unpack_from("<I", buf, pos)[0]
+        padded = length + (-(4 + length) % 8)
+        key = bytes(buf[pos + 4:pos + 4 + length]).decode("utf-8")
+        offset = pos + 4 + padded
+        yield key, struct.unpack_from("<d", buf, offset)[0], offset
+        pos = offset + 8
+
+
+def _read_file(path: Path) -> List[Tuple[str, float]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < 8:
+        return []
+    used = min(struct.unpack_from("<I", data, 0)[0], len(data))
+    return [(key, value) for key, value, _ in _read_entries(data, used)]
+
+
+class _Metric:
+    kind = ""
+    _width = 1
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, "_Child"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: object, **kwargs: object) -> "_Child":
+        """The series for these label values (cache it on hot paths)."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._child_class(self, key))
+        return child
+
+    def _unlabeled(self) -> "_Child":
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+    def _multiprocess_key(self, key: LabelValues, suffix: str, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        mode = getattr(self, "multiprocess_mode", "")
+        return json.dumps([self.name, self.kind, mode, suffix, list(zip(self.labelnames, key)) + [list(e) for e in extra]])
+
+    def samples(self) -> Samples:
+        out: Samples = {}
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            pairs = tuple(zip(self.labelnames, key))
+            for (suffix, extra), value in child.samples().items():
+                out[(suffix, pairs + extra)] = value
+        return out
+
+
+class _Child:
+    def __init__(self, metric: _Metric, key: LabelValues):
+        self._metric = metric
+        self._key = key
+        self._file: Optional[_MmapFile] = None
+        self._pid = 0
+        self._keys: Dict[Tuple, str] = {}
+        if metric._registry.multiprocess_dir is None:
+            self._cells: Optional[_ThreadCells] = _ThreadCells(metric._width)
+        else:
+            self._cells = None
+
+    def _mmap(self) -> _MmapFile:
+        pid = os.getpid()
+        if self._pid != pid:  # First use, or first use after a fork
+            self._file, self._pid = self._metric._registry._process_file(), pid
+        return self._file  # type: ignore[return-value]
+
+    def _mkey(self, suffix: str, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        key = self._keys.get((suffix, extra))
+        if key is None:
+            key = self._keys[(suffix, extra)] = self._metric._multiprocess_key(self._key, suffix, extra)
+        return key
+
+    def samples(self) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+        raise NotImplementedError
+
+
+class _CounterChild(_Child):
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        if self._cells is not None:
+            self._cells.cell()[0] += amount
+        else:
+            self._mmap().add(self._mkey(""), amount)
+
+    def get(self) -> float:
+        if self._cells is not None:
+            return self._cells.totals()[0]
+        return self._mmap().get(self._mkey(""))
+
+    def samples(self):
+        return {("", ()): self.get()}
+
+
+class _GaugeChild(_Child):
+    def __init__(self, metric: _Metric, key: LabelValues):
+        super().__init__(metric, key)
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        if self._cells is None:
+            self._mmap().set(self._mkey(""), value)
+        else:
+            self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        if self._cells is None:
+            self._mmap().add(self._mkey(""), amount)
+        else:
+            # Gauges go both ways, so they cannot be split into per-thread cells
+            with self._lock:
+                self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def get(self) -> float:
+        if self._cells is None:
+            return self._mmap().get(self._mkey(""))
+        return self._value
+
+    def samples(self):
+        return {("", ()): self.get()}
+
+
+class _HistogramChild(_Child):
+    # Cell layout: one count per bucket (the last is +Inf), then the sum
+
+    def observe(self, value: float) -> None:
+        buckets = self._metric.buckets  # type: ignore[attr-defined]
+        index = bisect_left(buckets, value)
+        if self._cells is not None:
+            cell = self._cells.cell()
+            cell[index] += 1
+            cell[-1] += value
+            return
+        f = self._mmap()
+        f.add(self._mkey("_bucket", (("le", _format_le(buckets[index])),)), 1.0)
+        f.add(self._mkey("_sum"), value)
+
+    def get(self) -> Tuple[float, float]:
+        """(count, sum) of the observations so far."""
+        samples = self.samples()
+        return samples[("_count", ())], samples[("_sum", ())]
+
+    def samples(self):
+        buckets = self._metric.buckets  # type: ignore[attr-defined]
+        if self._cells is not None:
+            totals = self._cells.totals()
+            counts, total = totals[:-1], totals[-1]
+        else:
+            f = self._mmap()
+            counts = [f.get(self._mkey("_bucket", (("le", _format_le(b)),))) for b in buckets]
+            total = f.get(self._mkey("_sum"))
+        out = {("_bucket", (("le", _format_le(b)),)): c for b, c in zip(buckets, counts)}
+        out[("_sum", ())] = total
+        return _cumulate(out, buckets)
+
+
+class Counter(_Metric):
+    """Monotonic count; by convention the name ends in ``_total``."""
+
+    kind = "counter"
+    _child_class = _CounterChild
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabeled().inc(amount)
+
+    def get(self) -> float:
+        return self._unlabeled().get()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _child_class = _GaugeChild
+
+    def __init__(self, registry, name, documentation, labelnames, multiprocess_mode: str = "sum"):
+        if multiprocess_mode not in ("sum", "max"):
+            raise ValueError("multiprocess_mode must be 'sum' or 'max'")
+        super().__init__(registry, name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value: float) -> None:
+        self._unlabeled().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabeled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabeled().dec(amount)
+
+    def get(self) -> float:
+        return self._unlabeled().get()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    _child_class = _HistogramChild
+
+    def __init__(self, registry, name, documentation, labelnames, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        bounds = sorted(float(b) for b in buckets if not math.isinf(b))
+        if not bounds:
+            raise ValueError("A histogram needs at least one finite bucket")
+        self.buckets = tuple(bounds) + (math.inf,)
+        self._width = len(self.buckets) + 1
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value: float) -> None:
+        self._unlabeled().observe(value)
+
+    def get(self) -> Tuple[float, float]:
+        return self._unlabeled().get()
+
+
+def _format_le(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def _cumulate(samples: Samples, buckets: Sequence[float]) -> Samples:
+    """Turn per-bucket counts into cumulative ``le`` counts and add ``_count``."""
+    out: Samples = {}
+    by_series: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+    for (suffix, pairs), value in samples.items():
+        if suffix == "_bucket":
+            le = dict(pairs)["le"]
+            rest = tuple(p for p in pairs if p[0] != "le")
+            by_series.setdefault(rest, {})[le] = value
+        else:
+            out[(suffix, pairs)] = value
+    for rest, counts in by_series.items():
+        running = 0.0
+        for bound in buckets:
+            le = _format_le(bound)
+            running += counts.get(le, 0.0)
+            out[("_bucket", rest + (("le", le),))] = running
+        out[("_count", rest)] = running
+        out.setdefault(("_sum", rest), 0.0)
+    return out
+
+
+class Registry:
+    """A set of named metrics, rendered together."""
+
+    def __init__(self, multiprocess_dir: Optional[str] = None):
+        self.multiprocess_dir = Path(multiprocess_dir) if multiprocess_dir else None
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._file: Optional[_MmapFile] = None
+        self._file_pid = 0
 
     @classmethod
-    def snapshot(cls) -> Dict[str, int]:
-        with cls._lock:
-            return dict(cls._counters)
+    def from_env(cls) -> "Registry":
+        return cls(os.getenv(MULTIPROC_DIR_ENV) or None)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), multiprocess_mode: str = "sum") -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)  # type: ignore[return-value]
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                # Re-declaring (e.g. a module imported twice) returns the same metric
+                if type(existing) is not cls or existing.labelnames != tuple(labelnames):
+                    raise ValueError(f"Metric {name} is already registered as a different {existing.kind}")
+                return existing
+            metric = cls(self, name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def _process_file(self) -> _MmapFile:
+        with self._lock:
+            pid = os.getpid()
+            if self._file is None or self._file_pid != pid:
+                assert self.multiprocess_dir is not None
+                self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+                self._file = _MmapFile(self.multiprocess_dir / f"metrics_{pid}.db")
+                self._file_pid = pid
+            return self._file
+
+    def collect(self) -> List[Tuple[str, str, str, Samples]]:
+        """(name, kind, documentation, samples) for every metric, sorted by name."""
+        if self.multiprocess_dir is not None:
+            return self._collect_multiprocess()
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return [(m.name, m.kind, m.documentation, m.samples()) for m in metrics]
+
+    def _collect_multiprocess(self) -> List[Tuple[str, str, str, Samples]]:
+        merged: Dict[str, Tuple[str, Samples]] = {}
+        gauge_max: Dict[Tuple[str, Tuple], float] = {}
+        assert self.multiprocess_dir is not None
+        for path in sorted(self.multiprocess_dir.glob("metrics_*.db")):
+            try:
+                pid = int(path.stem.split("_", 1)[1])
+                entries = _read_file(path)
+            except (ValueError, OSError) as e:
+                logger.debug("Skipping metrics file %s: %s", path, e)
+                continue
+            alive = _pid_alive(pid)
+            for key, value in entries:
+                name, kind, mode, suffix, pairs = json.loads(key)
+                if kind == "gauge" and not alive:
+                    continue
+                sample = (suffix, tuple(tuple(p) for p in pairs))
+                _, samples = merged.setdefault(name, (kind, {}))
+                if kind == "gauge" and mode == "max":
+                    current = gauge_max.get((name, sample))
+                    gauge_max[(name, sample)] = value if current is None else max(current, value)
+                    samples[sample] = gauge_max[(name, sample)]
+                else:
+                    samples[sample] = samples.get(sample, 0.0) + value
+        out = []
+        for name in sorted(merged):
+            kind, samples = merged[name]
+            metric = self._metrics.get(name)
+            if kind == "histogram":
+                buckets = metric.buckets if isinstance(metric, Histogram) else sorted(
+                    {math.inf} | {float(dict(p)["le"]) for s, p in samples if s == "_bucket" and dict(p)["le"] != "+Inf"}
+                )
+                samples = _cumulate(samples, buckets)
+            out.append((name, kind, metric.documentation if metric else "", samples))
+        return out
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, kind, documentation, samples in self.collect():
+            if documentation:
+                lines.append(f"# HELP {name} {_escape(documentation, help_text=True)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (suffix, pairs), value in sorted(samples.items(), key=_sample_order):
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+                lines.append(f"{name}{suffix}{{{labels}}} {_format_value(value)}" if labels else f"{name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _sample_order(item):
+    (suffix, pairs), _ = item
+    rest = tuple(p for p in pairs if p[0] != "le")
+    le = dict(pairs).get("le")
+    return rest, suffix, (math.inf if le == "+Inf" else float(le)) if le is not None else 0.0
+
+
+def _escape(value: str, help_text: bool = False) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value if help_text else value.replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry.from_env()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (), multiprocess_mode: str = "sum") -> Gauge:
+    return REGISTRY.gauge(name, documentation, labelnames, multiprocess_mode)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+def render() -> str:
+    return REGISTRY.render()
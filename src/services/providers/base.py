@@ -6,8 +6,9 @@ without changing the public API. No external network I/O should occur in tests.
 """
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 
 from src.models.database import Problem
 
@@ -60,6 +61,17 @@ class ProviderBase:
                     "how_questions": [str]
                 }
 
+    Async variants (agenerate_hint, areview_code, aelaborate_prompts) return the
+    same shapes. By default they run the sync method in a worker thread so the
+    event loop is never blocked; providers doing network I/O override them and
+    use the pooled clients in ``http_pool``.
+
+    Streaming (astream_hint, astream_review) yields the same response in
+    chunks: partial dicts combined with ``merge_chunk`` (lists are appended,
+    dicts updated, other values replaced). The default yields the whole
+    response as one chunk; providers that generate incrementally yield the
+    envelope (problem_id/provider/model) first, then one item per chunk.
+
     Notes:
     - Implementations MUST avoid external I/O during unit tests.
     - If simulating latency, keep sleeps minimal (<20ms) to avoid slow tests.
@@ -76,3 +88,45 @@ class ProviderBase:
 
     def elaborate_prompts(self, problem: Problem, ctx: AIContext) -> Dict[str, Any]:
         raise NotImplementedError
+
+    async def agenerate_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.generate_hint, problem, query, ctx)
+
+    async def areview_code(self, code: str, rubric: Optional[Dict[str, Any]], ctx: AIContext, problem: Optional[Problem] = None) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.review_code, code, rubric, ctx, problem)
+
+    async def aelaborate_prompts(self, problem: Problem, ctx: AIContext) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.elaborate_prompts, problem, ctx)
+
+    async def astream_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> AsyncIterator[Dict[str, Any]]:
+        yield await self.agenerate_hint(problem, query, ctx)
+
+    async def astream_review(self, code: str, rubric: Optional[Dict[str, Any]], ctx: AIContext, problem: Optional[Problem] = None) -> AsyncIterator[Dict[str, Any]]:
+        yield await self.areview_code(code, rubric, ctx, problem)
+
+
+def merge_chunk(response: Dict[str, Any], chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold a streamed chunk into the response assembled so far (in place)."""
+    for key, value in chunk.items():
+        current = response.get(key)
+        if isinstance(current, list) and isinstance(value, list):
+            current.extend(value)
+        elif isinstance(current, dict) and isinstance(value, dict):
+            current.update(value)
+        elif isinstance(value, list):
+            response[key] = list(value)
+        elif isinstance(value, dict):
+            response[key] = dict(value)
+        else:
+            response[key] = value
+    return response
+
+
+def split_response(response: Dict[str, Any], fields: Iterable[str]) -> List[Dict[str, Any]]:
+    """Deterministic chunks for a complete response: the envelope, then one item of ``fields`` per chunk."""
+    fields = tuple(fields)
+    chunks = [{key: value for key, value in response.items() if key not in fields}]
+    for field in fields:
+        for item in response.get(field) or []:
+            chunks.append({field: [item]})
+    return chunks
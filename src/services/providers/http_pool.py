@@ -0,0 +1,133 @@
+"""
+Pooled async HTTP clients for AI providers.
+
+Each provider gets one ``httpx.AsyncClient`` per (base URL, event loop), so
+connections and TLS sessions are reused across requests instead of being
+opened per call. Every pooled client carries its provider's policy: timeouts,
+a concurrency limit, and retries for transport errors, 429 and 5xx responses
+with exponential backoff (honouring ``Retry-After``).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover - if httpx not installed, module still importable
+    httpx = None  # type: ignore
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Never wait longer than this between attempts, whatever Retry-After says
+MAX_BACKOFF_SECONDS = 10.0
+
+
+class ProviderHTTPError(RuntimeError):
+    """Raised when a provider request fails after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True)
+class HTTPPolicy:
+    timeout_seconds: float = 10.0
+    connect_timeout_seconds: float = 3.0
+    max_retries: int = 2
+    backoff_seconds: float = 0.25
+    max_concurrency: int = 8
+    max_connections: int = 20
+
+    @classmethod
+    def from_env(cls, provider: str) -> "HTTPPolicy":
+        """Defaults overridden by DSATRAIN_AI_HTTP_* env vars; a ``_<PROVIDER>`` suffix wins over the generic one."""
+        def value(name: str, default):
+            raw = os.getenv(f"DSATRAIN_AI_HTTP_{name}_{provider.upper().replace('-', '_')}") or os.getenv(f"DSATRAIN_AI_HTTP_{name}")
+            return type(default)(raw) if raw else default
+
+        base = cls()
+        return cls(
+            timeout_seconds=value("TIMEOUT_SECONDS", base.timeout_seconds),
+            connect_timeout_seconds=value("CONNECT_TIMEOUT_SECONDS", base.connect_timeout_seconds),
+            max_retries=value("MAX_RETRIES", base.max_retries),
+            backoff_seconds=value("BACKOFF_SECONDS", base.backoff_seconds),
+            max_concurrency=value("MAX_CONCURRENCY", base.max_concurrency),
+            max_connections=value("MAX_CONNECTIONS", base.max_connections),
+        )
+
+
+class PooledClient:
+    """A provider's shared AsyncClient plus its concurrency limit and retry policy."""
+
+    def __init__(self, provider: str, base_url: str, policy: HTTPPolicy, transport=None):
+        self.provider = provider
+        self.policy = policy
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(policy.timeout_seconds, connect=policy.connect_timeout_seconds),
+            limits=httpx.Limits(max_connections=policy.max_connections,
+                                max_keepalive_connections=policy.max_connections),
+            transport=transport,
+        )
+        self.semaphore = asyncio.Semaphore(policy.max_concurrency)
+
+    async def post_json(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            delay: Optional[float] = None
+            async with self.semaphore:
+                try:
+                    response = await self.client.post(path, json=payload, headers=headers)
+                except httpx.TransportError as e:  # connect/read errors and timeouts
+                    if attempt >= self.policy.max_retries:
+                        raise ProviderHTTPError(f"{self.provider} request failed: {e!r}") from e
+                else:
+                    if response.status_code < 400:
+                        return response.json()
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.policy.max_retries:
+                        raise ProviderHTTPError(
+                            f"{self.provider} request failed with HTTP {response.status_code}", response.status_code
+                        )
+                    delay = _retry_after(response)
+            # Back off outside the semaphore so waiting retries don't hold a slot
+            if delay is None:
+                delay = self.policy.backoff_seconds * (2 ** attempt)
+            await asyncio.sleep(min(delay, MAX_BACKOFF_SECONDS))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+# Clients are bound to the event loop that created them; a loop going away takes its clients with it
+_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], PooledClient]]" = weakref.WeakKeyDictionary()
+
+
+def get_client(provider: str, base_url: str, policy: Optional[HTTPPolicy] = None, transport=None) -> PooledClient:
+    """The pooled client for ``provider`` at ``base_url`` on the running event loop (created on first use)."""
+    if httpx is None:
+        raise RuntimeError("httpx is required for HTTP-backed AI providers")
+    pool = _POOLS.setdefault(asyncio.get_running_loop(), {})
+    key = (provider, base_url.rstrip("/"))
+    client = pool.get(key)
+    if client is None:
+        client = pool[key] = PooledClient(provider, key[1], policy or HTTPPolicy.from_env(provider), transport)
+    return client
+
+
+async def aclose_clients() -> None:
+    """Close every pooled client on the running loop (application shutdown)."""
+    pool = _POOLS.pop(asyncio.get_running_loop(), {})
+    for client in pool.values():
+        await client.aclose()
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
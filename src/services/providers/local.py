@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterator, List
 
 from src.models.database import Problem
-from .base import ProviderBase, AIContext
+from .base import ProviderBase, AIContext, split_response
 
 
 class LocalProvider(ProviderBase):
@@ -51,6 +51,14 @@ class LocalProvider(ProviderBase):
             "suggestions": suggestions,
         }
 
+    async def astream_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> AsyncIterator[Dict[str, Any]]:
+        for chunk in split_response(self.generate_hint(problem, query, ctx), ("hints",)):
+            yield chunk
+
+    async def astream_review(self, code: str, rubric: Optional[Dict[str, Any]], ctx: AIContext, problem: Optional[Problem] = None) -> AsyncIterator[Dict[str, Any]]:
+        for chunk in split_response(self.review_code(code, rubric, ctx, problem), ("strengths", "suggestions")):
+            yield chunk
+
     def elaborate_prompts(self, problem: Problem, ctx: AIContext) -> Dict[str, Any]:
         why = [
             "Why does this approach ensure correctness across edge cases?",
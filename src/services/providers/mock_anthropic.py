@@ -1,18 +1,15 @@
 from __future__ import annotations
 
-import time
 from typing import Optional, Dict, Any
 
 from src.models.database import Problem
-from .base import ProviderBase, AIContext
+from .base import AIContext
+from .mock_base import MockProviderBase
 
 
-class MockAnthropicProvider(ProviderBase):
+class MockAnthropicProvider(MockProviderBase):
     name = "anthropic"
 
-    def _sleep(self):
-        time.sleep(0.01)
-
     def generate_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> Dict[str, Any]:
         self._sleep()
         return {
@@ -0,0 +1,71 @@
+"""
+Shared behaviour for the mock providers.
+
+Mocks return canned responses after a short simulated latency. When a stub
+server URL is configured (``DSATRAIN_AI_STUB_URL`` or ``stub_url=``), their
+async methods POST to ``{stub_url}/{provider}/{action}`` through the pooled
+HTTP client instead, so the async path (connection reuse, timeouts, retries,
+concurrency limits) can be exercised offline against a local server.
+Without one, streaming yields the canned response in deterministic chunks,
+paced by the simulated latency.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from src.models.database import Problem
+from .base import ProviderBase, AIContext, split_response
+from .http_pool import HTTPPolicy, get_client
+
+STUB_URL_ENV = "DSATRAIN_AI_STUB_URL"
+
+
+class MockProviderBase(ProviderBase):
+    latency_seconds: float = 0.01
+
+    def __init__(self, stub_url: Optional[str] = None, policy: Optional[HTTPPolicy] = None):
+        self.stub_url = stub_url if stub_url is not None else (os.getenv(STUB_URL_ENV) or None)
+        self.policy = policy
+
+    def _sleep(self):
+        # Simulate realistic latency without slowing tests too much
+        time.sleep(self.latency_seconds)
+
+    async def agenerate_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> Dict[str, Any]:
+        if not self.stub_url:
+            return await super().agenerate_hint(problem, query, ctx)
+        return await self._from_stub("hint", ctx, {"problem_id": problem.id, "title": getattr(problem, "title", None), "query": query})
+
+    async def areview_code(self, code: str, rubric: Optional[Dict[str, Any]], ctx: AIContext, problem: Optional[Problem] = None) -> Dict[str, Any]:
+        if not self.stub_url:
+            return await super().areview_code(code, rubric, ctx, problem)
+        return await self._from_stub("review", ctx, {"code": code, "rubric": rubric, "problem_id": getattr(problem, "id", None)})
+
+    async def aelaborate_prompts(self, problem: Problem, ctx: AIContext) -> Dict[str, Any]:
+        if not self.stub_url:
+            return await super().aelaborate_prompts(problem, ctx)
+        return await self._from_stub("elaborate", ctx, {"problem_id": problem.id, "title": getattr(problem, "title", None)})
+
+    async def astream_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> AsyncIterator[Dict[str, Any]]:
+        async for chunk in self._paced(await self.agenerate_hint(problem, query, ctx), ("hints",)):
+            yield chunk
+
+    async def astream_review(self, code: str, rubric: Optional[Dict[str, Any]], ctx: AIContext, problem: Optional[Problem] = None) -> AsyncIterator[Dict[str, Any]]:
+        async for chunk in self._paced(await self.areview_code(code, rubric, ctx, problem), ("strengths", "suggestions")):
+            yield chunk
+
+    async def _paced(self, response: Dict[str, Any], fields: Tuple[str, ...]) -> AsyncIterator[Dict[str, Any]]:
+        for index, chunk in enumerate(split_response(response, fields)):
+            if index and not self.stub_url:
+                await asyncio.sleep(self.latency_seconds)
+            yield chunk
+
+    async def _from_stub(self, action: str, ctx: AIContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+        client = get_client(self.name, self.stub_url, self.policy)
+        result = await client.post_json(f"/{self.name}/{action}", {**payload, "model": ctx.model})
+        result.setdefault("provider", ctx.provider)
+        result.setdefault("model", ctx.model)
+        return result
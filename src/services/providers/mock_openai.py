@@ -1,20 +1,15 @@
 from __future__ import annotations
 
-import time
-import random
 from typing import Optional, Dict, Any
 
 from src.models.database import Problem
-from .base import ProviderBase, AIContext
+from .base import AIContext
+from .mock_base import MockProviderBase
 
 
-class MockOpenAIProvider(ProviderBase):
+class MockOpenAIProvider(MockProviderBase):
     name = "openai"
 
-    def _sleep(self):
-        # Simulate realistic latency without slowing tests too much
-        time.sleep(0.01)
-
     def generate_hint(self, problem: Problem, query: Optional[str], ctx: AIContext) -> Dict[str, Any]:
         self._sleep()
         return {
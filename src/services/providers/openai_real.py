@@ -23,10 +23,6 @@ class OpenAIRealProvider(ProviderBase):
             raise RuntimeError("OPENAI_API_KEY is not set")
         return key
 
-    def _client(self):
-        import httpx
-        return httpx.Client(timeout=10)
-
     def _model(self, ctx: AIContext) -> str:
         return ctx.model or "gpt-4o-mini"
 
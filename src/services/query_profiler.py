@@ -0,0 +1,242 @@
+"""
+Query profiler
+Per-request SQL statistics on top of the engine cursor hooks.
+
+``track_queries`` opens a scope (the metrics middleware opens one per
+request). Every statement executed inside it, on any engine and in any
+thread the scope's context reaches (sync endpoints and dependencies run in a
+threadpool with a copy of it), is counted, timed and fingerprinted: literals
+and bind parameters become ``?`` so the same ORM query from every loop
+iteration collapses into one fingerprint. Statements slower than
+``DSATRAIN_SLOW_QUERY_MS`` (default 250, 0 disables) are logged with their
+query plan, whether or not a scope is open.
+
+Finished request scopes are folded into per-route totals (``route_report``)
+so the statements that dominate a route can be read off a running server.
+Tests hold code to a query budget with the same scope (or, over HTTP, with
+the ``Server-Timing`` header the middleware adds)::
+
+    with track_queries() as stats:
+        get_database_stats(session)
+    assert stats.count <= 20, stats.report()
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_ENV = "DSATRAIN_SLOW_QUERY_MS"
+DEFAULT_SLOW_QUERY_MS = 250.0
+# Distinct fingerprints kept per route; the rest are folded into OTHER_FINGERPRINT
+MAX_FINGERPRINTS_PER_ROUTE = 50
+OTHER_FINGERPRINT = "<other>"
+
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_BIND = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement: literals and bind parameters become ``?``."""
+    text = _COMMENT.sub(" ", statement)
+    text = _STRING.sub("?", text)
+    text = _BIND.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _SPACE.sub(" ", text).strip()
+    # IN (?, ?, ?) with any number of values is still the same query
+    return _VALUE_LIST.sub("(?...)", text)
+
+
+class QueryStats:
+    """Queries executed in one ``track_queries`` scope."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.slow = 0
+        # fingerprint -> [executions, seconds]
+        self.statements: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, statement_fingerprint: str, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += elapsed
+            entry = self.statements.get(statement_fingerprint)
+            if entry is None:
+                self.statements[statement_fingerprint] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The most expensive fingerprints, by total time."""
+        with self._lock:
+            items = sorted(self.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+        return [{"fingerprint": fp, "count": int(n), "seconds": round(s, 6)} for fp, (n, s) in items]
+
+    def repeated(self, min_count: int = 2) -> Dict[str, int]:
+        """Fingerprints executed at least ``min_count`` times (N+1 candidates)."""
+        with self._lock:
+            return {fp: int(n) for fp, (n, _) in self.statements.items() if n >= min_count}
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {t['count']:>4}x {t['seconds'] * 1000:8.1f} ms  {t['fingerprint']}" for t in self.top()]
+        return "\n".join(lines)
+
+
+class _RouteTotals:
+    __slots__ = ("requests", "queries", "seconds", "statements")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, List[float]] = {}
+
+
+_CURRENT: ContextVar[Optional[QueryStats]] = ContextVar("dsatrain_query_stats", default=None)
+_routes: Dict[str, _RouteTotals] = {}
+_routes_lock = threading.Lock()
+
+
+def _threshold_from_env() -> Optional[float]:
+    raw = os.getenv(SLOW_QUERY_ENV)
+    try:
+        ms = float(raw) if raw not in (None, "") else DEFAULT_SLOW_QUERY_MS
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", SLOW_QUERY_ENV, raw)
+        ms = DEFAULT_SLOW_QUERY_MS
+    return ms / 1000.0 if ms > 0 else None
+
+
+# Seconds; None disables the slow query log
+slow_query_seconds: Optional[float] = _threshold_from_env()
+
+
+@contextmanager
+def track_queries(label: str = "", stats: Optional[QueryStats] = None) -> Iterator[QueryStats]:
+    """Collect statistics for the statements executed inside the block (into ``stats`` if given)."""
+    stats = stats if stats is not None else QueryStats(label)
+    token = _CURRENT.set(stats)
+    try:
+        yield stats
+    finally:
+        _CURRENT.reset(token)
+
+
+def record(cursor, statement: str, parameters: Any, executemany: bool, dialect: str, elapsed: float) -> None:
+    """Account one executed statement (called from the ``after_cursor_execute`` hook)."""
+    stats = _CURRENT.get()
+    if stats is not None:
+        stats.add(fingerprint(statement), elapsed)
+    threshold = slow_query_seconds
+    if threshold is None or elapsed < threshold:
+        return
+    if stats is not None:
+        stats.slow += 1
+    plan = None if executemany else explain(cursor, dialect, statement, parameters)
+    logger.warning(
+        "Slow query (%.1f ms)%s: %s%s",
+        elapsed * 1000,
+        f" in {stats.label}" if stats is not None and stats.label else "",
+        fingerprint(statement),
+        "\n  plan: " + "\n  plan: ".join(plan) if plan else "",
+    )
+
+
+def explain(cursor, dialect: str, statement: str, parameters: Any) -> Optional[List[str]]:
+    """The database's plan for a read statement, via a fresh DBAPI cursor (so no hooks fire).
+
+    On PostgreSQL the EXPLAIN runs inside a savepoint: a failed statement
+    would otherwise abort the caller's transaction.
+    """
+    prefix = _EXPLAIN_PREFIX.get(dialect)
+    words = statement.split(None, 1)
+    if prefix is None or not words or words[0].upper() not in ("SELECT", "WITH"):
+        return None
+    savepoint = dialect == "postgresql"
+    raw = None
+    try:
+        raw = cursor.connection.cursor()
+        if savepoint:
+            raw.execute("SAVEPOINT dsatrain_explain")
+        try:
+            raw.execute(prefix + statement, parameters if parameters is not None else ())
+            plan = [str(row[-1]) for row in raw.fetchall()]
+        except Exception:
+            if savepoint:
+                raw.execute("ROLLBACK TO SAVEPOINT dsatrain_explain")
+            raise
+        if savepoint:
+            raw.execute("RELEASE SAVEPOINT dsatrain_explain")
+        return plan
+    except Exception as e:
+        logger.debug("EXPLAIN failed: %s", e)
+        return None
+    finally:
+        if raw is not None:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+
+def record_route(route: str, stats: QueryStats) -> None:
+    """Fold a finished request's statistics into its route's totals."""
+    with stats._lock:
+        statements = list(stats.statements.items())
+    with _routes_lock:
+        totals = _routes.get(route)
+        if totals is None:
+            totals = _routes[route] = _RouteTotals()
+        totals.requests += 1
+        totals.queries += stats.count
+        totals.seconds += stats.seconds
+        for fp, (n, s) in statements:
+            if fp not in totals.statements and len(totals.statements) >= MAX_FINGERPRINTS_PER_ROUTE:
+                fp = OTHER_FINGERPRINT
+            entry = totals.statements.setdefault(fp, [0, 0.0])
+            entry[0] += n
+            entry[1] += s
+
+
+def route_report(limit: int = 10) -> List[Dict[str, Any]]:
+    """Per-route query totals, most DB time first, with each route's top fingerprints."""
+    with _routes_lock:
+        rows = []
+        for route, totals in _routes.items():
+            top = sorted(totals.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+            rows.append({
+                "route": route,
+                "requests": totals.requests,
+                "queries": totals.queries,
+                "queries_per_request": round(totals.queries / totals.requests, 2) if totals.requests else 0.0,
+                "db_seconds": round(totals.seconds, 6),
+                "top_statements": [
+                    {"fingerprint": fp, "count": int(n), "seconds": round(s, 6)} for fp, (n, s) in top
+                ],
+            })
+    return sorted(rows, key=lambda r: r["db_seconds"], reverse=True)
+
+
+def reset_routes() -> None:
+    with _routes_lock:
+        _routes.clear()
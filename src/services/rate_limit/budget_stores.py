@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+try:
+    import redis  # type: ignore
+except Exception:  # pragma: no cover - if redis not installed, module still importable
+    redis = None  # type: ignore
+
+from .common import BudgetExceeded
+
+# Session budgets are eventually cleaned up; every use extends the lifetime
+BUDGET_TTL_SECONDS = 7 * 24 * 3600
+# Hint budget counter, kept apart from the generic "hint" action usage like the in-memory limiter does
+HINT_BUDGET_ACTION = "hint_budget"
+
+
+class _SharedBudgetStore:
+    """Limiter-compatible per-session budget methods on top of per-action counters.
+
+    Subclasses provide ``get_action_usage``, ``_increment``, ``_decrement`` and
+    ``_clear``. Commits are conditional increments: a counter never goes past
+    its budget, even when several workers commit for the same session at once.
+    Releases refund a commit whose request ended up delivering nothing.
+    """
+
+    ttl_seconds: int = BUDGET_TTL_SECONDS
+
+    def check_hint_budget(self, session_id: Optional[str], budget_per_session: int) -> None:
+        if not session_id or int(budget_per_session or 0) <= 0:
+            return
+        if self.get_action_usage(session_id, HINT_BUDGET_ACTION) >= int(budget_per_session):
+            raise BudgetExceeded("Hint budget exceeded for this session.")
+
+    def commit_hint_usage(self, session_id: Optional[str], budget_per_session: int = 0) -> None:
+        if not session_id:
+            return
+        if not self._increment(session_id, HINT_BUDGET_ACTION, int(budget_per_session or 0)):
+            raise BudgetExceeded("Hint budget exceeded for this session.")
+
+    def release_hint_usage(self, session_id: Optional[str]) -> None:
+        if session_id:
+            self._decrement(session_id, HINT_BUDGET_ACTION)
+
+    def get_hint_usage(self, session_id: Optional[str]) -> int:
+        return self.get_action_usage(session_id, HINT_BUDGET_ACTION)
+
+    def check_action_budget(self, session_id: Optional[str], budget_per_session: int, action: str) -> None:
+        if not session_id or int(budget_per_session or 0) <= 0:
+            return
+        if self.get_action_usage(session_id, action) >= int(budget_per_session):
+            raise BudgetExceeded(f"{action.capitalize()} budget exceeded for this session.")
+
+    def commit_action_usage(self, session_id: Optional[str], action: str, budget_per_session: int = 0) -> None:
+        if not session_id:
+            return
+        if not self._increment(session_id, action, int(budget_per_session or 0)):
+            raise BudgetExceeded(f"{action.capitalize()} budget exceeded for this session.")
+
+    def release_action_usage(self, session_id: Optional[str], action: str) -> None:
+        if session_id:
+            self._decrement(session_id, action)
+
+    def reset(self, session_id: Optional[str] = None, reset_global: bool = True) -> None:
+        # The global request window belongs to the rate limiter, not the budget store
+        if session_id:
+            self._clear(session_id)
+
+    def get_action_usage(self, session_id: Optional[str], action: str) -> int:
+        raise NotImplementedError
+
+    def _increment(self, session_id: str, action: str, budget: int) -> bool:
+        raise NotImplementedError
+
+    def _decrement(self, session_id: str, action: str) -> None:
+        raise NotImplementedError
+
+    def _clear(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+def server_epoch_sql(dialect_name: str) -> str:
+    """SQL for the database clock in epoch seconds."""
+    if dialect_name == "postgresql":
+        return "extract(epoch from now())"
+    return "CAST(strftime('%s', 'now') AS REAL)"
+
+
+class SQLBudgetStore(_SharedBudgetStore):
+    """Per-session budgets in the ``ai_budget_usage`` table (SQLite or Postgres).
+
+    Expiry is stamped from the database clock and expired rows are purged on
+    write, so TTLs hold across workers regardless of their local clocks.
+    """
+
+    def __init__(self, engine: Engine, ttl_seconds: int = BUDGET_TTL_SECONDS):
+        self.engine = engine
+        self.ttl_seconds = int(ttl_seconds)
+        self._now_sql = server_epoch_sql(engine.dialect.name)
+
+    def get_action_usage(self, session_id: Optional[str], action: str) -> int:
+        if not session_id:
+            return 0
+        with self.engine.connect() as conn:
+            used = conn.execute(
+                text(f"SELECT used FROM ai_budget_usage WHERE session_id = :session AND action = :action "
+                     f"AND expires_at > {self._now_sql}"),
+                {"session": session_id, "action": action},
+            ).scalar()
+        return int(used or 0)
+
+    def _increment(self, session_id: str, action: str, budget: int) -> bool:
+        params = {"session": session_id, "action": action, "ttl": self.ttl_seconds, "budget": budget}
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM ai_budget_usage WHERE expires_at <= {self._now_sql}"))
+            conn.execute(
+                text(f"INSERT INTO ai_budget_usage (session_id, action, used, expires_at) "
+                     f"VALUES (:session, :action, 0, {self._now_sql} + :ttl) "
+                     f"ON CONFLICT (session_id, action) DO NOTHING"),
+                params,
+            )
+            condition = " AND used < :budget" if budget > 0 else ""
+            updated = conn.execute(
+                text(f"UPDATE ai_budget_usage SET used = used + 1, expires_at = {self._now_sql} + :ttl "
+                     f"WHERE session_id = :session AND action = :action{condition}"),
+                params,
+            ).rowcount
+        return bool(updated)
+
+    def _decrement(self, session_id: str, action: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("UPDATE ai_budget_usage SET used = used - 1 "
+                     "WHERE session_id = :session AND action = :action AND used > 0"),
+                {"session": session_id, "action": action},
+            )
+
+    def _clear(self, session_id: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM ai_budget_usage WHERE session_id = :session"), {"session": session_id})
+
+
+# KEYS[1] = session hash; ARGV = action, budget, ttl. Returns the new count, or -1 when over budget
+INCREMENT_LUA = """
+local used = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+local budget = tonumber(ARGV[2])
+if budget > 0 and used >= budget then
+  return -1
+end
+local count = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return count
+"""
+
+# KEYS[1] = session hash; ARGV = action. Never goes below zero
+DECREMENT_LUA = """
+if tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0') > 0 then
+  redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+end
+"""
+
+
+class RedisBudgetStore(_SharedBudgetStore):
+    """Per-session budgets as one Redis hash per session (field per action) with a TTL."""
+
+    def __init__(self, redis_url: Optional[str] = None, ttl_seconds: int = BUDGET_TTL_SECONDS, client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("redis-py is not installed; cannot enable the Redis budget store")
+            url = redis_url or os.getenv("DSATRAIN_REDIS_URL", "redis://localhost:6379/0")
+            client = redis.StrictRedis.from_url(url)  # type: ignore[attr-defined]
+        self.r = client
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = "dsatrain:budget:"
+        self._increment_script = self.r.register_script(INCREMENT_LUA)
+        self._decrement_script = self.r.register_script(DECREMENT_LUA)
+
+    def get_action_usage(self, session_id: Optional[str], action: str) -> int:
+        if not session_id:
+            return 0
+        used = self.r.hget(f"{self.prefix}{session_id}", action)
+        return int(used) if used else 0
+
+    def _increment(self, session_id: str, action: str, budget: int) -> bool:
+        count = self._increment_script(keys=[f"{self.prefix}{session_id}"], args=[action, budget, self.ttl_seconds])
+        return int(count) >= 0
+
+    def _decrement(self, session_id: str, action: str) -> None:
+        self._decrement_script(keys=[f"{self.prefix}{session_id}"], args=[action])
+
+    def _clear(self, session_id: str) -> None:
+        self.r.delete(f"{self.prefix}{session_id}")
@@ -76,12 +76,24 @@ class InMemoryRateLimiter:
             if used >= int(budget_per_session):
                 raise BudgetExceeded("Hint budget exceeded for this session.")
 
-    def commit_hint_usage(self, session_id: Optional[str]) -> None:
-        """Commit one hint usage for the session after successful generation."""
+    def commit_hint_usage(self, session_id: Optional[str], budget_per_session: int = 0) -> None:
+        """Count one hint for the session; raises instead of going past a positive budget."""
         if not session_id:
             return
         with InMemoryRateLimiter._lock:
-            InMemoryRateLimiter._hints_by_session[session_id] = InMemoryRateLimiter._hints_by_session.get(session_id, 0) + 1
+            used = InMemoryRateLimiter._hints_by_session.get(session_id, 0)
+            if int(budget_per_session or 0) > 0 and used >= int(budget_per_session):
+                raise BudgetExceeded("Hint budget exceeded for this session.")
+            InMemoryRateLimiter._hints_by_session[session_id] = used + 1
+
+    def release_hint_usage(self, session_id: Optional[str]) -> None:
+        """Refund a committed hint that was never delivered."""
+        if not session_id:
+            return
+        with InMemoryRateLimiter._lock:
+            used = InMemoryRateLimiter._hints_by_session.get(session_id, 0)
+            if used > 0:
+                InMemoryRateLimiter._hints_by_session[session_id] = used - 1
 
     def get_hint_usage(self, session_id: Optional[str]) -> int:
         if not session_id:
@@ -98,12 +110,24 @@ class InMemoryRateLimiter:
             if used >= int(budget_per_session):
                 raise BudgetExceeded(f"{action.capitalize()} budget exceeded for this session.")
 
-    def commit_action_usage(self, session_id: Optional[str], action: str) -> None:
+    def commit_action_usage(self, session_id: Optional[str], action: str, budget_per_session: int = 0) -> None:
+        if not session_id:
+            return
+        with InMemoryRateLimiter._lock:
+            key = (session_id, action)
+            used = InMemoryRateLimiter._usage_by_session_and_action.get(key, 0)
+            if int(budget_per_session or 0) > 0 and used >= int(budget_per_session):
+                raise BudgetExceeded(f"{action.capitalize()} budget exceeded for this session.")
+            InMemoryRateLimiter._usage_by_session_and_action[key] = used + 1
+
+    def release_action_usage(self, session_id: Optional[str], action: str) -> None:
         if not session_id:
             return
         with InMemoryRateLimiter._lock:
             key = (session_id, action)
-            InMemoryRateLimiter._usage_by_session_and_action[key] = InMemoryRateLimiter._usage_by_session_and_action.get(key, 0) + 1
+            used = InMemoryRateLimiter._usage_by_session_and_action.get(key, 0)
+            if used > 0:
+                InMemoryRateLimiter._usage_by_session_and_action[key] = used - 1
 
     def get_action_usage(self, session_id: Optional[str], action: str) -> int:
         if not session_id:
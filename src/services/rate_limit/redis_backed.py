@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import math
 import os
-import time
+import uuid
 from typing import Optional
 
 try:
@@ -11,6 +12,29 @@ except Exception:  # pragma: no cover - if redis not installed, module still imp
 
 from .common import RateLimitExceeded, BudgetExceeded, RateStatus
 
+# Check and record in one atomic step, so concurrent workers cannot both pass
+# the check before either has recorded. Scores are server-time milliseconds,
+# which keeps workers on different hosts on one clock.
+# KEYS[1] = window zset; ARGV = window_ms, limit, member
+# Returns {allowed (0/1), used after the call, retry_after_ms}
+SLIDING_WINDOW_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local used = redis.call('ZCARD', KEYS[1])
+if limit > 0 and used >= limit then
+  local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+  local retry = window
+  if oldest[2] then retry = tonumber(oldest[2]) + window - now end
+  return {0, used, retry}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, used + 1, 0}
+"""
+
 
 class RedisRateLimiter:
     """Redis-backed sliding window limiter and per-session budgets.
@@ -29,40 +53,31 @@ class RedisRateLimiter:
         mdl = model or "default"
         self.bucket_key = f"dsatrain:rl:{prov}:{mdl}"
         self.hint_prefix = "dsatrain:hints:"
+        # Sorted set of request ids scored by server time in milliseconds
+        self.window_key = f"{self.bucket_key}:z"
+        self._sliding_window = self.r.register_script(SLIDING_WINDOW_LUA)
 
     def check_and_increment(self):
-        now = int(time.time())
-        pipe = self.r.pipeline()
-        # Use a sorted set for timestamps within the window
-        zkey = f"{self.bucket_key}:z"
-        pipe.zremrangebyscore(zkey, 0, now - self.window)
-        pipe.zcard(zkey)
-        res = pipe.execute()
-        used = int(res[1]) if len(res) >= 2 else 0
-        if self.limit > 0 and used >= self.limit:
-            # Compute retry-after as time until next item expires (approximate)
-            oldest = self.r.zrange(zkey, 0, 0, withscores=True)
-            retry_after = 1
-            if oldest:
-                oldest_ts = int(oldest[0][1])
-                retry_after = max(1, (oldest_ts + self.window) - now)
-            raise RateLimitExceeded("Rate limit exceeded. Try again later.", retry_after)
-        # Record current request
-        pipe = self.r.pipeline()
-        pipe.zadd(zkey, {str(now): now})
-        pipe.expire(zkey, self.window)
-        pipe.execute()
+        # Unique member per request: equal timestamps must not collapse into one entry
+        allowed, _used, retry_ms = self._sliding_window(
+            keys=[self.window_key], args=[self.window * 1000, self.limit, uuid.uuid4().hex]
+        )
+        if not int(allowed):
+            raise RateLimitExceeded("Rate limit exceeded. Try again later.", max(1, math.ceil(int(retry_ms) / 1000)))
+
+    def _server_time_ms(self) -> int:
+        seconds, micros = self.r.time()
+        return int(seconds) * 1000 + int(micros) // 1000
 
     def status(self) -> RateStatus:
-        now = int(time.time())
-        zkey = f"{self.bucket_key}:z"
-        self.r.zremrangebyscore(zkey, 0, now - self.window)
-        used = int(self.r.zcard(zkey))
-        oldest = self.r.zrange(zkey, 0, 0, withscores=True)
+        now = self._server_time_ms()
+        window_ms = self.window * 1000
+        self.r.zremrangebyscore(self.window_key, "-inf", now - window_ms)
+        used = int(self.r.zcard(self.window_key))
+        oldest = self.r.zrange(self.window_key, 0, 0, withscores=True)
         reset = None
         if oldest:
-            oldest_ts = int(oldest[0][1])
-            reset = max(0, (oldest_ts + self.window) - now)
+            reset = max(0, math.ceil((int(oldest[0][1]) + window_ms - now) / 1000))
         return RateStatus(used=used, limit=self.limit, window_seconds=self.window, reset_seconds=reset)
 
     def enforce_and_count_hint(self, session_id: Optional[str], budget_per_session: int):
@@ -89,14 +104,25 @@ class RedisRateLimiter:
         if count >= int(budget_per_session):
             raise BudgetExceeded("Hint budget exceeded for this session.")
 
-    def commit_hint_usage(self, session_id: Optional[str]) -> None:
+    def commit_hint_usage(self, session_id: Optional[str], budget_per_session: int = 0) -> None:
         if not session_id:
             return
         key = f"{self.hint_prefix}{session_id}"
         pipe = self.r.pipeline()
         pipe.incr(key)
         pipe.expire(key, 7 * 24 * 3600)
-        pipe.execute()
+        count = int(pipe.execute()[0])
+        # INCR is atomic, so of concurrent commits only those within the budget keep their slot
+        if int(budget_per_session or 0) > 0 and count > int(budget_per_session):
+            self.r.decr(key)
+            raise BudgetExceeded("Hint budget exceeded for this session.")
+
+    def release_hint_usage(self, session_id: Optional[str]) -> None:
+        if not session_id:
+            return
+        key = f"{self.hint_prefix}{session_id}"
+        if self.r.decr(key) < 0:
+            self.r.incr(key)
 
     def get_hint_usage(self, session_id: Optional[str]) -> int:
         if not session_id:
@@ -108,9 +134,8 @@ class RedisRateLimiter:
     def reset(self, session_id: Optional[str] = None, reset_global: bool = True):
         if reset_global:
             # Delete bucket keys (zset)
-            zkey = f"{self.bucket_key}:z"
             try:
-                self.r.delete(zkey)
+                self.r.delete(self.window_key)
             except Exception:
                 pass
         if session_id:
@@ -0,0 +1,283 @@
+"""
+Request profiler
+Opt-in stack sampling of API requests into flamegraph-ready collapsed stacks.
+
+A single background thread wakes every ``interval`` seconds while at least
+one request is being profiled and records, per profiled request, the stacks
+of the threads working on it:
+
+- the event loop thread, when the running task is inside that request's
+  middleware frame (async endpoints, middleware, streaming bodies);
+- threadpool workers, when the function they run was handed the request's
+  context (sync endpoints and dependencies: Starlette runs them through
+  anyio, which keeps that context in a ``context`` local of its worker loop;
+  only that loop's frame is read, never locals of arbitrary frames).
+
+Unlike cProfile, this follows a request across threads, does not slow down
+the code being measured, and costs nothing for requests that are not
+sampled. Finished profiles are kept per route in bounded ring buffers and
+exported in the collapsed format (``frame;frame;frame count`` per line)
+read by flamegraph.pl, speedscope and inferno.
+
+Off unless ``DSATRAIN_PROFILING`` is set; with it on, a fraction
+``DSATRAIN_PROFILE_SAMPLE_RATE`` of requests (default 0.01) is profiled,
+plus every request sent with an ``X-Profile: 1`` header.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ENABLED_ENV = "DSATRAIN_PROFILING"
+SAMPLE_RATE_ENV = "DSATRAIN_PROFILE_SAMPLE_RATE"
+INTERVAL_ENV = "DSATRAIN_PROFILE_INTERVAL_MS"
+BUFFER_ENV = "DSATRAIN_PROFILE_BUFFER"
+PROFILE_HEADER = b"x-profile"
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_BUFFER = 20  # Profiles kept per route
+MAX_STACK_DEPTH = 128
+
+_ACTIVE_PROFILE: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "dsatrain_request_profile", default=None
+)
+_ids = itertools.count(1)
+
+
+def profiling_enabled() -> bool:
+    return os.getenv(ENABLED_ENV, "0") in ("1", "true", "True")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", name, os.getenv(name))
+        return default
+
+
+@dataclass(eq=False)
+class RequestProfile:
+    method: str
+    path: str
+    trigger: str  # "sampled" or "header"
+    id: int = field(default_factory=lambda: next(_ids))
+    route: str = ""
+    started_at: float = field(default_factory=time.time)
+    duration_seconds: float = 0.0
+    samples: int = 0
+    # Collapsed stack (root first, ";"-separated) -> sample count
+    stacks: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "route": self.route,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_seconds * 1000, 3),
+            "samples": self.samples,
+        }
+
+
+def collapse(profiles: List[RequestProfile]) -> str:
+    """Merge profiles into collapsed-stack text, heaviest stacks first."""
+    merged: Dict[str, int] = {}
+    for profile in profiles:
+        for stack, count in profile.stacks.items():
+            merged[stack] = merged.get(stack, 0) + count
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(merged.items(), key=lambda kv: -kv[1]))
+
+
+class StackSampler:
+    """Samples the threads serving active profiles; the thread idles while there are none."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        # Active profile -> its middleware frame (the root of its stacks on the event loop thread)
+        self._active: Dict[RequestProfile, Any] = {}
+        self._wake = threading.Condition()
+        # Held for a whole sample, so stop() can wait until nothing writes to a profile
+        self._sampling = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+
+    def start(self, profile: RequestProfile, anchor_frame) -> None:
+        with self._wake:
+            self._active[profile] = anchor_frame
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def stop(self, profile: RequestProfile) -> None:
+        """Stop sampling ``profile``; once this returns, its stacks are no longer written."""
+        with self._wake:
+            self._active.pop(profile, None)
+        with self._sampling:
+            pass  # Wait out a sample that may still hold the profile
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._wake:
+                while not self._active:
+                    self._wake.wait()
+            with self._sampling:
+                with self._wake:
+                    active = dict(self._active)
+                try:
+                    self._sample(active, me)
+                except Exception as e:  # Never let a sampling glitch kill the thread
+                    logger.debug("Profiler sample failed: %s", e)
+            time.sleep(self.interval_seconds)
+
+    def _sample(self, active: Dict[RequestProfile, Any], me: int) -> None:
+        anchors = {id(frame): profile for profile, frame in active.items()}
+        for ident, leaf in sys._current_frames().items():
+            if ident == me:
+                continue
+            frames = []
+            owner = None
+            frame = leaf
+            while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                owner = anchors.get(id(frame))
+                if owner is not None:
+                    frames.append(frame)
+                    break
+                owner = _context_owner(frame)
+                if owner is not None:
+                    break
+                frames.append(frame)
+                frame = frame.f_back
+            if owner is None or owner not in active or not frames:
+                continue
+            stack = ";".join(self._label(f.f_code, f.f_globals) for f in reversed(frames))
+            owner.stacks[stack] = owner.stacks.get(stack, 0) + 1
+            owner.samples += 1
+
+    def _label(self, code, module_globals) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{module_globals.get('__name__', '?')}:{code.co_qualname}"
+            if len(self._labels) < 65536:
+                self._labels[code] = label
+        return label
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_loop_codes() -> FrozenSet[Any]:
+    """Code objects of the threadpool worker loops that hold a request's ``context``."""
+    try:
+        from anyio._backends._asyncio import WorkerThread
+    except Exception:  # anyio moved it; threadpool work goes unattributed
+        return frozenset()
+    return frozenset({WorkerThread.run.__code__})
+
+
+def _context_owner(frame) -> Optional[RequestProfile]:
+    """The profile carried by a worker loop's ``context`` local, if this frame is one."""
+    if frame.f_code not in _worker_loop_codes():
+        return None
+    context = frame.f_locals.get("context")
+    if isinstance(context, contextvars.Context):
+        return context.get(_ACTIVE_PROFILE)
+    return None
+
+
+class ProfileStore:
+    """Finished profiles, a bounded ring buffer per route."""
+
+    def __init__(self, per_route: int = DEFAULT_BUFFER):
+        self.per_route = per_route
+        self._by_route: Dict[str, Deque[RequestProfile]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            ring = self._by_route.get(profile.route)
+            if ring is None:
+                ring = self._by_route[profile.route] = deque(maxlen=self.per_route)
+            ring.append(profile)
+
+    def profiles(self, route: Optional[str] = None) -> List[RequestProfile]:
+        """Stored profiles, newest first."""
+        with self._lock:
+            rings = [self._by_route.get(route, ())] if route is not None else list(self._by_route.values())
+            found = [p for ring in rings for p in ring]
+        return sorted(found, key=lambda p: p.id, reverse=True)
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        return next((p for p in self.profiles() if p.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_route.clear()
+
+
+class Profiler:
+    """Decides which requests to profile and files the results."""
+
+    def __init__(self, sample_rate: float = DEFAULT_SAMPLE_RATE, interval_seconds: float = DEFAULT_INTERVAL_MS / 1000,
+                 per_route: int = DEFAULT_BUFFER):
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.sampler = StackSampler(interval_seconds)
+        self.store = ProfileStore(per_route)
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(
+            sample_rate=_env_float(SAMPLE_RATE_ENV, DEFAULT_SAMPLE_RATE),
+            interval_seconds=max(0.001, _env_float(INTERVAL_ENV, DEFAULT_INTERVAL_MS) / 1000),
+            per_route=max(1, int(_env_float(BUFFER_ENV, DEFAULT_BUFFER))),
+        )
+
+    def trigger(self, headers) -> Optional[str]:
+        """Why this request should be profiled, or None."""
+        for name, value in headers:
+            if name == PROFILE_HEADER and value.strip() in (b"1", b"true"):
+                return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def begin(self, profile: RequestProfile, anchor_frame) -> contextvars.Token:
+        token = _ACTIVE_PROFILE.set(profile)
+        self.sampler.start(profile, anchor_frame)
+        return token
+
+    def end(self, profile: RequestProfile, token: contextvars.Token, route: str, duration_seconds: float) -> None:
+        self.sampler.stop(profile)
+        _ACTIVE_PROFILE.reset(token)
+        profile.route = route
+        profile.duration_seconds = duration_seconds
+        self.store.add(profile)
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = Profiler.from_env()
+    return _profiler
@@ -0,0 +1,259 @@
+"""
+ResponseCache: bounded LRU + TTL cache for idempotent AI responses.
+
+Entries are stored as JSON text, which makes size accounting exact and gives
+every caller its own copy (nobody can mutate what the cache holds). Limits
+apply to both the number of entries and their total size; the least recently
+used entries go first, expired ones whenever they are met.
+
+An optional Redis tier shares entries between worker processes. Concurrent
+``get_or_compute`` calls for the same key within a process are coalesced:
+one caller computes, the others wait for and share its result.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    import redis  # type: ignore
+except Exception:  # pragma: no cover - if redis not installed, module still importable
+    redis = None  # type: ignore
+
+from src.services import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 60
+
+CACHE_LOOKUPS = metrics.counter("dsatrain_ai_cache_lookups_total", "AI response cache lookups", ["action", "outcome"])
+CACHE_EVICTIONS = metrics.counter("dsatrain_ai_cache_evictions_total", "AI response cache LRU evictions")
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, redis_client=None, redis_prefix: str = "dsatrain:aicache:"):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self.redis = redis_client
+        self.redis_prefix = redis_prefix
+        # key -> (expires_at monotonic, JSON text)
+        self._entries: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple, Future] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Limits from DSATRAIN_AI_CACHE_* env vars; DSATRAIN_AI_CACHE_REDIS=1 adds the Redis tier."""
+        redis_client = None
+        if os.getenv("DSATRAIN_AI_CACHE_REDIS", "0") in ("1", "true", "True"):
+            if redis is None:
+                logger.warning("DSATRAIN_AI_CACHE_REDIS is set but redis-py is not installed; using the local cache only")
+            else:
+                url = os.getenv("DSATRAIN_REDIS_URL", "redis://localhost:6379/0")
+                redis_client = redis.StrictRedis.from_url(url)  # type: ignore[attr-defined]
+        return cls(
+            max_entries=int(os.getenv("DSATRAIN_AI_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            max_bytes=int(os.getenv("DSATRAIN_AI_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            ttl_seconds=float(os.getenv("DSATRAIN_AI_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            redis_client=redis_client,
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, action: str, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Fresh copy of the cached response, or None (counted as hit/miss per action)."""
+        text = self._lookup((action, key))
+        self._count(action, "hit" if text is not None else "miss")
+        return json.loads(text) if text is not None else None
+
+    def set(self, action: str, key: Hashable, value: Dict[str, Any]) -> None:
+        text = _serialize(value)
+        if text is not None:
+            self._publish((action, key), text)
+
+    def get_or_compute(self, action: str, key: Hashable,
+                       compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Cached response, or ``compute()`` run once for all concurrent callers.
+
+        Returns ``(response, computed)``; ``computed`` is True only for the
+        caller that ran ``compute``. Errors propagate to every waiting caller.
+        """
+        full_key = (action, key)
+        text, inflight, leader = self._claim(full_key)
+        if text is not None:
+            return json.loads(text), False
+        if not leader:
+            return json.loads(inflight.result()), False
+        try:
+            value = compute()
+        except BaseException as e:
+            self._abandon(full_key, inflight, e)
+            raise
+        return self._complete(full_key, inflight, value)
+
+    async def aget_or_compute(self, action: str, key: Hashable,
+                              compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """``get_or_compute`` for coroutines; waiters await the leader without blocking the loop.
+
+        Sync and async callers of the same key share one in-flight computation.
+        """
+        full_key = (action, key)
+        text, inflight, leader = self._claim(full_key)
+        if text is not None:
+            return json.loads(text), False
+        if not leader:
+            return json.loads(await asyncio.wrap_future(inflight)), False
+        try:
+            value = await compute()
+        except BaseException as e:
+            # Includes cancellation: waiters must not hang on an abandoned computation
+            self._abandon(full_key, inflight, e)
+            raise
+        return self._complete(full_key, inflight, value)
+
+    def _claim(self, full_key: Tuple) -> Tuple[Optional[str], Optional[Future], bool]:
+        """(cached text, in-flight future, whether this caller must compute)."""
+        action = full_key[0]
+        with self._lock:
+            text = self._lookup_locked(full_key)
+            inflight = self._inflight.get(full_key) if text is None else None
+            leader = text is None and inflight is None
+            if leader:
+                inflight = self._inflight[full_key] = Future()
+        if text is None and leader and self.redis is not None:
+            text = self._redis_lookup(full_key)
+            if text is not None:
+                self._resolve(full_key, text)
+        if text is not None:
+            self._count(action, "hit")
+        elif not leader:
+            self._count(action, "coalesced")
+        else:
+            self._count(action, "miss")
+        return text, inflight, leader and text is None
+
+    def _complete(self, full_key: Tuple, inflight: Future, value: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        text = _serialize(value)
+        if text is not None:
+            self._publish(full_key, text)
+        with self._lock:
+            self._inflight.pop(full_key, None)
+        if text is None:
+            inflight.set_exception(RuntimeError("Response is not cacheable"))
+            return value, True
+        inflight.set_result(text)
+        return json.loads(text), True
+
+    def _abandon(self, full_key: Tuple, inflight: Future, error: BaseException) -> None:
+        with self._lock:
+            self._inflight.pop(full_key, None)
+        if isinstance(error, asyncio.CancelledError):
+            # The leader's request went away; that is a failure, not a cancellation, for the waiters
+            error = RuntimeError("Response computation was cancelled")
+        inflight.set_exception(error)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _publish(self, full_key: Tuple, text: str) -> None:
+        self._store(full_key, text)
+        if self.redis is not None:
+            try:
+                self.redis.set(self._redis_key(full_key), text, px=int(self.ttl_seconds * 1000))
+            except Exception as e:
+                logger.debug("Redis response cache write failed: %s", e)
+
+    def _resolve(self, full_key: Tuple, text: str) -> None:
+        """Publish a Redis-tier hit locally and release the callers waiting on it."""
+        self._store(full_key, text)
+        with self._lock:
+            inflight = self._inflight.pop(full_key, None)
+        if inflight is not None:
+            inflight.set_result(text)
+
+    def _lookup(self, full_key: Tuple) -> Optional[str]:
+        with self._lock:
+            text = self._lookup_locked(full_key)
+        if text is None and self.redis is not None:
+            text = self._redis_lookup(full_key)
+            if text is not None:
+                self._store(full_key, text)
+        return text
+
+    def _lookup_locked(self, full_key: Tuple) -> Optional[str]:
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(full_key)
+            return None
+        self._entries.move_to_end(full_key)
+        return entry[1]
+
+    def _store(self, full_key: Tuple, text: str) -> None:
+        if len(text) > self.max_bytes:
+            return
+        with self._lock:
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (time.monotonic() + self.ttl_seconds, text)
+            self._bytes += len(text)
+            if len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                # Expired entries first, then least recently used, until within limits
+                now = time.monotonic()
+                for stale in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    self._drop(stale)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                CACHE_EVICTIONS.inc()
+
+    def _drop(self, full_key: Tuple) -> None:
+        _, text = self._entries.pop(full_key)
+        self._bytes -= len(text)
+
+    def _redis_key(self, full_key: Tuple) -> str:
+        digest = hashlib.sha256(json.dumps(full_key, default=str).encode("utf-8")).hexdigest()
+        return f"{self.redis_prefix}{digest}"
+
+    def _redis_lookup(self, full_key: Tuple) -> Optional[str]:
+        try:
+            raw = self.redis.get(self._redis_key(full_key))
+        except Exception as e:
+            logger.debug("Redis response cache read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    @staticmethod
+    def _count(action: str, outcome: str) -> None:
+        CACHE_LOOKUPS.labels(action, outcome).inc()
+
+
+def _serialize(value: Dict[str, Any]) -> Optional[str]:
+    try:
+        return json.dumps(value)
+    except (TypeError, ValueError):
+        # Not JSON-serializable: not cacheable either
+        return None
@@ -0,0 +1,156 @@
+"""
+Full-text search index for problems.
+
+Serves a TF-IDF index (src/ml/tfidf_index.py) over problem title + description
+to free-text search ranking and "similar problems". Titles are counted twice
+so a term in the title outweighs the same term deep in a description.
+
+The data import publishes the index to disk (``publish_search_index``); API
+processes memory-map the published version when its catalogue fingerprint
+matches their database, and otherwise build one in memory. After Problem rows
+change the index is refreshed incrementally on the next lookup: texts are
+streamed from the database and only rows whose content hash changed are
+re-tokenized.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from src.ml.tfidf_index import TfidfIndex, load_published_index, publish_index
+from src.models.database import Problem
+
+DEFAULT_INDEX_DIR = Path(os.getenv(
+    "DSATRAIN_TFIDF_INDEX",
+    str(Path(__file__).parent.parent.parent / "data" / "processed" / "search" / "tfidf"),
+))
+_TITLE_WEIGHT = 2
+_REVALIDATE_SECONDS = 30.0
+
+
+def document_text(title: Optional[str], description: Optional[str]) -> str:
+    title = title or ""
+    return " ".join([title] * _TITLE_WEIGHT + [description or ""])
+
+
+def _documents(session: Session) -> Iterator[Tuple[str, str]]:
+    rows = session.query(Problem.id, Problem.title, Problem.description).order_by(Problem.id).yield_per(1000)
+    for problem_id, title, description in rows:
+        yield problem_id, document_text(title, description)
+
+
+def _database_key(session: Session) -> str:
+    url = session.get_bind().url.render_as_string(hide_password=True)
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+
+def _catalogue_fingerprint(session: Session) -> list:
+    count, last_update = session.query(func.count(Problem.id), func.max(Problem.updated_at)).one()
+    return [count, str(last_update)]
+
+
+def _refreshed(session: Session, previous: Optional[TfidfIndex]) -> TfidfIndex:
+    metadata = {"database": _database_key(session), "fingerprint": _catalogue_fingerprint(session)}
+    if previous is None:
+        return TfidfIndex.build(_documents(session), metadata=metadata)
+    return previous.updated(_documents(session), metadata=metadata)
+
+
+def _published_for(session: Session, root: Path) -> Optional[TfidfIndex]:
+    published = load_published_index(root)
+    if published is None or published.metadata.get("database") != _database_key(session):
+        return None
+    return published
+
+
+def publish_search_index(session: Session, root: Optional[Path] = None) -> Path:
+    """Bring the on-disk index up to date with the database and publish it."""
+    root = Path(root or DEFAULT_INDEX_DIR)
+    index = _refreshed(session, _published_for(session, root))
+    path = publish_index(index, root)
+    _remember(session, index)
+    return path
+
+
+class _Cached:
+    def __init__(self, index: TfidfIndex):
+        self.index = index
+        self.checked_at = time.monotonic()
+
+
+_indexes: Dict[str, _Cached] = {}
+_stale: set = set()
+_lock = threading.Lock()
+
+
+def _index_key(session: Session) -> str:
+    return str(session.get_bind().url)
+
+
+def _remember(session: Session, index: TfidfIndex) -> None:
+    with _lock:
+        _indexes[_index_key(session)] = _Cached(index)
+        _stale.discard(_index_key(session))
+
+
+def _is_current(session: Session, cached: _Cached) -> bool:
+    now = time.monotonic()
+    if now - cached.checked_at < _REVALIDATE_SECONDS:
+        return True
+    cached.checked_at = now
+    return _catalogue_fingerprint(session) == cached.index.metadata.get("fingerprint")
+
+
+def get_search_index(session: Session, root: Optional[Path] = None) -> TfidfIndex:
+    """Index for the session's database, loaded, built or incrementally refreshed as needed."""
+    key = _index_key(session)
+    cached = _indexes.get(key)
+    if cached is not None and key not in _stale:
+        if _is_current(session, cached):
+            return cached.index
+        _stale.add(key)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is None or key in _stale:
+            if cached is not None:
+                # Content hashes decide what changed; the fingerprint is too coarse here
+                index = _refreshed(session, cached.index)
+            else:
+                published = _published_for(session, Path(root or DEFAULT_INDEX_DIR))
+                if published is not None and published.metadata.get("fingerprint") == _catalogue_fingerprint(session):
+                    index = published
+                else:
+                    index = _refreshed(session, published)
+            _indexes[key] = _Cached(index)
+            _stale.discard(key)
+            cached = _indexes[key]
+    return cached.index
+
+
+@event.listens_for(Session, "before_flush")
+def _note_problem_changes(session, flush_context, instances):
+    if any(isinstance(o, Problem) for o in (*session.new, *session.dirty, *session.deleted)):
+        session.info["search_index_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_index_stale(session):
+    if session.info.pop("search_index_dirty", False):
+        try:
+            key = _index_key(session)
+        except Exception:
+            return
+        if key in _indexes:
+            _stale.add(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop("search_index_dirty", None)
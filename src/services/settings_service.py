@@ -3,21 +3,28 @@ SettingsService: Local-first settings management for single-user DSATrain.
 
 Responsibilities:
 - Load/save settings from config/user_settings.json
+- Keep a shared, versioned in-process snapshot so reads do not touch the file
 - Provide safe (masked) view of API keys
 - Validate basic structure of settings and optionally validate provider API key (stub)
 """
 
 from __future__ import annotations
 
+import copy
+import itertools
 import json
+import threading
+import time
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 import os
 
 
 DEFAULT_SETTINGS_PATH = Path("config/user_settings.json")
 ALLOWED_AI_PROVIDERS = {"openai", "anthropic", "openrouter", "local", "none"}
+# How often a cached snapshot re-checks its file for edits made outside this process
+RELOAD_CHECK_SECONDS = 1.0
 
 
 @dataclass
@@ -43,20 +50,77 @@ class Settings:
     cognitive_profile: CognitiveProfile = field(default_factory=CognitiveProfile)
 
 
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    """One parsed version of a settings file, shared by every SettingsService in the process.
+
+    ``settings`` must be treated as read-only; use ``SettingsService.load`` for a
+    copy that can be edited and saved.
+    """
+
+    settings: Settings
+    version: int
+    # (mtime_ns, size, inode) of the file the snapshot was read from or written to
+    file_stat: Optional[Tuple[int, int, int]]
+
+
+# Snapshots by resolved settings path, with the monotonic time of their last file check
+_SNAPSHOTS: Dict[str, SettingsSnapshot] = {}
+_CHECKED_AT: Dict[str, float] = {}
+_SNAPSHOT_LOCK = threading.RLock()
+_VERSIONS = itertools.count(1)
+
+
 class SettingsService:
-    def __init__(self, settings_path: Path = DEFAULT_SETTINGS_PATH):
+    def __init__(self, settings_path: Path = DEFAULT_SETTINGS_PATH, reload_check_seconds: float = RELOAD_CHECK_SECONDS):
         self.settings_path = settings_path
         self.settings_path.parent.mkdir(parents=True, exist_ok=True)
+        self.reload_check_seconds = reload_check_seconds
+        self._key = str(Path(settings_path).resolve())
 
     def _default_settings(self) -> Settings:
         return Settings()
 
+    def snapshot(self) -> SettingsSnapshot:
+        """Current settings snapshot; the file is only re-read after it changed."""
+        snap = _SNAPSHOTS.get(self._key)
+        now = time.monotonic()
+        if snap is not None and now - _CHECKED_AT.get(self._key, 0.0) < self.reload_check_seconds:
+            return snap
+        with _SNAPSHOT_LOCK:
+            file_stat = self._file_stat()
+            snap = _SNAPSHOTS.get(self._key)
+            if file_stat is None:
+                # Initialize with defaults
+                self.save(self._default_settings())
+                snap = _SNAPSHOTS[self._key]
+            elif snap is None or snap.file_stat != file_stat:
+                snap = self._publish(self._read(), file_stat)
+            _CHECKED_AT[self._key] = now
+            return snap
+
+    def current(self) -> Settings:
+        """Read-only view of the current settings (no copy, no file access)."""
+        return self.snapshot().settings
+
     def load(self) -> Settings:
-        if not self.settings_path.exists():
-            # Initialize with defaults
-            settings = self._default_settings()
-            self.save(settings)
-            return settings
+        """Private copy of the current settings, safe to modify and ``save``."""
+        return copy.deepcopy(self.current())
+
+    def _file_stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.settings_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _publish(self, settings: Settings, file_stat: Optional[Tuple[int, int, int]]) -> SettingsSnapshot:
+        snap = SettingsSnapshot(settings=settings, version=next(_VERSIONS), file_stat=file_stat)
+        _SNAPSHOTS[self._key] = snap
+        _CHECKED_AT[self._key] = time.monotonic()
+        return snap
+
+    def _read(self) -> Settings:
         try:
             raw = json.loads(self.settings_path.read_text(encoding="utf-8"))
             # Backward/forward compatible load
@@ -86,10 +150,16 @@ class SettingsService:
 
     def save(self, settings: Settings) -> None:
         data = asdict(settings)
-        self.settings_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        # Write a sibling temp file and rename it over the original, so readers
+        # in other processes never see a half-written file
+        temporary = self.settings_path.with_name(f"{self.settings_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        with _SNAPSHOT_LOCK:
+            os.replace(temporary, self.settings_path)
+            self._publish(copy.deepcopy(settings), self._file_stat())
 
     def get_masked(self, settings: Optional[Settings] = None) -> Dict[str, Any]:
-        s = settings or self.load()
+        s = settings or self.current()
         data = asdict(s)
         # Merge environment-provided keys (do not persist to disk)
         merged_keys: Dict[str, str] = {}
@@ -113,7 +183,7 @@ class SettingsService:
         """Return effective settings without exposing secrets.
         Includes api_keys_present booleans and provider readiness flags.
         """
-        s = settings or self.load()
+        s = settings or self.current()
         effective = asdict(s)
 
         # Merge settings and environment API keys (do not persist env keys)
@@ -155,7 +225,7 @@ class SettingsService:
         """
         errors = []
         # Start from current settings but do not persist
-        current = self.load()
+        current = self.current()
         candidate = Settings(**asdict(current))
         # Normalize nested dataclasses that were converted to dicts by asdict
         if isinstance(getattr(candidate, "cognitive_profile", None), dict):
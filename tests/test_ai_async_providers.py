@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.models.database import Base, DatabaseConfig, Problem
+from src.services.ai_service import AIService
+from src.services.providers.base import AIContext
+from src.services.providers.http_pool import HTTPPolicy, ProviderHTTPError
+from src.services.providers.mock_openai import MockOpenAIProvider
+from src.services.response_cache import ResponseCache
+from src.services.settings_service import Settings, SettingsService
+
+
+class StubServer:
+    """Local stand-in for a provider API: canned JSON, optional delay and failures."""
+
+    def __init__(self, delay=0.0, fail_first=0):
+        self.delay, self.fail_first = delay, fail_first
+        self.requests, self.peers = 0, set()
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests += 1
+                    stub.peers.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    failing = stub.requests <= stub.fail_first
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.in_flight -= 1
+                if failing:
+                    self._send(503, {"error": "overloaded"})
+                else:
+                    self._send(200, {"problem_id": body.get("problem_id"), "path": self.path,
+                                     "hints": [{"level": "conceptual", "text": "stubbed"}]})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                try:
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_factory():
+    servers = []
+
+    def make(**kwargs):
+        servers.append(StubServer(**kwargs))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+PROBLEM = type("P", (), {"id": "p1", "title": "Two Sum"})()
+CTX = AIContext(enable_ai=True, provider="openai", model=None)
+
+
+def test_requests_reuse_one_pooled_connection(stub_factory):
+    stub = stub_factory()
+    provider = MockOpenAIProvider(stub_url=stub.url)
+
+    async def run():
+        return [await provider.agenerate_hint(PROBLEM, None, CTX) for _ in range(10)]
+
+    results = asyncio.run(run())
+    assert all(r["path"] == "/openai/hint" and r["provider"] == "openai" for r in results)
+    assert stub.requests == 10
+    assert len(stub.peers) == 1
+
+
+def test_retries_transient_failures_then_succeeds(stub_factory):
+    stub = stub_factory(fail_first=2)
+    provider = MockOpenAIProvider(stub_url=stub.url, policy=HTTPPolicy(max_retries=2, backoff_seconds=0.01))
+    result = asyncio.run(provider.agenerate_hint(PROBLEM, "q", CTX))
+    assert result["hints"][0]["text"] == "stubbed"
+    assert stub.requests == 3
+
+    failing = stub_factory(fail_first=10)
+    provider = MockOpenAIProvider(stub_url=failing.url, policy=HTTPPolicy(max_retries=1, backoff_seconds=0.01))
+    with pytest.raises(ProviderHTTPError) as err:
+        asyncio.run(provider.agenerate_hint(PROBLEM, "q", CTX))
+    assert err.value.status_code == 503 and failing.requests == 2
+
+
+def test_concurrency_limit_and_timeout(stub_factory):
+    stub = stub_factory(delay=0.05)
+    provider = MockOpenAIProvider(stub_url=stub.url, policy=HTTPPolicy(max_concurrency=2))
+
+    async def run():
+        await asyncio.gather(*(provider.agenerate_hint(PROBLEM, str(i), CTX) for i in range(8)))
+
+    asyncio.run(run())
+    assert stub.requests == 8 and stub.max_in_flight <= 2
+
+    slow = stub_factory(delay=0.5)
+    provider = MockOpenAIProvider(stub_url=slow.url, policy=HTTPPolicy(timeout_seconds=0.1, max_retries=0))
+    with pytest.raises(ProviderHTTPError):
+        asyncio.run(provider.agenerate_hint(PROBLEM, None, CTX))
+
+
+def test_async_service_call_does_not_block_the_event_loop(tmp_path, monkeypatch, stub_factory):
+    stub = stub_factory(delay=0.3)
+    monkeypatch.setenv("DSATRAIN_AI_STUB_URL", stub.url)
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    monkeypatch.delenv("DSATRAIN_ENABLE_REAL_OPENAI", raising=False)
+    monkeypatch.setattr(AIService, "_response_cache", ResponseCache(), raising=False)
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'ai.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    session = db.get_session()
+    session.add(Problem(id="async_1", platform="custom", platform_id="a1", title="Async Problem",
+                        difficulty="Easy", algorithm_tags=[]))
+    session.commit()
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="openai", api_keys={"openai": "sk-" + "x" * 20},
+                           rate_limit_per_minute=1000, monthly_cost_cap_usd=0.0, hint_budget_per_session=0))
+    service = AIService(session, settings=settings)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        # Identical concurrent requests are coalesced into one upstream call
+        results = await asyncio.gather(*(service.agenerate_hint("async_1", query="q") for _ in range(3)))
+        task.cancel()
+        return ticks, results
+
+    ticks, results = asyncio.run(run())
+    assert ticks >= 10
+    assert stub.requests == 1
+    assert all(r["problem_id"] == "async_1" for r in results)
+    assert sum(bool(r.get("meta", {}).get("cached")) for r in results) == 2
+    session.close()
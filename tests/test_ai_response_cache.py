@@ -0,0 +1,187 @@
+import threading
+import time
+
+import pytest
+
+from src.models.database import Base, DatabaseConfig, Problem
+from src.services.ai_service import AIRateLimited, AIService
+from src.services.providers.local import LocalProvider
+from src.services.response_cache import CACHE_LOOKUPS, ResponseCache
+from src.services.settings_service import Settings, SettingsService
+
+
+def test_lru_eviction_by_count_and_size():
+    cache = ResponseCache(max_entries=2, max_bytes=10_000, ttl_seconds=60)
+    cache.set("hint", "a", {"v": 1})
+    cache.set("hint", "b", {"v": 2})
+    assert cache.get("hint", "a") == {"v": 1}  # "a" is now most recently used
+    cache.set("hint", "c", {"v": 3})
+    assert cache.get("hint", "b") is None
+    assert cache.get("hint", "a") == {"v": 1} and cache.get("hint", "c") == {"v": 3}
+
+    small = ResponseCache(max_entries=100, max_bytes=60, ttl_seconds=60)
+    for i in range(5):
+        small.set("hint", i, {"text": "x" * 10})
+    assert 0 < small.size_bytes <= 60
+    assert small.get("hint", 4) is not None and small.get("hint", 0) is None
+    # An entry larger than the whole cache is never stored
+    small.set("hint", "big", {"text": "x" * 100})
+    assert small.get("hint", "big") is None
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl_seconds=0.05)
+    cache.set("elaborate", "p1", {"prompts": []})
+    assert cache.get("elaborate", "p1") == {"prompts": []}
+    time.sleep(0.1)
+    assert cache.get("elaborate", "p1") is None
+    assert len(cache) == 0 and cache.size_bytes == 0
+
+
+def test_returned_values_are_copies_and_counted_per_action():
+    cache = ResponseCache()
+    hits, misses = CACHE_LOOKUPS.labels("hint", "hit"), CACHE_LOOKUPS.labels("elaborate", "miss")
+    before_hit, before_miss = hits.get(), misses.get()
+    cache.set("hint", "k", {"meta": {"cached": False}, "hints": ["a"]})
+    first = cache.get("hint", "k")
+    first["meta"]["cached"] = True
+    first["hints"].append("b")
+    assert cache.get("hint", "k") == {"meta": {"cached": False}, "hints": ["a"]}
+    assert cache.get("elaborate", "k") is None
+    assert hits.get() == before_hit + 2
+    assert misses.get() == before_miss + 1
+
+
+def test_concurrent_misses_are_coalesced_into_one_compute():
+    cache = ResponseCache()
+    calls, results = [], []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"hints": ["shared"]}
+
+    def request():
+        results.append(cache.get_or_compute("hint", "same", compute))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [computed for _, computed in results].count(True) == 1
+    assert all(value == {"hints": ["shared"]} for value, _ in results)
+
+
+def test_compute_errors_reach_every_waiter_and_are_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("hint", "k", fail)
+    value, computed = cache.get_or_compute("hint", "k", lambda: {"ok": True})
+    assert value == {"ok": True} and computed
+
+
+def test_ai_service_shares_one_provider_call_between_identical_hints(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'ai.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    session = db.get_session()
+    session.add(Problem(id="cache_1", platform="custom", platform_id="c1", title="Cache Problem",
+                        difficulty="Easy", algorithm_tags=[]))
+    session.commit()
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1000, hint_budget_per_session=0))
+    monkeypatch.setattr(AIService, "_response_cache", ResponseCache(), raising=False)
+
+    calls = []
+    original = LocalProvider.generate_hint
+
+    def counting(self, *args, **kwargs):
+        calls.append(1)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(LocalProvider, "generate_hint", counting)
+    service = AIService(session, settings=settings)
+    first = service.generate_hint("cache_1", query="Two pointers?", session_id="s1")
+    first["hints"] = []
+    second = service.generate_hint("cache_1", query="two pointers?  ")
+    assert len(calls) == 1
+    assert second["meta"]["cached"] is True
+    assert second["hints"] and "session_id" not in second["meta"]
+    session.close()
+
+
+def test_an_exhausted_session_does_not_fail_coalesced_callers(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'ai.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    setup = db.get_session()
+    setup.add(Problem(id="cache_2", platform="custom", platform_id="c2", title="Coalesced Problem",
+                      difficulty="Easy", algorithm_tags=[]))
+    setup.commit()
+    setup.close()
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1000, hint_budget_per_session=1))
+    monkeypatch.setattr(AIService, "_response_cache", ResponseCache(), raising=False)
+
+    exhausted, fresh = f"spent_{time.time_ns()}", f"fresh_{time.time_ns()}"
+    spender = db.get_session()
+    AIService(spender, settings=settings).generate_hint("cache_2", query="warm up", session_id=exhausted)
+    spender.close()
+
+    original_reserve = AIService._reserve_session
+    original_hint = LocalProvider.generate_hint
+
+    def slow_reserve(self, session_id, action):
+        # The exhausted caller arrives first and is slow to be refused
+        if session_id == exhausted:
+            time.sleep(0.2)
+        return original_reserve(self, session_id, action)
+
+    def slow_hint(self, *args, **kwargs):
+        time.sleep(0.2)
+        return original_hint(self, *args, **kwargs)
+
+    monkeypatch.setattr(AIService, "_reserve_session", slow_reserve)
+    monkeypatch.setattr(LocalProvider, "generate_hint", slow_hint)
+    outcomes = {}
+
+    def request(session_id):
+        session = db.get_session()
+        try:
+            outcomes[session_id] = AIService(session, settings=settings).generate_hint(
+                "cache_2", query="same question", session_id=session_id
+            )
+        except Exception as e:
+            outcomes[session_id] = e
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=request, args=(exhausted,)), threading.Thread(target=request, args=(fresh,))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(outcomes[exhausted], AIRateLimited)
+    assert outcomes[fresh]["hints"] and outcomes[fresh]["meta"]["session_id"] == fresh
+
+
+def test_redis_tier_is_shared_between_processes():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeStrictRedis()
+    worker_a, worker_b = ResponseCache(redis_client=client), ResponseCache(redis_client=client)
+    worker_a.set("hint", ("local", "m", "p1", ""), {"hints": ["x"]})
+    value, computed = worker_b.get_or_compute("hint", ("local", "m", "p1", ""), lambda: {"hints": ["fresh"]})
+    assert value == {"hints": ["x"]} and not computed
+    assert len(worker_b) == 1
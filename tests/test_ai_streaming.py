@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import ai as ai_api
+from src.api.main import app
+from src.models.database import Base, DatabaseConfig, Problem
+from src.services.ai_service import AIRateLimited, AIService
+from src.services.costs.in_memory import InMemoryCostLedger
+from src.services.providers.mock_openai import MockOpenAIProvider
+from src.services.response_cache import ResponseCache
+from src.services.settings_service import Settings, SettingsService
+
+
+@pytest.fixture
+def ai_db(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    monkeypatch.delenv("DSATRAIN_AI_STUB_URL", raising=False)
+    monkeypatch.delenv("DSATRAIN_ENABLE_REAL_OPENAI", raising=False)
+    monkeypatch.setattr(AIService, "_response_cache", ResponseCache(), raising=False)
+    # Fresh in-memory cost ledger and budgets for every test
+    monkeypatch.setattr(AIService, "_cost_ledger", None, raising=False)
+    monkeypatch.setattr(AIService, "_budget_store", None, raising=False)
+    monkeypatch.setattr(InMemoryCostLedger, "_usage_by_month", {})
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'ai.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    session = db.get_session()
+    session.add(Problem(id="stream_1", platform="custom", platform_id="s1", title="Stream Problem",
+                        difficulty="Easy", algorithm_tags=["graphs"]))
+    session.commit()
+    yield db, session
+    session.close()
+
+
+def _service(session, tmp_path, provider="local"):
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider=provider, api_keys={"openai": "sk-" + "x" * 20},
+                           rate_limit_per_minute=1000, monthly_cost_cap_usd=1.0, hint_budget_per_session=5))
+    return AIService(session, settings=settings)
+
+
+async def _collect(stream, limit=None):
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if limit is not None and len(chunks) >= limit:
+            await stream.aclose()
+            break
+    return chunks
+
+
+def test_hint_stream_chunks_match_the_full_response(ai_db, tmp_path):
+    _, session = ai_db
+    SESSION = f"stream-{tmp_path.name}"
+    service = _service(session, tmp_path)
+    chunks = asyncio.run(_collect(service.astream_hint("stream_1", query="bfs?", session_id=SESSION)))
+
+    assert chunks[0]["problem_id"] == "stream_1" and "hints" not in chunks[0]
+    assert [len(c["hints"]) for c in chunks[1:-1]] == [1, 1, 1]
+    assert chunks[-1]["meta"]["hints_used"] == 1
+    full = service.generate_hint("stream_1", query="bfs?")
+    assert [c["hints"][0] for c in chunks[1:-1]] == full["hints"]
+    assert full["meta"]["cached"] is True  # completed streams populate the cache
+
+    # A cached replay streams the same chunks, and still uses one of the session's hints
+    replay = asyncio.run(_collect(service.astream_hint("stream_1", query="bfs?", session_id=SESSION)))
+    assert replay[0]["meta"]["cached"] is True
+    assert replay[0]["meta"]["hints_used"] == 2
+    for used in (3, 4, 5):
+        assert service.generate_hint("stream_1", query="bfs?", session_id=SESSION)["meta"]["hints_used"] == used
+    # Cache hits are refused once the session budget is spent, on every path
+    with pytest.raises(AIRateLimited):
+        asyncio.run(_collect(service.astream_hint("stream_1", query="bfs?", session_id=SESSION)))
+    with pytest.raises(AIRateLimited):
+        service.generate_hint("stream_1", query="bfs?", session_id=SESSION)
+    assert service.get_status(session_id=SESSION)["hints_used_this_session"] == 5
+
+
+def test_cancelled_stream_is_charged_and_early_failure_refunded(ai_db, tmp_path, monkeypatch):
+    _, session = ai_db
+    SESSION = f"stream-{tmp_path.name}"
+    service = _service(session, tmp_path, provider="openai")
+    # Client goes away after the envelope and first hint
+    chunks = asyncio.run(_collect(service.astream_hint("stream_1", session_id=SESSION), limit=2))
+    assert len(chunks) == 2
+    status = service.get_status(session_id=SESSION)
+    assert status["monthly_cost_used_usd"] == pytest.approx(0.001)
+    assert status["hints_used_this_session"] == 1
+    # An interrupted stream is not cached
+    assert AIService._response_cache.get("hint", ("openai", None, "stream_1", "")) is None
+
+    async def broken(self, problem, query, ctx):
+        raise RuntimeError("upstream unavailable")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(MockOpenAIProvider, "astream_hint", broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(_collect(service.astream_hint("stream_1", query="again", session_id=SESSION)))
+    status = service.get_status(session_id=SESSION)
+    assert status["monthly_cost_used_usd"] == pytest.approx(0.001)
+    assert status["hints_used_this_session"] == 1
+
+
+def test_sse_endpoints_emit_events_in_order(ai_db, tmp_path, monkeypatch):
+    db, _ = ai_db
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1000))
+    monkeypatch.setattr(ai_api, "AIService", lambda session: AIService(session, settings=settings))
+
+    def get_db():
+        session = db.get_session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[ai_api.get_db] = get_db
+    try:
+        client = TestClient(app)
+        r = client.get("/ai/hint/stream", params={"problem_id": "stream_1", "session_id": "sse"})
+        events = [json.loads(line[len("data: "):]) for line in r.text.split("\n\n") if line.startswith("data: ")]
+        assert [e["type"] for e in events] == ["meta", "hint", "hint", "hint", "done"]
+        assert events[-1]["meta"]["session_id"] == "sse"
+
+        r = client.post("/ai/review/stream", json={"code": "assert solve() == 1"})
+        types = [json.loads(line[len("data: "):])["type"] for line in r.text.split("\n\n") if line.startswith("data: ")]
+        assert types[0] == "meta" and types[-1] == "done"
+        assert {"strength", "suggestion"} <= set(types)
+    finally:
+        app.dependency_overrides.pop(ai_api.get_db, None)
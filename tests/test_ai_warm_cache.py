@@ -0,0 +1,113 @@
+import pytest
+from sqlalchemy import event
+
+from src.models.database import AIPrecomputedResponse, Base, DatabaseConfig, Problem
+from src.services.ai_service import AIRateLimited, AIService
+from src.services import ai_warm_cache
+from src.services.ai_warm_cache import problem_content_hash, warm_responses
+from src.services.providers.local import LocalProvider
+from src.services.response_cache import ResponseCache
+from src.services.settings_service import Settings, SettingsService
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    monkeypatch.setattr(AIService, "_response_cache", ResponseCache(), raising=False)
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'warm.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    s = db.get_session()
+    for i in range(3):
+        s.add(Problem(id=f"warm_{i}", platform="custom", platform_id=f"w{i}", title=f"Warm {i}",
+                      difficulty="Easy", algorithm_tags=["graphs", "bfs"]))
+    s.commit()
+    yield s
+    s.close()
+
+
+def test_warm_run_regenerates_only_changed_problems(session):
+    stats = warm_responses(session, [("local", None)])
+    assert (stats.generated, stats.unchanged, stats.failed) == (6, 0, 0)
+    row = session.get(AIPrecomputedResponse, ("warm_0", "hint", "local", ""))
+    assert row.content_hash == problem_content_hash(session.get(Problem, "warm_0"))
+
+    session.get(Problem, "warm_1").algorithm_tags = ["dp"]
+    session.delete(session.get(Problem, "warm_2"))
+    session.commit()
+    stats = warm_responses(session, [("local", None)])
+    assert (stats.generated, stats.unchanged, stats.removed) == (2, 2, 2)
+    hint = session.get(AIPrecomputedResponse, ("warm_1", "hint", "local", "")).response
+    assert "dp" in hint["hints"][0]["text"]
+
+
+def test_service_serves_precomputed_responses_without_the_provider(session, tmp_path, monkeypatch):
+    warm_responses(session, [("local", None)])
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1, hint_budget_per_session=2))
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("provider should not be called")
+
+    monkeypatch.setattr(LocalProvider, "generate_hint", unexpected)
+    monkeypatch.setattr(LocalProvider, "elaborate_prompts", unexpected)
+    service = AIService(session, settings=settings)
+    session_id = f"warm-{tmp_path.name}"
+    # Well past the one-per-minute rate limit: precomputed responses skip it
+    for _ in range(2):
+        hint = service.generate_hint("warm_0", session_id=session_id)
+        assert hint["meta"]["precomputed"] is True and len(hint["hints"]) == 3
+        assert service.elaborate_prompts("warm_0")["meta"]["precomputed"] is True
+    assert hint["meta"]["hints_used"] == 2
+    # ...but they still count against the session's hint budget
+    with pytest.raises(AIRateLimited):
+        service.generate_hint("warm_0", session_id=session_id)
+
+    # A query is not precomputed, so it goes to the provider
+    with pytest.raises(AssertionError, match="provider should not be called"):
+        service.generate_hint("warm_0", query="what about cycles?")
+
+
+def test_rows_of_edited_problems_are_not_served(session, tmp_path):
+    warm_responses(session, [("local", None)])
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1000, hint_budget_per_session=0))
+    service = AIService(session, settings=settings)
+    assert service.generate_hint("warm_1")["meta"]["precomputed"] is True
+
+    # Edited after the warm run: the stale row falls through to the provider
+    session.get(Problem, "warm_1").algorithm_tags = ["dp"]
+    session.commit()
+    hint = service.generate_hint("warm_1")
+    assert "precomputed" not in hint["meta"]
+    assert "dp" in hint["hints"][0]["text"]
+
+
+def test_a_missing_table_is_checked_once_and_misses_load_the_problem_once(session, tmp_path, monkeypatch):
+    engine = session.get_bind()
+    AIPrecomputedResponse.__table__.drop(bind=engine)
+    inspections = []
+    original_inspect = ai_warm_cache.sa_inspect
+
+    def counting_inspect(bind):
+        inspections.append(bind)
+        return original_inspect(bind)
+
+    monkeypatch.setattr(ai_warm_cache, "sa_inspect", counting_inspect)
+    problem_loads = []
+
+    def count_problem_loads(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM problems" in statement:
+            problem_loads.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_problem_loads)
+    try:
+        settings = SettingsService(tmp_path / "user_settings.json")
+        settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1000, hint_budget_per_session=0))
+        service = AIService(session, settings=settings)
+        for _ in range(3):
+            problem_loads.clear()
+            assert "precomputed" not in service.elaborate_prompts("warm_2")["meta"]
+            assert len(problem_loads) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", count_problem_loads)
+    assert len(inspections) == 1
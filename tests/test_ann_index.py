@@ -0,0 +1,109 @@
+import numpy as np
+
+from src.ml.ann_index import IVFIndex, recall_at_k
+from src.ml.embedding_store import EmbeddingStore, EmbeddingStoreWriter, build_ann_index, get_embedding_store
+
+
+def _clustered(count=2000, dim=16, topics=40, seed=3):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    return centres[rng.integers(0, topics, count)] + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def _exact(vectors, queries, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    results = []
+    for query in queries:
+        scores = normalized @ (query / np.linalg.norm(query))
+        top = np.argsort(-scores, kind="stable")[:k]
+        results.append([(int(i), float(scores[i])) for i in top])
+    return results
+
+
+def test_probing_every_list_is_exact_and_fewer_lists_trade_recall():
+    vectors = _clustered()
+    index = IVFIndex.build(vectors, nlist=32)
+    queries = vectors[:50] + 0.05
+    exact = _exact(vectors, queries, 10)
+
+    full = index.search(queries, k=10, nprobe=index.nlist)
+    assert [[row for row, _ in hits] for hits in full] == [[row for row, _ in hits] for hits in exact]
+    assert np.allclose([s for hits in full for _, s in hits], [s for hits in exact for _, s in hits], atol=1e-5)
+
+    recalls = [recall_at_k(index.search(queries, 10, nprobe=n), exact) for n in (1, 4, 32)]
+    assert recalls == sorted(recalls) and recalls[1] > 0.9
+    assert sorted(index.rows.tolist()) == list(range(len(vectors)))  # every vector filed exactly once
+
+
+def test_exclusion_and_mmap_round_trip(tmp_path):
+    vectors = _clustered(count=300)
+    index = IVFIndex.build(vectors, nlist=8, metadata={"note": "x"})
+    index.save(tmp_path / "ivf")
+    loaded = IVFIndex.load(tmp_path / "ivf")
+
+    assert isinstance(loaded.vectors, np.memmap) and loaded.metadata["note"] == "x"
+    hits = loaded.search(vectors[5], k=5, nprobe=8, exclude_rows=[5])[0]
+    assert 5 not in [row for row, _ in hits] and len(hits) == 5
+    assert hits == index.search(vectors[5], k=5, nprobe=8, exclude_rows=[5])[0]
+    assert IVFIndex.load(tmp_path / "missing") is None
+
+
+def test_store_uses_ann_index_only_for_its_own_version(tmp_path):
+    vectors = _clustered(count=400)
+    ids = [f"p{i}" for i in range(len(vectors))]
+    with EmbeddingStoreWriter(tmp_path, "m", len(ids), vectors.shape[1]) as writer:
+        writer.write_batch(ids, vectors)
+
+    store = get_embedding_store("m", tmp_path)
+    assert store.ann is None
+    build_ann_index(store, nlist=10)
+    store = get_embedding_store("m", tmp_path)
+    assert store.ann is not None and store.ann.nlist == 10
+
+    exact = store.similar_to("p7", k=5, exact=True)
+    assert [pid for pid, _ in store.similar_to("p7", k=5, nprobe=10)] == [pid for pid, _ in exact]
+    assert "p7" not in [pid for pid, _ in store.similar_to("p7", k=5, nprobe=1)]
+
+    # Rebuilding the matrices invalidates the old ANN index
+    with EmbeddingStoreWriter(tmp_path, "m", len(ids), vectors.shape[1]) as writer:
+        writer.write_batch(ids, vectors[::-1].copy())
+    assert EmbeddingStore.open("m", tmp_path).ann is None
+
+
+def test_similar_problems_prefer_text_then_embeddings_then_tags(tmp_path, monkeypatch):
+    from src.ml import embedding_store
+    from src.ml.recommendation_engine_simple import RecommendationEngine
+    from src.models.database import Base, DatabaseConfig, Problem
+    from src.services import search_index
+
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'similar.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    session = db.get_session()
+    titles = {"p_a": "Shortest path in a grid", "p_b": "Shortest path in a maze grid", "p_c": "Coin change ways"}
+    for pid, title in titles.items():
+        session.add(Problem(id=pid, platform="custom", platform_id=pid, title=title, difficulty="Medium",
+                            description=title, algorithm_tags=["graphs"] if pid != "p_c" else ["dp"]))
+    session.commit()
+
+    # Textually p_b is p_a's neighbour; in embedding space it is p_c
+    vectors = np.array([[1.0, 0.0], [0.0, 1.0], [0.9, 0.1]], dtype=np.float32)
+    with EmbeddingStoreWriter(tmp_path, embedding_store.DEFAULT_EMBEDDING_MODEL, 3, 2) as writer:
+        writer.write_batch(list(titles), vectors)
+    monkeypatch.setattr(embedding_store, "DEFAULT_STORE_DIR", tmp_path)
+    build_ann_index(get_embedding_store(), nlist=1)
+
+    engine = RecommendationEngine(session)
+    assert [r["id"] for r in engine.get_content_based_recommendations("p_a", 1)] == ["p_b"]
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("index unavailable")
+
+    # Without the text index the embedding store answers
+    monkeypatch.setattr(search_index, "get_search_index", broken)
+    assert [r["id"] for r in engine.get_content_based_recommendations("p_a", 1)] == ["p_c"]
+
+    # Neither index working still leaves the tag-overlap fallback
+    monkeypatch.setattr(embedding_store, "get_embedding_store", broken)
+    assert [r["id"] for r in engine.get_content_based_recommendations("p_a", 1)] == ["p_b"]
+    session.close()
@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, Problem
+from src.services.autocomplete_index import AutocompleteIndex, Completion, get_autocomplete_index
+
+
+def test_complete_ranks_by_weight_and_matches_word_starts():
+    index = AutocompleteIndex([
+        Completion("binary_search", "tag", 50.0),
+        Completion("bit_manipulation", "tag", 80.0),
+        Completion("Binary Tree Paths", "title", 10.0),
+        Completion("Two Sum", "title", 30.0),
+        Completion("Path Sum", "title", 40.0),
+    ])
+
+    # Short prefixes come from the precomputed tables, longer ones from bisect ranges
+    assert [c.text for c in index.complete("bi", kind="tag")] == ["bit_manipulation", "binary_search"]
+    assert [c.text for c in index.complete("bin")] == ["binary_search", "Binary Tree Paths"]
+    assert [c.text for c in index.complete("sum", kind="title")] == ["Path Sum", "Two Sum"]
+    assert [c.text for c in index.complete("binary search")] == ["binary_search"]
+    assert index.complete("zzz") == []
+    assert len(index.complete("s", limit=1)) == 1
+
+
+def test_index_is_rebuilt_after_problem_commits(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'autocomplete.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Problem(id="ac1", platform="custom", platform_id="1", title="Merge Intervals",
+                        difficulty="Medium", algorithm_tags=["sorting"], quality_score=70.0))
+    session.commit()
+
+    first = get_autocomplete_index(session)
+    assert [c.text for c in first.complete("mer")] == ["Merge Intervals"]
+    assert get_autocomplete_index(session) is first
+
+    session.add(Problem(id="ac2", platform="custom", platform_id="2", title="Merge k Sorted Lists",
+                        difficulty="Hard", algorithm_tags=["heap"], quality_score=90.0))
+    session.commit()
+
+    second = get_autocomplete_index(session)
+    assert second is not first
+    assert [c.text for c in second.complete("mer")] == ["Merge k Sorted Lists", "Merge Intervals"]
+    session.close()
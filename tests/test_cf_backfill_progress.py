@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("bs4")
+from scripts import cf_bulk_backfill as backfill
+from src.models.database import Base, DatabaseConfig, Problem
+
+
+def _db(tmp_path, monkeypatch, count):
+    url = f"sqlite:///{tmp_path / 'backfill.db'}"
+    monkeypatch.setenv("DSATRAIN_DATABASE_URL", url)
+    db = DatabaseConfig(url)
+    Base.metadata.create_all(bind=db.engine)
+    session = db.get_session()
+    for i in range(1, count + 1):
+        session.add(Problem(id=f"codeforces_{i}A", platform="codeforces", platform_id=f"cf_{i}_A",
+                            title=f"Problem {i}", difficulty="Easy", algorithm_tags=[]))
+    session.commit()
+    return session
+
+
+def test_progress_store_imports_legacy_json_and_survives_reopen(tmp_path):
+    legacy = tmp_path / "progress.json"
+    legacy.write_text(json.dumps({
+        "completed": ["codeforces_1A"],
+        "failures": [{"id": "codeforces_2A", "error": "403"}] * 3 + [{"id": "codeforces_3A", "error": "timeout"}],
+    }))
+    store = backfill.ProgressStore(tmp_path / "progress.sqlite3", legacy_file=legacy)
+    assert store.counts() == {"done": 1, "failed": 2}
+    assert store.finished(max_attempts=3) == {"codeforces_1A", "codeforces_2A"}
+
+    store.record_failure("codeforces_3A", "timeout")
+    store.record_done(["codeforces_4A"])
+    store.close()
+
+    reopened = backfill.ProgressStore(tmp_path / "progress.sqlite3", legacy_file=legacy)
+    assert reopened.finished(max_attempts=2) == {"codeforces_1A", "codeforces_2A", "codeforces_3A", "codeforces_4A"}
+    reopened.close()
+
+
+def test_rate_meter_reports_error_rate_and_eta():
+    meter = backfill.RateMeter(total=10)
+    meter.started -= 4  # four seconds into the run
+    for ok in (True, True, True, False):
+        meter.tick(ok)
+    snapshot = meter.snapshot()
+    assert snapshot["error_rate"] == 0.25
+    assert snapshot["rate_per_second"] == pytest.approx(1.0, rel=0.05)
+    assert snapshot["eta_seconds"] == pytest.approx(6.0, rel=0.05)
+    assert "4/10 fetched" in meter.line()
+
+
+def test_results_are_committed_in_batches_and_resume_skips_done(tmp_path, monkeypatch):
+    session = _db(tmp_path, monkeypatch, count=7)
+
+    async def scrape(client, contest_id, index, proxy_base=None):
+        if contest_id == "3":
+            raise RuntimeError("403 Forbidden")
+        return {"description": f"Statement of {contest_id}{index} " * 5, "examples": [{"input": "1", "output": "1"}]}
+
+    monkeypatch.setattr(backfill, "scrape_problem", scrape)
+    kwargs = dict(max_items=0, concurrency=4, delay=0, use_browser=False, commit_batch=2,
+                  progress_path=tmp_path / "progress.sqlite3", legacy_progress=None, preflight=False)
+
+    totals = asyncio.run(backfill.run_backfill(resume=True, **kwargs))
+    assert totals == {"updated": 6, "commits": 3, "fetched": 6, "failed": 1}
+    session.expire_all()
+    assert session.get(Problem, "codeforces_5A").description.startswith("Statement of 5A")
+    assert session.get(Problem, "codeforces_3A").description is None
+
+    # Only the failed problem is fetched again, until it runs out of attempts
+    assert asyncio.run(backfill.run_backfill(resume=True, max_attempts=2, **kwargs))["failed"] == 1
+    assert asyncio.run(backfill.run_backfill(resume=True, max_attempts=2, **kwargs))["failed"] == 0
+    session.close()
+
+
+def test_a_failing_applier_stops_the_fetchers_and_is_reported(tmp_path, monkeypatch):
+    session = _db(tmp_path, monkeypatch, count=12)
+
+    async def scrape(client, contest_id, index, proxy_base=None):
+        return {"description": f"Statement of {contest_id}{index} " * 5}
+
+    def broken_apply(session, batch):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(backfill, "scrape_problem", scrape)
+    monkeypatch.setattr(backfill, "_apply_batch", broken_apply)
+    # A queue of two results: the fetchers fill it long before they are done
+    run = backfill.run_backfill(max_items=0, concurrency=1, delay=0, resume=False, use_browser=False, commit_batch=1,
+                                progress_path=tmp_path / "progress.sqlite3", legacy_progress=None, preflight=False)
+    with pytest.raises(RuntimeError, match="database is locked"):
+        asyncio.run(asyncio.wait_for(run, timeout=10))
+    session.close()
@@ -0,0 +1,97 @@
+import asyncio
+import gzip
+import json
+import time
+
+from src.models.database import Base, Problem, Solution
+
+
+def _pipeline(tmp_path, monkeypatch):
+    # The module and the pipeline create logs/ in the working directory
+    monkeypatch.chdir(tmp_path)
+    from src.collectors.automated_pipeline import AutomatedCollectionPipeline, CollectionConfig
+
+    monkeypatch.setenv("DSATRAIN_DATABASE_URL", f"sqlite:///{tmp_path / 'collection.db'}")
+    config = CollectionConfig(
+        platforms=["leetcode", "codeforces"], max_solutions_per_problem=2,
+        backup_directory=str(tmp_path / "backups"),
+    )
+    pipeline = AutomatedCollectionPipeline(config)
+    Base.metadata.create_all(bind=pipeline.db_config.engine)
+    return pipeline
+
+
+def test_platforms_are_collected_concurrently(tmp_path, monkeypatch):
+    pipeline = _pipeline(tmp_path, monkeypatch)
+    from src.collectors.automated_pipeline import CodeforceCollector, LeetCodeCollector
+    spans = {}
+
+    def timed(collect):
+        async def wrapper(self, limit=1000):
+            started = time.perf_counter()
+            problems = await collect(self, limit)
+            spans[self.platform_name] = (started, time.perf_counter())
+            return problems
+        return wrapper
+
+    monkeypatch.setattr(LeetCodeCollector, "collect_problems", timed(LeetCodeCollector.collect_problems))
+    monkeypatch.setattr(CodeforceCollector, "collect_problems", timed(CodeforceCollector.collect_problems))
+    asyncio.run(pipeline.run_collection_cycle())
+
+    (lc_start, lc_end), (cf_start, cf_end) = spans["leetcode"], spans["codeforces"]
+    assert cf_start < lc_end and lc_start < cf_end  # the two collections overlapped
+    session = pipeline.session_factory()
+    assert session.query(Problem).count() == 8
+    assert session.query(Solution).count() == 2  # sample solutions exist for two_sum only
+    session.close()
+
+
+def test_backups_are_incremental_gzip_jsonl(tmp_path, monkeypatch):
+    pipeline = _pipeline(tmp_path, monkeypatch)
+    asyncio.run(pipeline.run_collection_cycle())
+    first = sorted((tmp_path / "backups").glob("*.jsonl.gz"))
+    assert len(first) == 1
+    with gzip.open(first[0], "rt") as f:
+        header, *rows = [json.loads(line) for line in f]
+    assert header["type"] == "backup" and header["since"] == {}
+    assert sum(row["table"] == "problems" for row in rows) == 8
+
+    # Re-collecting identical data changes nothing, so no new backup is written
+    session = pipeline.session_factory()
+    assert asyncio.run(pipeline._store_problems(session, [])) == 0
+    time.sleep(1.1)  # SQLite timestamps have second resolution
+    asyncio.run(pipeline.run_collection_cycle())
+    assert len(list((tmp_path / "backups").glob("*.jsonl.gz"))) == 1
+
+    problem = session.get(Problem, "codeforces_1A")
+    problem.title = "Theatre Square (renamed)"
+    session.commit()
+    backup = asyncio.run(pipeline._create_backup(session))
+    with gzip.open(backup, "rt") as f:
+        changed = [json.loads(line) for line in f][1:]
+    assert "codeforces_1A" in {row["row"]["id"] for row in changed}
+    assert len(changed) < 8
+    session.close()
+
+
+def test_stored_problems_update_tag_statistics(tmp_path, monkeypatch):
+    from src.models.database import TagStatistic
+
+    pipeline = _pipeline(tmp_path, monkeypatch)
+    session = pipeline.session_factory()
+    session.add(Problem(id="graph_0", platform="custom", platform_id="g0", title="Graph 0",
+                        difficulty="Easy", algorithm_tags=["graphs"], quality_score=50.0))
+    session.commit()
+    assert session.get(TagStatistic, "graphs").problem_count == 1
+
+    problems = [
+        {"id": f"graph_{i}", "platform": "custom", "platform_id": f"g{i}", "title": f"Graph {i}",
+         "difficulty": "Medium", "algorithm_tags": ["graphs", "bfs"], "google_interview_relevance": 80.0,
+         "quality_score": 70.0, "collected_at": None}
+        for i in range(1, 4)
+    ]
+    assert asyncio.run(pipeline._store_problems(session, problems)) == 3
+    session.expire_all()
+    assert session.get(TagStatistic, "graphs").problem_count == 4
+    assert session.get(TagStatistic, "bfs").problem_count == 3
+    session.close()
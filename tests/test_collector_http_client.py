@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.collectors.http_client import CollectorHTTPClient, SyncCollectorHTTPClient, TokenBucket
+from src.monitoring.trend_monitor import InterviewTrendMonitor
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub["connections"].add(self.client_address)
+        stub["paths"].append(self.path)
+        if self.path.startswith("/api/problemset.problems"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._send(304)
+            body = json.dumps({"status": "OK", "result": {"problems": [{"contestId": 1, "index": "A"}]}})
+            self._send(200, body.encode(), [("Content-Type", "application/json"), ("ETag", '"v1"')])
+        elif self.path == "/page":
+            if self.headers.get("If-Modified-Since") == "Tue, 01 Sep 2026 00:00:00 GMT":
+                self._send(304)
+            else:
+                self._send(200, b"<html>interview trends</html>",
+                           [("Last-Modified", "Tue, 01 Sep 2026 00:00:00 GMT")])
+        elif self.path == "/flaky":
+            stub["flaky"] += 1
+            if stub["flaky"] <= 2:
+                self._send(503, b"busy", [("Retry-After", "0")])
+            else:
+                self._send(200, b"ok")
+        else:
+            self._send(404)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.stub = {"connections": set(), "paths": [], "flaky": 0}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.stub
+    server.shutdown()
+    server.server_close()
+
+
+def test_token_bucket_queues_callers_behind_the_burst():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    delays = [bucket.reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01) and delays[3] == pytest.approx(0.2, abs=0.01)
+
+
+def test_codeforces_client_reuses_connections_and_revalidates(tmp_path, stub_server):
+    pytest.importorskip("tqdm")
+    from src.collectors.codeforces_client import CodeforcesAPIClient
+    url, stub = stub_server
+
+    async def run():
+        http = CollectorHTTPClient(cache_dir=tmp_path / "cache", rate_limits={"127.0.0.1": (1000.0, 10)})
+        client = CodeforcesAPIClient(tmp_path, http=http)
+        client.BASE_URL = f"{url}/api"
+        try:
+            return [await client.get_problemset_problems() for _ in range(3)], http.stats
+        finally:
+            await client.aclose()
+
+    results, stats = asyncio.run(run())
+    assert all(result["problems"][0]["contestId"] == 1 for result in results)
+    assert len(stub["paths"]) == 3 and stats["cache_hits"] == 2
+    assert len(stub["connections"]) == 1  # one keep-alive connection for all requests
+
+
+def test_not_modified_is_served_from_disk_cache(tmp_path, stub_server):
+    url, stub = stub_server
+    monitor = InterviewTrendMonitor(tmp_path, http=SyncCollectorHTTPClient(
+        cache_dir=tmp_path / "cache", default_rate=(1000.0, 10)
+    ))
+
+    assert monitor._fetch_page(f"{url}/page") == "<html>interview trends</html>"
+    # A fresh client only has the disk cache to go on
+    monitor.http = SyncCollectorHTTPClient(cache_dir=tmp_path / "cache", default_rate=(1000.0, 10))
+    response = monitor.http.get(f"{url}/page")
+    assert response.extensions["from_cache"] and response.text == "<html>interview trends</html>"
+    assert monitor.http.stats["cache_hits"] == 1
+
+
+def test_retries_transient_errors_with_retry_after(stub_server):
+    url, stub = stub_server
+
+    async def run():
+        async with CollectorHTTPClient(default_rate=(1000.0, 10), max_retries=3) as http:
+            return await http.get(f"{url}/flaky"), http.stats
+
+    response, stats = asyncio.run(run())
+    assert response.status_code == 200 and response.text == "ok"
+    assert stats["retries"] == 2 and stats["requests"] == 3
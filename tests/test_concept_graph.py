@@ -0,0 +1,88 @@
+import json
+
+from src.ml.ai_feature_engineer import AIFeatureEngineer
+from src.ml.concept_graph import (
+    CONCEPT_PREREQUISITES, LEARNING_POSITION_PREREQUISITES, SKILL_AREA_PREREQUISITES, ConceptGraph,
+)
+from src.ml.learning_path_engine import LearningPathEngine
+from src.models.ai_features_models import ConceptNode, ConceptPrerequisite
+from src.models.database import Base, DatabaseConfig
+from src.processors.quality_scoring_engine import QualityScoringEngine
+
+
+def test_levels_closures_and_unlocks_on_a_dag():
+    graph = ConceptGraph(CONCEPT_PREREQUISITES)
+
+    assert not graph.has_cycle
+    order = graph.topological_order()
+    assert all(order.index(p) < order.index(c) for p, c in graph.edges())
+    assert graph.level("arrays") == 1 and graph.level("graphs") == 2
+    assert graph.level("shortest_paths") == 3  # sorting -> greedy -> shortest_paths
+    assert graph.requires("shortest_paths", "sorting") and not graph.requires("sorting", "shortest_paths")
+    assert graph.ancestors("segment_trees") == {"trees", "recursion", "data_structures"}
+    assert "fenwick_trees" in graph.descendants("recursion")
+    assert graph.unlocked_by(graph.mask(["arrays", "recursion", "sorting"])) == ["dynamic_programming", "binary_search"]
+
+
+def test_cycles_are_detected_and_closures_still_complete():
+    graph = ConceptGraph({"a": ["c"], "b": ["a"], "c": ["b"], "d": ["c"], "e": []})
+
+    assert graph.cycle_nodes == {"a", "b", "c", "d"}
+    assert graph.level("e") == 1
+    assert graph.ancestors("d") == {"a", "b", "c"}
+    assert graph.requires("a", "a")
+
+
+def test_deep_ladder_levels_are_linear_not_exponential():
+    # Every rung needs both nodes of the previous rung: 2^60 paths for a naive recursion
+    prerequisites = {}
+    for rung in range(1, 60):
+        for side in "lr":
+            prerequisites[f"{side}{rung}"] = [f"l{rung - 1}", f"r{rung - 1}"]
+    graph = ConceptGraph(prerequisites)
+    assert graph.level("l59") == 60
+    assert graph.requires("r59", "l0")
+
+
+def test_skill_dependencies_ignore_imported_tag_edges(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'skills.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    session = db_config.get_session()
+    session.add_all([ConceptNode(id="graphs", name="graphs"), ConceptNode(id="data_structures", name="data_structures")])
+    session.flush()
+    session.add(ConceptPrerequisite(concept_id="graphs", prerequisite_id="data_structures"))
+    session.commit()
+
+    dependencies = LearningPathEngine(session).skill_dependencies
+    assert dependencies["graphs"] == list(SKILL_AREA_PREREQUISITES.get("graphs", []))
+    session.close()
+
+
+def test_feature_engineer_writes_levels_and_edges_for_present_concepts(tmp_path):
+    engineer = AIFeatureEngineer(data_dir=tmp_path)
+    problems = [
+        {"id": "p1", "unified_tags": ["arrays", "sorting"]},
+        {"id": "p2", "unified_tags": ["binary_search", "greedy"]},
+    ]
+    engineer.construct_concept_graph(problems)
+    graph = json.loads((engineer.output_dir / "concept_graph.json").read_text())["graph"]
+
+    assert graph["nodes"]["binary_search"]["difficulty_level"] == 2
+    assert graph["nodes"]["greedy"]["difficulty_level"] == 2  # mathematics is not a present concept
+    assert graph["nodes"]["greedy"]["prerequisites"] == ["sorting", "mathematics"]
+    assert {(e["from"], e["to"]) for e in graph["edges"]} == {
+        ("arrays", "binary_search"), ("sorting", "binary_search"), ("sorting", "greedy"),
+    }
+
+
+def test_learning_position_uses_its_own_prerequisite_map(tmp_path):
+    engine = QualityScoringEngine(tmp_path)
+    assert engine.concept_graph.edges() == ConceptGraph(LEARNING_POSITION_PREREQUISITES).edges()
+
+    position = engine.calculate_learning_path_position({"unified_tags": ["graph_algorithms", "greedy"]})
+    # greedy has no prerequisites in this map
+    assert set(position["prerequisites"]) == {"graphs", "dynamic_programming"}
+    assert position["learning_order"] == 2
+    position = engine.calculate_learning_path_position({"unified_tags": ["graphs", "dynamic_programming"]})
+    assert position["next_topics"] == ["advanced_dp", "graph_algorithms"]
@@ -0,0 +1,123 @@
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, DatabaseConfig, Problem, TagStatistic
+from src.models.ai_features_models import ProblemEmbedding, ProblemQualityScore
+from src.services.data_import_service import DataImportService
+from src.services.bulk_upsert import ImportCheckpoint, source_signature
+
+
+def _unified(pid, title, tags, quality):
+    return {
+        "id": pid,
+        "source": "codeforces",
+        "original_id": pid,
+        "title": title,
+        "description": "",
+        "difficulty": {"level": "medium", "rating": 1600},
+        "unified_tags": tags,
+        "company_tags": [],
+        "quality_scores": {"overall": quality},
+        "google_relevance": 0.5,
+    }
+
+
+def _setup(tmp_path, problems):
+    processed = tmp_path / "data" / "processed"
+    (processed / "ai_features").mkdir(parents=True)
+    (processed / "problems_unified_complete.json").write_text(json.dumps({"problems": problems}))
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    return processed, db_config
+
+
+def test_bulk_import_upserts_and_reports_stages(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    problems = [_unified(f"bu_{i}", f"Problem {i}", ["graphs"], 0.5) for i in range(5)]
+    processed, db_config = _setup(tmp_path, problems)
+    service = DataImportService(tmp_path / "data", db_config, chunk_size=2)
+    session = db_config.get_session()
+
+    first = service.import_unified_problems(session)
+    assert first["status"] == "success"
+    assert (first["imported"], first["updated"]) == (5, 0)
+    assert first["stage_report"]["batches"] == 3
+    assert first["stage_report"]["rows"] == 5
+
+    problems[0]["title"] = "Renamed"
+    problems[0]["unified_tags"] = ["dp"]
+    (processed / "problems_unified_complete.json").write_text(json.dumps({"problems": problems}))
+    second = service.import_unified_problems(session)
+    assert (second["imported"], second["updated"]) == (0, 5)
+
+    session.expire_all()
+    assert session.get(Problem, "bu_0").title == "Renamed"
+    assert session.query(Problem).count() == 5
+    assert session.get(TagStatistic, "graphs").problem_count == 4
+    assert session.get(TagStatistic, "dp").problem_count == 1
+
+    embeddings = {"embeddings": {
+        "bu_1": {"embedding": [0.1] * 4, "title_embedding": [0.2] * 4, "desc_embedding": [0.3] * 4},
+        "unknown": {"embedding": [0.1] * 4},
+    }}
+    (processed / "ai_features" / "semantic_embeddings.json").write_text(json.dumps(embeddings))
+    emb = service.import_problem_embeddings(session)
+    assert emb["imported"] == 1
+    assert session.get(ProblemEmbedding, ("bu_1", "dsatrain_v1")).embedding_dimension == 4
+    session.close()
+    # Checkpoints are cleared once a stage completes
+    assert not service.checkpoint_path.exists()
+
+
+def test_bulk_import_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    problems = [_unified(f"rs_{i}", f"Problem {i}", ["arrays"], 0.5) for i in range(4)]
+    processed, db_config = _setup(tmp_path, problems)
+    service = DataImportService(tmp_path / "data", db_config, chunk_size=1)
+
+    # Pretend a previous run committed the first two rows before being interrupted
+    ImportCheckpoint(service.checkpoint_path).record(
+        "unified_problems", source_signature(processed / "problems_unified_complete.json"), 2
+    )
+    session = db_config.get_session()
+    result = service.import_unified_problems(session)
+    report = result["stage_report"]
+    assert (report["resumed_from"], report["skipped"], report["rows"]) == (2, 2, 2)
+    assert {p.id for p in session.query(Problem)} == {"rs_2", "rs_3"}
+    session.close()
+
+
+def test_partial_reimport_keeps_stored_fields(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    processed, db_config = _setup(tmp_path, [_unified("pr_1", "Full Problem", ["graphs", "bfs"], 0.8)])
+    (processed / "quality_scoring").mkdir()
+    scores = processed / "quality_scoring" / "quality_scores.json"
+    scores.write_text(json.dumps({"scores": {"pr_1": {
+        "content_quality": {"completeness": 0.9, "clarity": 0.7},
+        "google_relevance": {"overall_relevance": 0.6},
+        "overall_score": 0.75, "recommendation": "highly_recommended",
+    }}}))
+    service = DataImportService(tmp_path / "data", db_config)
+    session = db_config.get_session()
+    assert service.import_unified_problems(session)["status"] == "success"
+    assert service.import_quality_scores(session)["status"] == "success"
+
+    # A later export carries only some of the fields
+    (processed / "problems_unified_complete.json").write_text(
+        json.dumps({"problems": [{"id": "pr_1", "source": "codeforces", "description": "Now with a statement"}]})
+    )
+    scores.write_text(json.dumps({"scores": {"pr_1": {"content_quality": {"clarity": 0.95}}}}))
+    assert service.import_unified_problems(session)["status"] == "success"
+    assert service.import_quality_scores(session)["status"] == "success"
+
+    session.expire_all()
+    problem = session.get(Problem, "pr_1")
+    assert problem.description == "Now with a statement"
+    assert (problem.title, problem.difficulty_rating, problem.quality_score) == ("Full Problem", 1600.0, 0.8)
+    assert problem.algorithm_tags == ["graphs", "bfs"]
+    score = session.get(ProblemQualityScore, "pr_1")
+    assert (score.clarity_score, score.completeness_score) == (0.95, 0.9)
+    assert (score.overall_quality_score, score.recommendation) == (0.75, "highly_recommended")
+    assert score.frequency_score == 0.0  # never provided: the insert default
+    session.close()
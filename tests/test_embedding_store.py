@@ -0,0 +1,100 @@
+import numpy as np
+
+from src.models.database import Base, DatabaseConfig, Problem
+from src.models.ai_features_models import ProblemEmbedding
+from src.ml.embedding_store import DEFAULT_EMBEDDING_MODEL, EmbeddingStore, EmbeddingStoreWriter, get_embedding_store
+from src.services.data_import_service import DataImportService
+
+
+def _write_store(store_dir, model, vectors, capacity=None):
+    dim = len(next(iter(vectors.values())))
+    with EmbeddingStoreWriter(store_dir, model, capacity or len(vectors), dim) as writer:
+        for pid, vec in vectors.items():
+            writer.write(pid, vec, vec, vec)
+    return writer
+
+
+def test_cosine_top_k_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = {f"p{i}": rng.normal(size=16).tolist() for i in range(50)}
+    _write_store(tmp_path, "m1", vectors)
+    store = EmbeddingStore.open("m1", tmp_path)
+    assert isinstance(store.matrix(), np.memmap)
+
+    query = np.asarray(vectors["p3"], dtype=np.float32)
+    expected = sorted(
+        ((pid, float(np.dot(query, v) / (np.linalg.norm(query) * np.linalg.norm(v)))) for pid, v in vectors.items() if pid != "p3"),
+        key=lambda item: -item[1],
+    )[:5]
+    got = store.similar_to("p3", k=5)
+    assert [pid for pid, _ in got] == [pid for pid, _ in expected]
+    assert np.allclose([s for _, s in got], [s for _, s in expected], atol=1e-5)
+
+    batch = store.cosine_top_k(np.stack([store.vector("p1"), store.vector("p2")]), k=1)
+    assert [hits[0][0] for hits in batch] == ["p1", "p2"]
+
+
+def test_store_versions_trimming_and_reopen(tmp_path):
+    _write_store(tmp_path, "v1", {"a": [1.0, 0.0], "b": [0.0, 1.0]}, capacity=5)
+    _write_store(tmp_path, "v2", {"a": [0.0, 0.0]})
+
+    v1 = get_embedding_store("v1", tmp_path)
+    assert v1.matrix().shape == (2, 2) and v1.row_offset("b") == 1
+    # Zero vectors never divide by zero
+    assert get_embedding_store("v2", tmp_path).cosine_top_k([1.0, 0.0], k=3) == [[("a", 0.0)]]
+    assert get_embedding_store("missing", tmp_path) is None
+
+    _write_store(tmp_path, "v1", {"c": [1.0, 1.0]})
+    assert get_embedding_store("v1", tmp_path).ids == ["c"]
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_publish_switches_builds_without_touching_open_readers(tmp_path):
+    _write_store(tmp_path, "m", {"a": [1.0, 0.0]})
+    reader = EmbeddingStore.open("m", tmp_path)
+
+    for build in range(3):
+        _write_store(tmp_path, "m", {"b": [0.0, 1.0], "c": [float(build), 1.0]})
+    assert EmbeddingStore.open("m", tmp_path).ids == ["b", "c"]
+    # The open reader still sees its own build; only the newest two builds are kept
+    assert reader.ids == ["a"] and np.allclose(reader.vector("a"), [1.0, 0.0])
+    assert len([p for p in (tmp_path / "m").iterdir() if p.is_dir()]) == 2
+
+    class Interrupted(Exception):
+        pass
+
+    try:
+        with EmbeddingStoreWriter(tmp_path, "m", 1, 2) as writer:
+            writer.write("d", [1.0, 1.0])
+            raise Interrupted
+    except Interrupted:
+        pass
+    assert get_embedding_store("m", tmp_path).ids == ["b", "c"]
+    assert not writer.path.exists()
+
+
+def test_import_registers_row_offsets_only(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'emb.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    session = db_config.get_session()
+    session.add_all([
+        Problem(id=pid, platform="t", platform_id=pid, title=pid, difficulty="Easy", algorithm_tags=[])
+        for pid in ("a", "b", "c")
+    ])
+    session.commit()
+
+    store_dir = tmp_path / "data" / "processed" / "ai_features" / "embeddings"
+    _write_store(store_dir, DEFAULT_EMBEDDING_MODEL, {"a": [1.0, 0.0], "b": [0.0, 1.0], "ghost": [1.0, 1.0]})
+    service = DataImportService(tmp_path / "data", db_config)
+    result = service.import_problem_embeddings(session)
+    assert (result["imported"], result["total_embeddings"]) == (2, 3)
+    assert session.get(ProblemEmbedding, ("b", DEFAULT_EMBEDDING_MODEL)).row_offset == 1
+
+    # A rebuilt store drops problems and moves rows; stale metadata goes with it
+    _write_store(store_dir, DEFAULT_EMBEDDING_MODEL, {"c": [1.0, 0.0], "a": [0.0, 1.0]})
+    result = service.import_problem_embeddings(session)
+    assert result["removed"] == 1
+    offsets = {e.problem_id: e.row_offset for e in session.query(ProblemEmbedding)}
+    assert offsets == {"c": 0, "a": 1}
+    session.close()
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from src.ml.ai_feature_engineer import EMBEDDING_WORKERS_ENV, AIFeatureEngineer
+from src.ml.hashed_embeddings import HashedEmbeddingEncoder, projection_matrix, tokenize
+
+VOCAB = {"<UNK>": 0, "<PAD>": 1, "graph": 2, "tree": 3, "sum": 4, "two": 5}
+TEXTS = ["Two Sum", "", "graph tree graph", "unknown words only", "TREE"] * 7
+
+_SCRIPT = """
+import hashlib, sys
+from src.ml.hashed_embeddings import HashedEmbeddingEncoder
+vocab = {"<UNK>": 0, "<PAD>": 1, "graph": 2, "tree": 3, "sum": 4, "two": 5}
+out = HashedEmbeddingEncoder(vocab).encode(["Two Sum", "graph tree graph", "other"])
+sys.stdout.write(hashlib.sha256(out.tobytes()).hexdigest())
+"""
+
+
+def test_encode_matches_normalized_mean_of_projection_rows():
+    encoder = HashedEmbeddingEncoder(VOCAB, dim=16)
+    out = encoder.encode(TEXTS[:5])
+    projection = projection_matrix(6, 16)
+
+    expected = projection[[VOCAB[t] for t in tokenize("graph tree graph")]].mean(axis=0)
+    assert np.allclose(out[2], expected / np.linalg.norm(expected), atol=1e-6)
+    assert not out[1].any()  # empty text stays a zero vector
+    assert np.allclose(out[3], projection[0] / np.linalg.norm(projection[0]), atol=1e-6)
+    assert out.dtype == np.float32 and out.shape == (5, 16)
+
+
+def test_projection_rows_are_stable_as_vocabulary_grows():
+    assert np.array_equal(projection_matrix(10, 8)[:4], projection_matrix(4, 8))
+
+
+def test_parallel_chunks_are_byte_identical_to_serial():
+    encoder = HashedEmbeddingEncoder(VOCAB, dim=32)
+    serial = encoder.encode(TEXTS)
+    parallel = encoder.encode_parallel(TEXTS, workers=2, chunk_size=4)
+    assert serial.tobytes() == parallel.tobytes()
+
+
+def test_output_is_identical_across_processes_with_different_hash_seeds():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digests = set()
+    for seed in ("1", "2"):
+        env = {**os.environ, "PYTHONHASHSEED": seed, "PYTHONPATH": root}
+        digests.add(subprocess.run(
+            [sys.executable, "-c", _SCRIPT], env=env, cwd=root, capture_output=True, text=True, check=True
+        ).stdout)
+    assert len(digests) == 1
+
+
+def test_feature_engineer_takes_its_worker_count_from_the_environment(tmp_path, monkeypatch):
+    requested = []
+    original = HashedEmbeddingEncoder.encode_parallel
+
+    def spy(self, texts, workers=None, **kwargs):
+        requested.append(workers)
+        return original(self, texts, workers=1, **kwargs)
+
+    monkeypatch.setattr(HashedEmbeddingEncoder, "encode_parallel", spy)
+    monkeypatch.setenv(EMBEDDING_WORKERS_ENV, "3")
+    problems = [{"id": f"p{i}", "title": text, "description": text} for i, text in enumerate(TEXTS[:5])]
+    AIFeatureEngineer(tmp_path).generate_semantic_embeddings(problems)
+    assert requested == [3, 3, 3]
+    # An explicit count (the pipeline's) wins over the environment
+    assert AIFeatureEngineer(tmp_path, embedding_workers=2).embedding_workers == 2
+
+
+def test_texts_without_shared_tokens_are_near_orthogonal():
+    words = [f"word{i}" for i in range(200)]
+    vocab = {"<UNK>": 0, "<PAD>": 1, **{w: i + 2 for i, w in enumerate(words)}}
+    out = HashedEmbeddingEncoder(vocab, dim=128).encode([" ".join(words[:100]), " ".join(words[100:])])
+    assert abs(float(out[0] @ out[1])) < 0.2
+    same = HashedEmbeddingEncoder(vocab, dim=128).encode([" ".join(words[:100]), " ".join(words[:90])])
+    assert float(same[0] @ same[1]) > 0.9
+
+
+def test_invalid_worker_count_falls_back_to_one(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv(EMBEDDING_WORKERS_ENV, "many")
+    assert AIFeatureEngineer(tmp_path).embedding_workers == 1
+    assert "Ignoring invalid DSATRAIN_EMBEDDING_WORKERS" in caplog.text
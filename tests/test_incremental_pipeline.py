@@ -0,0 +1,97 @@
+import json
+
+from src.ml.embedding_store import EmbeddingStore
+from src.models.ai_features_models import DataPipelineStatus, ProblemEmbedding
+from src.models.database import Base, DatabaseConfig, Problem
+from src.processors.change_tracking import load_watermarks
+from src.processors.jsonl_artifacts import iter_artifact_records
+from src.processors.pipeline_orchestrator import DataPipelineOrchestrator
+
+
+def _write_raw(data_dir, cf_problems, hr_problems):
+    cf_file = data_dir / "raw" / "codeforces" / "problems" / "problems_simple.json"
+    hr_file = data_dir / "raw" / "hackerrank" / "interview_kit" / "interview_kit_problems.json"
+    cf_file.parent.mkdir(parents=True, exist_ok=True)
+    hr_file.parent.mkdir(parents=True, exist_ok=True)
+    cf_file.write_text(json.dumps({"problems": cf_problems}))
+    hr_file.write_text(json.dumps(hr_problems))
+
+
+def _cf(contest, index, name, tags):
+    return {"contestId": contest, "index": index, "name": name, "rating": 1200, "tags": tags}
+
+
+def test_second_run_reprocesses_only_changed_records(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    data_dir = tmp_path / "data"
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'incremental.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    cf_problems = [
+        _cf(100 + i, "A", f"Problem {i} with arrays and sorting", ["greedy", "sorting"]) for i in range(6)
+    ]
+    hr_problems = [{"id": "two-sum", "title": "Two Sum", "tags": ["arrays"]}]
+    _write_raw(data_dir, cf_problems, hr_problems)
+    orchestrator = DataPipelineOrchestrator(data_dir, db_config=db_config)
+
+    first = orchestrator.run_incremental_update()
+    assert first["status"] == "success", first["errors"]
+    assert len(first["reprocessed_ids"]) == 7
+    store = EmbeddingStore.open("dsatrain_v2", data_dir / "processed" / "ai_features" / "embeddings")
+    kept_row = store.row_offset("cf_101_A")
+    kept_vector = store.matrix("combined")[kept_row].copy()
+
+    # Rename one Codeforces problem and add another; HackerRank is untouched
+    cf_problems[3]["name"] = "Problem 3 renamed to mention graphs"
+    cf_problems.append(_cf(200, "B", "Brand new problem", ["dp"]))
+    _write_raw(data_dir, cf_problems, hr_problems)
+
+    second = orchestrator.run_incremental_update()
+    assert second["status"] == "success", second["errors"]
+    assert second["reprocessed_ids"] == ["cf_103_A", "cf_200_B"]
+    assert [c["component"] for c in second["components_updated"]] == ["codeforces_problems", "trend_monitoring"]
+
+    store = EmbeddingStore.open("dsatrain_v2", data_dir / "processed" / "ai_features" / "embeddings")
+    assert len(store.ids) == 8 and store.row_offset("cf_101_A") == kept_row
+    assert (store.matrix("combined")[kept_row] == kept_vector).all()
+    scores = {r["id"] for r in iter_artifact_records(data_dir / "processed" / "quality_scoring" / "quality_scores.json", "scores")}
+    assert "cf_200_B" in scores and len(scores) == 8
+
+    session = db_config.get_session()
+    assert session.get(Problem, "cf_103_A").title == "Problem 3 renamed to mention graphs"
+    assert session.query(Problem).count() == 8
+    assert session.query(ProblemEmbedding).filter_by(problem_id="cf_200_B").one().row_offset == 7
+    watermarks = load_watermarks(session)
+    assert watermarks["codeforces"]["last_contest_id"] == 200
+    assert set(watermarks) == {"codeforces", "hackerrank", "import"}
+    assert session.query(DataPipelineStatus).filter_by(pipeline_component="watermark:hackerrank").count() == 1
+    session.close()
+
+    third = orchestrator.run_incremental_update()
+    assert third["components_updated"][0]["status"] == "no_new_data"
+
+
+def test_unreadable_source_fails_the_run_without_dropping_its_problems(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    data_dir = tmp_path / "data"
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'incremental.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    _write_raw(data_dir, [_cf(100, "A", "Arrays problem", ["sorting"])], [])
+    atcoder_file = data_dir / "raw" / "atcoder" / "atcoder_problems.json"
+    atcoder_file.parent.mkdir(parents=True)
+    atcoder_file.write_text(json.dumps({"problems": [{"id": "abc100_a", "title": "Happy Birthday", "tags": []}]}))
+    orchestrator = DataPipelineOrchestrator(data_dir, db_config=db_config)
+    assert orchestrator.run_incremental_update()["status"] == "success"
+    session = db_config.get_session()
+    before = load_watermarks(session)["atcoder"]
+    session.close()
+
+    atcoder_file.write_text('{"problems": [')
+    failed = orchestrator.run_incremental_update()
+    assert failed["status"] == "failed"
+
+    problems_file = data_dir / "processed" / "problems_unified_complete.json"
+    assert any(r.get("source") == "atcoder" for r in iter_artifact_records(problems_file, "problems"))
+    session = db_config.get_session()
+    assert session.query(Problem).filter_by(platform="atcoder").count() == 1
+    assert load_watermarks(session)["atcoder"] == before
+    session.close()
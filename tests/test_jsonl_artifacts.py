@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from src.models.database import Base, DatabaseConfig
+from src.models.ai_features_models import ProblemDifficultyVector
+from src.processors.jsonl_artifacts import (
+    JsonlArtifactWriter, iter_artifact_records, read_artifact_metadata, resolve_artifact, write_jsonl_artifact
+)
+from src.services.data_import_service import DataImportService
+
+
+def test_jsonl_roundtrip_streams_records_after_header(tmp_path):
+    path = write_jsonl_artifact(
+        tmp_path / "vectors.json",
+        ({"id": f"p{i}", "vector": [i, i + 1]} for i in range(3)),
+        metadata={"dimensions": ["a", "b"]},
+    )
+
+    assert path.suffix == ".jsonl"
+    assert len(path.read_text().splitlines()) == 4
+    assert resolve_artifact(tmp_path / "vectors.json") == path
+    assert read_artifact_metadata(tmp_path / "vectors.json") == {"dimensions": ["a", "b"]}
+    assert [r["id"] for r in iter_artifact_records(tmp_path / "vectors.json", "vectors")] == ["p0", "p1", "p2"]
+
+
+def test_failed_write_leaves_previous_artifact(tmp_path):
+    write_jsonl_artifact(tmp_path / "scores.json", [{"id": "old"}])
+
+    with pytest.raises(RuntimeError):
+        with JsonlArtifactWriter(tmp_path / "scores.json") as writer:
+            writer.write({"id": "new"})
+            raise RuntimeError("boom")
+
+    assert [r["id"] for r in iter_artifact_records(tmp_path / "scores.json", "scores")] == ["old"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_newer_legacy_json_wins_over_stale_jsonl(tmp_path):
+    stale = write_jsonl_artifact(tmp_path / "problems.json", [{"id": "old"}])
+    legacy = tmp_path / "problems.json"
+    legacy.write_text(json.dumps({"problems": [{"id": "new"}]}))
+    os.utime(stale, ns=(1_000_000_000, 1_000_000_000))
+
+    assert resolve_artifact(legacy) == legacy
+    assert [r["id"] for r in iter_artifact_records(legacy, "problems")] == ["new"]
+
+    write_jsonl_artifact(legacy, [{"id": "newest"}])
+    assert resolve_artifact(legacy) == stale
+
+
+def test_legacy_json_documents_are_adapted(tmp_path):
+    (tmp_path / "problems.json").write_text(json.dumps({"metadata": {"v": 1}, "problems": [{"id": "a"}, {"id": "b"}]}))
+    (tmp_path / "vectors.json").write_text(json.dumps({"vectors": {"a": {"vector": [1]}, "b": {"vector": [2]}}}))
+
+    assert read_artifact_metadata(tmp_path / "problems.json") == {"v": 1}
+    assert [r["id"] for r in iter_artifact_records(tmp_path / "problems.json", "problems")] == ["a", "b"]
+    assert list(iter_artifact_records(tmp_path / "vectors.json", "vectors")) == [
+        {"vector": [1], "id": "a"}, {"vector": [2], "id": "b"},
+    ]
+    with pytest.raises(FileNotFoundError):
+        list(iter_artifact_records(tmp_path / "missing.json", "problems"))
+
+
+def test_import_consumes_jsonl_artifacts(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    processed = tmp_path / "data" / "processed"
+    problems = [
+        {"id": f"jl_{i}", "source": "codeforces", "title": f"Problem {i}", "unified_tags": ["graphs"]}
+        for i in range(4)
+    ]
+    write_jsonl_artifact(processed / "problems_unified_complete.json", problems, metadata={"total_problems": 4})
+    write_jsonl_artifact(
+        processed / "ai_features" / "difficulty_vectors.json",
+        # The unknown problem is skipped, the short vector is ignored
+        [{"id": "jl_0", "vector": [0.1] * 5}, {"id": "jl_1", "vector": [0.2]}, {"id": "ghost", "vector": [0.3] * 5}],
+    )
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    service = DataImportService(tmp_path / "data", db_config, chunk_size=3)
+    session = db_config.get_session()
+
+    result = service.import_unified_problems(session)
+    assert (result["status"], result["imported"], result["total_processed"]) == ("success", 4, 4)
+
+    vectors = service.import_difficulty_vectors(session)
+    assert (vectors["imported"], vectors["total_vectors"]) == (1, 3)
+    assert session.query(ProblemDifficultyVector).one().problem_id == "jl_0"
+    session.close()
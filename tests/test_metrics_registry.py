@@ -0,0 +1,121 @@
+import gc
+import multiprocessing
+import threading
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.api.observability import DB_QUERY_SECONDS, instrument_queries, setup_observability
+from src.services.metrics import Registry
+
+
+def test_counters_histograms_and_gauges_render_as_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("demo_requests_total", "Demo requests", ["route"])
+    latency = registry.histogram("demo_seconds", "Demo latency", ["route"], buckets=(0.1, 1.0))
+    in_flight = registry.gauge("demo_in_flight", "In flight")
+
+    # Lock-free per-thread cells still add up exactly
+    threads = [threading.Thread(target=lambda: [requests.labels("/a").inc() for _ in range(2000)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for value in (0.05, 0.5, 5.0):
+        latency.labels(route="/a").observe(value)
+    in_flight.inc(3)
+    in_flight.dec()
+
+    assert requests.labels("/a").get() == 8000
+    assert latency.labels("/a").get() == (3, pytest.approx(5.55))
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_requests_total counter" in lines
+    assert 'demo_requests_total{route="/a"} 8000.0' in lines
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1.0' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2.0' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3.0' in lines
+    assert 'demo_seconds_count{route="/a"} 3.0' in lines
+    assert "demo_in_flight 2.0" in lines
+
+    with pytest.raises(ValueError):
+        requests.labels("/a", "extra")
+    with pytest.raises(ValueError):
+        registry.gauge("demo_requests_total", "Same name, different type")
+
+
+def test_cells_of_exited_threads_are_folded_into_the_total():
+    registry = Registry()
+    jobs = registry.counter("demo_jobs_total", "Demo jobs")
+    for _ in range(50):
+        t = threading.Thread(target=lambda: [jobs.inc() for _ in range(10)])
+        t.start()
+        t.join()
+    gc.collect()
+
+    assert jobs.get() == 500
+    assert len(jobs._unlabeled()._cells._cells) <= 1
+
+
+def _worker(directory):
+    registry = Registry(directory)
+    registry.counter("jobs_total", "Jobs", ["kind"]).labels("import").inc(2)
+    registry.histogram("job_seconds", "Job time", buckets=(1.0,)).observe(0.5)
+    registry.gauge("workers", "Live workers").set(1)
+
+
+def test_multiprocess_files_are_aggregated(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_worker, args=(str(tmp_path),)) for _ in range(3)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    registry = Registry(str(tmp_path))
+    registry.counter("jobs_total", "Jobs", ["kind"]).labels("import").inc()
+    registry.gauge("workers", "Live workers").set(1)
+    lines = registry.render().splitlines()
+    # Counters and histograms keep the contributions of exited workers...
+    assert 'jobs_total{kind="import"} 7.0' in lines
+    assert 'job_seconds_bucket{le="+Inf"} 3.0' in lines
+    assert "job_seconds_sum 1.5" in lines
+    # ...gauges only count live processes
+    assert "workers 1.0" in lines
+
+
+def test_middleware_records_route_templates_and_statuses():
+    app = FastAPI()
+    setup_observability(app)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="missing")
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in (1, 2, 0):
+        client.get(f"/items/{item_id}")
+    client.get("/no/such/route")
+
+    body = client.get("/metrics").text
+    assert 'dsatrain_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2.0' in body
+    assert 'dsatrain_http_requests_total{method="GET",route="/items/{item_id}",status="404"} 1.0' in body
+    assert 'route="<unmatched>",status="404"' in body
+    assert 'dsatrain_http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3.0' in body
+
+
+def test_query_hooks_time_statements_on_any_engine():
+    instrument_queries()
+    selects = DB_QUERY_SECONDS.labels("select")
+    before = selects.get()[0]
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 2"))
+        assert conn.info["query_started"] == []
+    assert selects.get()[0] == before + 2
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from src.processors.pipeline_dag import CPU, DEFAULT_STAGES, IO, PipelineDAG, PipelineScheduler, Stage
+
+# Stage targets live at module level so process-pool workers can import them
+
+
+def upper_stage(data_dir):
+    text = (data_dir / "raw" / "words.txt").read_text()
+    (data_dir / "processed").mkdir(exist_ok=True)
+    (data_dir / "processed" / "upper.txt").write_text(text.strip().upper())
+
+
+def count_stage(data_dir):
+    text = (data_dir / "processed" / "upper.txt").read_text()
+    (data_dir / "processed" / "count.txt").write_text(str(len(text.split())))
+    with (data_dir / "count_runs.log").open("a") as f:
+        f.write("run\n")
+
+
+def failing_stage(data_dir):
+    return {"pipeline_status": "failed", "error": "source unavailable"}
+
+
+async def slow_fetch(data_dir):
+    await asyncio.sleep(0.3)
+
+
+def _stages():
+    return [
+        Stage("count", "test_pipeline_dag:count_stage",
+              inputs=("processed/upper.txt",), outputs=("processed/count.txt",)),
+        Stage("upper", "test_pipeline_dag:upper_stage",
+              inputs=("raw/words.txt",), outputs=("processed/upper.txt",)),
+    ]
+
+
+def test_dependencies_come_from_inputs_and_outputs():
+    dag = PipelineDAG(_stages() + [
+        Stage("fetch", "test_pipeline_dag:slow_fetch", outputs=("raw",), kind=IO),
+        Stage("other", "test_pipeline_dag:failing_stage", after=("fetch",)),
+    ])
+
+    assert dag.dependencies == {"count": ["upper"], "upper": ["fetch"], "fetch": [], "other": ["fetch"]}
+    assert dag.order().index("upper") < dag.order().index("count")
+    assert dag.select(["count"]) == ["fetch", "upper", "count"]
+    with pytest.raises(ValueError, match="cycle"):
+        PipelineDAG([Stage("a", "m:f", inputs=("x",), outputs=("y",)), Stage("b", "m:f", inputs=("y",), outputs=("x",))])
+
+
+def test_default_stages_wait_for_every_artifact_they_read():
+    dependencies = {name: set(deps) for name, deps in PipelineDAG(DEFAULT_STAGES).dependencies.items()}
+
+    assert dependencies == {
+        "codeforces_collection": set(),
+        "academic_datasets": set(),
+        "behavioral_processing": set(),
+        "unified_data_processor": {"codeforces_collection"},
+        "quality_scoring_engine": {"unified_data_processor", "academic_datasets"},
+        "ai_feature_engineer": {"unified_data_processor", "academic_datasets"},
+    }
+    behavioral = next(stage for stage in DEFAULT_STAGES if stage.name == "behavioral_processing")
+    assert "raw/google_official" in behavioral.inputs
+
+
+def test_unchanged_inputs_are_skipped_and_unchanged_outputs_cut_off_rebuilds(tmp_path):
+    (tmp_path / "raw").mkdir()
+    words = tmp_path / "raw" / "words.txt"
+    words.write_text("binary search trees")
+    scheduler = PipelineScheduler(PipelineDAG(_stages()), tmp_path, tmp_path / "state.json", max_workers=1)
+
+    first = scheduler.run()
+    assert first["counts"] == {"success": 2}
+    assert (tmp_path / "processed" / "count.txt").read_text() == "3"
+    assert scheduler.run()["counts"] == {"skipped": 2}
+
+    # Same words, different bytes: upper reruns but produces an identical output
+    words.write_text("binary search trees\n")
+    third = scheduler.run()
+    assert third["stages"]["upper"]["status"] == "success"
+    assert third["stages"]["count"]["status"] == "skipped"
+    assert (tmp_path / "count_runs.log").read_text().count("run") == 1
+
+    assert scheduler.run(force=True)["counts"] == {"success": 2}
+
+
+def test_failures_block_dependents_and_are_retried(tmp_path):
+    stages = [
+        Stage("fetch", "test_pipeline_dag:failing_stage", outputs=("raw/words.txt",), kind=CPU),
+        *_stages(),
+    ]
+    (tmp_path / "raw").mkdir()
+    (tmp_path / "raw" / "words.txt").write_text("graphs")
+    scheduler = PipelineScheduler(PipelineDAG(stages), tmp_path, tmp_path / "state.json", max_workers=1)
+
+    result = scheduler.run()
+    assert result["stages"]["fetch"] == {"status": "failed", "seconds": result["stages"]["fetch"]["seconds"],
+                                         "error": "source unavailable"}
+    assert result["stages"]["upper"] == {"status": "blocked", "blocked_by": ["fetch"]}
+    assert result["stages"]["count"] == {"status": "blocked", "blocked_by": ["upper"]}
+    assert scheduler.run()["stages"]["fetch"]["status"] == "failed"
+
+
+def test_independent_io_stages_overlap(tmp_path):
+    stages = [Stage(f"fetch_{i}", "test_pipeline_dag:slow_fetch", kind=IO, always_run=True) for i in range(3)]
+    scheduler = PipelineScheduler(PipelineDAG(stages), tmp_path, tmp_path / "state.json")
+
+    started = time.perf_counter()
+    result = scheduler.run()
+    assert result["counts"] == {"success": 3}
+    assert time.perf_counter() - started < 0.8
@@ -0,0 +1,54 @@
+import json
+
+from src.processors.quality_scoring_engine import CHECKPOINT_FILE, QualityScoringEngine
+
+PROBLEMS = [
+    {
+        "id": f"p{i}",
+        "title": ["Two Sum", "Binary Search on Answer", "Large Scale Merge", "Tree Traversal"][i % 4],
+        "description": "word " * (i * 7 % 60),
+        "unified_tags": [["arrays", "hash_tables"], ["binary_search", "sorting"], ["graphs", "greedy"], ["trees"]][i % 4],
+        "difficulty": {"level": ["easy", "medium", "hard"][i % 3]},
+    }
+    for i in range(23)
+]
+
+
+def _strip_timings(results):
+    results["metadata"].pop("timings")
+    results["metadata"].pop("scoring_date")
+    return results
+
+
+def test_parallel_chunks_merge_to_the_serial_result(tmp_path):
+    serial = QualityScoringEngine(tmp_path, chunk_size=1000).score_all_problems(PROBLEMS)
+    parallel = QualityScoringEngine(tmp_path, scoring_workers=2, chunk_size=4).score_all_problems(PROBLEMS)
+
+    assert list(parallel["scores"]) == [p["id"] for p in PROBLEMS]
+    timings = parallel["metadata"]["timings"]
+    assert timings["chunks"] == 6 and set(timings["stage_seconds"]) >= {"content_quality", "learning_position"}
+    assert _strip_timings(parallel) == _strip_timings(serial)
+
+
+def test_checkpoint_resumes_only_missing_or_changed_chunks(tmp_path, monkeypatch):
+    engine = QualityScoringEngine(tmp_path, chunk_size=5)
+    checkpoint = tmp_path / CHECKPOINT_FILE
+    expected = engine.score_all_problems(PROBLEMS, checkpoint)
+
+    # Simulate a crash: the last chunk record was torn mid-write
+    lines = checkpoint.read_text().splitlines()
+    checkpoint.write_text("\n".join(lines[:-1]) + "\n" + lines[-1][:20])
+    changed = [dict(p) for p in PROBLEMS]
+    changed[0]["title"] = "Palindrome Substring"
+
+    scored = []
+    original = QualityScoringEngine.score_chunk
+    monkeypatch.setattr(QualityScoringEngine, "score_chunk",
+                        lambda self, problems, offset=0: scored.append(offset) or original(self, problems, offset))
+    resumed = engine.score_all_problems(changed, checkpoint)
+
+    assert scored == [0, 20]  # the edited first chunk and the torn last one
+    assert resumed["metadata"]["timings"]["resumed_chunks"] == 3
+    assert resumed["scores"]["p7"] == expected["scores"]["p7"]
+    assert resumed["scores"]["p0"]["google_relevance"] != expected["scores"]["p0"]["google_relevance"]
+    assert all(json.loads(line)["key"] for line in checkpoint.read_text().splitlines()[-2:])
@@ -0,0 +1,117 @@
+import logging
+import re
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import src.api.main as main
+from src.api.observability import instrument_queries
+from src.models.database import Base, DatabaseConfig, Problem, Solution
+from src.services import query_profiler
+from src.services.query_profiler import explain, fingerprint, track_queries
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    config = DatabaseConfig(f"sqlite:///{tmp_path / 'queries.db'}")
+    Base.metadata.create_all(bind=config.engine)
+    session = config.get_session()
+    for i in range(20):
+        session.add(Problem(id=f"q_{i}", platform="custom", platform_id=f"q{i}", title=f"Query {i}",
+                            difficulty="Easy", algorithm_tags=["arrays"], quality_score=float(i)))
+    for i in range(5):
+        session.add(Solution(id=f"q_0_sol_{i}", problem_id="q_0", language="python", code="pass",
+                             approach_type="brute_force", algorithm_tags=["arrays"], overall_quality_score=float(i)))
+    session.commit()
+    yield config
+    session.close()
+
+
+def test_fingerprints_collapse_literals_and_parameters():
+    assert fingerprint("SELECT * FROM problems WHERE id = 'two_sum' AND  rating > 3.5") == \
+        "SELECT * FROM problems WHERE id = ? AND rating > ?"
+    assert fingerprint("SELECT a FROM t WHERE id IN (?, ?, ?) LIMIT ? OFFSET ?") == \
+        fingerprint("SELECT a FROM t WHERE id IN (:id_1, :id_2) LIMIT 10 OFFSET 20")
+    # Digits inside identifiers are not literals
+    assert fingerprint("SELECT anon_1.id FROM t1 AS anon_1") == "SELECT anon_1.id FROM t1 AS anon_1"
+
+
+def test_scope_counts_queries_and_slow_ones_are_logged_with_a_plan(db, monkeypatch, caplog):
+    instrument_queries()
+    monkeypatch.setattr(query_profiler, "slow_query_seconds", 1e-9)
+    session = db.get_session()
+    try:
+        with caplog.at_level(logging.WARNING, logger="src.services.query_profiler"):
+            with track_queries("loop") as stats:
+                for i in range(3):
+                    session.execute(text("SELECT title FROM problems WHERE id = :id"), {"id": f"q_{i}"}).all()
+    finally:
+        session.close()
+    assert stats.count == 3 and stats.slow == 3
+    assert stats.repeated() == {"SELECT title FROM problems WHERE id = ?": 3}
+    assert "Slow query" in caplog.text and "in loop" in caplog.text
+    assert re.search(r"plan: SEARCH problems USING (INDEX|PRIMARY KEY)", caplog.text)
+
+
+def test_explain_covers_ctes_and_isolates_failures_on_postgres():
+    connection = sqlite3.connect(":memory:")
+    plan = explain(connection.cursor(), "sqlite", "\n  WITH t AS (SELECT 1 AS x) SELECT x FROM t", None)
+    assert plan
+
+    class FailingCursor:
+        def __init__(self, executed):
+            self.executed = executed
+            self.connection = self
+
+        def cursor(self):
+            return self
+
+        def execute(self, sql, parameters=()):
+            self.executed.append(sql)
+            if sql.startswith("EXPLAIN"):
+                raise RuntimeError("permission denied")
+
+        def close(self):
+            pass
+
+    executed = []
+    assert explain(FailingCursor(executed), "postgresql", "SELECT 1", None) is None
+    # The failed EXPLAIN is rolled back to its savepoint, not left to abort the transaction
+    assert executed == ["SAVEPOINT dsatrain_explain", "EXPLAIN SELECT 1", "ROLLBACK TO SAVEPOINT dsatrain_explain"]
+
+
+def _db_queries(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+def test_hot_endpoints_stay_within_their_query_budget(db, monkeypatch):
+    monkeypatch.setenv("DSATRAIN_DEBUG_ENDPOINTS", "1")
+
+    def get_db():
+        session = db.get_session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    main.app.dependency_overrides[main.get_db] = get_db
+    query_profiler.reset_routes()
+    try:
+        client = TestClient(main.app)
+        # One COUNT plus one page query, however many problems are on the page
+        r = client.get("/problems", params={"limit": 20})
+        assert r.json()["count"] == 20
+        assert _db_queries(r) == 2
+
+        r = client.get("/problems/q_0/solutions")
+        assert r.json()["count"] == 5
+        assert _db_queries(r) == 2
+
+        report = {row["route"]: row for row in client.get("/debug/queries").json()["routes"]}
+        assert report["GET /problems"]["queries_per_request"] == 2
+        assert report["GET /problems/{problem_id}/solutions"]["top_statements"]
+    finally:
+        main.app.dependency_overrides.pop(main.get_db, None)
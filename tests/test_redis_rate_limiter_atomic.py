@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+redis = pytest.importorskip("redis")
+
+from src.services.rate_limit.common import RateLimitExceeded
+from src.services.rate_limit.redis_backed import SLIDING_WINDOW_LUA, RedisRateLimiter
+
+
+def _have_redis(url: str) -> bool:
+    try:
+        return bool(redis.StrictRedis.from_url(url).ping())
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    """A real redis-server when one is reachable, else a local fakeredis TCP server."""
+    url = os.getenv("DSATRAIN_REDIS_URL", "redis://localhost:6379/0")
+    if _have_redis(url):
+        yield url
+        return
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs lupa to run Lua scripts
+    if not hasattr(fakeredis, "TcpFakeServer"):
+        pytest.skip("Redis not available")
+    server = fakeredis.TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+def _hammer(url, model, attempts, results):
+    allowed = 0
+    try:
+        limiter = RedisRateLimiter(25, 60, "stress", model, url)
+        for _ in range(attempts):
+            try:
+                limiter.check_and_increment()
+                allowed += 1
+            except RateLimitExceeded:
+                pass
+    except Exception as e:
+        allowed = repr(e)
+    results.put(allowed)
+
+
+def test_concurrent_processes_never_exceed_the_limit(redis_url):
+    model = f"procs-{os.getpid()}"
+    setup = RedisRateLimiter(25, 60, "stress", model, redis_url)
+    setup.reset()
+    # Load the script up front so the workers race on the limit, not on NOSCRIPT fallbacks
+    setup.r.script_load(SLIDING_WINDOW_LUA)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=_hammer, args=(redis_url, model, 20, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    allowed = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert all(isinstance(count, int) for count in allowed), allowed
+    assert sum(allowed) == 25
+    status = setup.status()
+    assert status.used == 25 and 0 < status.reset_seconds <= 60
+
+
+def test_requests_in_the_same_millisecond_are_counted_separately(redis_url):
+    limiter = RedisRateLimiter(1000, 60, "burst", f"same-ms-{os.getpid()}", redis_url)
+    limiter.reset()
+    for _ in range(200):
+        limiter.check_and_increment()
+    assert limiter.status().used == 200
+
+    small = RedisRateLimiter(2, 5, "burst", f"retry-{os.getpid()}", redis_url)
+    small.reset()
+    small.check_and_increment()
+    small.check_and_increment()
+    with pytest.raises(RateLimitExceeded) as exceeded:
+        small.check_and_increment()
+    assert 1 <= exceeded.value.retry_after_seconds <= 5
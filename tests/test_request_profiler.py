@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import sys
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.observability import ProfilingMiddleware, setup_observability
+from src.services import request_profiler
+from src.services.request_profiler import _ACTIVE_PROFILE, Profiler, RequestProfile, StackSampler, _context_owner
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def busy_sync_work():
+    _spin(0.15)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("DSATRAIN_PROFILING", "1")
+    monkeypatch.setenv("DSATRAIN_DEBUG_ENDPOINTS", "1")
+    monkeypatch.setattr(request_profiler, "_profiler", Profiler(sample_rate=0.0, interval_seconds=0.002))
+    app = FastAPI()
+    setup_observability(app)
+
+    @app.get("/sync/{n}")
+    def sync_endpoint(n: int):
+        busy_sync_work()
+        return {"n": n}
+
+    @app.get("/async")
+    async def async_endpoint():
+        _spin(0.1)
+        await asyncio.sleep(0)
+        return {}
+
+    return TestClient(app)
+
+
+def test_only_flagged_requests_are_profiled_into_collapsed_stacks(client):
+    assert "x-profile-id" not in client.get("/sync/1").headers
+    assert client.get("/debug/profiles").json()["profiles"] == []
+
+    r = client.get("/sync/2", headers={"X-Profile": "1"})
+    profile_id = int(r.headers["x-profile-id"])
+    client.get("/async", headers={"X-Profile": "1"})
+
+    listed = client.get("/debug/profiles", params={"route": "GET /sync/{n}"}).json()["profiles"]
+    assert [p["id"] for p in listed] == [profile_id]
+    assert listed[0]["trigger"] == "header" and listed[0]["samples"] > 0
+
+    # Sync endpoints run in the threadpool and are still attributed to their request
+    text = client.get("/debug/profiles/collapsed", params={"profile_id": profile_id}).text
+    lines = text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(":busy_sync_work;" in line and ":_spin " in line for line in lines)
+
+    text = client.get("/debug/profiles/collapsed", params={"route": "GET /async"}).text
+    assert any(".async_endpoint;" in line and ":_spin " in line for line in text.splitlines())
+    assert client.get("/debug/profiles/collapsed", params={"route": "GET /missing"}).status_code == 404
+
+
+def test_debug_endpoints_need_the_env_flag(client, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DEBUG_ENDPOINTS")
+    assert client.get("/debug/profiles").status_code == 403
+
+
+def test_ring_buffer_keeps_the_newest_profiles_per_route(client, monkeypatch):
+    monkeypatch.setattr(request_profiler, "_profiler", Profiler(sample_rate=1.0, interval_seconds=0.002, per_route=2))
+    for n in range(4):
+        client.get(f"/sync/{n}")
+    profiles = client.get("/debug/profiles").json()["profiles"]
+    assert [p["path"] for p in profiles] == ["/sync/3", "/sync/2"]
+    assert {p["trigger"] for p in profiles} == {"sampled"}
+
+
+def test_profiler_is_not_installed_unless_enabled(monkeypatch):
+    monkeypatch.delenv("DSATRAIN_PROFILING", raising=False)
+    app = FastAPI()
+    setup_observability(app)
+    assert ProfilingMiddleware not in [m.cls for m in app.user_middleware]
+
+
+def test_only_the_worker_loop_frame_is_read_for_a_context():
+    profile = RequestProfile("GET", "/x", "header")
+    token = _ACTIVE_PROFILE.set(profile)
+    try:
+        context = contextvars.copy_context()
+    finally:
+        _ACTIVE_PROFILE.reset(token)
+    # Any other frame with a local named "context" is not a worker loop
+    assert context.get(_ACTIVE_PROFILE) is profile
+    assert _context_owner(sys._getframe()) is None
+
+
+def test_stop_waits_for_an_in_flight_sample():
+    sampler = StackSampler(interval_seconds=0.001)
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_sample(active, me):
+        entered.set()
+        release.wait(5)
+
+    sampler._sample = slow_sample
+    profile = RequestProfile("GET", "/x", "header")
+    sampler.start(profile, sys._getframe())
+    assert entered.wait(5)
+    stopped = threading.Event()
+    stopper = threading.Thread(target=lambda: (sampler.stop(profile), stopped.set()))
+    stopper.start()
+    assert not stopped.wait(0.1)
+    release.set()
+    stopper.join(5)
+    assert stopped.is_set()
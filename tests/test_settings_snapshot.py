@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from src.services.settings_service import Settings, SettingsService
+
+
+def _reads(monkeypatch):
+    calls = []
+    original = SettingsService._read
+
+    def counting(self):
+        calls.append(self.settings_path)
+        return original(self)
+
+    monkeypatch.setattr(SettingsService, "_read", counting)
+    return calls
+
+
+def test_reads_share_one_snapshot_until_the_settings_change(tmp_path: Path, monkeypatch):
+    path = tmp_path / "user_settings.json"
+    svc = SettingsService(settings_path=path, reload_check_seconds=0)
+    svc.save(Settings(hint_budget_per_session=3))
+    reads = _reads(monkeypatch)
+
+    first = svc.snapshot()
+    assert all(svc.current() is first.settings for _ in range(5))
+    assert reads == []  # the save already published the snapshot
+
+    # An update through another instance is visible at once, with a new version
+    SettingsService(settings_path=path).update({"hint_budget_per_session": 7})
+    assert svc.current().hint_budget_per_session == 7
+    assert svc.snapshot().version > first.version
+    assert reads == []
+
+
+def test_outside_edits_are_picked_up_by_file_stat(tmp_path: Path, monkeypatch):
+    path = tmp_path / "user_settings.json"
+    SettingsService(settings_path=path).save(Settings())
+    eager = SettingsService(settings_path=path, reload_check_seconds=0)
+    lazy = SettingsService(settings_path=path, reload_check_seconds=3600)
+    version = eager.snapshot().version
+
+    raw = json.loads(path.read_text())
+    raw["rate_limit_per_minute"] = 99
+    path.write_text(json.dumps(raw))
+    assert lazy.current().rate_limit_per_minute == 30  # not re-checked within the interval
+    assert eager.current().rate_limit_per_minute == 99
+    assert eager.snapshot().version > version
+    # Once reloaded, the shared snapshot serves every instance
+    assert lazy.current().rate_limit_per_minute == 99
+
+
+def test_load_returns_a_private_copy_and_saves_are_atomic(tmp_path: Path):
+    path = tmp_path / "user_settings.json"
+    svc = SettingsService(settings_path=path)
+    assert svc.current() == Settings()  # defaults written on first access
+    copy = svc.load()
+    copy.api_keys["openai"] = "sk-local-only"
+    assert svc.current().api_keys == {}
+
+    svc.update({"model": "gpt-4o-mini"})
+    assert json.loads(path.read_text())["model"] == "gpt-4o-mini"
+    assert [p.name for p in tmp_path.iterdir()] == ["user_settings.json"]
@@ -0,0 +1,181 @@
+import threading
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from src.models.database import Base, DatabaseConfig, Problem
+from src.services.ai_service import AICostExceeded, AIService
+from src.services.costs.common import CostCapExceeded
+from src.services.costs.sql_backed import SQLCostLedger
+from src.services.rate_limit.budget_stores import SQLBudgetStore
+from src.services.rate_limit.common import BudgetExceeded
+from src.services.settings_service import Settings, SettingsService
+
+
+def _engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_sql_ledger_never_exceeds_the_cap_across_workers(tmp_path):
+    path = tmp_path / "ledger.db"
+    # One engine per "worker": nothing is shared but the database file
+    ledgers = [SQLCostLedger(2.0, _engine(path)) for _ in range(8)]
+    outcomes = []
+
+    def spend(ledger):
+        try:
+            ledger.reserve(0.5)
+            outcomes.append(True)
+        except CostCapExceeded:
+            outcomes.append(False)
+
+    threads = [threading.Thread(target=spend, args=(ledger,)) for ledger in ledgers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count(True) == 4
+    status = ledgers[0].status()
+    assert status.used_usd == pytest.approx(2.0)
+    assert status.month_key == datetime.now(UTC).strftime("%Y-%m")
+
+    # Settling below the reservation refunds the difference
+    ledgers[1].commit(-0.75)
+    assert ledgers[2].status().used_usd == pytest.approx(1.25)
+    ledgers[2].reserve(0.75)
+    with pytest.raises(CostCapExceeded):
+        ledgers[3].reserve(0.01)
+
+
+def test_sql_budgets_are_shared_conditional_and_expire(tmp_path):
+    engine = _engine(tmp_path / "budgets.db")
+    worker_a, worker_b = SQLBudgetStore(engine), SQLBudgetStore(_engine(tmp_path / "budgets.db"))
+
+    worker_a.commit_action_usage("s1", "review", 2)
+    worker_b.commit_action_usage("s1", "review", 2)
+    with pytest.raises(BudgetExceeded):
+        worker_a.commit_action_usage("s1", "review", 2)
+    with pytest.raises(BudgetExceeded, match="Review budget"):
+        worker_b.check_action_budget("s1", 2, "review")
+    assert worker_b.get_action_usage("s1", "review") == 2
+    # The hint budget is counted apart from the generic "hint" action
+    worker_a.commit_hint_usage("s1", 1)
+    assert worker_b.get_hint_usage("s1") == 1 and worker_b.get_action_usage("s1", "hint") == 0
+
+    worker_a.reset(session_id="s1")
+    assert worker_b.get_action_usage("s1", "review") == 0
+
+    expired = SQLBudgetStore(engine, ttl_seconds=-1)
+    expired.commit_action_usage("s2", "review", 1)
+    assert expired.get_action_usage("s2", "review") == 0
+
+
+def test_ai_service_reserves_from_the_shared_ledger(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DSATRAIN_AI_LEDGER_BACKEND", "sql")
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'ai.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    session = db.get_session()
+    session.add(Problem(id="ledger_1", platform="custom", platform_id="l1", title="Ledger Problem",
+                        difficulty="Easy", algorithm_tags=["arrays"]))
+    session.commit()
+    settings = SettingsService(tmp_path / "user_settings.json")
+    # Mock OpenAI hints are estimated at $0.001 each
+    settings.save(Settings(enable_ai=True, ai_provider="openai", api_keys={"openai": "sk-" + "x" * 20},
+                           rate_limit_per_minute=1000, monthly_cost_cap_usd=0.0025, hint_budget_per_session=0))
+
+    service = AIService(session, settings=settings)
+    service.generate_hint("ledger_1", query="first")
+    service.generate_hint("ledger_1", query="second")
+    with pytest.raises(AICostExceeded):
+        service.generate_hint("ledger_1", query="third")
+
+    # Another worker process would see the same month total
+    assert SQLCostLedger(0.0025, db.engine).status().used_usd == pytest.approx(0.002)
+    assert service.get_status()["monthly_cost_used_usd"] == pytest.approx(0.002)
+    session.close()
+
+
+def test_redis_ledger_and_budgets(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs lupa to run Lua scripts
+    from src.services.costs.redis_backed import RedisCostLedger
+    from src.services.rate_limit.budget_stores import RedisBudgetStore
+
+    client = fakeredis.FakeStrictRedis()
+    ledger = RedisCostLedger(1.0, client=client)
+    ledger.reserve(0.6)
+    with pytest.raises(CostCapExceeded):
+        RedisCostLedger(1.0, client=client).reserve(0.6)
+    ledger.commit(-0.2)
+    status = ledger.status()
+    assert status.used_usd == pytest.approx(0.4)
+    assert status.month_key == datetime.now(UTC).strftime("%Y-%m")
+    assert 0 < client.ttl(f"dsatrain:cost:{status.month_key}") <= 62 * 24 * 3600
+
+    budgets = RedisBudgetStore(client=client, ttl_seconds=60)
+    budgets.commit_action_usage("s1", "elaborate", 1)
+    with pytest.raises(BudgetExceeded):
+        budgets.commit_action_usage("s1", "elaborate", 1)
+    assert budgets.get_action_usage("s1", "elaborate") == 1
+    assert 0 < client.ttl("dsatrain:budget:s1") <= 60
+
+
+def test_concurrent_hints_never_overshoot_the_session_budget(tmp_path, monkeypatch):
+    from src.services.ai_service import AIRateLimited
+    from src.services.providers.local import LocalProvider
+    from src.services.response_cache import ResponseCache
+
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DSATRAIN_AI_LEDGER_BACKEND", "sql")
+    monkeypatch.setattr(AIService, "_response_cache", ResponseCache(), raising=False)
+    db = DatabaseConfig(f"sqlite:///{tmp_path / 'ai.db'}")
+    Base.metadata.create_all(bind=db.engine)
+    setup = db.get_session()
+    setup.add(Problem(id="budget_1", platform="custom", platform_id="b1", title="Budget Problem",
+                      difficulty="Easy", algorithm_tags=["arrays"]))
+    setup.commit()
+    setup.close()
+    settings = SettingsService(tmp_path / "user_settings.json")
+    settings.save(Settings(enable_ai=True, ai_provider="local", rate_limit_per_minute=1000, hint_budget_per_session=2))
+
+    original = LocalProvider.generate_hint
+
+    def slow(self, *args, **kwargs):
+        if kwargs.get("query") == "broken":
+            raise RuntimeError("provider down")
+        threading.Event().wait(0.1)  # every request is in flight at once
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(LocalProvider, "generate_hint", slow)
+    session_id = f"race-{tmp_path.name}"
+    outcomes = []
+
+    def request(n):
+        session = db.get_session()
+        try:
+            AIService(session, settings=settings).generate_hint("budget_1", query=f"question {n}", session_id=session_id)
+            outcomes.append("served")
+        except AIRateLimited:
+            outcomes.append("refused")
+        finally:
+            session.close()
+
+    # A failed call gives its slot back
+    session = db.get_session()
+    with pytest.raises(RuntimeError):
+        AIService(session, settings=settings).generate_hint("budget_1", query="broken", session_id=session_id)
+    session.close()
+    assert SQLBudgetStore(db.engine).get_hint_usage(session_id) == 0
+
+    threads = [threading.Thread(target=request, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outcomes.count("served") == 2 and outcomes.count("refused") == 6
+    assert SQLBudgetStore(db.engine).get_hint_usage(session_id) == 2
@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, Problem, TagStatistic, ensure_tag_statistics, rebuild_tag_statistics
+
+
+def _problem(pid, tags, quality, relevance):
+    return Problem(
+        id=pid,
+        platform="custom",
+        platform_id=pid,
+        title=f"Problem {pid}",
+        difficulty="Easy",
+        algorithm_tags=tags,
+        quality_score=quality,
+        google_interview_relevance=relevance,
+    )
+
+
+def _snapshot(session):
+    return {
+        s.tag: (s.problem_count, round(s.quality_sum, 6), round(s.quality_sq_sum, 6),
+                s.relevance_count, round(s.relevance_sum, 6), s.high_relevance_count)
+        for s in session.query(TagStatistic).filter(TagStatistic.problem_count > 0)
+    }
+
+
+def test_tag_statistics_follow_inserts_updates_and_deletes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tags.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    session.add_all([
+        _problem("t1", ["arrays", "two_pointers"], 80.0, 8.0),
+        _problem("t2", ["arrays"], 60.0, 4.0),
+        _problem("t3", ["graphs"], 90.0, None),
+    ])
+    session.commit()
+
+    arrays = session.get(TagStatistic, "arrays")
+    assert arrays.problem_count == 2
+    assert arrays.avg_quality == 70.0
+    assert arrays.quality_stddev == 10.0
+    assert arrays.avg_relevance == 6.0
+    assert arrays.high_relevance_count == 1
+    # Column defaults (relevance 0.0) are counted exactly as they are stored
+    assert session.get(TagStatistic, "graphs").relevance_count == 1
+
+    # Update: retag and rescore t2, then delete t1
+    p2 = session.get(Problem, "t2")
+    p2.algorithm_tags = ["graphs"]
+    p2.google_interview_relevance = 9.0
+    session.commit()
+    session.delete(session.get(Problem, "t1"))
+    session.commit()
+    session.expire_all()
+
+    incremental = _snapshot(session)
+    assert "arrays" not in incremental
+    assert incremental["graphs"][0] == 2
+    assert incremental["graphs"][3] == 2
+    assert incremental["graphs"][5] == 1
+
+    # A full rebuild must agree with the incrementally maintained rows
+    rebuild_tag_statistics(session)
+    assert _snapshot(session) == incremental
+    session.close()
+
+
+def test_ensure_builds_once_when_no_problem_has_tags(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tags.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([_problem("u1", None, 50.0, 5.0), _problem("u2", [], 40.0, 3.0)])
+    session.commit()
+
+    ensure_tag_statistics(session)
+    assert _snapshot(session) == {}
+
+    import src.models.database as database
+
+    def fail(db_session):
+        raise AssertionError("tag_statistics rebuilt twice")
+
+    monkeypatch.setattr(database, "rebuild_tag_statistics", fail)
+    ensure_tag_statistics(session)
+    session.close()
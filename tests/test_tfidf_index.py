@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.ml.tfidf_index import TfidfIndex, load_published_index, publish_index
+from src.models.database import Base, DatabaseConfig, Problem
+import src.api.main as main
+from src.services import search_index
+from src.services.search_index import get_search_index, publish_search_index
+
+DOCS = [
+    ("a", "two sum array hash map"),
+    ("b", "binary tree level order traversal"),
+    ("c", "two pointers on a sorted array"),
+    ("d", ""),
+    ("e", "shortest path in a weighted graph"),
+]
+
+
+def test_scores_match_dense_reference_cosine():
+    index = TfidfIndex.build(DOCS)
+    vocab = {t: i for i, t in enumerate(index.terms)}
+    dense = np.zeros((len(DOCS), len(vocab)))
+    for row, (_, text) in enumerate(DOCS):
+        for term in text.split():
+            dense[row, vocab[term]] += 1
+    df = (dense > 0).sum(axis=0)
+    idf = np.log((1 + len(DOCS)) / (1 + df)) + 1
+    tfidf = np.where(dense > 0, 1 + np.log(np.maximum(dense, 1)), 0) * idf
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    expected = tfidf @ tfidf[0]
+    got = dict(index.similar("a", k=10))
+    assert set(got) == {"c"}  # only documents sharing a term, never itself
+    assert got["c"] == pytest.approx(expected[2], abs=1e-6)
+
+    batch = index.search_many(["array", "graph path", "nothing indexed"], k=2)
+    assert {pid for pid, _ in batch[0]} == {"a", "c"}
+    assert batch[1][0][0] == "e" and batch[2] == []
+
+
+def test_incremental_update_equals_full_rebuild_and_survives_publish(tmp_path):
+    index = TfidfIndex.build(DOCS)
+    current = [("a", "two sum array hash map"), ("c", "binary search on answer"), ("f", "array rotation")]
+    updated = index.updated(current)
+    rebuilt = TfidfIndex.build(current)
+
+    assert updated.metadata["reindexed"] == 2
+    assert index.updated(DOCS) is index
+    for query in ("array", "binary search", "two"):
+        assert dict(updated.search(query)) == pytest.approx(dict(rebuilt.search(query)))
+
+    publish_index(updated, tmp_path)
+    publish_index(rebuilt, tmp_path)
+    publish_index(rebuilt, tmp_path)
+    loaded = load_published_index(tmp_path)
+    assert isinstance(loaded.post_docs, np.memmap)
+    assert dict(loaded.search("array")) == pytest.approx(dict(rebuilt.search("array")))
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 2
+
+
+def test_search_index_tracks_database_changes(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    session = db_config.get_session()
+    for pid, title, desc in [("p1", "Two Sum", "find two numbers"), ("p2", "Graph Paths", "count paths")]:
+        session.add(Problem(id=pid, platform="t", platform_id=pid, title=title, description=desc,
+                            difficulty="Easy", algorithm_tags=[]))
+    session.commit()
+
+    root = tmp_path / "tfidf"
+    publish_search_index(session, root)
+    assert load_published_index(root).search("paths")[0][0] == "p2"
+
+    session.get(Problem, "p1").description = "paths through a grid"
+    session.commit()
+    index = get_search_index(session, root)
+    assert {pid for pid, _ in index.search("grid")} == {"p1"}
+    assert index.metadata["reindexed"] == 1
+    session.close()
+
+
+def test_versions_that_cannot_be_deleted_yet_are_retried_on_the_next_publish(tmp_path, monkeypatch):
+    index = TfidfIndex.build(DOCS)
+    for _ in range(2):
+        publish_index(index, tmp_path)
+    real_unlink = os.unlink
+
+    def locked(path, *args, **kwargs):
+        raise PermissionError("mapped by another process")
+
+    monkeypatch.setattr(os, "unlink", locked)
+    publish_index(index, tmp_path)
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 3
+    monkeypatch.setattr(os, "unlink", real_unlink)
+    publish_index(index, tmp_path)
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 2
+    assert load_published_index(tmp_path).ids == index.ids
+
+
+def test_search_endpoint_builds_the_index_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.delenv("DSATRAIN_DATABASE_URL", raising=False)
+    db_config = DatabaseConfig(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=db_config.engine)
+    session = db_config.get_session()
+    session.add(Problem(id="p1", platform="t", platform_id="p1", title="Grid Paths", description="count paths",
+                        difficulty="Easy", algorithm_tags=[]))
+    session.commit()
+    session.close()
+    builds = []
+    original = search_index._refreshed
+
+    def recording(session, previous):
+        try:
+            asyncio.get_running_loop()
+            builds.append("event loop")
+        except RuntimeError:
+            builds.append("worker thread")
+        return original(session, previous)
+
+    def get_db():
+        db = db_config.get_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(search_index, "_refreshed", recording)
+    monkeypatch.setattr(search_index, "DEFAULT_INDEX_DIR", tmp_path / "tfidf")
+    main.app.dependency_overrides[main.get_db] = get_db
+    try:
+        response = TestClient(main.app).get("/search", params={"query": "paths"})
+    finally:
+        main.app.dependency_overrides.pop(main.get_db, None)
+    assert response.status_code == 200
+    assert builds == ["worker thread"]